@@ -29,6 +29,9 @@ __status__ = "Development"
 class ClinicaClassLoader:
     """
     Load pipelines from a custom locations (general from $HOME/clinica)
+
+    load_specs() declares the CmdParser classes found in the `*_cli.py` files without importing them
+    (see clinica.engine.registry), load() imports and instantiates them.
     """
 
     def __init__(self, env='CLINICAPATH',
@@ -63,11 +66,78 @@ class ClinicaClassLoader:
 
         return pipeline_cli_parsers
 
+    def load_specs(self):
+        """
+        Declare the CmdParser classes of the custom location without importing them.
+
+        The name and description of a class are read from the string literals assigned to
+        `self._name` and `self._description` in its define_name and define_description methods
+        (as in the files generated by `clinica generate template`). Otherwise, the class is
+        instantiated to get them.
+
+        Returns:
+            List of clinica.engine.registry.CommandSpec, whose module is the path to the file.
+        """
+        import os
+        from clinica.engine.registry import CommandSpec
+
+        command_specs = []
+        if self.env not in os.environ.keys():
+            return command_specs
+
+        clinica_pipelines_path = join(os.environ[self.env], self.extra_dir)
+        if not os.path.isdir(clinica_pipelines_path):
+            return command_specs
+
+        src_path = self.discover_path_with_subdir(clinica_pipelines_path)
+        self.add_to_python_path(src_path)
+        for file in self.find_files(src_path, self.reg):
+            class_name, name, description = self.read_class_literals(self.baseclass, file)
+            if class_name is None:
+                continue
+            if name is None:
+                cmdparser = self.load_class(self.baseclass, file)
+                name, description = cmdparser.name, cmdparser.description
+            command_specs.append(CommandSpec(name, file, class_name, description))
+
+        return command_specs
+
+    @staticmethod
+    def read_class_literals(baseclass, file):
+        """Class name and literal name/description (None if not literal) of the first subclass of baseclass."""
+        import ast
+
+        with open(file) as f:
+            tree = ast.parse(f.read(), filename=file)
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            base_names = [getattr(base, 'attr', getattr(base, 'id', None)) for base in node.bases]
+            if baseclass.__name__ not in base_names:
+                continue
+            literals = {}
+            for method in node.body:
+                if isinstance(method, ast.FunctionDef) and method.name in ['define_name', 'define_description']:
+                    for statement in ast.walk(method):
+                        if (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                                and isinstance(statement.targets[0], ast.Attribute)
+                                and statement.targets[0].attr in ['_name', '_description']):
+                            try:
+                                value = ast.literal_eval(statement.value)
+                            except (ValueError, TypeError, SyntaxError):
+                                continue
+                            if isinstance(value, str):
+                                literals[statement.targets[0].attr] = value
+            return node.name, literals.get('_name'), literals.get('_description')
+        return None, None, None
+
     def load_class(self, baseclass, file):
-        import imp
+        import importlib.util
         import inspect
         py_module_name, ext = os.path.splitext(os.path.split(file)[-1])
-        py_module = imp.load_source(py_module_name, file)
+        module_spec = importlib.util.spec_from_file_location(py_module_name, file)
+        py_module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(py_module)
         for class_name, class_obj in inspect.getmembers(py_module, inspect.isclass):
             if inspect.isclass(class_obj) and not inspect.isabstract(class_obj):
                 x = class_obj()
@@ -87,6 +157,28 @@ class ClinicaClassLoader:
         return [os.path.join(path, file) for path in paths for file in os.listdir(path) if re.match(reg, file) is not None]
 
 
+def init_registry_objects(root_parser, parser, specs, requested_name=None):
+    """
+    Declare the sub-commands of a category from their specifications (see clinica.engine.registry).
+
+    Only the sub-command requested on the command line is loaded with its arguments, the others
+    being declared with their name and help message.
+
+    Args:
+        root_parser: The root parser
+        parser: The ArgParser node (e.g. 'run' or 'convert')
+        specs: List of CommandSpec of this category
+        requested_name: Name of the sub-command given on the command line
+    """
+    from clinica.engine.registry import load_command
+
+    for spec in specs:
+        if spec.name == requested_name:
+            init_cmdparser_objects(root_parser, parser, [load_command(spec)])
+        else:
+            parser.add_parser(spec.name, add_help=False, help=spec.help)
+
+
 # Nice display
 def custom_traceback(exc_type, exc_value, exc_traceback):
     import traceback
@@ -184,66 +276,35 @@ def execute():
                         help='Define the log file name (default: clinica.log)')
 
     """
-    run category: run one of the available pipelines
+    Sub-commands are declared from the registry: only the module of the
+    sub-command given on the command line is imported
     """
     from clinica.engine import CmdParser
+    from clinica.engine.registry import COMMANDS, requested_command
+
+    if '_ARGCOMPLETE' in os.environ:
+        # Shell completion: the command line is given by the shell
+        import shlex
+        command_line = os.environ.get('COMP_LINE', '')[:int(os.environ.get('COMP_POINT', 0))]
+        try:
+            command_words = shlex.split(command_line)[1:]
+        except ValueError:
+            command_words = command_line.split()[1:]
+    else:
+        command_words = sys.argv[1:]
+    requested_category, requested_name = requested_command(command_words)
 
-    from clinica.pipelines.t1_freesurfer.t1_freesurfer_cli import T1FreeSurferCLI
-    from clinica.pipelines.t1_freesurfer_longitudinal.t1_freesurfer_longitudinal_cli import T1FreeSurferLongitudinalCLI
-    from clinica.pipelines.t1_freesurfer_longitudinal.t1_freesurfer_template_cli import T1FreeSurferTemplateCLI
-    from clinica.pipelines.t1_freesurfer_longitudinal.t1_freesurfer_longitudinal_correction_cli import T1FreeSurferLongitudinalCorrectionCLI
-    from clinica.pipelines.t1_volume_tissue_segmentation.t1_volume_tissue_segmentation_cli import T1VolumeTissueSegmentationCLI
-    from clinica.pipelines.t1_volume_create_dartel.t1_volume_create_dartel_cli import T1VolumeCreateDartelCLI
-    from clinica.pipelines.t1_volume_register_dartel.t1_volume_register_dartel_cli import T1VolumeRegisterDartelCLI
-    from clinica.pipelines.t1_volume_dartel2mni.t1_volume_dartel2mni_cli import T1VolumeDartel2MNICLI
-    from clinica.pipelines.t1_volume.t1_volume_cli import T1VolumeCLI
-    from clinica.pipelines.t1_volume_existing_template.t1_volume_existing_template_cli import T1VolumeExistingTemplateCLI
-    from clinica.pipelines.t1_volume_parcellation.t1_volume_parcellation_cli import T1VolumeParcellationCLI
-    from clinica.pipelines.t1_linear.t1_linear_cli import T1LinearCLI
-    from clinica.pipelines.deeplearning_prepare_data.deeplearning_prepare_data_cli import DeepLearningPrepareDataCLI
-    from clinica.pipelines.dwi_preprocessing_using_phasediff_fieldmap.dwi_preprocessing_using_phasediff_fieldmap_cli import DwiPreprocessingUsingPhaseDiffFieldmapCli
-    from clinica.pipelines.dwi_preprocessing_using_t1.dwi_preprocessing_using_t1_cli import DwiPreprocessingUsingT1Cli
-    from clinica.pipelines.dwi_dti.dwi_dti_cli import DwiDtiCli
-    from clinica.pipelines.dwi_connectome.dwi_connectome_cli import DwiConnectomeCli
-    from clinica.pipelines.pet_volume.pet_volume_cli import PETVolumeCLI
-    from clinica.pipelines.pet_surface.pet_surface_cli import PetSurfaceCLI
-    from clinica.pipelines.pet_surface.pet_surface_longitudinal_cli import PetSurfaceLongitudinalCLI
-    from clinica.pipelines.machine_learning_spatial_svm.spatial_svm_cli import SpatialSVMCLI
-    from clinica.pipelines.statistics_surface.statistics_surface_cli import StatisticsSurfaceCLI
-    from clinica.pipelines.statistics_volume.statistics_volume_cli import StatisticsVolumeCLI
-    from clinica.pipelines.statistics_volume_correction.statistics_volume_correction_cli import StatisticsVolumeCorrectionCLI
-    pipelines = ClinicaClassLoader(baseclass=CmdParser,
-                                   extra_dir="pipelines").load()
-    # The order in pipelines var will the same when typing `clinica run`
+    def init_commands(category, subparsers, custom_specs=()):
+        requested = requested_name if category == requested_category else None
+        init_registry_objects(parser, subparsers, list(custom_specs) + COMMANDS[category], requested)
+
+    """
+    run category: run one of the available pipelines
+    """
+    # The order of the registry is the one displayed when typing `clinica run`
     # Pipelines are sorted by main / advanced pipelines then by modality
-    pipelines += [
-        # Main pipelines:
-        T1FreeSurferCLI(),
-        T1VolumeCLI(),
-        T1FreeSurferLongitudinalCLI(),
-        T1LinearCLI(),
-        DwiPreprocessingUsingPhaseDiffFieldmapCli(),
-        DwiPreprocessingUsingT1Cli(),
-        DwiDtiCli(),
-        DwiConnectomeCli(),
-        PETVolumeCLI(),
-        PetSurfaceCLI(),
-        # PetSurfaceLongitudinalCLI(),
-        DeepLearningPrepareDataCLI(),
-        SpatialSVMCLI(),
-        StatisticsSurfaceCLI(),
-        StatisticsVolumeCLI(),
-        StatisticsVolumeCorrectionCLI(),
-        # Advanced pipelines:
-        T1VolumeExistingTemplateCLI(),
-        T1VolumeTissueSegmentationCLI(),
-        T1VolumeCreateDartelCLI(),
-        T1VolumeRegisterDartelCLI(),
-        T1VolumeDartel2MNICLI(),
-        T1VolumeParcellationCLI(),
-        T1FreeSurferTemplateCLI(),
-        T1FreeSurferLongitudinalCorrectionCLI(),
-    ]
+    pipelines = ClinicaClassLoader(baseclass=CmdParser,
+                                   extra_dir="pipelines").load_specs()
 
     run_parser = sub_parser.add_parser(
         'run',
@@ -256,28 +317,13 @@ def execute():
     run_parser._positionals.title = '%sclinica run expects one of the following pipelines%s' % \
                                     (Fore.GREEN, Fore.RESET)
 
-    init_cmdparser_objects(
-        parser,
-        run_parser.add_subparsers(metavar='', dest='run'),
-        pipelines
-    )
+    init_commands('run', run_parser.add_subparsers(metavar='', dest='run'), pipelines)
 
     """
     convert category: convert one of the supported datasets into BIDS hierarchy
     """
-    from clinica.iotools.converters.aibl_to_bids.aibl_to_bids_cli import AiblToBidsCLI
-    from clinica.iotools.converters.adni_to_bids.adni_to_bids_cli import AdniToBidsCLI
-    from clinica.iotools.converters.oasis_to_bids.oasis_to_bids_cli import OasisToBidsCLI
-    from clinica.iotools.converters.nifd_to_bids.nifd_to_bids_cli import NifdToBidsCLI  # noga
-
     converters = ClinicaClassLoader(baseclass=CmdParser,
-                                    extra_dir="iotools/converters").load()
-    converters += [
-        AdniToBidsCLI(),
-        AiblToBidsCLI(),
-        OasisToBidsCLI(),
-        NifdToBidsCLI(),
-    ]
+                                    extra_dir="iotools/converters").load_specs()
 
     convert_parser = sub_parser.add_parser(
         'convert',
@@ -289,26 +335,11 @@ def execute():
     convert_parser._positionals.title = '%sclinica convert expects one of the following datasets%s' % \
                                         (Fore.YELLOW, Fore.RESET)
     convert_parser._optionals.title = OPTIONAL_TITLE
-    init_cmdparser_objects(
-        parser,
-        convert_parser.add_subparsers(metavar='', dest='convert'),
-        converters
-    )
+    init_commands('convert', convert_parser.add_subparsers(metavar='', dest='convert'), converters)
 
     """
     iotools category
     """
-    from clinica.iotools.utils.data_handling_cli import CmdParserSubjectsSessions
-    from clinica.iotools.utils.data_handling_cli import CmdParserMergeTsv
-    from clinica.iotools.utils.data_handling_cli import CmdParserMissingModalities
-    from clinica.iotools.utils.data_handling_cli import CmdParserCenterNifti
-    io_tools = [
-        CmdParserSubjectsSessions(),
-        CmdParserMergeTsv(),
-        CmdParserMissingModalities(),
-        CmdParserCenterNifti()
-    ]
-
     HELP_IO_TOOLS = 'Tools to handle BIDS/CAPS datasets.'
     io_parser = sub_parser.add_parser(
         'iotools',
@@ -320,24 +351,13 @@ def execute():
                                    (Fore.YELLOW, Fore.RESET)
     io_parser._optionals.title = OPTIONAL_TITLE
 
-    init_cmdparser_objects(
-        parser,
-        io_parser.add_subparsers(metavar='', dest='iotools'),
-        io_tools
-    )
+    init_commands('iotools', io_parser.add_subparsers(metavar='', dest='iotools'))
 
     """
     visualize category: run one of the available pipelines
     """
-    from clinica.engine import CmdParser
-
-    from clinica.pipelines.t1_freesurfer.t1_freesurfer_visualizer import T1FreeSurferVisualizer
-
     visualizers = ClinicaClassLoader(baseclass=CmdParser,
-                                     extra_dir="pipelines").load()
-    visualizers += [
-        T1FreeSurferVisualizer(),
-    ]
+                                     extra_dir="pipelines").load_specs()
 
     visualize_parser = sub_parser.add_parser(
         'visualize',
@@ -350,11 +370,7 @@ def execute():
     visualize_parser._positionals.title = '%sclinica visualize expects one of the following pipelines%s' % \
                                           (Fore.YELLOW, Fore.RESET)
 
-    init_cmdparser_objects(
-        parser,
-        visualize_parser.add_subparsers(metavar='', dest='visualize'),
-        visualizers
-    )
+    init_commands('visualize', visualize_parser.add_subparsers(metavar='', dest='visualize'), visualizers)
 
     """
     generate category: template
@@ -371,12 +387,7 @@ def execute():
                                          (Fore.YELLOW, Fore.RESET)
     generate_parser._optionals.title = OPTIONAL_TITLE
 
-    from clinica.engine.template import CmdGenerateTemplates
-    init_cmdparser_objects(
-        parser,
-        generate_parser.add_subparsers(metavar='', dest='generate'),
-        [CmdGenerateTemplates()]
-    )
+    init_commands('generate', generate_parser.add_subparsers(metavar='', dest='generate'))
 
     """
     Silent all sub-parser errors methods except the one which is called
@@ -0,0 +1,227 @@
+# coding: utf8
+
+"""Registry of the sub-commands of the `clinica` executable.
+
+Each sub-command is declared with its name, the module and class of its CmdParser and its help
+message. `clinica --help`, `clinica run` or the shell completion list the sub-commands from this
+table: the module of a sub-command (and the pipeline, nipype, etc. it imports) is only loaded when
+this sub-command is dispatched.
+"""
+
+from collections import namedtuple
+
+# - name: name of the sub-command (CmdParser.name)
+# - module: module of the CmdParser (or path to its file for the pipelines of $CLINICAPATH)
+# - class_name: name of the CmdParser class
+# - help: help message of the sub-command (CmdParser.description)
+CommandSpec = namedtuple("CommandSpec", ["name", "module", "class_name", "help"])
+
+# The order of the pipelines is the one displayed by `clinica run`:
+# main pipelines then advanced pipelines, sorted by modality
+RUN_COMMANDS = [
+    # Main pipelines:
+    CommandSpec('t1-freesurfer',
+                'clinica.pipelines.t1_freesurfer.t1_freesurfer_cli', 'T1FreeSurferCLI',
+                'Cross-sectional pre-processing of T1w images with FreeSurfer:\n'
+                'http://clinica.run/doc/Pipelines/T1_FreeSurfer/'),
+    CommandSpec('t1-volume',
+                'clinica.pipelines.t1_volume.t1_volume_cli', 'T1VolumeCLI',
+                'Volume-based processing of T1-weighted MR images:\n'
+                'http://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-freesurfer-longitudinal',
+                'clinica.pipelines.t1_freesurfer_longitudinal.t1_freesurfer_longitudinal_cli',
+                'T1FreeSurferLongitudinalCLI',
+                'Longitudinal pre-processing of T1w images with FreeSurfer:\n'
+                'http://clinica.run/doc/Pipelines/T1_FreeSurfer_Longitudinal/'),
+    CommandSpec('t1-linear',
+                'clinica.pipelines.t1_linear.t1_linear_cli', 'T1LinearCLI',
+                'Affine registration of T1w images to the MNI standard space:\n'
+                'http://clinica.run/doc/Pipelines/T1_Linear/'),
+    CommandSpec('dwi-preprocessing-using-fieldmap',
+                'clinica.pipelines.dwi_preprocessing_using_phasediff_fieldmap.'
+                'dwi_preprocessing_using_phasediff_fieldmap_cli',
+                'DwiPreprocessingUsingPhaseDiffFieldmapCli',
+                'Preprocessing of raw DWI datasets using a phase difference image:\n'
+                'http://clinica.run/doc/Pipelines/DWI_Preprocessing/'),
+    CommandSpec('dwi-preprocessing-using-t1',
+                'clinica.pipelines.dwi_preprocessing_using_t1.dwi_preprocessing_using_t1_cli',
+                'DwiPreprocessingUsingT1Cli',
+                'Preprocessing of raw DWI datasets using a T1w image:\n'
+                'http://clinica.run/doc/Pipelines/DWI_Preprocessing/'),
+    CommandSpec('dwi-dti',
+                'clinica.pipelines.dwi_dti.dwi_dti_cli', 'DwiDtiCli',
+                'DTI-based processing of DWI datasets:\n'
+                'http://clinica.run/doc/DWI_DTI'),
+    CommandSpec('dwi-connectome',
+                'clinica.pipelines.dwi_connectome.dwi_connectome_cli', 'DwiConnectomeCli',
+                'Connectome-based processing of DWI datasets:\n'
+                'http://clinica.run/doc/DWI_Connectome'),
+    CommandSpec('pet-volume',
+                'clinica.pipelines.pet_volume.pet_volume_cli', 'PETVolumeCLI',
+                'SPM-based pre-processing of PET images:\n'
+                'http://clinica.run/doc/Pipelines/PET_Volume/'),
+    CommandSpec('pet-surface',
+                'clinica.pipelines.pet_surface.pet_surface_cli', 'PetSurfaceCLI',
+                'Surface-based processing of PET images:\n'
+                'http://clinica.run/doc/Pipelines/PET_Surface/'),
+    # CommandSpec('pet-surface-longitudinal',
+    #             'clinica.pipelines.pet_surface.pet_surface_longitudinal_cli', 'PetSurfaceLongitudinalCLI',
+    #             'Longitudinal surface-based processing of PET images:\n'
+    #             'http://clinica.run/doc/Pipelines/PET_Surface_Longitudinal/'),
+    CommandSpec('deeplearning-prepare-data',
+                'clinica.pipelines.deeplearning_prepare_data.deeplearning_prepare_data_cli',
+                'DeepLearningPrepareDataCLI',
+                'Prepare data generated Clinica for PyTorch with Tensor extraction:\n'
+                'http://clinica.run/doc/Pipelines/DeepLearning_PrepareData/'),
+    CommandSpec('machinelearning-prepare-spatial-svm',
+                'clinica.pipelines.machine_learning_spatial_svm.spatial_svm_cli', 'SpatialSVMCLI',
+                'Prepare input data for SVM with spatial and anatomical regularization:\n'
+                'http://clinica.run/doc/MachineLeaning_PrepareSpatialSVM'),
+    CommandSpec('statistics-surface',
+                'clinica.pipelines.statistics_surface.statistics_surface_cli', 'StatisticsSurfaceCLI',
+                'Surface-based mass-univariate analysis with SurfStat:\n'
+                'http://clinica.run/doc/Pipelines/Stats_Surface/'),
+    CommandSpec('statistics-volume',
+                'clinica.pipelines.statistics_volume.statistics_volume_cli', 'StatisticsVolumeCLI',
+                'Volume-based mass-univariate analysis with SPM:\n'
+                'http://clinica.run/doc/Pipelines/Statistics_Volume/'),
+    CommandSpec('statistics-volume-correction',
+                'clinica.pipelines.statistics_volume_correction.statistics_volume_correction_cli',
+                'StatisticsVolumeCorrectionCLI',
+                'Statistical correction of statistics-volume pipeline:\n'
+                'http://clinica.run/doc/Pipelines/Statistics_Volume/'),
+    # Advanced pipelines:
+    CommandSpec('t1-volume-existing-template',
+                'clinica.pipelines.t1_volume_existing_template.t1_volume_existing_template_cli',
+                'T1VolumeExistingTemplateCLI',
+                'Volume-based processing of T1-weighted MR images using an existing DARTEL template:\n'
+                'http://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-volume-tissue-segmentation',
+                'clinica.pipelines.t1_volume_tissue_segmentation.t1_volume_tissue_segmentation_cli',
+                'T1VolumeTissueSegmentationCLI',
+                'Tissue segmentation, bias correction and spatial normalization to MNI space of T1w images '
+                'with SPM:\nhttp://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-volume-create-dartel',
+                'clinica.pipelines.t1_volume_create_dartel.t1_volume_create_dartel_cli', 'T1VolumeCreateDartelCLI',
+                'Inter-subject registration using Dartel (creating a new Dartel template):\n'
+                'http://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-volume-register-dartel',
+                'clinica.pipelines.t1_volume_register_dartel.t1_volume_register_dartel_cli',
+                'T1VolumeRegisterDartelCLI',
+                'Inter-subject registration using Dartel (using an existing Dartel template):\n'
+                'http://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-volume-dartel2mni',
+                'clinica.pipelines.t1_volume_dartel2mni.t1_volume_dartel2mni_cli', 'T1VolumeDartel2MNICLI',
+                'Register DARTEL template to MNI space:\n'
+                'http://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-volume-parcellation',
+                'clinica.pipelines.t1_volume_parcellation.t1_volume_parcellation_cli', 'T1VolumeParcellationCLI',
+                'Computation of mean GM concentration for a set of regions:\n'
+                'http://clinica.run/doc/Pipelines/T1_Volume/'),
+    CommandSpec('t1-freesurfer-template',
+                'clinica.pipelines.t1_freesurfer_longitudinal.t1_freesurfer_template_cli', 'T1FreeSurferTemplateCLI',
+                'Creation of unbiased template with FreeSurfer:\n'
+                'http://clinica.run/doc/Pipelines/T1_FreeSurfer_Longitudinal/'),
+    CommandSpec('t1-freesurfer-longitudinal-correction',
+                'clinica.pipelines.t1_freesurfer_longitudinal.t1_freesurfer_longitudinal_correction_cli',
+                'T1FreeSurferLongitudinalCorrectionCLI',
+                'Longitudinal pre-processing correction of T1w images with FreeSurfer:\n'
+                'http://clinica.run/doc/Pipelines/T1_FreeSurfer_Longitudinal/'),
+]
+
+CONVERT_COMMANDS = [
+    CommandSpec('adni-to-bids',
+                'clinica.iotools.converters.adni_to_bids.adni_to_bids_cli', 'AdniToBidsCLI',
+                'Convert ADNI (http://adni.loni.usc.edu/) into BIDS'),
+    CommandSpec('aibl-to-bids',
+                'clinica.iotools.converters.aibl_to_bids.aibl_to_bids_cli', 'AiblToBidsCLI',
+                'Convert AIBL (https://aibl.csiro.au/adni/index.html) into BIDS.'),
+    CommandSpec('oasis-to-bids',
+                'clinica.iotools.converters.oasis_to_bids.oasis_to_bids_cli', 'OasisToBidsCLI',
+                'Convert OASIS (http://oasis-brains.org/) into BIDS.'),
+    CommandSpec('nifd-to-bids',
+                'clinica.iotools.converters.nifd_to_bids.nifd_to_bids_cli', 'NifdToBidsCLI',
+                'Convert NIFD (http://4rtni-ftldni.ini.usc.edu/) into BIDS.'),
+]
+
+IOTOOLS_COMMANDS = [
+    CommandSpec('create-subjects-visits',
+                'clinica.iotools.utils.data_handling_cli', 'CmdParserSubjectsSessions',
+                'Create a TSV file containing participants with their sessions'),
+    CommandSpec('merge-tsv',
+                'clinica.iotools.utils.data_handling_cli', 'CmdParserMergeTsv',
+                'Merge TSV files containing clinical data of a BIDS dataset into a single TSV file.'),
+    CommandSpec('check-missing-modalities',
+                'clinica.iotools.utils.data_handling_cli', 'CmdParserMissingModalities',
+                'Check missing modalities in a BIDS directory'),
+    CommandSpec('center-nifti',
+                'clinica.iotools.utils.data_handling_cli', 'CmdParserCenterNifti',
+                'Center NIFTI of a BIDS directory. Tool mainly used when SPM is not able \n'
+                'to segment some T1w images because the centers of these volumes are not\n'
+                'aligned with the origin of theworld coordinate system. By default, only\n'
+                'problematic images are converted. The rest of the images are also copied\n'
+                'to the new BIDS directory, but left untouched.'),
+]
+
+VISUALIZE_COMMANDS = [
+    CommandSpec('t1-freesurfer',
+                'clinica.pipelines.t1_freesurfer.t1_freesurfer_visualizer', 'T1FreeSurferVisualizer',
+                'Cross-sectional pre-processing of T1w images with FreeSurfer:\n'
+                'http://clinica.run/doc/Pipelines/T1_FreeSurfer/'),
+]
+
+GENERATE_COMMANDS = [
+    CommandSpec('template',
+                'clinica.engine.template', 'CmdGenerateTemplates',
+                'Generate the skeleton for a new pipeline (for developers)'),
+]
+
+# Sub-commands of each category of `clinica`
+COMMANDS = {
+    'run': RUN_COMMANDS,
+    'convert': CONVERT_COMMANDS,
+    'iotools': IOTOOLS_COMMANDS,
+    'visualize': VISUALIZE_COMMANDS,
+    'generate': GENERATE_COMMANDS,
+}
+
+
+def requested_command(argv):
+    """
+    Find the category and the sub-command of a command line.
+
+    Args:
+        argv (list[str]): Words of the command line, without the executable (e.g. ['run', 't1-linear', ...]).
+
+    Returns:
+        Tuple (category, command name), e.g. ('run', 't1-linear'), whose elements are None if not found.
+    """
+    words = [word for word in argv if not word.startswith('-')]
+    for i, word in enumerate(words):
+        if word in COMMANDS:
+            return word, words[i + 1] if i + 1 < len(words) else None
+    return None, None
+
+
+def load_command(spec):
+    """
+    Import the module of a sub-command and instantiate its CmdParser.
+
+    Args:
+        spec (CommandSpec): Sub-command to load.
+
+    Returns:
+        Instance of the CmdParser of the sub-command.
+    """
+    import importlib
+    import importlib.util
+    import os
+
+    if spec.module.endswith('.py'):
+        module_name = os.path.splitext(os.path.basename(spec.module))[0]
+        module_spec = importlib.util.spec_from_file_location(module_name, spec.module)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(spec.module)
+    return getattr(module, spec.class_name)()
@@ -19,8 +19,9 @@ def create_merge_file(bids_dir, out_tsv, caps_dir=None, tsv_file=None, pipelines
 
     """
     from os import path
-    from glob import glob
     import os
+    from concurrent.futures import ThreadPoolExecutor
+    from itertools import groupby
     import pandas as pd
     import numpy as np
     import warnings
@@ -32,7 +33,6 @@ def create_merge_file(bids_dir, out_tsv, caps_dir=None, tsv_file=None, pipelines
             raise IOError('The path to the CAPS directory is wrong')
 
     col_list = []
-    scans_dict = {}
 
     if not os.path.isfile(path.join(bids_dir, 'participants.tsv')):
         raise IOError('participants.tsv not found in the specified BIDS directory')
@@ -68,83 +68,79 @@ def create_merge_file(bids_dir, out_tsv, caps_dir=None, tsv_file=None, pipelines
     for col in participants_df.columns.values:
         col_list.append(col)
 
-    merged_df = pd.DataFrame(columns=col_list)
-
-    # BIDS part
-    i_subject = 0
-    while i_subject < n_sessions:
-        sub_path = path.join(bids_dir, subjects[i_subject])
-        sub_name = sub_path.split(os.sep)[-1]
-        # For each subject, extract the relative row from the dataframe
-        row_participant = participants_df[participants_df['participant_id'] == sub_name]
-        # Open the sessions file related to the subject
-        sessions_df = pd.read_csv(path.join(sub_path, sub_name + '_sessions.tsv'), sep='\t')
-        # Looking for the sessions corresponding to the subject
-        loc_sessions = []
-        i_session = i_subject
-        while i_session < n_sessions and subjects[i_session] == subjects[i_subject]:
-            loc_sessions.append(i_session)
-            i_session += 1
-
-        # For each session found
-        # extract the information contained in the scans files
-        # for line in range(0, len(sessions_df)):
+    # Rows of participants_df for each participant (a participant may appear several times)
+    participants_rows = {}
+    for position, participant_id in enumerate(participants_df['participant_id'].values):
+        participants_rows.setdefault(participant_id, []).append(position)
+    participants_values = {col: participants_df[col].values for col in participants_df.columns.values}
+
+    def read_tsv(tsv_path):
+        return pd.read_csv(tsv_path, sep='\t')
+
+    def read_tsv_files(tsv_paths):
+        """Read the TSV files concurrently (each file is read once)."""
+        unique_paths = list(dict.fromkeys(tsv_paths))
+        with ThreadPoolExecutor() as executor:
+            return dict(zip(unique_paths, executor.map(read_tsv, unique_paths)))
+
+    # Consecutive sessions of the same subject are processed together
+    subject_groups = []
+    for subject, group in groupby(range(n_sessions), key=lambda i_session: subjects[i_session]):
+        subject_groups.append((subject, list(group)))
+
+    sessions_dfs = read_tsv_files([path.join(bids_dir, subject, subject + '_sessions.tsv')
+                                   for subject, _ in subject_groups])
+
+    # Extract the row relative to each session and locate the scans files
+    session_rows = []
+    for sub_name, loc_sessions in subject_groups:
+        sessions_df = sessions_dfs[path.join(bids_dir, sub_name, sub_name + '_sessions.tsv')]
         for i_session in loc_sessions:
-            # Extract and convert to a dictionary information
-            # regarding the session
-            row_session_df = sessions_df[sessions_df.session_id == sessions[i_session]]
-            row_session_df.reset_index(inplace=True, drop=True)
-            if len(row_session_df) == 0:
+            session_positions = np.flatnonzero(sessions_df.session_id.values == sessions[i_session])
+            if len(session_positions) == 0:
                 raise DatasetError(sessions_df.loc[0, 'session_id'] + ' / ' + sessions[i_session])
-
-            new_cols = [s for s in row_session_df.columns.values if s not in col_list]
-            if len(new_cols) != 0:
-                for i in range(0, len(new_cols)):
-                    col_list.append(new_cols[i])
-
-            session_id = row_session_df.loc[0, 'session_id']
-            if os.path.isfile(path.join(bids_dir, sub_name, 'ses-' + session_id,
-                                        sub_name + '_' + 'ses-' + session_id + '_scans.tsv')):
-                scans_df = pd.read_csv(path.join(bids_dir, sub_name, 'ses-' + session_id,
-                                                 sub_name + '_' + 'ses-' + session_id + '_scans.tsv'), sep='\t')
-                for i in range(0, len(scans_df)):
-                    for col in scans_df.columns.values:
-                        if col == 'filename':
-                            pass
-                        else:
-                            file_scan = scans_df.iloc[i]['filename']
-                            file_name = file_scan.split('/')[1]
-                            # Remove the extension .nii.gz
-                            file_name = os.path.splitext(os.path.splitext(file_name)[0])[0]
-                            file_parts = file_name.split('_')
-                            last_pattern_index = len(file_parts) - 1
-                            mod_type = file_parts[last_pattern_index]
-                            value = scans_df.iloc[i][col]
-                            new_col_name = col + '_' + mod_type
-                            scans_dict.update({new_col_name: value})
-                row_scans = pd.DataFrame(scans_dict, index=[0])
+            session_id = sessions_df.session_id.values[session_positions[0]]
+            scans_path = path.join(bids_dir, sub_name, 'ses-' + session_id,
+                                   sub_name + '_' + 'ses-' + session_id + '_scans.tsv')
+            session_rows.append((sub_name, sessions_df, session_positions[0],
+                                 scans_path if os.path.isfile(scans_path) else None))
+
+    scans_dfs = read_tsv_files([scans_path for _, _, _, scans_path in session_rows if scans_path is not None])
+
+    # BIDS part: one record per participant row and session
+    records = []
+    for sub_name, loc_session_rows in groupby(session_rows, key=lambda session_row: session_row[0]):
+        # Information extracted from the scans files accumulates over the sessions of the subject
+        scans_dict = {}
+        for _, sessions_df, session_position, scans_path in loc_session_rows:
+            # Extract the information regarding the session
+            session_dict = {col: sessions_df[col].values[session_position]
+                            for col in sessions_df.columns.values}
+            col_list.extend(col for col in session_dict if col not in col_list)
+
+            # Extract the information contained in the scans files
+            if scans_path is not None:
+                scans_df = scans_dfs[scans_path]
+                scans_columns = [col for col in scans_df.columns.values if col != 'filename']
+                for i, file_scan in enumerate(scans_df['filename'].values):
+                    file_name = file_scan.split('/')[1]
+                    # Remove the extension .nii.gz
+                    file_name = os.path.splitext(os.path.splitext(file_name)[0])[0]
+                    mod_type = file_name.split('_')[-1]
+                    for col in scans_columns:
+                        scans_dict[col + '_' + mod_type] = scans_df[col].values[i]
+                row_scans = dict(scans_dict)
             else:
-                row_scans = pd.DataFrame()
-
-            new_cols = [s for s in row_scans.columns.values if s not in col_list]
-            if len(new_cols) != 0:
-                for i in range(0, len(new_cols)):
-                    col_list.append(new_cols[i])
-
-            row_to_append_df = pd.DataFrame(columns=row_participant.columns)
-            for col in row_participant:
-                row_to_append_df[col] = row_participant[col]
+                row_scans = {}
+            col_list.extend(col for col in row_scans if col not in col_list)
 
-            # Append all the data inside session_df
-            for col in row_session_df:
-                row_to_append_df[col] = row_session_df[col].values[0]
+            for position in participants_rows.get(sub_name, []):
+                record = {col: values[position] for col, values in participants_values.items()}
+                record.update(session_dict)
+                record.update(row_scans)
+                records.append(record)
 
-            for col in row_scans:
-                row_to_append_df[col] = row_scans[col].values[0]
-
-            merged_df = merged_df.append(row_to_append_df)
-        scans_dict = {}
-        i_subject = loc_sessions[-1] + 1
+    merged_df = pd.DataFrame(records, columns=col_list)
 
     old_index = col_list.index('session_id')
     col_list.insert(1, col_list.pop(old_index))
@@ -259,16 +255,16 @@ def find_mods_and_sess(bids_dir):
     }
 
     """
-    from glob import glob
     from os import path
     import os
+    from clinica.utils.dataset_index import index_glob
 
     mods_dict = {}
     mods_list = []
-    subjects_paths_lists = glob(path.join(bids_dir, '*sub-*'))
+    subjects_paths_lists = index_glob(bids_dir, path.join(bids_dir, '*sub-*'))
 
     for sub_path in subjects_paths_lists:
-        ses_paths = glob(path.join(sub_path, '*ses-*'))
+        ses_paths = index_glob(bids_dir, path.join(sub_path, '*ses-*'))
         for session in ses_paths:
             ses_name = session.split(os.sep)[-1]
             mods_avail = []
@@ -277,14 +273,14 @@ def find_mods_and_sess(bids_dir):
                     mods_dict['sessions'].append(ses_name)
             else:
                 mods_dict.update({'sessions': [ses_name]})
-            mods_paths_folders = glob(path.join(session, '*/'))
+            mods_paths_folders = index_glob(bids_dir, path.join(session, '*/'))
 
             for p in mods_paths_folders:
                 p = p[:-1]
                 mods_avail.append(p.split('/').pop())
 
             if 'func' in mods_avail:
-                list_funcs_paths = glob(path.join(session, 'func', '*bold.nii.gz'))
+                list_funcs_paths = index_glob(bids_dir, path.join(session, 'func', '*bold.nii.gz'))
                 for func_path in list_funcs_paths:
                     func_name = func_path.split(os.sep)[-1]
                     func_name_tokens = func_name.split('_')
@@ -317,7 +313,7 @@ def find_mods_and_sess(bids_dir):
                     mods_list.append('pet')
 
             if 'anat' in mods_avail:
-                anat_files_paths = glob(path.join(session, 'anat', '*'))
+                anat_files_paths = index_glob(bids_dir, path.join(session, 'anat', '*'))
 
                 for anat_file in anat_files_paths:
                     anat_name = anat_file.split(os.sep)[-1]
@@ -493,9 +489,9 @@ def create_subs_sess_list(input_dir, output_dir,
         use_session_tsv (boolean): Specify if the list uses the sessions listed in the sessions.tsv files
     """
     from os import path
-    from glob import glob
     import pandas as pd
     import os
+    from clinica.utils.dataset_index import index_glob
 
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -509,7 +505,7 @@ def create_subs_sess_list(input_dir, output_dir,
         path_to_search = input_dir
     else:
         path_to_search = path.join(input_dir, 'subjects')
-    subjects_paths = glob(path.join(path_to_search, '*sub-*'))
+    subjects_paths = index_glob(input_dir, path.join(path_to_search, '*sub-*'))
 
     # Sort the subjects list
     subjects_paths.sort()
@@ -527,7 +523,7 @@ def create_subs_sess_list(input_dir, output_dir,
                 subjs_sess_tsv.write(subj_id + '\t' + session + '\n')
 
         else:
-            sess_list = glob(path.join(sub_path, '*ses-*'))
+            sess_list = index_glob(input_dir, path.join(sub_path, '*ses-*'))
 
             for ses_path in sess_list:
                 session_name = ses_path.split(os.sep)[-1]
@@ -64,7 +64,6 @@ def pet_volume_pipeline(caps_dir, df, **kwargs):
     columns = ['pipeline_name', 'group_id', 'atlas_id', 'regions_number', 'first_column_name', 'last_column_name']
     summary_df = pd.DataFrame(columns=columns)
     col_list = []
-    group_list = []
 
     # Looking for a subject with the correct modality to initialize
     sub_paths = glob(path.join(caps_dir, '*sub-*'))
@@ -95,7 +94,6 @@ def pet_volume_pipeline(caps_dir, df, **kwargs):
                 warnings.warn('The group wanted does not exist for ' + pipeline_name + ': ' + group_selected, UserWarning)
     for group_path in group_paths:
         group_id = group_path.split(os.sep)[-1]
-        group_list.append(group_id)
         stats_path = group_path + os.sep + 'atlas_statistics'
         # Selection of the atlas(es)
         if atlas_selection is None:
@@ -137,40 +135,7 @@ def pet_volume_pipeline(caps_dir, df, **kwargs):
             row_summary_df.iloc[0] = row_summary
             summary_df = pd.concat([summary_df, row_summary_df])
 
-    # Initial empty DataFrame for the pipeline
-    number_sessions = len(df)
-    pipeline_df = pd.DataFrame(index=np.arange(number_sessions), columns=col_list)
-
-    for i in range(number_sessions):
-        # Reading the reference (subject + session)
-        participant_id = df['participant_id'][i]
-        session_id = df['session_id'][i]
-
-        ses_path = caps_dir + os.sep + participant_id + os.sep + session_id
-        mod_path = ses_path + os.sep + pet_path
-        ses_df = pd.DataFrame(index=np.arange(1), columns=col_list)
-
-        if os.path.exists(mod_path):
-            # Looking for groups
-            for group in group_list:
-                group_path = mod_path + os.sep + group
-                if os.path.exists(group_path):
-                    # Looking for atlases
-                    atlas_list = summary_df[summary_df.group_id == group]['atlas_id'].to_numpy()
-                    for atlas in atlas_list:
-                        atlas_path = group_path + os.sep + 'atlas_statistics' + os.sep
-                        atlas_path = atlas_path + participant_id + '_' + session_id + '_' + atlas + '_statistics.tsv'
-                        if os.path.exists(atlas_path):
-                            n_regions = summary_df[(summary_df.group_id == group) &
-                                                   (summary_df.atlas_id == atlas)]['regions_number'].values[0]
-                            atlas_df = pd.read_csv(atlas_path, sep='\t')
-                            label_list = [group + '_' + atlas + '_ROI-' + str(x) for x in
-                                          range(n_regions)]
-                            ses_df.loc[:, label_list] = atlas_df['mean_scalar'].to_numpy()
-
-        pipeline_df.iloc[i] = ses_df.iloc[0]
-
-    final_df = pd.concat([df, pipeline_df], axis=1)
+    final_df = merge_atlas_statistics(caps_dir, df, pet_path, col_list, summary_df)
 
     return final_df, summary_df
 
@@ -211,7 +176,6 @@ def t1_volume_pipeline(caps_dir, df, **kwargs):
     columns = ['pipeline_name', 'group_id', 'atlas_id', 'regions_number', 'first_column_name', 'last_column_name']
     summary_df = pd.DataFrame(columns=columns)
     col_list = []
-    group_list = []
 
     # Looking for a subject with the correct modality to initialize
     sub_paths = glob(path.join(caps_dir, '*sub-*'))
@@ -245,7 +209,6 @@ def t1_volume_pipeline(caps_dir, df, **kwargs):
                 warnings.warn('The group wanted does not exist for ' + pipeline_name + ': ' + group_selected, UserWarning)
     for group_path in group_paths:
         group_id = group_path.split(os.sep)[-1]
-        group_list.append(group_id)
         stats_path = group_path + os.sep + 'atlas_statistics'
         # Selection of the atlas(es)
         if atlas_selection is None:
@@ -277,42 +240,67 @@ def t1_volume_pipeline(caps_dir, df, **kwargs):
             row_summary_df.iloc[0] = row_summary
             summary_df = pd.concat([summary_df, row_summary_df])
 
-    # Initial empty DataFrame for the pipeline
-    number_sessions = len(df)
-    pipeline_df = pd.DataFrame(index=np.arange(number_sessions), columns=col_list)
+    final_df = merge_atlas_statistics(caps_dir, df, t1_spm_path, col_list, summary_df)
+
+    return final_df, summary_df
+
+
+def merge_atlas_statistics(caps_dir, df, mod_path, col_list, summary_df):
+    """
+    This method gathers the mean of each ROI computed by a pipeline for all the sessions
+    of the merged file.
 
+    All the statistics files are located first, then read concurrently and stored in a
+    float block (sessions x ROIs) which is concatenated once to the DataFrame.
+
+    Args:
+        caps_dir: the path to the 'subjects' folder of the CAPS directory
+        df: the DataFrame containing the BIDS information
+        mod_path: the path to the outputs of the pipeline, relative to the session folder
+        col_list: the names of the ROI columns (in the order of summary_df)
+        summary_df: the DataFrame describing the atlases found for each group
+
+    Returns:
+        final_df: a DataFrame containing the information of the bids and the pipeline
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # First column of each (group, atlas) in the ROI block
+    atlas_columns = {}
+    first_column = 0
+    for group, atlas, n_regions in zip(summary_df.group_id, summary_df.atlas_id, summary_df.regions_number):
+        atlas_columns.setdefault((group, atlas), []).append((first_column, n_regions))
+        first_column += n_regions
+
+    # Statistics files of all the sessions
+    number_sessions = len(df)
+    atlas_paths = []
     for i in range(number_sessions):
-        # Reading the reference (subject + session)
         participant_id = df['participant_id'][i]
         session_id = df['session_id'][i]
-
         ses_path = caps_dir + os.sep + participant_id + os.sep + session_id
-        mod_path = ses_path + os.sep + t1_spm_path
-        ses_df = pd.DataFrame(index=np.arange(1), columns=col_list)
-
-        if os.path.exists(mod_path):
-            # Looking for groups
-            for group in group_list:
-                group_path = mod_path + os.sep + group
-                if os.path.exists(group_path):
-                    # Looking for atlases
-                    atlas_list = summary_df[summary_df.group_id == group]['atlas_id'].to_numpy()
-                    for atlas in atlas_list:
-                        atlas_path = group_path + os.sep + 'atlas_statistics' + os.sep
-                        atlas_path = atlas_path + participant_id + '_' + session_id + '_' + atlas + '_statistics.tsv'
-                        if os.path.exists(atlas_path):
-                            n_regions = summary_df[(summary_df.group_id == group) &
-                                                   (summary_df.atlas_id == atlas)]['regions_number'].values[0]
-                            atlas_df = pd.read_csv(atlas_path, sep='\t')
-                            label_list = [group + '_' + atlas + '_ROI-' + str(x) for x in
-                                          range(n_regions)]
-                            ses_df.loc[:, label_list] = atlas_df['mean_scalar'].to_numpy()
-
-        pipeline_df.iloc[i] = ses_df.iloc[0]
-
-    final_df = pd.concat([df, pipeline_df], axis=1)
-
-    return final_df, summary_df
+        for group, atlas in atlas_columns:
+            atlas_path = ses_path + os.sep + mod_path + os.sep + group + os.sep + 'atlas_statistics' + os.sep
+            atlas_path = atlas_path + participant_id + '_' + session_id + '_' + atlas + '_statistics.tsv'
+            atlas_paths.append((i, group, atlas, atlas_path))
+
+    def read_mean_scalar(atlas_path):
+        try:
+            return pd.read_csv(atlas_path, sep='\t', usecols=['mean_scalar'])['mean_scalar'].to_numpy()
+        except FileNotFoundError:
+            return None
+
+    pipeline_block = np.full((number_sessions, len(col_list)), np.nan)
+    with ThreadPoolExecutor() as executor:
+        mean_scalars = executor.map(read_mean_scalar, [atlas_path for _, _, _, atlas_path in atlas_paths])
+        for (i, group, atlas, _), mean_scalar in zip(atlas_paths, mean_scalars):
+            if mean_scalar is not None:
+                for first_column, n_regions in atlas_columns[(group, atlas)]:
+                    pipeline_block[i, first_column:first_column + n_regions] = mean_scalar
+
+    pipeline_df = pd.DataFrame(pipeline_block, index=np.arange(number_sessions), columns=col_list)
+
+    return pd.concat([df, pipeline_df], axis=1)
 
 
 class InitException(Exception):
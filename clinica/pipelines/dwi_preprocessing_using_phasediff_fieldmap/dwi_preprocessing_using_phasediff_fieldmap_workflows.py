@@ -58,6 +58,7 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.ants as ants
 
+    from clinica.utils.dwi import split_volumes, merge_volumes_remove_negative
     from clinica.utils.epi import bids_dir_to_fsl_dir
     from clinica.utils.fmap import resample_fmap_to_b0
 
@@ -157,16 +158,19 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
     vsm = pe.Node(fsl.FUGUE(save_shift=True, **fugue_params),
                   name="ComputeVSM")
 
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
+    split = pe.Node(niu.Function(input_names=['in_file'],
+                                 output_names=['out_files'],
+                                 function=split_volumes),
+                    name='SplitDWIs')
 
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['out_file'],
+                                 function=merge_volumes_remove_negative),
+                    name='MergeDWIs')
 
     unwarp = pe.MapNode(fsl.FUGUE(icorr=True, forward_warping=False),
                         iterfield=['in_file'], name='UnwarpDWIs')
 
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-
     vsm2dfm = vsm2warp()
     vsm2dfm.inputs.inputnode.scaling = 1.0
 
@@ -223,13 +227,12 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
         (split,   unwarp, [('out_files',      'in_file')]),  # noqa
         (vsm,     unwarp, [('shift_out_file', 'shift_in_file')]),  # noqa
         (fsl_dir, unwarp, [('fsl_dir',        'unwarp_direction')]),  # noqa
-        (unwarp, thres, [('unwarped_file', 'in_file')]),  # noqa
-        (thres, merge, [('out_file', 'in_files')]),  # noqa
-        (merge,   vsm2dfm, [('merged_file',    'inputnode.in_ref')]),  # noqa
+        (unwarp,  merge,   [('unwarped_file',  'in_files')]),  # noqa
+        (merge,   vsm2dfm, [('out_file',       'inputnode.in_ref')]),  # noqa
         (vsm,     vsm2dfm, [('shift_out_file', 'inputnode.in_vsm')]),  # noqa
         (fsl_dir, vsm2dfm, [('fsl_dir',        'inputnode.enc_dir')]),  # noqa
         (rad2rsec, outputnode, [('out_file',            'out_native_fmap')]),  # noqa
-        (merge,    outputnode, [('merged_file',         'out_file')]),  # noqa
+        (merge,    outputnode, [('out_file',            'out_file')]),  # noqa
         (vsm,      outputnode, [('shift_out_file',      'out_vsm')]),  # noqa
         (vsm2dfm,  outputnode, [('outputnode.out_warp', 'out_warp')]),  # noqa
     ])
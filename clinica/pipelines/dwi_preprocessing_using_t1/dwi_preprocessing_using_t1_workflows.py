@@ -58,6 +58,7 @@ def susceptibility_distortion_correction_using_t1(
     import nipype.interfaces.fsl as fsl
     import \
         clinica.pipelines.dwi_preprocessing_using_t1.dwi_preprocessing_using_t1_utils as utils
+    from clinica.utils.dwi import split_volumes, merge_volumes_remove_negative
 
     def expend_matrix_list(in_matrix, in_bvec):
         import numpy as np
@@ -108,7 +109,10 @@ def susceptibility_distortion_correction_using_t1(
         niu.IdentityInterface(fields=['in_t1', 'in_dwi', 'in_bvec']),
         name='inputnode')
 
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
+    split = pe.Node(niu.Function(input_names=['in_file'],
+                                 output_names=['out_files'],
+                                 function=split_volumes),
+                    name='SplitDWIs')
     pick_ref = pe.Node(niu.Select(), name='Pick_b0')
     pick_ref.inputs.index = [0]
 
@@ -162,10 +166,10 @@ def susceptibility_distortion_correction_using_t1(
                             iterfield=['in_file'], name='apply_warp')
     apply_warp.inputs.interp = 'spline'
 
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['out_file'],
+                                 function=merge_volumes_remove_negative),
+                    name='MergeDWIs')
 
     outputnode = pe.Node(niu.IdentityInterface(
         fields=['dwi_to_t1_coregistration_matrix',
@@ -219,11 +223,9 @@ def susceptibility_distortion_correction_using_t1(
         (split, apply_warp, [('out_files', 'in_file')]),  # noqa
         (inputnode, apply_warp, [('in_t1', 'ref_file')]),  # noqa
 
-        (apply_warp, thres, [('out_file', 'in_file')]),  # noqa
-
-        (thres, merge, [('out_file', 'in_files')]),  # noqa
+        (apply_warp, merge, [('out_file', 'in_files')]),  # noqa
         # Outputnode
-        (merge, outputnode, [('merged_file', 'out_dwi')]),  # noqa
+        (merge, outputnode, [('out_file', 'out_dwi')]),  # noqa
         (flirt_b0_to_t1, outputnode,
          [('out_matrix_file', 'dwi_to_t1_coregistration_matrix')]),  # noqa
         (ants_registration_syn_quick, outputnode,
@@ -246,6 +248,8 @@ def apply_all_corrections_using_ants(name='UnwarpArtifacts'):
     import nipype.interfaces.utility as niu
     import nipype.pipeline.engine as pe
 
+    from clinica.utils.dwi import split_volumes, merge_volumes_remove_negative
+
     inputnode = pe.Node(niu.IdentityInterface(
         fields=['in_sdc_syb', 'in_hmc', 'in_ecc', 'in_dwi', 'in_t1']),
         name='inputnode')
@@ -254,7 +258,10 @@ def apply_all_corrections_using_ants(name='UnwarpArtifacts'):
         fields=['out_file', 'out_warp', 'out_coeff', 'out_jacobian']),
         name='outputnode')
 
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
+    split = pe.Node(niu.Function(input_names=['in_file'],
+                                 output_names=['out_files'],
+                                 function=split_volumes),
+                    name='SplitDWIs')
 
     concat_hmc_ecc = pe.MapNode(fsl.ConvertXFM(), name="concat_hmc_ecc",
                                 iterfield=['in_file', 'in_file2'])
@@ -272,13 +279,12 @@ def apply_all_corrections_using_ants(name='UnwarpArtifacts'):
                         iterfield=['in_file'], name='CoeffComp')
     jacobian = pe.MapNode(fsl.WarpUtils(write_jacobian=True),
                           iterfield=['in_file'], name='JacobianComp')
-    jacmult = pe.MapNode(fsl.MultiImageMaths(op_string='-mul %s'),
-                         iterfield=['in_file', 'operand_files'],
-                         name='ModulateDWIs')
-
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    # The unwarped DWIs are modulated by the determinant of the Jacobian, and
+    # their negative values removed, when they are merged
+    merge = pe.Node(niu.Function(input_names=['in_files', 'in_multipliers'],
+                                 output_names=['out_file'],
+                                 function=merge_volumes_remove_negative),
+                    name='MergeDWIs')
 
     wf = pe.Workflow(name=name)
     wf.connect([
@@ -296,14 +302,12 @@ def apply_all_corrections_using_ants(name='UnwarpArtifacts'):
         (warps, coeffs, [('out_file', 'in_file')]),  # noqa
         (inputnode, jacobian, [('in_t1', 'reference')]),  # noqa
         (coeffs, jacobian, [('out_file', 'in_file')]),  # noqa
-        (unwarp, jacmult, [('out_file', 'in_file')]),  # noqa
-        (jacobian, jacmult, [('out_jacobian', 'operand_files')]),  # noqa
-        (jacmult, thres, [('out_file', 'in_file')]),  # noqa
-        (thres, merge, [('out_file', 'in_files')]),  # noqa
+        (unwarp, merge, [('out_file', 'in_files')]),  # noqa
+        (jacobian, merge, [('out_jacobian', 'in_multipliers')]),  # noqa
         (warps, outputnode, [('out_file', 'out_warp')]),  # noqa
         (coeffs, outputnode, [('out_file', 'out_coeff')]),  # noqa
         (jacobian, outputnode, [('out_jacobian', 'out_jacobian')]),  # noqa
-        (merge, outputnode, [('merged_file', 'out_file')])  # noqa
+        (merge, outputnode, [('out_file', 'out_file')])  # noqa
     ])
 
     return wf
@@ -3,7 +3,6 @@
 
 from os import path
 import json
-from multiprocessing.pool import ThreadPool
 import datetime
 
 import numpy as np
@@ -24,13 +23,15 @@ import clinica.pipelines.machine_learning.ml_utils as utils
 
 class DualSVMAlgorithm(base.MLAlgorithm):
 
-    def _launch_svc(self, kernel_train, x_test, y_train, y_test, c):
+    def _svc(self, c, probability=True):
 
         if self._algorithm_params['balanced']:
-            svc = SVC(C=c, kernel='precomputed', probability=True, tol=1e-6, class_weight='balanced')
-        else:
-            svc = SVC(C=c, kernel='precomputed', probability=True, tol=1e-6)
+            return SVC(C=c, kernel='precomputed', probability=probability, tol=1e-6, class_weight='balanced')
+        return SVC(C=c, kernel='precomputed', probability=probability, tol=1e-6)
+
+    def _launch_svc(self, kernel_train, x_test, y_train, y_test, c):
 
+        svc = self._svc(c)
         svc.fit(kernel_train, y_train)
         y_hat_train = svc.predict(kernel_train)
         y_hat = svc.predict(x_test)
@@ -39,12 +40,20 @@ class DualSVMAlgorithm(base.MLAlgorithm):
 
         return svc, y_hat, auc, y_hat_train
 
-    def _grid_search(self, kernel_train, x_test, y_train, y_test, c):
+    def _grid_search(self, kernel_train, x_test, y_train, y_test, c_range):
+        """
+        Balanced accuracy of each value of C on an inner fold.
 
-        _, y_hat, _, _ = self._launch_svc(kernel_train, x_test, y_train, y_test, c)
-        res = utils.evaluate_prediction(y_test, y_hat)
+        The kernel blocks of the fold are shared by all the values of C, and the probabilities
+        are not calibrated since only the predictions are scored.
+        """
+        accuracies = {}
+        for c in c_range:
+            svc = self._svc(c, probability=False)
+            svc.fit(kernel_train, y_train)
+            accuracies[c] = utils.evaluate_prediction(y_test, svc.predict(x_test))['balanced_accuracy']
 
-        return res['balanced_accuracy']
+        return accuracies
 
     def _select_best_parameter(self, async_result):
 
@@ -54,9 +63,8 @@ class DualSVMAlgorithm(base.MLAlgorithm):
             best_c = -1
             best_acc = -1
 
-            for c, async_acc in async_result[fold].items():
+            for c, acc in async_result[fold].result().items():
 
-                acc = async_acc.get()
                 if acc > best_acc:
                     best_c = c
                     best_acc = acc
@@ -70,12 +78,10 @@ class DualSVMAlgorithm(base.MLAlgorithm):
 
     def evaluate(self, train_index, test_index):
 
-        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
+        executor = self._get_executor()
         async_result = {}
-        for i in range(self._algorithm_params['grid_search_folds']):
-            async_result[i] = {}
 
-        outer_kernel = self._kernel[train_index, :][:, train_index]
+        train_index, test_index = np.asarray(train_index), np.asarray(test_index)
         y_train = self._y[train_index]
 
         skf = StratifiedKFold(n_splits=self._algorithm_params['grid_search_folds'], shuffle=True)
@@ -84,22 +90,15 @@ class DualSVMAlgorithm(base.MLAlgorithm):
         for i in range(len(inner_cv)):
             inner_train_index, inner_test_index = inner_cv[i]
 
-            inner_kernel = outer_kernel[inner_train_index, :][:, inner_train_index]
-            x_test_inner = outer_kernel[inner_test_index, :][:, inner_train_index]
-            y_train_inner, y_test_inner = y_train[inner_train_index], y_train[inner_test_index]
-
-            for c in self._algorithm_params['c_range']:
-                async_result[i][c] = inner_pool.apply_async(self._grid_search,
-                                                            (inner_kernel, x_test_inner,
-                                                             y_train_inner, y_test_inner, c))
-        inner_pool.close()
-        inner_pool.join()
+            async_result[i] = executor.submit(self._run_on_fold, '_grid_search',
+                                              train_index[inner_train_index],
+                                              train_index[inner_test_index], self._algorithm_params['c_range'])
 
         best_parameter = self._select_best_parameter(async_result)
-        x_test = self._kernel[test_index, :][:, train_index]
-        y_train, y_test = self._y[train_index], self._y[test_index]
+        y_test = self._y[test_index]
 
-        _, y_hat, auc, y_hat_train = self._launch_svc(outer_kernel, x_test, y_train, y_test, best_parameter['c'])
+        _, y_hat, auc, y_hat_train = executor.submit(self._run_on_fold, '_launch_svc', train_index, test_index,
+                                                     best_parameter['c']).result()
 
         result = dict()
         result['best_parameter'] = best_parameter
@@ -129,11 +128,7 @@ class DualSVMAlgorithm(base.MLAlgorithm):
         # Mean balanced accuracy
         mean_bal_acc = np.mean(bal_acc_list)
 
-        if self._algorithm_params['balanced']:
-            svc = SVC(C=best_c, kernel='precomputed', probability=True, tol=1e-6, class_weight='balanced')
-        else:
-            svc = SVC(C=best_c, kernel='precomputed', probability=True, tol=1e-6)
-
+        svc = self._svc(best_c)
         svc.fit(self._kernel, self._y)
 
         return svc, {'c': best_c, 'balanced_accuracy': mean_bal_acc}
@@ -149,8 +144,8 @@ class DualSVMAlgorithm(base.MLAlgorithm):
         dual_coefficients = classifier.dual_coef_
         sv_indices = classifier.support_
 
-        weighted_sv = dual_coefficients.transpose() * x[sv_indices]
-        weights = np.sum(weighted_sv, 0)
+        # Single product of the dual coefficients with the support vectors, read by blocks
+        weights = utils.weighted_rows_sum(x, sv_indices, np.sum(dual_coefficients, 0))
 
         np.savetxt(path.join(output_dir, 'weights.txt'), weights)
 
@@ -177,14 +172,16 @@ class DualSVMAlgorithm(base.MLAlgorithm):
 
 class LogisticReg(base.MLAlgorithm):
 
-    def _launch_logistic_reg(self, x_train, x_test, y_train, y_test, c):
+    def _logistic_reg(self, c, warm_start=False):
 
         if self._algorithm_params['balanced']:
-            classifier = LogisticRegression(penalty=self._algorithm_params['penalty'], tol=1e-6, C=c,
-                                            class_weight='balanced')
-        else:
-            classifier = LogisticRegression(penalty=self._algorithm_params['penalty'], tol=1e-6, C=c)
+            return LogisticRegression(penalty=self._algorithm_params['penalty'], tol=1e-6, C=c,
+                                      class_weight='balanced', warm_start=warm_start)
+        return LogisticRegression(penalty=self._algorithm_params['penalty'], tol=1e-6, C=c, warm_start=warm_start)
 
+    def _launch_logistic_reg(self, x_train, x_test, y_train, y_test, c):
+
+        classifier = self._logistic_reg(c)
         classifier.fit(x_train, y_train)
         y_hat_train = classifier.predict(x_train)
         y_hat = classifier.predict(x_test)
@@ -193,12 +190,21 @@ class LogisticReg(base.MLAlgorithm):
 
         return classifier, y_hat, auc, y_hat_train
 
-    def _grid_search(self, x_train, x_test, y_train, y_test, c):
+    def _grid_search(self, x_train, x_test, y_train, y_test, c_range):
+        """
+        Balanced accuracy of each value of C on an inner fold.
 
-        _, y_hat, _, _ = self._launch_logistic_reg(x_train, x_test, y_train, y_test, c)
-        res = utils.evaluate_prediction(y_test, y_hat)
+        The values of C are fitted from the most to the least regularized one, each fit starting
+        from the previous solution when warm_start is enabled.
+        """
+        classifier = self._logistic_reg(1.0, warm_start=self._algorithm_params['warm_start'])
+        accuracies = {}
+        for c in sorted(c_range):
+            classifier.set_params(C=c)
+            classifier.fit(x_train, y_train)
+            accuracies[c] = utils.evaluate_prediction(y_test, classifier.predict(x_test))['balanced_accuracy']
 
-        return res['balanced_accuracy']
+        return {c: accuracies[c] for c in c_range}
 
     def _select_best_parameter(self, async_result):
 
@@ -208,9 +214,8 @@ class LogisticReg(base.MLAlgorithm):
             best_c = -1
             best_acc = -1
 
-            for c, async_acc in async_result[fold].items():
+            for c, acc in async_result[fold].result().items():
 
-                acc = async_acc.get()
                 if acc > best_acc:
                     best_c = c
                     best_acc = acc
@@ -224,12 +229,10 @@ class LogisticReg(base.MLAlgorithm):
 
     def evaluate(self, train_index, test_index):
 
-        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
+        executor = self._get_executor()
         async_result = {}
-        for i in range(self._algorithm_params['grid_search_folds']):
-            async_result[i] = {}
 
-        x_train = self._x[train_index]
+        train_index, test_index = np.asarray(train_index), np.asarray(test_index)
         y_train = self._y[train_index]
 
         skf = StratifiedKFold(n_splits=self._algorithm_params['grid_search_folds'], shuffle=True)
@@ -238,23 +241,15 @@ class LogisticReg(base.MLAlgorithm):
         for i in range(len(inner_cv)):
             inner_train_index, inner_test_index = inner_cv[i]
 
-            x_train_inner = x_train[inner_train_index]
-            x_test_inner = x_train[inner_test_index]
-            y_train_inner = y_train[inner_train_index]
-            y_test_inner = y_train[inner_test_index]
-
-            for c in self._algorithm_params['c_range']:
-                async_result[i][c] = inner_pool.apply_async(self._grid_search,
-                                                            (x_train_inner, x_test_inner,
-                                                             y_train_inner, y_test_inner, c))
-        inner_pool.close()
-        inner_pool.join()
+            async_result[i] = executor.submit(self._run_on_fold, '_grid_search',
+                                              train_index[inner_train_index],
+                                              train_index[inner_test_index], self._algorithm_params['c_range'])
 
         best_parameter = self._select_best_parameter(async_result)
-        x_test = self._x[test_index]
         y_test = self._y[test_index]
 
-        _, y_hat, auc, y_hat_train = self._launch_logistic_reg(x_train, x_test, y_train, y_test, best_parameter['c'])
+        _, y_hat, auc, y_hat_train = executor.submit(self._run_on_fold, '_launch_logistic_reg', train_index,
+                                                     test_index, best_parameter['c']).result()
 
         result = dict()
         result['best_parameter'] = best_parameter
@@ -284,12 +279,7 @@ class LogisticReg(base.MLAlgorithm):
         # Mean balanced accuracy
         mean_bal_acc = np.mean(bal_acc_list)
 
-        if self._algorithm_params['balanced']:
-            classifier = LogisticRegression(C=best_c, penalty=self._algorithm_params['penalty'], tol=1e-6,
-                                            class_weight='balanced')
-        else:
-            classifier = LogisticRegression(C=best_c, penalty=self._algorithm_params['penalty'], tol=1e-6)
-
+        classifier = self._logistic_reg(best_c)
         classifier.fit(self._x, self._y)
 
         return classifier, {'c': best_c, 'balanced_accuracy': mean_bal_acc}
@@ -327,6 +317,7 @@ class LogisticReg(base.MLAlgorithm):
                            'balanced': False,
                            'grid_search_folds': 10,
                            'c_range': np.logspace(-6, 2, 17),
+                           'warm_start': True,
                            'n_threads': 15}
 
         return parameters_dict
@@ -340,11 +331,11 @@ class RandomForest(base.MLAlgorithm):
         if self._algorithm_params['balanced']:
             classifier = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
                                                 min_samples_split=min_samples_split, max_features=max_features,
-                                                class_weight='balanced', n_jobs=self._algorithm_params['n_threads'])
+                                                class_weight='balanced', n_jobs=self._estimator_n_jobs())
         else:
             classifier = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
                                                 min_samples_split=min_samples_split, max_features=max_features,
-                                                n_jobs=self._algorithm_params['n_threads'])
+                                                n_jobs=self._estimator_n_jobs())
 
         classifier.fit(x_train, y_train)
         y_hat_train = classifier.predict(x_train)
@@ -374,8 +365,7 @@ class RandomForest(base.MLAlgorithm):
             best_params = None
             best_acc = -1
 
-            for params, async_acc in async_result[fold].items():
-                acc = async_acc.get()
+            for params, acc in async_result[fold].items():
                 if acc > best_acc:
                     best_params = params
                     best_acc = acc
@@ -416,12 +406,9 @@ class RandomForest(base.MLAlgorithm):
 
     def evaluate(self, train_index, test_index):
 
-        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
-        async_result = {}
-        for i in range(self._algorithm_params['grid_search_folds']):
-            async_result[i] = {}
+        executor = self._get_executor()
 
-        x_train = self._x[train_index]
+        train_index, test_index = np.asarray(train_index), np.asarray(test_index)
         y_train = self._y[train_index]
 
         skf = StratifiedKFold(n_splits=self._algorithm_params['grid_search_folds'], shuffle=True)
@@ -432,31 +419,17 @@ class RandomForest(base.MLAlgorithm):
                                                          self._algorithm_params['min_samples_split_range'],
                                                          self._algorithm_params['max_features_range']))
 
-        for i in range(len(inner_cv)):
-            inner_train_index, inner_test_index = inner_cv[i]
+        # Index of n_estimators in the combinations: number of trees reduced by successive halving
+        async_result = self._search_parameters(train_index, inner_cv, parameters_combinations, budget_index=0)
 
-            x_train_inner = x_train[inner_train_index]
-            x_test_inner = x_train[inner_test_index]
-            y_train_inner = y_train[inner_train_index]
-            y_test_inner = y_train[inner_test_index]
-
-            for parameters in parameters_combinations:
-                async_result[i][parameters] = inner_pool.apply_async(self._grid_search,
-                                                                     (x_train_inner, x_test_inner,
-                                                                      y_train_inner, y_test_inner,
-                                                                      parameters[0], parameters[1],
-                                                                      parameters[2], parameters[3]))
-        inner_pool.close()
-        inner_pool.join()
         best_parameter = self._select_best_parameter(async_result)
-        x_test = self._x[test_index]
         y_test = self._y[test_index]
 
-        _, y_hat, auc, y_hat_train = self._launch_random_forest(x_train, x_test, y_train, y_test,
-                                                                best_parameter['n_estimators'],
-                                                                best_parameter['max_depth'],
-                                                                best_parameter['min_samples_split'],
-                                                                best_parameter['max_features'])
+        _, y_hat, auc, y_hat_train = executor.submit(self._run_on_fold, '_launch_random_forest', train_index, test_index,
+                                                     best_parameter['n_estimators'],
+                                                     best_parameter['max_depth'],
+                                                     best_parameter['min_samples_split'],
+                                                     best_parameter['max_features']).result()
 
         result = dict()
         result['best_parameter'] = best_parameter
@@ -474,9 +447,7 @@ class RandomForest(base.MLAlgorithm):
 
     def evaluate_no_cv(self, train_index, test_index):
 
-        x_train = self._x[train_index]
         y_train = self._y[train_index]
-        x_test = self._x[test_index]
         y_test = self._y[test_index]
 
         best_parameter = dict()
@@ -485,11 +456,12 @@ class RandomForest(base.MLAlgorithm):
         best_parameter['min_samples_split'] = self._algorithm_params['min_samples_split_range']
         best_parameter['max_features'] = self._algorithm_params['max_features_range']
 
-        _, y_hat, auc, y_hat_train = self._launch_random_forest(x_train, x_test, y_train, y_test,
-                                                                self._algorithm_params['n_estimators_range'],
-                                                                self._algorithm_params['max_depth_range'],
-                                                                self._algorithm_params['min_samples_split_range'],
-                                                                self._algorithm_params['max_features_range'])
+        _, y_hat, auc, y_hat_train = self._get_executor().submit(
+            self._run_on_fold, '_launch_random_forest', train_index, test_index,
+            self._algorithm_params['n_estimators_range'],
+            self._algorithm_params['max_depth_range'],
+            self._algorithm_params['min_samples_split_range'],
+            self._algorithm_params['max_features_range']).result()
         result = dict()
         result['best_parameter'] = best_parameter
         result['evaluation'] = utils.evaluate_prediction(y_test, y_hat)
@@ -540,12 +512,12 @@ class RandomForest(base.MLAlgorithm):
             classifier = RandomForestClassifier(n_estimators=best_n_estimators, max_depth=best_max_depth,
                                                 min_samples_split=best_min_samples_split,
                                                 max_features=best_max_features,
-                                                class_weight='balanced', n_jobs=self._algorithm_params['n_threads'])
+                                                class_weight='balanced', n_jobs=self._estimator_n_jobs())
         else:
             classifier = RandomForestClassifier(n_estimators=best_n_estimators, max_depth=best_max_depth,
                                                 min_samples_split=best_min_samples_split,
                                                 max_features=best_max_features,
-                                                n_jobs=self._algorithm_params['n_threads'])
+                                                n_jobs=self._estimator_n_jobs())
 
         classifier.fit(self._x, self._y)
 
@@ -583,6 +555,8 @@ class RandomForest(base.MLAlgorithm):
                            'max_depth_range': (None, 6, 8, 10, 12),
                            'min_samples_split_range': (2, 4, 6, 8),
                            'max_features_range': ('auto', 0.1, 0.2, 0.3, 0.4, 0.5),
+                           'search_strategy': 'grid',
+                           'halving_factor': 3,
                            'n_threads': 15}
 
         return parameters_dict
@@ -598,13 +572,13 @@ class XGBoost(base.MLAlgorithm):
             # http://xgboost.readthedocs.io/en/latest//how_to/param_tuning.html
             scale_pos_weight = float(len(self._y - sum(self._y)) / sum(self._y))
             classifier = XGBClassifier(max_depth=max_depth, learning_rate=learning_rate, n_estimators=n_estimators,
-                                       n_jobs=self._algorithm_params['n_threads'], colsample_bytree=colsample_bytree,
+                                       n_jobs=self._estimator_n_jobs(), colsample_bytree=colsample_bytree,
                                        reg_alpha=self._algorithm_params['reg_alpha'],
                                        reg_lambda=self._algorithm_params['reg_lambda'],
                                        scale_pos_weight=scale_pos_weight)
         else:
             classifier = XGBClassifier(max_depth=max_depth, learning_rate=learning_rate, n_estimators=n_estimators,
-                                       n_jobs=self._algorithm_params['n_threads'], colsample_bytree=colsample_bytree,
+                                       n_jobs=self._estimator_n_jobs(), colsample_bytree=colsample_bytree,
                                        reg_alpha=self._algorithm_params['reg_alpha'],
                                        reg_lambda=self._algorithm_params['reg_lambda'])
 
@@ -635,8 +609,7 @@ class XGBoost(base.MLAlgorithm):
             best_params = None
             best_acc = -1
 
-            for params, async_acc in async_result[fold].items():
-                acc = async_acc.get()
+            for params, acc in async_result[fold].items():
                 if acc > best_acc:
                     best_params = params
                     best_acc = acc
@@ -665,12 +638,9 @@ class XGBoost(base.MLAlgorithm):
 
     def evaluate(self, train_index, test_index):
 
-        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
-        async_result = {}
-        for i in range(self._algorithm_params['grid_search_folds']):
-            async_result[i] = {}
+        executor = self._get_executor()
 
-        x_train = self._x[train_index]
+        train_index, test_index = np.asarray(train_index), np.asarray(test_index)
         y_train = self._y[train_index]
 
         skf = StratifiedKFold(n_splits=self._algorithm_params['grid_search_folds'], shuffle=True)
@@ -681,31 +651,17 @@ class XGBoost(base.MLAlgorithm):
                                                          self._algorithm_params['n_estimators_range'],
                                                          self._algorithm_params['colsample_bytree_range']))
 
-        for i in range(len(inner_cv)):
-            inner_train_index, inner_test_index = inner_cv[i]
+        # Index of n_estimators in the combinations: number of trees reduced by successive halving
+        async_result = self._search_parameters(train_index, inner_cv, parameters_combinations, budget_index=2)
 
-            x_train_inner = x_train[inner_train_index]
-            x_test_inner = x_train[inner_test_index]
-            y_train_inner = y_train[inner_train_index]
-            y_test_inner = y_train[inner_test_index]
-
-            for parameters in parameters_combinations:
-                async_result[i][parameters] = inner_pool.apply_async(self._grid_search,
-                                                                     (x_train_inner, x_test_inner,
-                                                                      y_train_inner, y_test_inner,
-                                                                      parameters[0], parameters[1],
-                                                                      parameters[2], parameters[3]))
-        inner_pool.close()
-        inner_pool.join()
         best_parameter = self._select_best_parameter(async_result)
-        x_test = self._x[test_index]
         y_test = self._y[test_index]
 
-        _, y_hat, auc, y_hat_train = self._launch_xgboost(x_train, x_test, y_train, y_test,
-                                                          best_parameter['max_depth'],
-                                                          best_parameter['learning_rate'],
-                                                          best_parameter['n_estimators'],
-                                                          best_parameter['colsample_bytree'])
+        _, y_hat, auc, y_hat_train = executor.submit(self._run_on_fold, '_launch_xgboost', train_index, test_index,
+                                                     best_parameter['max_depth'],
+                                                     best_parameter['learning_rate'],
+                                                     best_parameter['n_estimators'],
+                                                     best_parameter['colsample_bytree']).result()
 
         result = dict()
         result['best_parameter'] = best_parameter
@@ -723,9 +679,7 @@ class XGBoost(base.MLAlgorithm):
 
     def evaluate_no_cv(self, train_index, test_index):
 
-        x_train = self._x[train_index]
         y_train = self._y[train_index]
-        x_test = self._x[test_index]
         y_test = self._y[test_index]
 
         best_parameter = dict()
@@ -734,11 +688,12 @@ class XGBoost(base.MLAlgorithm):
         best_parameter['n_estimators'] = self._algorithm_params['n_estimators_range']
         best_parameter['colsample_bytree'] = self._algorithm_params['colsample_bytree_range']
 
-        _, y_hat, auc, y_hat_train = self._launch_xgboost(x_train, x_test, y_train, y_test,
-                                                          self._algorithm_params['max_depth_range'],
-                                                          self._algorithm_params['learning_rate_range'],
-                                                          self._algorithm_params['n_estimators_range'],
-                                                          self._algorithm_params['colsample_bytree_range'])
+        _, y_hat, auc, y_hat_train = self._get_executor().submit(
+            self._run_on_fold, '_launch_xgboost', train_index, test_index,
+            self._algorithm_params['max_depth_range'],
+            self._algorithm_params['learning_rate_range'],
+            self._algorithm_params['n_estimators_range'],
+            self._algorithm_params['colsample_bytree_range']).result()
         result = dict()
         result['best_parameter'] = best_parameter
         result['evaluation'] = utils.evaluate_prediction(y_test, y_hat)
@@ -767,14 +722,14 @@ class XGBoost(base.MLAlgorithm):
             scale_pos_weight = float(len(self._y - sum(self._y)) / sum(self._y))
 
             classifier = XGBClassifier(max_depth=best_max_depth, learning_rate=best_learning_rate,
-                                       n_estimators=best_n_estimators, n_jobs=self._algorithm_params['n_threads'],
+                                       n_estimators=best_n_estimators, n_jobs=self._estimator_n_jobs(),
                                        colsample_bytree=best_colsample_bytree,
                                        reg_alpha=self._algorithm_params['reg_alpha'],
                                        reg_lambda=self._algorithm_params['reg_lambda'],
                                        scale_pos_weight=scale_pos_weight)
         else:
             classifier = XGBClassifier(max_depth=best_max_depth, learning_rate=best_learning_rate,
-                                       n_estimators=best_n_estimators, n_jobs=self._algorithm_params['n_threads'],
+                                       n_estimators=best_n_estimators, n_jobs=self._estimator_n_jobs(),
                                        colsample_bytree=best_colsample_bytree,
                                        reg_alpha=self._algorithm_params['reg_alpha'],
                                        reg_lambda=self._algorithm_params['reg_lambda'])
@@ -816,6 +771,8 @@ class XGBoost(base.MLAlgorithm):
                            'colsample_bytree_range': (0.5, 1),
                            'reg_alpha': 0,
                            'reg_lambda': 1,
+                           'search_strategy': 'grid',
+                           'halving_factor': 3,
                            'n_threads': 15}
 
         return parameters_dict
@@ -856,7 +813,7 @@ class OneVsOneSVM(base.MLAlgorithm):
 
             for c, async_acc in async_result[fold].items():
 
-                acc = async_acc.get()
+                acc = async_acc.result()
                 if acc > best_acc:
                     best_c = c
                     best_acc = acc
@@ -870,12 +827,12 @@ class OneVsOneSVM(base.MLAlgorithm):
 
     def evaluate(self, train_index, test_index):
 
-        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
+        executor = self._get_executor()
         async_result = {}
         for i in range(self._algorithm_params['grid_search_folds']):
             async_result[i] = {}
 
-        outer_kernel = self._kernel[train_index, :][:, train_index]
+        train_index, test_index = np.asarray(train_index), np.asarray(test_index)
         y_train = self._y[train_index]
 
         skf = StratifiedKFold(n_splits=self._algorithm_params['grid_search_folds'], shuffle=True)
@@ -884,22 +841,16 @@ class OneVsOneSVM(base.MLAlgorithm):
         for i in range(len(inner_cv)):
             inner_train_index, inner_test_index = inner_cv[i]
 
-            inner_kernel = outer_kernel[inner_train_index, :][:, inner_train_index]
-            x_test_inner = outer_kernel[inner_test_index, :][:, inner_train_index]
-            y_train_inner, y_test_inner = y_train[inner_train_index], y_train[inner_test_index]
-
             for c in self._algorithm_params['c_range']:
-                async_result[i][c] = inner_pool.apply_async(self._grid_search,
-                                                            (inner_kernel, x_test_inner,
-                                                             y_train_inner, y_test_inner, c))
-        inner_pool.close()
-        inner_pool.join()
+                async_result[i][c] = executor.submit(self._run_on_fold, '_grid_search',
+                                                     train_index[inner_train_index],
+                                                     train_index[inner_test_index], c)
 
         best_parameter = self._select_best_parameter(async_result)
-        x_test = self._kernel[test_index, :][:, train_index]
-        y_train, y_test = self._y[train_index], self._y[test_index]
+        y_test = self._y[test_index]
 
-        _, y_hat, y_hat_train = self._launch_svc(outer_kernel, x_test, y_train, y_test, best_parameter['c'])
+        _, y_hat, y_hat_train = executor.submit(self._run_on_fold, '_launch_svc', train_index, test_index,
+                                                best_parameter['c']).result()
 
         result = dict()
         result['best_parameter'] = best_parameter
@@ -1009,7 +960,7 @@ class OneVsRestSVM(base.MLAlgorithm):
 
             for c, async_acc in async_result[fold].items():
 
-                acc = async_acc.get()
+                acc = async_acc.result()
                 if acc > best_acc:
                     best_c = c
                     best_acc = acc
@@ -1023,12 +974,12 @@ class OneVsRestSVM(base.MLAlgorithm):
 
     def evaluate(self, train_index, test_index):
 
-        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
+        executor = self._get_executor()
         async_result = {}
         for i in range(self._algorithm_params['grid_search_folds']):
             async_result[i] = {}
 
-        outer_kernel = self._kernel[train_index, :][:, train_index]
+        train_index, test_index = np.asarray(train_index), np.asarray(test_index)
         y_train = self._y[train_index]
 
         skf = StratifiedKFold(n_splits=self._algorithm_params['grid_search_folds'], shuffle=True)
@@ -1037,22 +988,16 @@ class OneVsRestSVM(base.MLAlgorithm):
         for i in range(len(inner_cv)):
             inner_train_index, inner_test_index = inner_cv[i]
 
-            inner_kernel = outer_kernel[inner_train_index, :][:, inner_train_index]
-            x_test_inner = outer_kernel[inner_test_index, :][:, inner_train_index]
-            y_train_inner, y_test_inner = y_train[inner_train_index], y_train[inner_test_index]
-
             for c in self._algorithm_params['c_range']:
-                async_result[i][c] = inner_pool.apply_async(self._grid_search,
-                                                            (inner_kernel, x_test_inner,
-                                                             y_train_inner, y_test_inner, c))
-        inner_pool.close()
-        inner_pool.join()
+                async_result[i][c] = executor.submit(self._run_on_fold, '_grid_search',
+                                                     train_index[inner_train_index],
+                                                     train_index[inner_test_index], c)
 
         best_parameter = self._select_best_parameter(async_result)
-        x_test = self._kernel[test_index, :][:, train_index]
-        y_train, y_test = self._y[train_index], self._y[test_index]
+        y_test = self._y[test_index]
 
-        _, y_hat, y_hat_train = self._launch_svc(outer_kernel, x_test, y_train, y_test, best_parameter['c'])
+        _, y_hat, y_hat_train = executor.submit(self._run_on_fold, '_launch_svc', train_index, test_index,
+                                                best_parameter['c']).result()
 
         result = dict()
         result['best_parameter'] = best_parameter
@@ -1,8 +1,13 @@
 # coding: utf8
 
 
+import threading
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+from clinica.pipelines.machine_learning.executor import SharedArray, get_executor
+
 
 class MLWorkflow(ABC):
 
@@ -30,14 +35,15 @@ class MLWorkflow(ABC):
         self._input = self._input_class(self._input_params)
 
         # Computing input values
-        x = self._input.get_x()
         y = self._input.get_y()
 
         # Instantiating classification algorithm
+        # (a cached kernel is used without loading the images before the weights are saved)
         if self._algorithm_class.uses_kernel():
             kernel = self._input.get_kernel()
             self._algorithm = self._algorithm_class(kernel, y, self._algorithm_params)
         else:
+            x = self._input.get_x()
             self._algorithm = self._algorithm_class(x, y, self._algorithm_params)
 
         # Instantiating cross-validation method and classification algorithm
@@ -53,7 +59,7 @@ class MLWorkflow(ABC):
 
         # Saving algorithm trained classifier
         self._algorithm.save_classifier(classifier, classifier_dir)
-        self._algorithm.save_weights(classifier, x, classifier_dir)
+        self._algorithm.save_weights(classifier, self._input.get_x(), classifier_dir)
         self._algorithm.save_parameters(best_params, classifier_dir)
 
         # Saving validation trained classifier
@@ -131,6 +137,156 @@ class MLAlgorithm(ABC):
 
         self._y = y
 
+        self._in_worker = False
+        self._shared_arrays = {}
+        self._shared_arrays_lock = threading.Lock()
+
+    def __getstate__(self):
+        # The kernel and features are sent to the workers as memmaps instead of pickled copies
+        state = self.__dict__.copy()
+        del state['_shared_arrays']
+        del state['_shared_arrays_lock']
+        with self._shared_arrays_lock:
+            for key in ['_kernel', '_x']:
+                if isinstance(state.get(key), np.ndarray) and state[key].size > 0:
+                    if key not in self._shared_arrays:
+                        self._shared_arrays[key] = SharedArray(state[key])
+                    state[key] = self._shared_arrays[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._in_worker = True
+        self._shared_arrays = {}
+        self._shared_arrays_lock = threading.Lock()
+
+    def _get_executor(self):
+        return get_executor(self._algorithm_params['n_threads'])
+
+    def _estimator_n_jobs(self):
+        """Number of threads of an estimator: 1 when it is trained in a worker of the process pool."""
+        if self._in_worker:
+            return 1
+        return self._algorithm_params['n_threads']
+
+    def _fold_data(self, train_index, test_index):
+        """
+        Returns: the train and test data (kernel blocks or features) and labels of a fold.
+        """
+        if self.uses_kernel():
+            x_train = self._kernel[np.ix_(train_index, train_index)]
+            x_test = self._kernel[np.ix_(test_index, train_index)]
+        else:
+            x_train = self._x[train_index]
+            x_test = self._x[test_index]
+
+        return x_train, x_test, self._y[train_index], self._y[test_index]
+
+    def _run_on_fold(self, method_name, train_index, test_index, *parameters):
+        """
+        Call method(x_train, x_test, y_train, y_test, *parameters) on the data of a fold.
+
+        It is the function submitted to the process pool: only the indices of the fold are sent.
+        """
+        x_train, x_test, y_train, y_test = self._fold_data(train_index, test_index)
+        return getattr(self, method_name)(x_train, x_test, y_train, y_test, *parameters)
+
+    def _search_parameters(self, train_index, inner_cv, parameters_combinations, budget_index=None):
+        """
+        Score combinations of hyperparameters on the inner folds of train_index with _grid_search.
+
+        The strategy is given by the 'search_strategy' parameter (default: 'grid'), one of the keys
+        of _search_strategies.
+
+        Args:
+            train_index: indices of the outer training set
+            inner_cv: list of (train, test) indices of the inner folds, relative to train_index
+            parameters_combinations: list of tuples of hyperparameters passed to _grid_search
+            budget_index: position in the tuples of a parameter proportional to the cost of a fit
+                (e.g. the number of trees), reduced in the first rounds of successive halving
+
+        Returns:
+            Dict {inner fold: {parameters: balanced accuracy}} of the combinations kept by the search
+        """
+        strategy = self._algorithm_params.get('search_strategy', 'grid')
+        if strategy not in self._search_strategies:
+            raise ValueError(
+                f"Unknown search strategy (given value: {strategy}). "
+                f"It must be one of {list(self._search_strategies)}"
+            )
+        if strategy == 'successive_halving':
+            from numbers import Real
+            from clinica.utils.exceptions import ClinicaException
+
+            factor = self._algorithm_params.get('halving_factor', 3)
+            if isinstance(factor, bool) or not isinstance(factor, Real) or not factor > 1:
+                raise ClinicaException(
+                    f"The halving factor of the successive halving search must be a number greater than 1 "
+                    f"(given value: {factor})."
+                )
+        search = getattr(self, self._search_strategies[strategy])
+        return search(np.asarray(train_index), inner_cv, parameters_combinations, budget_index)
+
+    def _score_parameters(self, train_index, inner_cv, folds, parameters_list):
+        """
+        Returns: dict {(fold, parameters): balanced accuracy} of the given folds and parameters.
+        """
+        executor = self._get_executor()
+        futures = {}
+        for fold in folds:
+            inner_train_index, inner_test_index = inner_cv[fold]
+            for parameters in parameters_list:
+                futures[(fold, parameters)] = executor.submit(self._run_on_fold, '_grid_search',
+                                                              train_index[inner_train_index],
+                                                              train_index[inner_test_index], *parameters)
+        return {key: future.result() for key, future in futures.items()}
+
+    def _grid_search_strategy(self, train_index, inner_cv, parameters_combinations, budget_index=None):
+        scores = self._score_parameters(train_index, inner_cv, range(len(inner_cv)), parameters_combinations)
+        return {fold: {parameters: scores[(fold, parameters)] for parameters in parameters_combinations}
+                for fold in range(len(inner_cv))}
+
+    def _successive_halving_strategy(self, train_index, inner_cv, parameters_combinations, budget_index=None):
+        """
+        Successive halving: all the combinations are first scored on a few inner folds (and with a
+        reduced budget), then only the best 1/halving_factor of them are scored on more folds, until
+        the remaining combinations are scored on all the folds with their full budget.
+        """
+        import math
+
+        factor = self._algorithm_params.get('halving_factor', 3)
+        n_folds = len(inner_cv)
+        candidates = list(parameters_combinations)
+        n_rounds = math.ceil(math.log(len(candidates), factor)) if len(candidates) > 1 else 0
+
+        for current_round in range(n_rounds + 1):
+            fraction = float(factor) ** (current_round - n_rounds)
+            folds = range(max(1, math.ceil(n_folds * fraction)))
+
+            if budget_index is None or current_round == n_rounds:
+                budgets = {parameters: parameters for parameters in candidates}
+            else:
+                budgets = {
+                    parameters: parameters[:budget_index]
+                    + (max(1, int(round(parameters[budget_index] * fraction))),)
+                    + parameters[budget_index + 1:]
+                    for parameters in candidates
+                }
+            scores = self._score_parameters(train_index, inner_cv, folds, list(set(budgets.values())))
+
+            if current_round < n_rounds:
+                mean_scores = {parameters: np.mean([scores[(fold, budgets[parameters])] for fold in folds])
+                               for parameters in candidates}
+                n_kept = max(1, math.ceil(len(candidates) / factor))
+                candidates = sorted(candidates, key=lambda parameters: -mean_scores[parameters])[:n_kept]
+
+        return {fold: {parameters: scores[(fold, parameters)] for parameters in candidates}
+                for fold in range(n_folds)}
+
+    # Search strategies available for the 'search_strategy' parameter
+    _search_strategies = {'grid': '_grid_search_strategy',
+                          'successive_halving': '_successive_halving_strategy'}
+
     @staticmethod
     @abstractmethod
     def uses_kernel():
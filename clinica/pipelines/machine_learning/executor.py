@@ -0,0 +1,82 @@
+# coding: utf8
+
+"""
+Process pool shared by the validations and the grid searches of the machine learning workflows.
+
+The outer folds of a validation are coordinated by threads, which submit every estimator fit
+(inner grid search points and outer refits) to a single pool of processes: the number of
+estimators trained at the same time is bounded by the size of this pool. Kernels and feature
+matrices are sent to the workers as references to files opened as read-only memmaps.
+"""
+
+import threading
+
+import numpy as np
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(n_workers):
+    """
+    Return the process pool of the machine learning workflows.
+
+    Args:
+        n_workers: number of processes of the pool. The pool is created again if it changes.
+
+    Returns:
+        A concurrent.futures.ProcessPoolExecutor
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _executor, _executor_workers
+
+    n_workers = max(1, int(n_workers))
+    with _executor_lock:
+        if _executor is None or _executor_workers != n_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=True)
+            _executor = ProcessPoolExecutor(max_workers=n_workers)
+            _executor_workers = n_workers
+            # With the fork start method all the workers are started by the first task: it is done
+            # here, before the validation starts the threads coordinating the outer folds
+            _executor.submit(int).result()
+        return _executor
+
+
+def _open_shared_array(filename, dtype, shape, offset):
+    return np.memmap(filename, dtype=dtype, mode='r', shape=shape, offset=offset, order='C')
+
+
+class SharedArray:
+    """
+    File-backed copy of a numpy array, unpickled as a read-only numpy.memmap of this file.
+
+    Arrays which already are memmaps of a file (e.g. voxels loaded with a memmap_directory or
+    cached kernels) are not copied. The temporary file of a copy is removed with the object.
+    """
+
+    def __init__(self, array):
+        import mmap
+        import os
+        import tempfile
+        import weakref
+
+        if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap) and array.flags['C_CONTIGUOUS']:
+            self.filename = array.filename
+            self.offset = array.offset
+        else:
+            fd, self.filename = tempfile.mkstemp(prefix='clinica_ml_', suffix='.dat')
+            os.close(fd)
+            self.offset = 0
+            data = np.memmap(self.filename, dtype=array.dtype, mode='w+', shape=array.shape, order='C')
+            data[:] = array
+            data.flush()
+            del data
+            weakref.finalize(self, os.remove, self.filename)
+        self.dtype = array.dtype
+        self.shape = array.shape
+
+    def __reduce__(self):
+        return _open_shared_array, (self.filename, self.dtype, self.shape, self.offset)
@@ -49,12 +49,15 @@ class CAPSInput(base.MLInput):
                     raise Exception("""Precomputed kernel provided is not in the correct format.
                     It must be a numpy.ndarray object with number of rows and columns equal to the number of subjects,
                     or a filename to a numpy txt file containing an object with the described format.""")
-            elif type(self._input_params['precomputed_kernel'] == str):
-                self._kernel = np.loadtxt(self._input_params['precomputed_kernel'])
+            elif isinstance(self._input_params['precomputed_kernel'], str):
+                if self._input_params['precomputed_kernel'].endswith('.npy'):
+                    self._kernel = np.load(self._input_params['precomputed_kernel'], mmap_mode='r')
+                else:
+                    self._kernel = np.loadtxt(self._input_params['precomputed_kernel'])
             else:
                 raise Exception("""Precomputed kernel provided is not in the correct format.
                 It must be a numpy.ndarray object with number of rows and columns equal to the number of subjects,
-                or a filename to a numpy txt file containing an object with the described format.""")
+                or a filename to a numpy .npy or txt file containing an object with the described format.""")
 
     @abc.abstractmethod
     def get_images(self):
@@ -84,18 +87,87 @@ class CAPSInput(base.MLInput):
     def get_kernel(self, kernel_function=utils.gram_matrix_linear, recompute_if_exists=False):
         """
         Returns: a numpy 2d-array.
+
+        If kernel_cache_directory is set, the kernel is stored in this directory (.npy file keyed
+        by the images, their size and modification time, the loading parameters and the kernel
+        function) and loaded from it, memory-mapped, when the same features are used again.
         """
         if self._kernel is not None and not recompute_if_exists:
             return self._kernel
 
+        cache_file = self._kernel_cache_file(kernel_function)
+        if cache_file is not None and path.exists(cache_file) and not recompute_if_exists:
+            self._kernel = np.load(cache_file, mmap_mode='r')
+            cprint(f"Kernel loaded from {cache_file}")
+            return self._kernel
+
         if self._x is None:
             self.get_x()
 
         cprint("Computing kernel ...")
-        self._kernel = kernel_function(self._x)
+        self._kernel = self._compute_kernel(kernel_function)
         cprint("Kernel computed")
+
+        if cache_file is not None:
+            self._save_array(cache_file, self._kernel)
+
         return self._kernel
 
+    def _compute_kernel(self, kernel_function):
+        return kernel_function(self._x)
+
+    def _data_signature(self, *extra):
+        """
+        Hash of the images (path, size and modification time), of the parameters used to load
+        them and of the extra values given.
+
+        Returns: a hexadecimal string, or None if the input has no image list.
+        """
+        import hashlib
+        import os
+
+        images = self.get_images()
+        if images is None:
+            return None
+
+        signature = hashlib.sha1()
+        for image in images:
+            for filename in (image if isinstance(image, list) else [image]):
+                image_stat = os.stat(filename)
+                signature.update(f'{filename}\0{image_stat.st_size}\0{image_stat.st_mtime_ns}\n'.encode())
+        for key in ['mask_zeros', 'data_dtype']:
+            signature.update(f"{key}={self._input_params.get(key)}\n".encode())
+        for value in extra:
+            signature.update(f"{value}\n".encode())
+        return signature.hexdigest()
+
+    def _kernel_cache_file(self, kernel_function):
+        """
+        Returns: the path of the cached kernel, or None if the kernel is not cached.
+        """
+        cache_directory = self._input_params['kernel_cache_directory']
+        if cache_directory is None:
+            return None
+
+        signature = self._data_signature(
+            f"{getattr(kernel_function, '__module__', '')}.{getattr(kernel_function, '__qualname__', kernel_function)}")
+        if signature is None:
+            return None
+
+        return path.join(cache_directory, f'kernel_{signature}.npy')
+
+    @staticmethod
+    def _save_array(filename, array):
+        import os
+
+        try:
+            os.makedirs(path.dirname(filename), exist_ok=True)
+            tmp_filename = f'{filename}.{os.getpid()}.tmp.npy'
+            np.save(tmp_filename, array)
+            os.replace(tmp_filename, filename)
+        except OSError as e:
+            cprint(f"Unable to write {filename}: {e}")
+
     def save_kernel(self, output_dir):
         """
 
@@ -106,8 +178,8 @@ class CAPSInput(base.MLInput):
 
         """
         if self._kernel is not None:
-            filename = path.join(output_dir, 'kernel.txt')
-            np.savetxt(filename, self._kernel)
+            filename = path.join(output_dir, 'kernel.npy')
+            np.save(filename, self._kernel)
             return filename
         raise Exception("Unable to save the kernel. Kernel must have been computed before.")
 
@@ -125,6 +197,8 @@ class CAPSInput(base.MLInput):
         parameters_dict.setdefault('group_label', None)
         parameters_dict.setdefault('image_type', None)
         parameters_dict.setdefault('precomputed_kernel', None)
+        # Kernel cache (disabled if None)
+        parameters_dict.setdefault('kernel_cache_directory', None)
 
         return parameters_dict
 
@@ -207,11 +281,52 @@ class CAPSVoxelBasedInput(CAPSInput):
             return self._x
 
         cprint(f"Loading {len(self.get_images())} subjects")
-        self._x, self._orig_shape, self._data_mask = vbio.load_data(self._images, mask=self._input_params['mask_zeros'])
+        memmap_file = None
+        if self._input_params['memmap_directory'] is not None:
+            import os
+            import tempfile
+
+            os.makedirs(self._input_params['memmap_directory'], exist_ok=True)
+            fd, memmap_file = tempfile.mkstemp(
+                prefix='voxel_data_', suffix='.dat', dir=self._input_params['memmap_directory'])
+            os.close(fd)
+        try:
+            self._x, self._orig_shape, self._data_mask = vbio.load_data(
+                self._images,
+                mask=self._input_params['mask_zeros'],
+                memmap_file=memmap_file,
+                dtype=self._input_params['data_dtype'],
+                n_threads=self._input_params['n_threads'],
+            )
+        except BaseException:
+            if memmap_file is not None:
+                os.remove(memmap_file)
+            raise
+        if memmap_file is not None:
+            import weakref
+
+            # The file is reopened by the workers as long as the data are used
+            weakref.finalize(self._x, os.remove, memmap_file)
         cprint("Subjects loaded")
 
         return self._x
 
+    def _compute_kernel(self, kernel_function):
+        """
+        When the voxels are stored in a memmap, the linear kernel is computed tile by tile
+        by a pool of processes and the completed tiles are saved in the memmap directory
+        until the kernel is assembled, so that an interrupted computation can be resumed.
+        """
+        if self._input_params['memmap_directory'] is None or kernel_function is not utils.gram_matrix_linear:
+            return super()._compute_kernel(kernel_function)
+
+        return utils.blocked_gram_matrix(
+            self._x,
+            block_size=self._input_params['kernel_block_size'],
+            n_procs=self._input_params['n_threads'],
+            checkpoint_dir=path.join(self._input_params['memmap_directory'], f'kernel_tiles_{self._data_signature()}'),
+        )
+
     def save_weights_as_nifti(self, weights, output_dir):
 
         if self._images is None:
@@ -229,6 +344,11 @@ class CAPSVoxelBasedInput(CAPSInput):
         parameters_dict.setdefault("fwhm", 0)
         # t1-volume / pet-volume ?
         parameters_dict.setdefault("mask_zeros", True)
+        # Loading of the voxels: disk-backed storage, precision and number of readers
+        parameters_dict.setdefault("memmap_directory", None)
+        parameters_dict.setdefault("data_dtype", "float64")
+        parameters_dict.setdefault("n_threads", 15)
+        parameters_dict.setdefault("kernel_block_size", 256)
         # t1-volume
         parameters_dict.setdefault("modulated", "on")
         # pet-volume
@@ -320,7 +440,7 @@ class CAPSRegionBasedInput(CAPSInput):
             return self._x
 
         cprint(f"Loading {len(self.get_images())} subjects")
-        self._x = rbio.load_data(self._images, self._subjects)
+        self._x = rbio.load_data(self._images, self._subjects, n_threads=self._input_params['n_threads'])
         cprint("Subjects loaded")
 
         return self._x
@@ -346,6 +466,8 @@ class CAPSRegionBasedInput(CAPSInput):
         parameters_dict.setdefault("atlas", None)
         # t1-volume / pet-volume ?
         parameters_dict.setdefault("mask_zeros", True)
+        # Number of TSV files read concurrently
+        parameters_dict.setdefault("n_threads", 15)
         # pet-volume
         parameters_dict.setdefault('acq_label', None)
         parameters_dict.setdefault('suvr_reference_region', None)
@@ -593,15 +715,13 @@ class TsvInput(base.MLInput):
 
         super().__init__(input_params)
 
-        import pandas as pd
-
-        self._dataframe = pd.io.parsers.read_csv(input_params['data_tsv'], sep='\t')
+        self._dataframe = tbio.read_table(input_params['data_tsv'])
 
         if not input_params['columns']:
             raise Exception("List of columns to use as input can not be empty.")
 
     def get_x(self):
-        self._x = self._dataframe.as_matrix(self._input_params['columns'])
+        self._x = self._dataframe[self._input_params['columns']].to_numpy()
         return self._x
 
     def get_y(self):
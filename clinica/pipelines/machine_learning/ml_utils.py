@@ -73,6 +73,180 @@ def gram_matrix_linear(data):
     return np.dot(data, data.transpose())
 
 
+def weighted_rows_sum(data, rows, coefficients, block_size=256, transform=None):
+    """
+    Compute sum_k coefficients[k] * data[rows[k]] by blocks of rows.
+
+    Only block_size rows of data are held in memory at the same time, so that data can be a
+    numpy.memmap larger than the memory. Rows are read in increasing order.
+
+    Args:
+        data: 2d-array or numpy.memmap (samples x features)
+        rows: indices of the rows to sum (e.g. the support vectors)
+        coefficients: weight of each row (e.g. the dual coefficients)
+        block_size: number of rows read at once
+        transform: function applied to each block of rows before the sum (e.g. scaler.transform)
+
+    Returns:
+        1d-array of length features
+    """
+    rows = np.asarray(rows)
+    coefficients = np.asarray(coefficients, dtype=float)
+    if len(rows) != len(coefficients):
+        raise ValueError(
+            f"The number of rows and the number of coefficients must be the same "
+            f"({len(rows)} rows, {len(coefficients)} coefficients)."
+        )
+
+    order = np.argsort(rows, kind='stable')
+    rows, coefficients = rows[order], coefficients[order]
+
+    weights = np.zeros(data.shape[1])
+    for start in range(0, len(rows), block_size):
+        block = np.asarray(data[rows[start:start + block_size]], dtype=float)
+        if transform is not None:
+            block = transform(block)
+        weights += np.dot(coefficients[start:start + block_size], block)
+
+    return weights
+
+
+def gram_matrix_rbf(data, gamma=None):
+    """
+    Gaussian (RBF) kernel exp(-gamma * ||x_i - x_j||^2) of the rows of data.
+
+    Args:
+        data: 2d-array (samples x features)
+        gamma: width of the kernel (default: 1 / number of features)
+
+    Returns:
+        The kernel matrix (samples x samples)
+    """
+    return blocked_gram_matrix(data, kernel='rbf', gamma=gamma)
+
+
+def _open_rows(source):
+    """Return the 2d-array described by source: an array, or the description of a memmap file."""
+    if isinstance(source, dict):
+        return np.memmap(source['filename'], dtype=source['dtype'], mode='r',
+                         offset=source['offset'], shape=source['shape'], order='C')
+    return source
+
+
+def _gram_tile(source, rows_i, rows_j, feature_block_size):
+    """Linear kernel between two blocks of rows, accumulated over blocks of features."""
+    data = _open_rows(source)
+    tile = np.zeros((rows_i[1] - rows_i[0], rows_j[1] - rows_j[0]))
+    for f0 in range(0, data.shape[1], feature_block_size):
+        f1 = min(f0 + feature_block_size, data.shape[1])
+        block_i = np.asarray(data[rows_i[0]:rows_i[1], f0:f1], dtype=float)
+        if rows_i == rows_j:
+            block_j = block_i
+        else:
+            block_j = np.asarray(data[rows_j[0]:rows_j[1], f0:f1], dtype=float)
+        tile += np.dot(block_i, block_j.T)
+    return tile
+
+
+def blocked_gram_matrix(data, kernel='linear', gamma=None, block_size=256, feature_block_size=65536,
+                        n_procs=1, checkpoint_dir=None):
+    """
+    Compute the kernel matrix of the rows of data tile by tile.
+
+    The upper triangle of the matrix is split into tiles of block_size x block_size samples.
+    Each tile is accumulated over blocks of feature_block_size features, so that only two
+    blocks of rows are held in memory per worker. When data is a numpy.memmap, the tiles are
+    computed by a pool of processes reading the rows from the file; otherwise by a pool of threads.
+
+    Args:
+        data: 2d-array or numpy.memmap (samples x features)
+        kernel: 'linear' or 'rbf'
+        gamma: width of the RBF kernel (default: 1 / number of features)
+        block_size: number of samples per tile
+        feature_block_size: number of features read at once
+        n_procs: number of tiles computed in parallel
+        checkpoint_dir: if given, each completed tile is saved in this directory and
+            tiles already present are loaded instead of being computed again (e.g. when
+            resuming an interrupted computation). The directory is removed once the
+            matrix is assembled.
+
+    Returns:
+        The kernel matrix (samples x samples)
+    """
+    import mmap
+    import os
+    import shutil
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+    if kernel not in ['linear', 'rbf']:
+        raise ValueError(f"Unknown kernel (given value: {kernel}). It must be one of 'linear', 'rbf'.")
+
+    n_samples, n_features = data.shape
+    if isinstance(data, np.memmap) and isinstance(data.base, mmap.mmap):
+        source = {'filename': data.filename, 'dtype': data.dtype, 'offset': data.offset, 'shape': data.shape}
+        executor_class = ProcessPoolExecutor
+    else:
+        source = data
+        executor_class = ThreadPoolExecutor
+
+    bounds = [(start, min(start + block_size, n_samples)) for start in range(0, n_samples, block_size)]
+    kernel_matrix = np.empty((n_samples, n_samples))
+
+    def store(rows_i, rows_j, tile):
+        kernel_matrix[rows_i[0]:rows_i[1], rows_j[0]:rows_j[1]] = tile
+        kernel_matrix[rows_j[0]:rows_j[1], rows_i[0]:rows_i[1]] = tile.T
+
+    def tile_file(bi, bj):
+        # Named after the rows of the tile, which do not depend on the block size
+        (i0, i1), (j0, j1) = bounds[bi], bounds[bj]
+        return os.path.join(checkpoint_dir, f'tile_{i0}-{i1}_{j0}-{j1}.npy')
+
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    pending = []
+    for bi in range(len(bounds)):
+        for bj in range(bi, len(bounds)):
+            if checkpoint_dir is not None and os.path.exists(tile_file(bi, bj)):
+                tile = np.load(tile_file(bi, bj))
+                expected_shape = (bounds[bi][1] - bounds[bi][0], bounds[bj][1] - bounds[bj][0])
+                if tile.shape == expected_shape:
+                    store(bounds[bi], bounds[bj], tile)
+                    continue
+            pending.append((bi, bj))
+
+    if pending:
+        with executor_class(max_workers=max(1, int(n_procs))) as executor:
+            futures = {
+                executor.submit(_gram_tile, source, bounds[bi], bounds[bj], feature_block_size): (bi, bj)
+                for bi, bj in pending
+            }
+            for future in as_completed(futures):
+                bi, bj = futures[future]
+                tile = future.result()
+                if checkpoint_dir is not None:
+                    tmp_file = tile_file(bi, bj) + '.tmp.npy'
+                    np.save(tmp_file, tile)
+                    os.replace(tmp_file, tile_file(bi, bj))
+                store(bounds[bi], bounds[bj], tile)
+
+    if checkpoint_dir is not None:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    if kernel == 'rbf':
+        if gamma is None:
+            gamma = 1.0 / n_features
+        squared_norms = np.diag(kernel_matrix).copy()
+        kernel_matrix *= -2
+        kernel_matrix += squared_norms[:, np.newaxis]
+        kernel_matrix += squared_norms[np.newaxis, :]
+        np.maximum(kernel_matrix, 0, out=kernel_matrix)
+        kernel_matrix *= -gamma
+        np.exp(kernel_matrix, out=kernel_matrix)
+
+    return kernel_matrix
+
+
 def evaluate_prediction_multiclass(y, y_hat):
 
     balanced_accuracy = balanced_accuracy_score(y, y_hat)
@@ -21,7 +21,10 @@ class VoxelBasedKFoldDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         use_pvc_data=False,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         mask_zeros=True,
+        memmap_directory=None,
+        data_dtype="float64",
         n_threads=15,
         n_folds=10,
         grid_search_folds=10,
@@ -54,7 +57,10 @@ class VoxelBasedRepKFoldDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         use_pvc_data=False,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         mask_zeros=True,
+        memmap_directory=None,
+        data_dtype="float64",
         n_threads=15,
         n_iterations=100,
         n_folds=10,
@@ -88,7 +94,10 @@ class VoxelBasedRepHoldOutDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         use_pvc_data=False,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         mask_zeros=True,
+        memmap_directory=None,
+        data_dtype="float64",
         n_threads=15,
         n_iterations=100,
         test_size=0.3,
@@ -120,6 +129,7 @@ class VertexBasedRepHoldOutDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         fwhm=20,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         n_threads=15,
         n_iterations=100,
         test_size=0.3,
@@ -220,6 +230,8 @@ class RegionBasedRepHoldOutRandomForest(base.MLWorkflow):
         max_depth_range=[None],
         min_samples_split_range=[2],
         max_features_range=("auto", 0.25, 0.5),
+        search_strategy="grid",
+        halving_factor=3,
         splits_indices=None,
     ):
 
@@ -246,6 +258,7 @@ class RegionBasedLearningCurveRepHoldOutDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         use_pvc_data=False,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         n_threads=15,
         n_iterations=100,
         test_size=0.3,
@@ -279,7 +292,10 @@ class VoxelBasedLearningCurveRepHoldOutDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         use_pvc_data=False,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         mask_zeros=True,
+        memmap_directory=None,
+        data_dtype="float64",
         n_threads=15,
         n_iterations=100,
         test_size=0.3,
@@ -385,6 +401,8 @@ class CAPSTsvRepHoldOutRandomForest(base.MLWorkflow):
         max_depth_range=[None],
         min_samples_split_range=[2],
         max_features_range=("auto", 0.25, 0.5),
+        search_strategy="grid",
+        halving_factor=3,
         splits_indices=None,
     ):
 
@@ -415,7 +433,10 @@ class VoxelBasedREGRepKFoldDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         use_pvc_data=False,
         precomputed_kernel=None,
+        kernel_cache_directory=None,
         mask_zeros=True,
+        memmap_directory=None,
+        data_dtype="float64",
         n_threads=15,
         n_iterations=100,
         n_folds=10,
@@ -453,6 +474,8 @@ class TsvRepHoldOutRandomForest(base.MLWorkflow):
         max_depth_range=[None],
         min_samples_split_range=[2],
         max_features_range=("auto", 0.25, 0.5),
+        search_strategy="grid",
+        halving_factor=3,
         splits_indices=None,
         inner_cv=False,
     ):
@@ -2,51 +2,57 @@
 
 
 import numpy as np
-import pandas as pd
 import nibabel as nib
 
 
-def load_data(image_list, subjects):
+def load_data(image_list, subjects, n_threads=1):
     """
+    Load the mean_scalar column of a list of atlas statistics TSV files in a 2d-array.
 
     Args:
-        image_list:
-        subjects:
+        image_list: list of TSV files (one per session)
+        subjects: list of participant IDs (one per TSV file)
+        n_threads: number of TSV files read concurrently
 
     Returns:
-
+        2d-array (sessions x regions)
     """
+    from concurrent.futures import ThreadPoolExecutor
+    from clinica.pipelines.machine_learning.tsv_based_io import read_table
+
+    def read_regions(tsv_file):
+        return read_table(tsv_file, usecols=['mean_scalar'])['mean_scalar'].to_numpy()
+
+    with ThreadPoolExecutor(max_workers=max(1, int(n_threads))) as executor:
+        data = None
+        for i, regions in enumerate(executor.map(read_regions, image_list)):
+            if data is None:
+                data = np.zeros((len(subjects), len(regions)))
+            if len(regions) != data.shape[1]:
+                raise ValueError(
+                    f"{image_list[i]} has {len(regions)} regions while {image_list[0]} has {data.shape[1]} regions."
+                )
+            data[i, :] = regions
 
-    subj_average = []
-    all_vector = np.array([])
-    read_file = pd.io.parsers.read_csv(image_list[0], sep='\t', usecols=[2], header=0)
-    read_file = read_file.mean_scalar
-    data = np.zeros((len(subjects), len(read_file)))
-
-    for i in range(len(image_list)):
-        tsv_file = pd.io.parsers.read_csv(image_list[i], sep='\t', usecols=[2], header=0)
-        subj_average = tsv_file.mean_scalar
-        all_vector = np.append(all_vector, subj_average)
-    data_temp = np.split(all_vector, len(image_list))
-
-    for i in range(len(image_list)):
-        for j in range(len(subj_average)):
-            data[i][j] = data_temp[i][j]
     return data
 
 
-def features_weights(image_list, dual_coefficients, sv_indices, scaler=None):
+def features_weights(image_list, dual_coefficients, sv_indices, scaler=None, data=None):
     """
+    Regional weights sum_k dual_coefficients[k] * regions[sv_indices[k]] of a linear SVM.
 
     Args:
-        image_list:
-        dual_coefficients:
-        sv_indices:
-        scaler:
+        image_list: list of TSV files
+        dual_coefficients: dual coefficients of the support vectors
+        sv_indices: indices of the support vectors in image_list
+        scaler: if given, applied to the regional values of the support vectors
+        data: if given, regional values already loaded by load_data: the support vectors are
+            read from it instead of their TSV files
 
     Returns:
-
+        1d-array of the weight of each region
     """
+    from clinica.pipelines.machine_learning.ml_utils import weighted_rows_sum
 
     if len(sv_indices) != len(dual_coefficients):
         raise ValueError(
@@ -58,17 +64,13 @@ def features_weights(image_list, dual_coefficients, sv_indices, scaler=None):
     if len(image_list) == 0:
         raise ValueError("The number of images must be greater than 0.")
 
-    sv_images = [image_list[i] for i in sv_indices]
-
-    shape = pd.io.parsers.read_csv(sv_images[0], sep='\t', usecols=[2], header=0)
-    weights = np.zeros(len(shape))
+    if data is None:
+        sv_indices = np.asarray(sv_indices)
+        data = load_data([image_list[i] for i in sv_indices], sv_indices)
+        sv_indices = np.arange(len(sv_indices))
 
-    for i in range(len(sv_images)):
-        subj = pd.io.parsers.read_csv(sv_images[i], sep='\t', usecols=[2], header=0)
-        subj_data = subj.mean_scalar
-        weights += dual_coefficients[i] * subj_data
-
-    return weights
+    transform = scaler.transform if scaler is not None else None
+    return weighted_rows_sum(data, sv_indices, dual_coefficients, transform=transform)
 
 
 def weights_to_nifti(weights, atlas, output_filename):
@@ -94,14 +96,9 @@ def weights_to_nifti(weights, atlas, output_filename):
         raise ValueError('Atlas path not found for atlas name ' + atlas)
 
     atlas_image = nib.load(atlas_path)
-    atlas_data = atlas_image.get_data()
-    labels = list(set(atlas_data.ravel()))
-    output_image_weights = np.array(atlas_data, dtype='f')
-    for i, n in enumerate(labels):
-        index = np.array(np.where(atlas_data == n))
-        output_image_weights[index[0, :], index[1, :], index[2, :]] = weights[i]
-
-    affine = atlas_image.get_affine()
-    header = atlas_image.get_header()
-    output_image = nib.Nifti1Image(output_image_weights, affine, header)
+    atlas_data = np.asanyarray(atlas_image.dataobj)
+    labels, label_indices = np.unique(atlas_data, return_inverse=True)
+    output_image_weights = np.asarray(weights, dtype='f')[label_indices].reshape(atlas_data.shape)
+
+    output_image = nib.Nifti1Image(output_image_weights, atlas_image.affine, atlas_image.header)
     nib.save(output_image, output_filename)
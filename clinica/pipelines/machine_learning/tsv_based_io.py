@@ -1,44 +1,69 @@
 # coding: utf8
 
 import os
+from functools import lru_cache
 
-import numpy as np
 import pandas as pd
 
 
-def load_data(images, caps_directory, subjects, sessions, dataset):
-    """
-
-    Args:
-        images:
-        caps_directory:
-        subjects_visits_tsv:
-        dataset:
+@lru_cache(maxsize=8192)
+def _read_table(tsv_file, size, mtime, usecols):
+    return pd.read_csv(tsv_file, sep='\t', usecols=list(usecols) if usecols is not None else None)
 
-    Returns:
-        np 2D array
 
+def read_table(tsv_file, usecols=None):
     """
+    Read a TSV file, reusing the table parsed by a previous call while the file is unchanged.
 
-    df = pd.io.parsers.read_csv(os.path.join(caps_directory), sep='\t')
+    The parsed tables are cached on the path, size and modification time of the file and on the
+    columns read: they are shared by the inputs of the workflows and must not be modified.
 
-    all_vector = np.array([])
+    Args:
+        tsv_file: path to a TSV file
+        usecols: names of the columns to read (default: all)
 
-    participant_id = subjects
+    Returns:
+        A pandas DataFrame
+    """
+    tsv_file = os.path.abspath(tsv_file)
+    tsv_stat = os.stat(tsv_file)
+    return _read_table(tsv_file, tsv_stat.st_size, tsv_stat.st_mtime_ns,
+                       tuple(usecols) if usecols is not None else None)
 
-    session_id = sessions
 
-    for i in range(len(participant_id)):
-        df_sub = df[df.participant_id == participant_id[i]]
+def load_data(images, caps_directory, subjects, sessions, dataset):
+    """
+    Select the columns of a merged TSV file containing `images` for a list of sessions.
 
-        df_analysis = df_sub[[col for col in df_sub.columns if images in col]]
+    Args:
+        images: substring of the names of the columns to select
+        caps_directory: path to the TSV file
+        subjects: list of participant IDs
+        sessions: list of session IDs (used when the TSV file has a session_id column)
+        dataset:
 
-        all_vector = np.append(all_vector, df_analysis.values)
-    data = np.zeros((len(participant_id), df_analysis.shape[1]))
-    data_temp = np.split(all_vector, len(participant_id))
+    Returns:
+        np 2D array (sessions x selected columns)
 
-    for i in range(len(participant_id)):
-        for j in range(df_analysis.shape[1]):
-            data[i][j] = data_temp[i][j]
+    """
 
-    return data
+    df = read_table(caps_directory)
+    columns = [col for col in df.columns if images in col]
+
+    if 'session_id' in df.columns:
+        keys = ['participant_id', 'session_id']
+        requested = pd.DataFrame({'participant_id': subjects, 'session_id': sessions})
+    else:
+        keys = ['participant_id']
+        requested = pd.DataFrame({'participant_id': subjects})
+
+    selected = requested.merge(df[keys + columns].drop_duplicates(subset=keys), on=keys, how='left',
+                               indicator=True)
+    missing = selected[selected['_merge'] != 'both']
+    if len(missing) > 0:
+        raise ValueError(
+            f"The following sessions are missing from {caps_directory}:\n"
+            f"{missing[keys].to_string(index=False)}"
+        )
+
+    return selected[columns].to_numpy(dtype=float)
@@ -18,6 +18,8 @@ class KFoldCV(base.MLValidation):
             skf = StratifiedKFold(n_splits=self._validation_params['n_folds'], shuffle=True)
             self._validation_params['splits_indices'] = list(skf.split(np.zeros(len(y)), y))
 
+        # Outer folds are coordinated by threads, the estimators are trained in the process pool of the algorithm
+        self._ml_algorithm._get_executor()
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
@@ -114,14 +116,10 @@ class RepeatedKFoldCV(base.MLValidation):
                 skf = StratifiedKFold(n_splits=self._validation_params['n_folds'], shuffle=True)
                 self._validation_params['splits_indices'].append(list(skf.split(np.zeros(len(y)), y)))
 
+        self._ml_algorithm._get_executor()
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
-        for i in range(self._validation_params['n_iterations']):
-
-            train_index, test_index = self._validation_params['splits_indices'][i]
-            async_result[i] = async_pool.apply_async(self._ml_algorithm.evaluate, (train_index, test_index))
-
         for r in range(self._validation_params['n_iterations']):
 
             async_result[r] = {}
@@ -246,6 +244,7 @@ class RepeatedHoldOut(base.MLValidation):
                                             test_size=self._validation_params['test_size'])
             self._validation_params['splits_indices'] = list(splits.split(np.zeros(len(y)), y))
 
+        self._ml_algorithm._get_executor()
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
@@ -363,6 +362,7 @@ class LearningCurveRepeatedHoldOut(base.MLValidation):
                                             test_size=self._validation_params['test_size'])
             self._validation_params['splits_indices'] = list(splits.split(np.zeros(len(y)), y))
 
+        self._ml_algorithm._get_executor()
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
@@ -482,6 +482,7 @@ class RepeatedKFoldCV_Multiclass(base.MLValidation):
 
     def validate(self, y, n_iterations=100, n_folds=10, n_threads=15):
 
+        self._ml_algorithm._get_executor()
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
         self._cv = []
@@ -4,36 +4,94 @@ import numpy as np
 import nibabel as nib
 
 
-def load_data(image_list, mask=True):
+def _iter_images(image_list, n_threads=1):
     """
+    Yield the flattened data of each image of a list, in order.
+
+    Images are read by a pool of `n_threads` workers, with at most 2 x `n_threads`
+    images held in memory at the same time.
 
     Args:
-        image_list:
-        mask:
+        image_list: list of NIfTI files
+        n_threads: number of images read concurrently
 
     Returns:
-
+        Generator of (index, shape, flattened data without NaN)
     """
-    data = None
-    shape = None
-    data_mask = None
-    first = True
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    def read_image(image):
+        subj_data = np.asanyarray(nib.load(image).dataobj)
+        return subj_data.shape, np.nan_to_num(subj_data.ravel())
+
+    n_threads = max(1, int(n_threads))
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        pending = deque()
+        for i, image in enumerate(image_list):
+            pending.append(executor.submit(read_image, image))
+            if len(pending) >= 2 * n_threads:
+                yield (i - len(pending) + 1,) + pending.popleft().result()
+        first = len(image_list) - len(pending)
+        for j, future in enumerate(pending):
+            yield (first + j,) + future.result()
+
+
+def load_data(image_list, mask=True, memmap_file=None, dtype=float, n_threads=1):
+    """
+    Load the voxels of a list of images in a 2d-array (images x voxels).
+
+    When `mask` is True, a first pass over the images computes the voxels different
+    from 0 in at least one image, and only these voxels are written during the
+    second pass, so the full (images x all voxels) array is never allocated.
 
-    for i in range(len(image_list)):
-        subj = nib.load(image_list[i])
-        subj_data = np.nan_to_num(subj.get_data().flatten())
+    Args:
+        image_list: list of NIfTI files
+        mask: if True, only keep the voxels different from 0 in at least one image
+        memmap_file: if given, the data are written to this file (numpy.memmap)
+            instead of being held in memory
+        dtype: type of the returned data (e.g. numpy.float32 to halve its size)
+        n_threads: number of images read concurrently
+
+    Returns:
+        data: 2d-array of the (masked) voxels of each image
+        shape: shape of the images
+        data_mask: boolean 1d-array of the voxels kept (None if mask is False)
+    """
+    if len(image_list) == 0:
+        raise ValueError('The number of images must be greater than 0.')
 
-        # Memory allocation for ndarray containing all data to avoid copying the array for each new subject
-        if first:
-            data = np.ndarray(shape=(len(image_list), subj_data.shape[0]), dtype=float, order='C')
-            shape = subj.get_data().shape
-            first = False
+    shape = nib.load(image_list[0]).shape
+    data_mask = None
 
-        data[i, :] = subj_data
+    def check_shape(i, subj_shape):
+        if subj_shape != shape:
+            raise ValueError(
+                f"All the images must have the same shape: {image_list[i]} has shape "
+                f"{subj_shape} while {image_list[0]} has shape {shape}."
+            )
 
     if mask:
-        data_mask = (data != 0).sum(axis=0) != 0
-        data = data[:, data_mask]
+        data_mask = np.zeros(int(np.prod(shape)), dtype=bool)
+        for i, subj_shape, subj_data in _iter_images(image_list, n_threads):
+            check_shape(i, subj_shape)
+            data_mask |= subj_data != 0
+        n_features = int(data_mask.sum())
+    else:
+        n_features = int(np.prod(shape))
+
+    # Memory allocation for ndarray containing all data to avoid copying the array for each new subject
+    if memmap_file is None:
+        data = np.empty((len(image_list), n_features), dtype=dtype, order='C')
+    else:
+        data = np.memmap(memmap_file, dtype=dtype, mode='w+', shape=(len(image_list), n_features), order='C')
+
+    for i, subj_shape, subj_data in _iter_images(image_list, n_threads):
+        check_shape(i, subj_shape)
+        data[i, :] = subj_data[data_mask] if mask else subj_data
+
+    if memmap_file is not None:
+        data.flush()
 
     return data, shape, data_mask
 
@@ -58,7 +116,23 @@ def revert_mask(weights, mask, shape):
     return new_weights
 
 
-def features_weights(image_list, dual_coefficients, sv_indices, scaler=None, mask=None):
+def features_weights(image_list, dual_coefficients, sv_indices, scaler=None, mask=None, data=None):
+    """
+    Weight map sum_k dual_coefficients[k] * image[sv_indices[k]] of a linear SVM.
+
+    Args:
+        image_list: list of NIfTI files
+        dual_coefficients: dual coefficients of the support vectors
+        sv_indices: indices of the support vectors in image_list
+        scaler: if given with mask, applied to the masked voxels of the support vectors
+        mask: boolean 1d-array of the voxels of data (see load_data)
+        data: if given, (masked) voxels of the images already loaded by load_data (array or memmap):
+            the support vectors are read from it by blocks instead of loading their images
+
+    Returns:
+        3d-array of the weights
+    """
+    from clinica.pipelines.machine_learning.ml_utils import weighted_rows_sum
 
     if len(sv_indices) != len(dual_coefficients):
         print("Length dual coefficients: " + str(len(dual_coefficients)))
@@ -68,18 +142,25 @@ def features_weights(image_list, dual_coefficients, sv_indices, scaler=None, mas
     if len(image_list) == 0:
         raise ValueError('The number of images must be greater than 0.')
 
-    sv_images = [image_list[i] for i in sv_indices]
+    shape = nib.load(image_list[sv_indices[0] if len(sv_indices) > 0 else 0]).shape
 
-    shape = nib.load(sv_images[0]).get_data().shape
+    if data is not None:
+        transform = scaler.transform if scaler is not None and mask is not None else None
+        weights = weighted_rows_sum(data, sv_indices, dual_coefficients, transform=transform)
+        if mask is not None:
+            return revert_mask(weights, mask, shape)
+        return np.reshape(weights, shape)
+
+    sv_images = [image_list[i] for i in sv_indices]
     weights = np.zeros(shape)
 
     for i in range(len(sv_images)):
         subj = nib.load(sv_images[i])
-        subj_data = np.nan_to_num(subj.get_data())
+        subj_data = np.nan_to_num(subj.get_fdata())
 
         if scaler is not None and mask is not None:
             subj_data = subj_data.flatten()[mask]
-            subj_data = scaler.transform(subj_data)
+            subj_data = scaler.transform(subj_data[np.newaxis, :])[0]
             subj_data = revert_mask(subj_data, mask, shape)
         weights += dual_coefficients[i] * subj_data
 
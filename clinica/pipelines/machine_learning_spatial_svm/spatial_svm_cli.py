@@ -90,6 +90,7 @@ class SpatialSVMCLI(ce.CmdParser):
             'suvr_reference_region': args.suvr_reference_region,
             # Advanced arguments
             'fwhm': args.full_width_half_maximum,
+            'n_threads': args.n_procs if args.n_procs else 1,
         }
         pipeline = SpatialSVM(
             caps_directory=self.absolute_path(args.caps_directory),
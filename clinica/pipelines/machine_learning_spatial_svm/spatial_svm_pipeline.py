@@ -30,6 +30,7 @@ class SpatialSVM(cpe.Pipeline):
 
         # Advanced parameters
         self.parameters.setdefault('fwhm', 4)
+        self.parameters.setdefault('n_threads', 1)
 
     def check_custom_dependencies(self):
         """Check dependencies that can not be listed in the `info.json` file.
@@ -150,7 +151,7 @@ class SpatialSVM(cpe.Pipeline):
 
         fisher_tensor_generation = npe.Node(name="obtain_g_fisher_tensor",
                                             interface=nutil.Function(input_names=['dartel_input', 'FWHM'],
-                                                                     output_names=['fisher_tensor', 'fisher_tensor_path'],
+                                                                     output_names=['fisher_tensor_path'],
                                                                      function=utils.obtain_g_fisher_tensor))
         fisher_tensor_generation.inputs.FWHM = self.parameters['fwhm']
 
@@ -160,13 +161,16 @@ class SpatialSVM(cpe.Pipeline):
                                                                  function=utils.obtain_time_step_estimation))
         time_step_generation.inputs.FWHM = self.parameters['fwhm']
 
-        heat_solver_equation = npe.MapNode(name='heat_solver_equation',
-                                           interface=nutil.Function(input_names=['input_image', 'g',
-                                                                                 'FWHM', 't_step', 'dartel_input'],
-                                                                    output_names=['regularized_image'],
-                                                                    function=utils.heat_solver_equation),
-                                           iterfield=['input_image'])
+        # All the images are regularized by the same node: the tensor is read once from its .npy file
+        # (instead of being pickled for each subject) and the images are diffused by batches
+        heat_solver_equation = npe.Node(name='heat_solver_equation',
+                                        interface=nutil.Function(input_names=['input_image', 'g', 'FWHM',
+                                                                              't_step', 'dartel_input', 'n_threads'],
+                                                                 output_names=['regularized_image'],
+                                                                 function=utils.heat_solver_equations))
         heat_solver_equation.inputs.FWHM = self.parameters['fwhm']
+        heat_solver_equation.inputs.n_threads = self.parameters['n_threads']
+        heat_solver_equation.n_procs = self.parameters['n_threads']
 
         datasink = npe.Node(nio.DataSink(),
                             name='sinker')
@@ -174,7 +178,7 @@ class SpatialSVM(cpe.Pipeline):
         datasink.inputs.parameterization = True
         if self.parameters['orig_input_data'] == 't1-volume':
             datasink.inputs.regexp_substitutions = [
-                (r'(.*)/regularized_image/.*/(.*(sub-(.*)_ses-(.*))_T1w(.*)_probability(.*))$',
+                (r'(.*)/regularized_image/(?:.*/)?(.*(sub-(.*)_ses-(.*))_T1w(.*)_probability(.*))$',
                  r'\1/subjects/sub-\4/ses-\5/machine_learning/input_spatial_svm/group-' + self.parameters[
                      'group_label'] + r'/\3_T1w\6_spatialregularization\7'),
 
@@ -189,7 +193,7 @@ class SpatialSVM(cpe.Pipeline):
 
         elif self.parameters['orig_input_data'] == 'pet-volume':
             datasink.inputs.regexp_substitutions = [
-                (r'(.*)/regularized_image/.*/(.*(sub-(.*)_ses-(.*))_(task.*)_pet(.*))$',
+                (r'(.*)/regularized_image/(?:.*/)?(.*(sub-(.*)_ses-(.*))_(task.*)_pet(.*))$',
                  r'\1/subjects/sub-\4/ses-\5/machine_learning/input_spatial_svm/group-' + self.parameters[
                      'group_label'] + r'/\3_\6_spatialregularization\7'),
                 (r'(.*)json_file/(output_data.json)$',
@@ -204,11 +208,11 @@ class SpatialSVM(cpe.Pipeline):
         # ==========
         self.connect([
             (self.input_node,      fisher_tensor_generation,    [('dartel_input',    'dartel_input')]),
-            (fisher_tensor_generation,      time_step_generation,    [('fisher_tensor',    'g')]),
+            (fisher_tensor_generation,      time_step_generation,    [('fisher_tensor_path',    'g')]),
 
             (self.input_node, time_step_generation, [('dartel_input', 'dartel_input')]),
             (self.input_node, heat_solver_equation, [('input_image', 'input_image')]),
-            (fisher_tensor_generation, heat_solver_equation, [('fisher_tensor', 'g')]),
+            (fisher_tensor_generation, heat_solver_equation, [('fisher_tensor_path', 'g')]),
             (time_step_generation, heat_solver_equation, [('t_step', 't_step')]),
             (self.input_node, heat_solver_equation, [('dartel_input', 'dartel_input')]),
 
@@ -9,9 +9,10 @@ def atlas_decomposition(dartel_input):
     """
 
     import nibabel as nib
+    import numpy as np
 
     dartel = nib.load(dartel_input)
-    dartel = dartel.get_data()
+    dartel = np.asanyarray(dartel.dataobj)
     atlas_1 = dartel[:, :, :, 0]
     atlas_2 = dartel[:, :, :, 1]
     atlas_3 = dartel[:, :, :, 2]
@@ -32,7 +33,7 @@ def spm_read(fname):
     import numpy as np
 
     img = nib.load(fname)
-    pico = img.get_data()
+    pico = np.asanyarray(img.dataobj)
     pico = np.array(pico, dtype='float32')
     mask = np.isnan(pico)
     pico[mask] = 0
@@ -85,624 +86,352 @@ def rescaleImage(image1, p):
     return image2
 
 
-def tensor_scalar_product(sc, g1):
-    """
+# Components of the symmetric 3 * 3 tensors, stored in this order in the last axis of a packed
+# (X, Y, Z, 6) tensor field
+TENSOR_COMPONENTS = ((0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2))
 
-    :param sc: scalar
-    :param g1: 3 * 3 tensor
-    :return: product between the tensor and the scalar
-    """
-    import numpy as np
-    # we define the scalar and the tensor as complex
 
-    sc = np.array(sc, dtype=np.complex128)
-    g1 = np.array(g1, dtype=np.complex128)
-    g = np.zeros(g1.shape, dtype=np.complex128)  # new vector
-
-    for i in range(g1.shape[0]):
-        for j in range(g1.shape[1]):
-            for k in range(g1.shape[0]):
-                g[i][j] = g1[i][j] * sc
-
-    # g is the final tensor
-    return g
-
-
-def tensor_eye(atlas):
+def tensor_pack(g, dtype=None):
     """
 
-    :param atlas: list of atlases
-    :return: the identity matrix of a tensor
+    :param g: symmetric tensor dim = 3*3*xg*yg*zg
+    :param dtype: data type of the packed tensor (default: the one of g)
+    :return: packed tensor dim = xg*yg*zg*6
     """
     import numpy as np
-    a = np.ones(atlas[0].shape)
-    b = np.zeros(atlas[0].shape)
-    # the new matrix is 1 on the diagonal and 0 in the other positions
-    X = [a, b, b]
-    Y = [b, a, b]
-    Z = [b, b, a]
 
-    matrix = [X, Y, Z]
-    # it returns matrix, combination of array
-    return matrix
+    g = np.asarray(g)
+    packed = np.empty(g.shape[2:] + (6,), dtype=dtype or g.dtype)
+    for k, (i, j) in enumerate(TENSOR_COMPONENTS):
+        packed[..., k] = g[i, j]
+    return packed
 
 
-def tensor_sum(g1, g2):
+def tensor_unpack(g):
     """
 
-    :param g1: first tensor
-    :param g2: second tensor
-    :return: sum of the two tensor
+    :param g: packed tensor dim = xg*yg*zg*6
+    :return: symmetric tensor dim = 3*3*xg*yg*zg
     """
     import numpy as np
-    g = np.add(g1, g2)
-    # numpy add to sum the tensors
-    return g
 
+    full = np.empty((3, 3) + g.shape[:-1], dtype=g.dtype)
+    for k, (i, j) in enumerate(TENSOR_COMPONENTS):
+        full[i, j] = g[..., k]
+        full[j, i] = g[..., k]
+    return full
 
-def tensor_product(g1, g2):
+
+def tensor_eye(shape, dtype='float64'):
     """
 
-    :param g1: first tensor
-    :param g2: second tensor
-    :return: product between the two tensors
+    :param shape: shape of the volume (xg, yg, zg)
+    :param dtype: data type of the tensor
+    :return: packed identity tensor dim = xg*yg*zg*6
     """
     import numpy as np
-    g1 = np.array(g1)
-    g2 = np.array(g2)
-
-    g = np.zeros(g1.shape)
-
-    for i in range(g1.shape[0]):
-        for j in range(g2.shape[0]):
-            g[i][j] = 0
-            for k in range(g1.shape[0]):
-                g[i][j] = g[i][j] + np.multiply(g1[i][k], g2[k][j])
 
-    # g = g1 * g2 (dim of the tensor: 3*3*xg*yg*zg)
+    g = np.zeros(tuple(shape) + (6,), dtype=dtype)
+    g[..., :3] = 1
     return g
 
 
 def tensor_determinant(g):
     """
 
-    :param g: tensor dim = 3*3*xg*yg*z
+    :param g: packed tensor dim = xg*yg*zg*6
     :return: determinant of the tensor dim = xg*yg*zg
     """
-    import numpy as np
-    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
-
-    g = np.array(g)
-    d = 0
-    s = g.shape
-    # recursive function we have a matrix of 3*3 and then we divide it in different blocks of 2*2 and we calculate the determinant
-    # of them making a um of the different determinants. The resulting determinant it's a sum of the different blocks.
-    if s[0] == 3:
-        # if the tensor is 3*3
-
-        for i in range(s[0]):
-
-            if np.mod(i, 2) == 0:
-                epsilon = 1
-            else:
-                epsilon = -1
-
-            if i == 0:
-                g1 = [[g[1][1], g[1][2]], [g[2][1], g[2][2]]]
-            elif i == 1:
-                g1 = [[g[0][1], g[0][2]], [g[2][1], g[2][2]]]
-            else:
-                g1 = [[g[0][1], g[0][2]], [g[1][1], g[1][2]]]
-            # it's a recursive function
-            prod = epsilon * g[i][0] * utils.tensor_determinant(g1)
-            d = d + prod
-
-    elif s[0] == 2:
-        # if the tensor is 2*2
-        for i in range(s[0]):
-            if np.mod(i, 2) == 0:
-                epsilon = 1
-            else:
-                epsilon = -1
-            if i == 0:
-                g1 = [g[1][1]]
-            elif i == 1:
-                g1 = [g[0][1]]
-            prod = epsilon * g[i][0] * utils.tensor_determinant(g1)
-            d = d + prod
-
-    elif s[0] == 1:
-        # if the tensor is 1 matrix
-        d = [g[0]]
-    return d
-
-
-def tensor_trace(g):
-    """
+    xx, yy, zz, xy, xz, yz = (g[..., k] for k in range(6))
+    # cofactor expansion along the first row, written out for symmetric tensors
+    return xx * (yy * zz - yz * yz) - xy * (xy * zz - yz * xz) + xz * (xy * yz - yy * xz)
 
-    :param g: tensor
-    :return: trace of a tensor
-    """
-    import numpy as np
-    trace = np.trace(g)
-    # trace if the trace of the input tensor
-    return trace
 
-
-def roots_poly(C):
+def tensor_inverse(g):
     """
 
-    :param C: coefficients. If C has N+1 components, the polynomial is C(1)*X^N + ... + C(N) * X + C(N+1)
-    :return: roots of the polynomial
-
-    the functions find the polynomial roots. It computes the roots of the polynomail whose coefficients are the elements of the vector C?
+    :param g: packed tensor dim = xg*yg*zg*6
+    :return: packed inverse of the tensor, 0 where the tensor is singular
     """
-    import numpy as np
-    import math
-
-    import cmath
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
+    import numpy as np
 
-    C = np.array(C)
-    if C.shape[0] < 2:
-        rts = []
-
-    elif C.shape[0] < 3:
-        rts = - C[:, 1] * (1 / C[:, 0])
-
-    elif C.shape[0] < 4:
-        # implementation of delta
-        delta = np.array([cmath.sqrt((C[1, i] * C[1, i]) - (4 * C[0, i] * C[2, i])) for i in range(C.shape[1])])
-        # two roots
-        rts1 = (-C[1, :] + delta) * (1 / ((2 * C[0, :])))
-        rts2 = (-C[1, :] - delta) * (1 / ((2 * C[0, :])))
-        rts = np.array([rts1, rts2])
-
-    elif C.shape[0] < 5:
-        # implementation of the method of Cardan
-
-        a = C[0, :]
-        b = C[1, :]
-        c = C[2, :]
-        d = C[3, :]
-
-        p = - b * b * (1 / (3 * a * a)) + c * (1 / a)
-        q = b * (1 / (27. * a)) * (2 * b * b * (1 / (a * a)) - 9 * c * (1 / a)) + d * (1 / a)
-
-        new_roots = np.array([np.ones((q.shape[0])), q, - (p * p * p) / 27])
-
-        rts = utils.roots_poly(new_roots)
-
-        u = rts[0, :]
-        u_mod = abs(u) ** (1 / 3)
-        u_angle = np.angle(u) * (1 / 3)
-
-        v = rts[1, :]
-        v_mod = abs(v) ** (1 / 3)
-        v_angle = np.angle(v) * (1 / 3)
-
-        rts = np.zeros([C.shape[1], 3], dtype='complex128')
-
-        ind = np.zeros([u.shape[0]], dtype='int32')
-
-        for k in [0, 1, 2]:
-            u = u_mod * np.power(math.e, 1j * (u_angle + k * 2 * math.pi * (1 / 3)))
-            u = np.array(u)
-
-            for r in [0, 1, 2]:
-                v = v_mod * np.power(math.e, 1j * (v_angle + r * 2 * math.pi * (1 / 3)))
-
-                ind2 = abs(u * v + p * 1 / 3) < 1e-10
-
-                rts[ind2, ind[ind2]] = u[ind2] + v[ind2] - b[ind2] * (1 / (3 * a[ind2]))
-
-                ind[ind2] = np.minimum(2, ind[ind2] + 1)
-
-    else:
-        print("For degree > 3 use roots ")
+    xx, yy, zz, xy, xz, yz = (g[..., k] for k in range(6))
+    # the adjugate of a symmetric tensor is symmetric: same packing as g
+    adjugate = np.empty_like(g)
+    adjugate[..., 0] = yy * zz - yz * yz
+    adjugate[..., 1] = xx * zz - xz * xz
+    adjugate[..., 2] = xx * yy - xy * xy
+    adjugate[..., 3] = xz * yz - xy * zz
+    adjugate[..., 4] = xy * yz - xz * yy
+    adjugate[..., 5] = xy * xz - xx * yz
 
-    return rts
+    detg = utils.tensor_determinant(g)[..., np.newaxis]
+    return np.divide(adjugate, detg, out=np.zeros_like(adjugate), where=detg != 0)
 
 
 def tensor_eigenvalues(g):
     """
 
-    :param g: tensor
-    :return: eigenvalues of the tensor
+    :param g: packed tensor dim = xg*yg*zg*6
+    :return: eigenvalues of the tensor dim = xg*yg*zg*3, sorted in increasing order
 
+    The eigenvalues are computed in closed form with the trigonometric solution of the
+    characteristic polynomial of real symmetric matrices (O. K. Smith, 1961).
     """
-    import numpy as np
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
-    g = np.array(g)
-
-    if g.shape[0] < 4:
-        # condition if we have a tensor
-
-        C1 = np.ones(len(np.ravel(g[0][0])))
-        buff = -utils.tensor_trace(g)
-        C2 = buff.flatten('F')
-        buff = utils.tensor_trace(utils.tensor_product(g, g))
-        buff = (- 0.5 * (buff.flatten('F') - np.multiply(C2, C2)))
-        C3 = buff.flatten('F')
-        buff = -utils.tensor_determinant(g)
-        C4 = buff.flatten('F')
-
-        C = np.array([C1, C2, C3, C4])
-        rts = utils.roots_poly(C)
-
-    else:
-        print('Degree too big : not still implemented')
-
-    rts2 = rts.real.copy()
-    rts2.sort()
-
-    lamb = np.zeros(shape=(g.shape[0], g.shape[2], g.shape[3], g.shape[4]), dtype='complex128')
-
-    for i in range(g.shape[0]):
-        lamb[i, :, :, :] = rts2[:, i].reshape(g.shape[2], g.shape[3], g.shape[4], order='F')
-
-    # lamb[0] is the smallest eigenvalues, lamb[2] is the biggest
-    return lamb
-
-
-def tensor_transpose(g):
-    """
-
-    :param g: tensor
-    :return: tranpose of the tensor
-    """
     import numpy as np
 
-    g = np.array(g)
-    tg = np.array(g)
-    for i in range(g.shape[0]):
-        for j in range(g.shape[0]):
-            tg[i][j] = g[j][i]
-    # tg is the transposed tensor
-    return tg
-
-
-def tensor_commatrix(g):
-    """
-
-    :param g: tensor
-    :return: commatrix of the tensor
-    """
-    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
+    xx, yy, zz, xy, xz, yz = (g[..., k] for k in range(6))
 
-    import numpy as np
-    g = np.array(g)
-    g_com = []
+    q = (xx + yy + zz) / 3
+    # deviatoric part of the tensor, B = (g - q * I) / p
+    p = np.sqrt(((xx - q) ** 2 + (yy - q) ** 2 + (zz - q) ** 2 + 2 * (xy * xy + xz * xz + yz * yz)) / 6)
+    deviatoric = np.array(g, copy=True)
+    deviatoric[..., :3] -= q[..., np.newaxis]
+    np.divide(deviatoric, p[..., np.newaxis], out=deviatoric, where=p[..., np.newaxis] > 0)
+    r = np.clip(utils.tensor_determinant(deviatoric) / 2, -1, 1)
+    phi = np.arccos(r) / 3
 
-    for i in range(g.shape[0]):
-        for j in range(g.shape[0]):
-            if np.mod(i + j, 2) == 0:
-                epsilon = 1
-            else:
-                epsilon = -1
-            if i == 0:
-                if j == 0:
-                    n = [[g[1][1], g[1][2]], [g[2][1], g[2][2]]]
-                    a0 = epsilon * utils.tensor_determinant(n)
-                elif j == 1:
-                    n = [[g[1][0], g[1][2]], [g[2][0], g[2][2]]]
-                    a1 = epsilon * utils.tensor_determinant(n)
-                else:
-                    n = [[g[1][0], g[1][1]], [g[2][0], g[2][1]]]
-                    a2 = epsilon * utils.tensor_determinant(n)
-            elif i == 1:
-                if j == 0:
-                    n = [[g[0][1], g[0][2]], [g[2][1], g[2][2]]]
-                    b0 = epsilon * utils.tensor_determinant(n)
-                elif j == 1:
-                    n = [[g[0][0], g[0][2]], [g[2][0], g[2][2]]]
-                    b1 = epsilon * utils.tensor_determinant(n)
-                else:
-                    n = [[g[0][0], g[0][1]], [g[2][0], g[2][1]]]
-                    b2 = epsilon * utils.tensor_determinant(n)
-            else:
-                if j == 0:
-                    n = [[g[0][1], g[0][2]], [g[1][1], g[1][2]]]
-                    c0 = epsilon * utils.tensor_determinant(n)
-                elif j == 1:
-                    n = [[g[0][0], g[0][2]], [g[1][0], g[1][2]]]
-                    c1 = epsilon * utils.tensor_determinant(n)
-                else:
-                    n = [[g[0][0], g[0][1]], [g[1][0], g[1][1]]]
-                    c2 = epsilon * utils.tensor_determinant(n)
-    g_com = [[a0, a1, a2], [b0, b1, b2], [c0, c1, c2]]
-    g_com = np.array(g_com)
-    if len(g_com.shape) == 6:
-        g_com = g_com[:, :, 0, :, :, :]
+    lamb = np.empty(g.shape[:-1] + (3,), dtype=g.dtype)
+    lamb[..., 2] = q + 2 * p * np.cos(phi)
+    lamb[..., 0] = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+    lamb[..., 1] = 3 * q - lamb[..., 0] - lamb[..., 2]
 
-    return g_com
+    # lamb[..., 0] is the smallest eigenvalues, lamb[..., 2] is the biggest
+    return lamb
 
 
-def create_fisher_tensor(atlas):
+def create_fisher_tensor(atlas, dtype='float64'):
     """
 
     :param atlas: list of 3 atlases, the 3 probability maps from the template with 3 components
-    :return: g = tensor
+    :param dtype: data type of the tensor
+    :return: g = packed tensor dim = xg*yg*zg*6
     """
 
     # create tensor for fisher metrics
+    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
     import numpy as np
-    import math
 
     upper_bound = 0.999  # probabibilty limits to avoid log(0) and log(1)
     lower_bound = 0.001  # probability limits to avoid log(0) and log(1)
     epsilon = 1e-6  # regularization
 
-    n = atlas[0].shape
-
-    a = np.ones(atlas[0].shape)
-    b = np.zeros(atlas[0].shape)
-    X = [np.dot(a, epsilon), b, b]
-    Y = [b, np.dot(a, epsilon), b]
-    Z = [b, b, np.dot(a, epsilon)]
-
-    g = [X, Y, Z]
+    g = utils.tensor_eye(atlas[0].shape, dtype=dtype)
+    g *= epsilon
 
     for i in range(3):  # for for each component of the tensor
-        proba = 1
-        proba = (proba * atlas[i])
-        proba = np.maximum(np.minimum(proba, upper_bound), lower_bound)
-        gr = np.array(np.gradient(np.log(proba)))
+        proba = np.maximum(np.minimum(atlas[i], upper_bound), lower_bound)
+        gr = np.gradient(np.log(proba))
 
-        for x in range(3):
-            for y in range(3):
-                g[x][y] = (g[x][y] + (proba * gr[x] * gr[y]))
+        for k, (x, y) in enumerate(utils.TENSOR_COMPONENTS):
+            g[..., k] += proba * gr[x] * gr[y]
 
     return g
 
 
-def tensor_helmholtz(x, h, detg, k):
-    """
+# Offsets of the 19-point stencil of the heat operator: the voxel, its 6 faces and its 12 edges
+HEAT_STENCIL_OFFSETS = (
+    ((0, 0, 0),)
+    + tuple(tuple(s if axis == a else 0 for axis in range(3)) for a in range(3) for s in (-1, 1))
+    + tuple(tuple(sa if axis == a else sb if axis == b else 0 for axis in range(3))
+            for a, b in ((0, 1), (1, 2), (0, 2)) for sa in (-1, 1) for sb in (-1, 1))
+)
 
-    :param x: 3D Array
-    :param h: sqrt(det(g)) * inverse(g)^2 -> g is he metric tensor of the 3D manifold M
-    :param detg: sqrt(det(g))
-    :param k: constant( 0 - gives laplacian)
-    :return:
 
+def heat_stencil_coefficients(g, h, dtype=None):
     """
 
-    import numpy as np
-    detg = np.array(detg)
-    if len(detg.shape) == 3:
-        detg_ = detg
-    else:
-        detg_ = detg[0]
-
-    weight = detg_[1:-1, 1:-1, 1:-1] * k
-    if len(h.shape) == 6:
-        h_ = h[:, :, 0, :, :, :, ]
-    else:
-        h_ = h
-    for i in range(len(h)):  # from 1 to 3
-        mat = h_[i][i]
-        weight = weight + mat[1:-1, 1:-1, 1:-1]
-
-    mat_1 = h_[0][0]
-    weight = weight + 0.5 * mat_1[:-2, 1:-1, 1:-1]
-    weight = weight + 0.5 * mat_1[2:, 1:-1, 1:-1]
-
-    mat_2 = h_[1][1]
-    weight = weight + 0.5 * mat_2[1:-1, :-2, 1:-1]
-    weight = weight + 0.5 * mat_2[1:-1, 2:, 1:-1]
-
-    mat_3 = h_[2][2]
-    weight = weight + 0.5 * mat_3[1:-1, 1:-1, :-2]
-    weight = weight + 0.5 * mat_3[1:-1, 1:-1, 2:]
-
-    y0 = (weight * x[1:-1, 1:-1, 1:-1])
-
-    mat1 = h_[0][1]
-    mat2 = h_[1][0]
-    mat3 = h_[1][2]
-    mat4 = h_[2][1]
-    mat5 = h_[0][2]
-    mat6 = h_[2][0]
-
-    y0 = y0 + (-1 * -1 * -0.25) * (mat1[:-2, 1:-1, 1: -1] + mat2[1:-1, :-2, 1:-1]) * x[:-2, :-2, 1:-1]
-    y0 = y0 + (-1 * -1 * -0.25) * (mat3[1:-1, :-2, 1: -1] + mat4[1:-1, 1:-1, :-2]) * x[1:-1, :-2, :-2]
-    y0 = y0 + (-1 * -1 * -0.25) * (mat5[:-2, 1:-1, 1: -1] + mat6[1:-1, 1:-1, :-2]) * x[:-2, 1:-1, :-2]
-    y0 = y0 + (-1 * +1 * -0.25) * (mat1[:-2, 1:-1, 1: -1] + mat2[1:-1, 2:, 1:-1]) * x[:-2, 2:, 1:-1]
-    y0 = y0 + (-1 * +1 * -0.25) * (mat3[1:-1, :-2, 1: -1] + mat4[1:-1, 1:-1, 2:]) * x[1:-1, :-2, 2:]
-    y0 = y0 + (-1 * +1 * -0.25) * (mat5[:-2, 1:-1, 1: -1] + mat6[1:-1, 1:-1, 2:]) * x[:-2, 1:-1, 2:]
-    y0 = y0 + (+1 * -1 * -0.25) * (mat1[2:, 1:-1, 1: -1] + mat2[1:-1, :-2, 1:-1]) * x[2:, :-2, 1:-1]
-    y0 = y0 + (+1 * -1 * -0.25) * (mat3[1:-1, 2:, 1: -1] + mat4[1:-1, 1:-1, :-2]) * x[1:-1, 2:, :-2]
-    y0 = y0 + (+1 * -1 * -0.25) * (mat5[2:, 1:-1, 1: -1] + mat6[1:-1, 1:-1, :-2]) * x[2:, 1:-1, :-2]
-    y0 = y0 + (+1 * +1 * -0.25) * (mat1[2:, 1:-1, 1: -1] + mat2[1:-1, 2:, 1:-1]) * x[2:, 2:, 1:-1]
-    y0 = y0 + (+1 * +1 * -0.25) * (mat3[1:-1, 2:, 1: -1] + mat4[1:-1, 1:-1, 2:]) * x[1:-1, 2:, 2:]
-    y0 = y0 + (+1 * +1 * -0.25) * (mat5[2:, 1:-1, 1: -1] + mat6[1:-1, 1:-1, 2:]) * x[2:, 1:-1, 2:]
-
-    y0 = y0 + (-0.5) * (mat_1[1:-1, 1:-1, 1:-1] + mat_1[:-2, 1:-1, 1:-1]) * x[:-2, 1:-1, 1:-1]
-    y0 = y0 + (-0.5) * (mat_1[1:-1, 1:-1, 1:-1] + mat_1[2:, 1:-1, 1:-1]) * x[2:, 1:-1, 1:-1]
-    y0 = y0 + (-0.5) * (mat_2[1:-1, 1:-1, 1:-1] + mat_2[1:-1, :-2, 1:-1]) * x[1:-1, :-2, 1:-1]
-    y0 = y0 + (-0.5) * (mat_2[1:-1, 1:-1, 1:-1] + mat_2[1:-1, 2:, 1:-1]) * x[1:-1, 2:, 1:-1]
-    y0 = y0 + (-0.5) * (mat_3[1:-1, 1:-1, 1:-1] + mat_3[1:-1, 1:-1, :-2]) * x[1:-1, 1:-1, :-2]
-    y0 = y0 + (-0.5) * (mat_3[1:-1, 1:-1, 1:-1] + mat_3[1:-1, 1:-1, 2:]) * x[1:-1, 1:-1, 2:]
-
-    return y0
-
+    :param g: packed metric tensor dim = xg*yg*zg*6
+    :param h: space step
+    :param dtype: data type of the coefficients (default: the one of g)
+    :return: coefficients of the heat operator dim = 19*(xg-2)*(yg-2)*(zg-2), one per offset of
+        HEAT_STENCIL_OFFSETS
 
-def tensor_inverse(g):
+    The heat operator maps x (defined inside the volume, 0 on its border) to
+    -div(sqrt(det(g)) * inverse(g) * grad(x)) / sqrt(det(g)) / h^2, discretized with the
+    27-point finite element scheme of the previous tensor_helmholtz: its weights only depend
+    on g, so that they are computed once for all the time steps.
     """
+    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
+    import numpy as np
 
-    :param g: tensor
-    :return: inverse of the tensor
+    dtype = np.dtype(dtype or g.dtype)
+    detg = np.sqrt(utils.tensor_determinant(g))
+    detg[np.isnan(detg)] = 0
+    ginv = utils.tensor_inverse(g)
+    ginv *= detg[..., np.newaxis]
+
+    def shifted(a, b, offset):
+        # sqrt(det(g)) * inverse(g)[a][b] at the voxels (inside the volume) + offset
+        return ginv[tuple(slice(1 + o, ginv.shape[axis] - 1 + o) for axis, o in enumerate(offset))
+                    + (utils.TENSOR_COMPONENTS.index((a, b)),)]
+
+    coefficients = np.zeros((len(utils.HEAT_STENCIL_OFFSETS),) + tuple(n - 2 for n in g.shape[:3]), dtype=dtype)
+    for index, offset in enumerate(utils.HEAT_STENCIL_OFFSETS):
+        axes = [axis for axis in range(3) if offset[axis] != 0]
+        if len(axes) == 0:
+            for a in range(3):
+                minus = tuple(-1 if axis == a else 0 for axis in range(3))
+                plus = tuple(1 if axis == a else 0 for axis in range(3))
+                coefficients[index] += shifted(a, a, (0, 0, 0)) + 0.5 * (shifted(a, a, minus) + shifted(a, a, plus))
+        elif len(axes) == 1:
+            a = axes[0]
+            coefficients[index] = -0.5 * (shifted(a, a, (0, 0, 0)) + shifted(a, a, offset))
+        else:
+            a, b = axes
+            offset_a = tuple(offset[a] if axis == a else 0 for axis in range(3))
+            offset_b = tuple(offset[b] if axis == b else 0 for axis in range(3))
+            coefficients[index] = -0.25 * offset[a] * offset[b] * (shifted(a, b, offset_a) + shifted(a, b, offset_b))
+
+    inner_detg = detg[1:-1, 1:-1, 1:-1] * (h * h)
+    np.divide(coefficients, inner_detg, out=coefficients, where=inner_detg > 0)
+    coefficients[:, inner_detg <= 0] = 0
+
+    return coefficients
+
+
+def heat_operator(x, coefficients, out, n_threads=1):
+    """
+
+    :param x: array dim = xg*yg*zg, the vector inside the volume and 0 on its border, or a stack
+        of such arrays dim = n*xg*yg*zg
+    :param coefficients: coefficients of the heat operator (see heat_stencil_coefficients)
+    :param out: array dim = (xg-2)*(yg-2)*(zg-2) (or n*(xg-2)*(yg-2)*(zg-2) for a stack)
+        receiving the heat operator applied to x
+    :param n_threads: number of threads computing slabs of out along the first axis of the volume
+    :return: out
     """
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
     import numpy as np
 
-    h = utils.tensor_transpose(utils.tensor_commatrix(g))
-    detg = utils.tensor_determinant(g)
+    def apply_on_slab(start, stop):
+        slab = out[..., start:stop, :, :]
+        buffer = np.empty_like(slab)
+        for index, offset in enumerate(utils.HEAT_STENCIL_OFFSETS):
+            neighbours = x[...,
+                           1 + start + offset[0]:1 + stop + offset[0],
+                           1 + offset[1]:x.shape[-2] - 1 + offset[1],
+                           1 + offset[2]:x.shape[-1] - 1 + offset[2]]
+            if index == 0:
+                np.multiply(coefficients[index, start:stop], neighbours, out=slab)
+            else:
+                np.multiply(coefficients[index, start:stop], neighbours, out=buffer)
+                slab += buffer
+
+    n_slabs = max(1, min(int(n_threads), out.shape[-3]))
+    bounds = np.linspace(0, out.shape[-3], n_slabs + 1).astype(int)
+    if n_slabs == 1:
+        apply_on_slab(0, out.shape[-3])
+    else:
+        from concurrent.futures import ThreadPoolExecutor
 
-    h = h * (1 / (detg))
-    mask = np.isnan(h)
-    h[mask] = 0
-    return h
+        # numpy releases the GIL in the products of each slab
+        with ThreadPoolExecutor(max_workers=n_slabs) as executor:
+            for future in [executor.submit(apply_on_slab, bounds[i], bounds[i + 1]) for i in range(n_slabs)]:
+                future.result()
 
+    return out
 
-def operateur(x, ginv, detg):
+
+def heat_diffusion(x0, coefficients, t_final, t_step, n_threads=1):
     """
 
-    :param x:
-    :param ginv:
-    :param detg:
-    :return:
+    :param x0: vector x (at t = 0) dim = (xg-2)*(yg-2)*(zg-2), or a stack of vectors
+        dim = n*(xg-2)*(yg-2)*(zg-2) diffused together
+    :param coefficients: coefficients of the heat operator (see heat_stencil_coefficients)
+    :param t_final: time
+    :param t_step: time step (must satisfy the CFL max(lambda) < 2)
+    :param n_threads: number of threads applying the heat operator
+    :return: vector x (at t = t_final)
     """
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
+
     import numpy as np
 
-    if len(x.shape) == 4:
-        x = x[0, :, :, :]
-    y = np.zeros([x.shape[0] + 2, x.shape[1] + 2, x.shape[2] + 2])
-    y = np.array(y, dtype=np.complex_)
-    y[1:-1, 1:-1, 1:-1] = x
-    y = utils.tensor_helmholtz(y, ginv, detg, 0)
+    # parameters
+    nb_step = np.ceil(t_final / t_step)  # number of time step
+    nb_step = nb_step.astype(int)
+    t_step = t_final / nb_step
+
+    # LOOP: explicit Euler steps between two buffers, 0 on the border of the volume
+    x = np.zeros(x0.shape[:-3] + tuple(n + 2 for n in x0.shape[-3:]), dtype=np.result_type(x0, coefficients))
+    x[..., 1:-1, 1:-1, 1:-1] = x0
+    y = np.zeros_like(x)
+    for i in range(nb_step):
+        inner = y[..., 1:-1, 1:-1, 1:-1]
+        utils.heat_operator(x, coefficients, inner, n_threads=n_threads)
+        inner *= -t_step
+        inner += x[..., 1:-1, 1:-1, 1:-1]
+        x, y = y, x
 
-    return y
+    return x[..., 1:-1, 1:-1, 1:-1]
 
 
-def largest_eigenvalue_heat_3D_tensor2(g, h, epsilon):
+def largest_eigenvalue_heat_3D_tensor2(g, h, epsilon, n_threads=1):
     """
 
-    :param g: metric tensor
+    :param g: packed metric tensor dim = xg*yg*zg*6
     :param h: space step
     :param epsilon: stop criterion
+    :param n_threads: number of threads applying the heat operator
     :return: lamba = the largest eigenvalues
 
     """
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
 
     import numpy as np
-    import cmath
 
     # parameters
     if epsilon is None:
         epsilon = 1e-6
     erreur = 1 + epsilon
 
-    # tensors
-
-    detg = utils.tensor_determinant(g)
-    detg = np.array(detg, dtype=np.complex128)  # complex tensor
-    detg = np.sqrt(detg)
-    detg = detg[0]
-    ginv = utils.tensor_inverse(g)
-
-    if len(ginv.shape) == 6:
-        ginv = ginv[:, :, 0, :, :, :]
+    # operator
+    coefficients = utils.heat_stencil_coefficients(g, h)
 
-    ginv = utils.tensor_scalar_product(detg, ginv)
-    detg2 = detg[1:-1, 1:-1, 1:-1]  # 141*121*141
-    detg2[np.isnan(detg2)] = 0
-    detg[np.isnan(detg)] = 0
-    ginv[np.isnan(ginv)] = 0
-
-    # initialisation
-
-    s = [g[0][0].shape[0] - 2, g[0][0].shape[1] - 2, g[0][0].shape[2] - 2]
-    b1 = np.ones([s[0], s[1], s[2]])
-
-    b1 = np.divide(b1, np.array(cmath.sqrt(np.dot(b1.flatten('F').transpose(), b1.flatten('F'))), dtype=np.complex128))
+    # initialisation: power iteration between two buffers, 0 on the border of the volume
+    b0 = np.zeros(g.shape[:3], dtype=coefficients.dtype)
+    b1 = np.zeros(g.shape[:3], dtype=coefficients.dtype)
+    b1[1:-1, 1:-1, 1:-1] = 1 / np.sqrt(b1[1:-1, 1:-1, 1:-1].size)
+    b2 = np.empty(coefficients.shape[1:], dtype=coefficients.dtype)
 
     print("Computation of the largest eigenvalue ...")
     while erreur > epsilon:
-        b0 = b1
-        b2 = np.array(np.divide(np.array(utils.operateur(b1, ginv, detg)) * h, detg2) / h / h / h, dtype=np.complex128)
-        b1 = np.divide(b2, np.array(cmath.sqrt(np.dot(b2.flatten('F').transpose(), b2.flatten('F')))),
-                       dtype=np.complex128)
+        b0, b1 = b1, b0
+        utils.heat_operator(b0, coefficients, b2, n_threads=n_threads)
+        lam = np.sqrt(np.vdot(b2, b2))
+        np.divide(b2, lam, out=b1[1:-1, 1:-1, 1:-1])
 
-        erreur = np.linalg.norm(b1.flatten('F') - b0.flatten('F'))
+        erreur = np.linalg.norm(b1 - b0)
 
     print("done")
 
-    lam = (cmath.sqrt(np.dot(b2.flatten('F').transpose(), b2.flatten('F'))))
-
     return lam
 
 
-def heat_finite_elt_3D_tensor2(x0, t_final, t_step, h, g):
+def heat_finite_elt_3D_tensor2(x0, t_final, t_step, h, g, n_threads=1):
     """
 
     :param x0: vector x (at t = 0)
     :param t_final: time
     :param t_step: time step (must satisfy the CFL max(lambda) < 2)
     :param h:
-    :param g: metric tensor
+    :param g: packed metric tensor dim = xg*yg*zg*6
+    :param n_threads: number of threads applying the heat operator
     :return: vector x (at t = t_final)
 
     """
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
 
-    import numpy as np
     if len(x0.shape) == 4:
         x0 = x0[0, :, :, :]
 
-    # parameters
-    nb_step = np.ceil(t_final / t_step)  # number of time step
-    nb_step = nb_step.astype(int)
-    t_step = t_final / nb_step
+    # operator
+    coefficients = utils.heat_stencil_coefficients(g, h)
 
-    # tensors
-    detg = utils.tensor_determinant(g)
-    detg = np.sqrt(detg)
-    ginv = utils.tensor_inverse(g)
-    ginv = utils.tensor_scalar_product(detg, ginv)
-    detg2 = detg[:, 1:-1, 1:-1, 1:-1]
-    if len(ginv.shape) == 6:
-        ginv = ginv[:, :, 0, :, :, :]
-    if len(detg.shape) == 4:
-        detg = detg[0, :, :, :]
-    ginv = np.array(ginv.real, dtype='float64')
-    detg = np.array(detg.real, dtype='float64')
-    detg2 = np.array(detg2.real, dtype='float64')
-
-    # LOOP
-    x = x0
-    for i in range(nb_step):
-        x = np.array(x - t_step * (np.divide(np.array(utils.operateur(x, ginv, detg)) * h, detg2)) / h / h / h)
-
-    return x
-
-
-def heat_finite_elt_2D_tensor2(x0, t_final, t_step, h, g):
-    """
-
-    :param x0: vector x (at t = 0)
-    :param t_final: time
-    :param t_step: time step (must satisfy the CFL max(lambda) < 2)
-    :param h:
-    :param g: metric tensor
-    :return: vector x (at t = t_final)
-
-    """
-    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
-    import numpy as np
-
-    # parameters
-    nb_step = np.ceil(t_final / t_step)  # number of time step
-    t_step = t_final / nb_step
-
-    # tensors
-    detg = utils.tensor_determinant(g)
-    detg = np.sqrt(detg)
-    ginv = utils.tensor_inverse(g)
-    ginv = utils.tensor_scalar_product(detg, ginv)
-    detg2 = detg[1:-1, 1:-1]
-
-    # LOOP
-    x = x0
-    for i in range(nb_step):
-        m = t_step / h / h
-        x = np.sum(x, -(
-            utils.tensor_scalar_product(m,
-                                        np.divide(utils.tensor_scalar_product(h, utils.operateur(x, ginv, detg)), detg2, dtype=object))))
-
-    return x
+    return utils.heat_diffusion(x0, coefficients, t_final, t_step, n_threads=n_threads)
 
 
 def heat_solver_tensor_3D_P1_grad_conj(f, g, t_final, h, t_step, CL_value, epsilon):
@@ -747,51 +476,15 @@ def heat_solver_tensor_3D_P1_grad_conj(f, g, t_final, h, t_step, CL_value, epsil
     return u
 
 
-def heat_solver_tensor_2D_P1_grad_conj(f, g, t_final, h, t_step, CL_value, epsilon):
-    """
-    It solves the poisson's equation in 1D on the regular mesh (with mesh of size h)
-    :param f: approximation of a funcion of L^(/Omega)
-    :param g: tensor
-    :param t_final:
-    :param h:
-    :param t_step:
-    :param CL_value:
-    :param epsilon:
-    :return: u= solution of the poisson's equation
-    """
-    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
-    import numpy as np
-
-    # intiialisation
-    if h is None:
-        h = 1
-    if CL_value is None:
-        CL_value = np.zeros(f.shape)
-    if epsilon is None:
-        epsilon = 1e-4
-
-    # rigidity matrix
-    b_h = utils.tensor_scalar_product((h * h), f[1:-1, 1:-1])
-    b_h[:, 0] = b_h[:, 0] + utils.tensor_scalar_product(h, CL_value[1:-1, 0])
-    b_h[0, :] = b_h[0, :] + utils.tensor_scalar_product(h, CL_value[0, 1:-1])
-
-    # inversion of the linear system
-    U_h = utils.heat_finite_elt_2D_tensor2(b_h, t_final, t_step, h, g)
-
-    u = CL_value
-    u[1:-1, 1:-1] = U_h
-
-    return u
-
-
-def obtain_g_fisher_tensor(dartel_input, FWHM):
+def obtain_g_fisher_tensor(dartel_input, FWHM, dtype='float64'):
     """
     heat regularization based on the Fisher metric
     :param dartel_input: dartel template in MNI space
     :param sigma_loc: 10
     :param h: voxel size 1,5
     :param FWHM: mm of smoothing, parameters choosing by the user. default_value = 4
-    :return: g: fisher tensor
+    :param dtype: data type of the tensor ('float64' or 'float32')
+    :return: path to the .npy file of g: packed fisher tensor dim = xg*yg*zg*6
 
     """
 
@@ -830,12 +523,9 @@ def obtain_g_fisher_tensor(dartel_input, FWHM):
     si = atlas[0].shape
 
     # CREATE TENSOR
-    g_atlas = utils.create_fisher_tensor(atlas)
-    g_atlas = utils.tensor_scalar_product(h * h, g_atlas)
-    g_pos = utils.tensor_eye(atlas)
-    g_pos = utils.tensor_scalar_product(1 / float(sigma_loc ** 2), g_pos)
-
-    g = utils.tensor_sum(g_atlas, g_pos)
+    g = utils.create_fisher_tensor(atlas, dtype=dtype)
+    g *= h * h
+    g += utils.tensor_eye(si, dtype=dtype) / float(sigma_loc ** 2)
 
     print("computing mean distance ... ")
 
@@ -843,19 +533,15 @@ def obtain_g_fisher_tensor(dartel_input, FWHM):
 
     print('done')
 
-    dist_av = []
-
-    for i in range(g.shape[0]):
-        dist_av.append(np.sqrt(abs(eigenv[i])))
-    dist_av = np.mean(dist_av)
+    dist_av = np.mean(np.sqrt(np.abs(eigenv)))
 
     print("average distance ", dist_av)
 
-    g = utils.tensor_scalar_product((1 / dist_av) / dist_av, g)
+    g /= dist_av * dist_av
 
     np.save(os.path.abspath('./output_fisher_tensor.npy'), g)
 
-    return g, os.path.abspath('./output_fisher_tensor.npy')
+    return os.path.abspath('./output_fisher_tensor.npy')
 
 
 def obtain_time_step_estimation(dartel_input, FWHM, g):
@@ -863,7 +549,7 @@ def obtain_time_step_estimation(dartel_input, FWHM, g):
 
     :param h: 1,5 voxel size
     :param FWHM: mm of smoothing, defined by the user, default value = 4
-    :param g: fisher tensor
+    :param g: packed fisher tensor, or path to the .npy file where it is saved (memory-mapped)
     :return:
     """
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
@@ -886,6 +572,8 @@ def obtain_time_step_estimation(dartel_input, FWHM, g):
     sigma = FWHM / (2 * math.sqrt(2 * math.log(2)))  # sigma of voxels
     beta = sigma ** 2 / 2
 
+    if isinstance(g, str):
+        g = np.load(g, mmap_mode='r')
     lam = utils.largest_eigenvalue_heat_3D_tensor2(g, h,
                                                    error_tol)
     print("lambda: ", lam)
@@ -917,6 +605,30 @@ def obtain_time_step_estimation(dartel_input, FWHM, g):
 
 
 def heat_solver_equation(input_image, g, FWHM, t_step, dartel_input):
+    """
+    Heat regularization of one image (see heat_solver_equations)
+    """
+    import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
+
+    return utils.heat_solver_equations([input_image], g, FWHM, t_step, dartel_input)[0]
+
+
+def heat_solver_equations(input_image, g, FWHM, t_step, dartel_input, n_threads=1, batch_size=8):
+    """
+    Heat regularization of a list of images based on the same Fisher metric
+
+    :param input_image: list of paths to the images to regularize
+    :param g: packed fisher tensor, or path to the .npy file where it is saved (memory-mapped)
+    :param FWHM: mm of smoothing, defined by the user, default value = 4
+    :param t_step: time step of the heat equation
+    :param dartel_input: dartel template in MNI space (header used for the voxel size)
+    :param n_threads: number of threads applying the heat operator
+    :param batch_size: number of images diffused together
+    :return: list of paths to the regularized images
+
+    The coefficients of the heat operator are computed once from g and the images are diffused
+    by stacks of batch_size images.
+    """
     import math
     import clinica.pipelines.machine_learning_spatial_svm.spatial_svm_utils as utils
     import nibabel as nib
@@ -933,14 +645,29 @@ def heat_solver_equation(input_image, g, FWHM, t_step, dartel_input):
     sigma = FWHM / (2 * math.sqrt(2 * math.log(2)))  # sigma of voxels
     beta = sigma ** 2 / 2
 
-    input_image_read = nib.load(input_image)
-    input_image_data = input_image_read.get_data()
-    input_image_data = np.array(input_image_data, dtype='float32')
+    if isinstance(g, str):
+        g = np.load(g, mmap_mode='r')
+    coefficients = utils.heat_stencil_coefficients(g, h)
+    del g
+
+    regularized_images = []
+    for start in range(0, len(input_image), batch_size):
+        batch = input_image[start:start + batch_size]
+
+        # rigidity matrix of each image (see heat_solver_tensor_3D_P1_grad_conj)
+        b_h = np.empty((len(batch),) + coefficients.shape[1:], dtype='float32')
+        for k, image in enumerate(batch):
+            data = np.asanyarray(nib.load(image).dataobj)
+            b_h[k] = data[1:-1, 1:-1, 1:-1] * (h * h * h)
 
-    u = utils.heat_solver_tensor_3D_P1_grad_conj(input_image_data, g, beta, h, t_step, CL_value=None, epsilon=None)
+        U_h = utils.heat_diffusion(b_h, coefficients, beta, t_step, n_threads=n_threads)
 
-    img = utils.spm_write_vol(input_image, u)
+        for k, image in enumerate(batch):
+            u = np.zeros(tuple(n + 2 for n in U_h.shape[1:]))
+            u[1:-1, 1:-1, 1:-1] = U_h[k]
 
-    nib.save(img, './regularized_' + os.path.basename(input_image))
+            img = utils.spm_write_vol(image, u)
+            nib.save(img, './regularized_' + os.path.basename(image))
+            regularized_images.append(os.path.abspath('./regularized_' + os.path.basename(image)))
 
-    return os.path.abspath('./regularized_' + os.path.basename(input_image))
+    return regularized_images
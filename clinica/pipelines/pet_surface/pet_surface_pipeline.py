@@ -1,7 +1,14 @@
 # coding: utf-8
 
+from nipype import config
+
 import clinica.pipelines.engine as cpe
 
+# Use hash instead of parameters for iterables folder names
+# Otherwise path will be too long and generate OSError
+cfg = dict(execution={'parameterize_dirs': False})
+config.update_config(cfg)
+
 
 class PetSurface(cpe.Pipeline):
     """PetSurface - Surface-based processing of PET images.
@@ -29,7 +36,10 @@ class PetSurface(cpe.Pipeline):
         Returns:
             A list of (string) input fields name.
         """
-        return ['orig_nu',
+        return ['subject_id',
+                'session_id',
+                'psf',
+                'orig_nu',
                 'pet',
                 'white_surface_left',
                 'white_surface_right',
@@ -162,16 +172,7 @@ class PetSurface(cpe.Pipeline):
                                                                   self.bids_directory,
                                                                   self.parameters['acq_label'])
 
-        self.connect([
-            (read_parameters_node, self.input_node, [('pet', 'pet'),
-                                                     ('orig_nu', 'orig_nu'),
-                                                     ('white_surface_left', 'white_surface_left'),
-                                                     ('white_surface_right', 'white_surface_right'),
-                                                     ('destrieux_left', 'destrieux_left'),
-                                                     ('destrieux_right', 'destrieux_right'),
-                                                     ('desikan_left', 'desikan_left'),
-                                                     ('desikan_right', 'desikan_right')])
-        ])
+        self._connect_read_parameters_node(read_parameters_node)
 
     def build_input_node_cross_sectional(self):
         import nipype.interfaces.utility as nutil
@@ -264,15 +265,28 @@ class PetSurface(cpe.Pipeline):
                                                                   self.bids_directory,
                                                                   self.parameters['acq_label'])
 
+        self._connect_read_parameters_node(read_parameters_node)
+
+    def _connect_read_parameters_node(self, read_parameters_node):
+        """Iterate over the subjects of read_parameters_node and connect it to the input node.
+
+        Each image of read_parameters_node is given with the subject, session and PSF of the
+        PET image as synchronized iterables, so that each stage of the core nodes runs (and is
+        cached) separately for each subject.
+        """
+        from clinica.utils.pet import read_psf_information
+
+        read_parameters_node.inputs.subject_id = self.subjects
+        read_parameters_node.inputs.session_id = self.sessions
+        read_parameters_node.inputs.psf = read_psf_information(self.parameters['pvc_psf_tsv'],
+                                                               self.subjects,
+                                                               self.sessions,
+                                                               self.parameters['acq_label'])
+        read_parameters_node.iterables = [(field, getattr(read_parameters_node.inputs, field))
+                                          for field in self.get_input_fields()]
+
         self.connect([
-            (read_parameters_node, self.input_node, [('pet',                 'pet'),
-                                                     ('orig_nu',             'orig_nu'),
-                                                     ('white_surface_left',  'white_surface_left'),
-                                                     ('white_surface_right', 'white_surface_right'),
-                                                     ('destrieux_left',      'destrieux_left'),
-                                                     ('destrieux_right',     'destrieux_right'),
-                                                     ('desikan_left',        'desikan_left'),
-                                                     ('desikan_right',       'desikan_right')])
+            (read_parameters_node, self.input_node, [(field, field) for field in self.get_input_fields()])
         ])
 
     def build_output_node(self):
@@ -280,86 +294,389 @@ class PetSurface(cpe.Pipeline):
         pass
 
     def build_core_nodes(self):
-        """The function get_wf constructs a pipeline for one subject (in pet_surface_utils.py) and runs it.
-        We use iterables to give to the node all the files and information needed.
-        """
-        # TODO(@arnaud.marcoux): Convert it to a Node with iterables + MapNodes.
-        #   I'm experimenting something to avoid the "MapNode of MapNode" case
-        #   with iterables. I'll try to apply it on the tractography pipeline.
-        #   Check it out to get inspiration from it when it's ready.
+        """Build and connect the core nodes of the pipeline.
 
+        Each stage (gtmseg, PETPVC, SPM coregistration, projections at the 7 depths of the cortex,
+        projections on fsaverage...) is a node of the pipeline, run for each subject (iterables of
+        the input node) and each hemisphere, so that it is scheduled, cached and resumed on its own.
+        """
         import os
         import nipype.pipeline.engine as npe
         import nipype.interfaces.utility as niu
+        import nipype.interfaces.io as nio
+        from nipype.interfaces.freesurfer import Tkregister2, ApplyVolTransform, MRIConvert
+        from nipype.interfaces.petpvc import PETPVC
+        from nipype.interfaces.spm import Coregister, Normalize12
         import clinica.pipelines.pet_surface.pet_surface_utils as utils
-        from clinica.utils.spm import spm_standalone_is_available, use_spm_standalone
-
-        full_pipe = npe.MapNode(niu.Function(input_names=['subject_id',
-                                                          'session_id',
-                                                          'caps_dir',
-                                                          'pvc_psf_tsv',
-                                                          'pet',
-                                                          'orig_nu',
-                                                          'white_surface_left',
-                                                          'white_surface_right',
-                                                          'working_directory_subjects',
-                                                          'acq_label',
-                                                          'csv_segmentation',
-                                                          'suvr_reference_region',
-                                                          'matscript_folder_inverse_deformation',
-                                                          'desikan_left',
-                                                          'desikan_right',
-                                                          'destrieux_left',
-                                                          'destrieux_right',
-                                                          'spm_standalone_is_available',
-                                                          'is_longitudinal'],
-                                             output_names=[],
-                                             function=utils.get_wf),
-                                name='full_pipeline_mapnode',
-                                iterfield=['subject_id',
-                                           'session_id',
-                                           'pet',
-                                           'orig_nu',
-                                           'white_surface_left',
-                                           'white_surface_right',
-                                           'desikan_left',
-                                           'desikan_right',
-                                           'destrieux_left',
-                                           'destrieux_right'])
-
-        full_pipe.inputs.subject_id = self.subjects
-        full_pipe.inputs.session_id = self.sessions
-        full_pipe.inputs.caps_dir = self.caps_directory
-        full_pipe.inputs.pvc_psf_tsv = self.parameters['pvc_psf_tsv']
-        full_pipe.inputs.working_directory_subjects = self.base_dir
-        full_pipe.inputs.acq_label = self.parameters['acq_label']
-        full_pipe.inputs.suvr_reference_region = self.parameters['suvr_reference_region']
-        full_pipe.inputs.csv_segmentation = os.path.abspath(os.path.join(
-            os.path.dirname(os.path.realpath(__file__)),
-            '..',
-            '..',
-            'resources',
-            'label_conversion_gtmsegmentation.csv'
-        ))
-        full_pipe.inputs.matscript_folder_inverse_deformation = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
-        full_pipe.inputs.is_longitudinal = self.parameters['longitudinal']
+        from clinica.utils.filemanip import unzip_nii
+        from clinica.utils.pet import get_suvr_mask
+        from clinica.utils.spm import get_tpm, spm_standalone_is_available, use_spm_standalone
+
+        acq_label = self.parameters['acq_label']
+        suvr_reference_region = self.parameters['suvr_reference_region']
+        is_longitudinal = self.parameters['longitudinal']
+
+        csv_segmentation = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                                        '..',
+                                                        '..',
+                                                        'resources',
+                                                        'label_conversion_gtmsegmentation.csv'))
+        if not os.path.exists(csv_segmentation):
+            raise Exception('CSV file : ' + csv_segmentation + ' does not exist.')
+
+        # Check and read the inputs of each subject
+        # ==========================================
+        check_pet = npe.Node(niu.Function(input_names=['pet', 'subject_id', 'session_id'],
+                                          output_names=['pet'],
+                                          function=utils.check_pet_volume),
+                             name='check_pet')
+
+        unzip_pet = npe.Node(niu.Function(input_names=['in_file'],
+                                          output_names=['out_file'],
+                                          function=unzip_nii),
+                             name='unzip_pet')
+
+        unzip_orig_nu = unzip_pet.clone(name='unzip_orig_nu')
+
+        unzip_mask = unzip_pet.clone(name='unzip_mask')
+        unzip_mask.inputs.in_file = get_suvr_mask(suvr_reference_region)
+
+        # PET in the space of the gtmseg segmentation
+        # ===========================================
+        coreg = npe.Node(Coregister(), name='coreg')
+
+        convert_mgh = npe.Node(MRIConvert(), name='convert_mgh')
+
+        removenan = npe.Node(niu.Function(input_names=['volname'],
+                                          output_names=['vol_wo_nan'],
+                                          function=utils.remove_nan),
+                             name='removenan')
+
+        gtmsegmentation = npe.Node(niu.Function(input_names=['caps_dir',
+                                                             'subject_id',
+                                                             'session_id',
+                                                             'is_longitudinal'],
+                                                output_names=['gtmseg_file'],
+                                                function=utils.perform_gtmseg),
+                                   name='gtmseg')
+        gtmsegmentation.inputs.caps_dir = self.caps_directory
+        gtmsegmentation.inputs.is_longitudinal = is_longitudinal
+
+        tkregister = npe.Node(Tkregister2(reg_header=True), name='tkreg')
+
+        convert_gtmseg = convert_mgh.clone(name='convert_gtmseg')
+
+        labelconversion = npe.Node(niu.Function(input_names=['gtmsegfile',
+                                                             'csv'],
+                                                output_names=['mask_4d'],
+                                                function=utils.make_label_conversion),
+                                   name='conversion_of_labels')
+        labelconversion.inputs.csv = csv_segmentation
+
+        vol2vol = npe.Node(ApplyVolTransform(reg_header=True, interp='trilin'),
+                           name='vol2vol')
+
+        vol2vol_mask = npe.Node(ApplyVolTransform(reg_header=True, interp='nearest'),
+                                name='vol2vol_mask')
+
+        # SUVR and partial volume correction
+        # ==================================
+        normalize12 = npe.Node(Normalize12(tpm=get_tpm(),
+                                           affine_regularization_type='mni',
+                                           jobtype='est',
+                                           bias_fwhm=60,
+                                           bias_regularization=0.0001,
+                                           warping_regularization=[0, 0.001, 0.5, 0.05, 0.2]),
+                               name='normalize_to_MNI')
 
         # This section of code determines whether to use SPM standalone or not
         if spm_standalone_is_available():
             use_spm_standalone()
-            full_pipe.inputs.spm_standalone_is_available = True
+            fun_apply_inverse_deformation = utils.runApplyInverseDeformationField_SPM_standalone
+        else:
+            fun_apply_inverse_deformation = utils.runApplyInverseDeformationField
+        apply_inverse_deformation = npe.Node(niu.Function(input_names=['target',
+                                                                       'deformation_field',
+                                                                       'img',
+                                                                       'matscript_folder'],
+                                                          output_names=['freesurfer_space_eroded_mask'],
+                                                          function=fun_apply_inverse_deformation),
+                                             name='applyInverseDeformation')
+        apply_inverse_deformation.inputs.matscript_folder = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+        pons_normalization = npe.Node(niu.Function(input_names=['pet_path',
+                                                                'mask'],
+                                                   output_names=['suvr'],
+                                                   function=utils.suvr_normalization),
+                                      name='pons_normalization')
+
+        pvc = npe.Node(PETPVC(pvc='IY'), name='petpvc')
+
+        # Projection on the cortical surface of each hemisphere
+        # =====================================================
+        reformat_surface_name = npe.Node(niu.Function(input_names=['hemi',
+                                                                   'left_surface',
+                                                                   'right_surface'],
+                                                      output_names=['out'],
+                                                      function=utils.reformat_surfname),
+                                         name='reformat_surface_name')
+        reformat_surface_name.iterables = ('hemi', ['lh', 'rh'])
+
+        mris_exp = npe.Node(niu.Function(input_names=['in_surface'],
+                                         output_names=['out_surface'],
+                                         function=utils.mris_expand),
+                            name='mris_expand_white')
+
+        surf_conversion = npe.MapNode(niu.Function(input_names=['in_surface',
+                                                                'reg_file',
+                                                                'gtmsegfile',
+                                                                'subject_id',
+                                                                'session_id',
+                                                                'caps_dir',
+                                                                'is_longitudinal'],
+                                                   output_names=['tval'],
+                                                   function=utils.surf2surf),
+                                      name='surf_conversion',
+                                      iterfield=['in_surface'])
+        surf_conversion.inputs.caps_dir = self.caps_directory
+        surf_conversion.inputs.is_longitudinal = is_longitudinal
+
+        vol_on_surf = npe.MapNode(niu.Function(input_names=['volume',
+                                                            'surface',
+                                                            'subject_id',
+                                                            'session_id',
+                                                            'caps_dir',
+                                                            'gtmsegfile',
+                                                            'is_longitudinal'],
+                                               output_names=['output'],
+                                               function=utils.vol2surf),
+                                  name='vol_on_surf',
+                                  iterfield=['surface'])
+        vol_on_surf.inputs.caps_dir = self.caps_directory
+        vol_on_surf.inputs.is_longitudinal = is_longitudinal
+
+        normal_average = npe.Node(niu.Function(input_names=['in_surfaces'],
+                                               output_names=['out_surface'],
+                                               function=utils.weighted_mean),
+                                  name='normal_average')
+
+        project_on_fsaverage = npe.Node(niu.Function(input_names=['projection',
+                                                                  'subject_id',
+                                                                  'caps_dir',
+                                                                  'session_id',
+                                                                  'fwhm',
+                                                                  'is_longitudinal'],
+                                                     output_names=['out_fsaverage'],
+                                                     function=utils.fsaverage_projection),
+                                        name='project_on_fsaverage')
+        project_on_fsaverage.iterables = ('fwhm', [0, 5, 10, 15, 20, 25])
+        project_on_fsaverage.inputs.caps_dir = self.caps_directory
+        project_on_fsaverage.inputs.is_longitudinal = is_longitudinal
+
+        extract_mid_surface = npe.Node(niu.Function(input_names=['in_surfaces'],
+                                                    output_names=['mid_surface'],
+                                                    function=utils.get_mid_surface),
+                                       name='extract_mid_surface')
+
+        # Statistics on the surface atlases (both hemispheres)
+        # ====================================================
+        gather_fsaverage_projection = npe.JoinNode(niu.IdentityInterface(fields=['fsaverage_projection']),
+                                                   name='gather_fsaverage_projection',
+                                                   joinsource='project_on_fsaverage',
+                                                   joinfield=['fsaverage_projection'])
+
+        gather_pet_projection = npe.JoinNode(niu.IdentityInterface(fields=['pet_projection_lh_rh',
+                                                                           'fsaverage_projection_lh_rh']),
+                                             name='gather_pet_projection_hemisphere',
+                                             joinsource='reformat_surface_name',
+                                             joinfield=['pet_projection_lh_rh', 'fsaverage_projection_lh_rh'])
+
+        surface_atlas = npe.Node(niu.Function(input_names=['destrieux_left',
+                                                           'destrieux_right',
+                                                           'desikan_left',
+                                                           'desikan_right'],
+                                              output_names=['atlas_files'],
+                                              function=utils.get_surface_atlases),
+                                 name='surface_atlas')
+
+        atlas_tsv = npe.Node(niu.Function(input_names=['pet', 'atlas_files'],
+                                          output_names=['destrieux_tsv', 'desikan_tsv'],
+                                          function=utils.produce_tsv),
+                             name='atlas_tsv')
+
+        clean_freesurfer_directory = npe.Node(niu.Function(input_names=['pet_projections',
+                                                                        'fsaverage_projections',
+                                                                        'caps_dir',
+                                                                        'subject_id',
+                                                                        'session_id',
+                                                                        'is_longitudinal'],
+                                                           output_names=[],
+                                                           function=utils.clean_freesurfer_directory),
+                                              name='clean_freesurfer_directory')
+        clean_freesurfer_directory.inputs.caps_dir = self.caps_directory
+        clean_freesurfer_directory.inputs.is_longitudinal = is_longitudinal
+
+        # Writing outputs into CAPS
+        # =========================
+        outputnode = npe.Node(niu.IdentityInterface(fields=['mid_surf',
+                                                            'projection_native_subject',
+                                                            'projection_fsaverage_smoothed',
+                                                            'destrieux_tsv',
+                                                            'desikan_tsv']),
+                              name='outputnode',
+                              mandatory_inputs=True)
+
+        output_dir = npe.Node(niu.Function(input_names=['is_longitudinal',
+                                                        'caps_dir',
+                                                        'subject_id',
+                                                        'session_id'],
+                                           output_names=['output_dir'],
+                                           function=utils.get_output_dir),
+                              name='output_dir')
+        output_dir.inputs.caps_dir = self.caps_directory
+        output_dir.inputs.is_longitudinal = is_longitudinal
+
+        datasink = npe.Node(nio.DataSink(),
+                            name='sinker')
+        datasink.inputs.parameterization = True
+        cross_sectional_regexp_substitutions = [
+            # Mid surface
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/midsurface\/.*_hemi_([a-z]+)(.*)$',
+             r'\1/\2_\3_hemi-\4_midcorticalsurface'),
+            # Projection in native space
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/projection_native\/.*_hemi_([a-z]+).*',
+             r'\1/\2_\3_task-rest_acq-' + acq_label + r'_pet_space-native_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\4_projection.mgh'),
+            # Projection in fsaverage
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/projection_fsaverage\/.*_hemi_([a-z]+).*_fwhm_([0-9]+).*',
+             r'\1/\2_\3_task-rest_acq-' + acq_label + r'_pet_space-fsaverage_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\4_fwhm-\5_projection.mgh'),
+            # TSV file for Destrieux atlas
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/destrieux_tsv\/destrieux.tsv',
+             r'\1/atlas_statistics/\2_\3_task-rest_acq-' + acq_label + '_pet_space-destrieux_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv'),
+            # TSV file for Desikan atlas
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/desikan_tsv\/desikan.tsv',
+             r'\1/atlas_statistics/\2_\3_task-rest_acq-' + acq_label + '_pet_space-desikan_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv')
+        ]
+        longitudinal_regexp_substitutions = [
+            # Mid surface
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/midsurface\/.*_hemi_([a-z]+)(.*)$',
+             r'\1/\2_\3_\4_hemi-\5_midcorticalsurface'),
+            # Projection in native space
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/projection_native\/.*_hemi_([a-z]+).*',
+             r'\1/\2_\3_\4_task-rest_acq-' + acq_label + r'_pet_space-native_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\5_projection.mgh'),
+            # Projection in fsaverage
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/projection_fsaverage\/.*_hemi_([a-z]+).*_fwhm_([0-9]+).*',
+             r'\1/\2_\3_\4_task-rest_acq-' + acq_label + r'_pet_space-fsaverage_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\5_fwhm-\6_projection.mgh'),
+            # TSV file for Destrieux atlas
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/destrieux_tsv\/destrieux.tsv',
+             r'\1/atlas_statistics/\2_\3_\4_task-rest_acq-' + acq_label + '_pet_space-destrieux_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv'),
+            # TSV file for Desikan atlas
+            (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/desikan_tsv\/desikan.tsv',
+             r'\1/atlas_statistics/\2_\3_\4_task-rest_acq-' + acq_label + '_pet_space-desikan_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv')
+        ]
+        if is_longitudinal:
+            datasink.inputs.regexp_substitutions = longitudinal_regexp_substitutions
         else:
-            full_pipe.inputs.spm_standalone_is_available = False
+            datasink.inputs.regexp_substitutions = cross_sectional_regexp_substitutions
 
         # Connection
         # ==========
         self.connect([
-            (self.input_node, full_pipe, [('pet', 'pet'),
-                                          ('white_surface_left', 'white_surface_left'),
-                                          ('white_surface_right', 'white_surface_right'),
-                                          ('orig_nu', 'orig_nu'),
-                                          ('destrieux_left', 'destrieux_left'),
-                                          ('destrieux_right', 'destrieux_right'),
-                                          ('desikan_left', 'desikan_left'),
-                                          ('desikan_right', 'desikan_right')])
+            # Subject information
+            (self.input_node, check_pet, [('pet', 'pet'),
+                                          ('subject_id', 'subject_id'),
+                                          ('session_id', 'session_id')]),
+            (self.input_node, gtmsegmentation, [('subject_id', 'subject_id'),
+                                                ('session_id', 'session_id')]),
+            (self.input_node, surf_conversion, [('subject_id', 'subject_id'),
+                                                ('session_id', 'session_id')]),
+            (self.input_node, vol_on_surf, [('subject_id', 'subject_id'),
+                                            ('session_id', 'session_id')]),
+            (self.input_node, project_on_fsaverage, [('subject_id', 'subject_id'),
+                                                     ('session_id', 'session_id')]),
+            (self.input_node, clean_freesurfer_directory, [('subject_id', 'subject_id'),
+                                                           ('session_id', 'session_id')]),
+            (self.input_node, output_dir, [('subject_id', 'subject_id'),
+                                           ('session_id', 'session_id')]),
+            (self.input_node, pvc, [(('psf', utils.get_psf_fwhm, 0), 'fwhm_x'),
+                                    (('psf', utils.get_psf_fwhm, 1), 'fwhm_y'),
+                                    (('psf', utils.get_psf_fwhm, 2), 'fwhm_z')]),
+            (self.input_node, reformat_surface_name, [('white_surface_left', 'left_surface'),
+                                                      ('white_surface_right', 'right_surface')]),
+            (self.input_node, surface_atlas, [('destrieux_left', 'destrieux_left'),
+                                              ('destrieux_right', 'destrieux_right'),
+                                              ('desikan_left', 'desikan_left'),
+                                              ('desikan_right', 'desikan_right')]),
+
+            # PET in the space of the gtmseg segmentation
+            (check_pet, unzip_pet, [('pet', 'in_file')]),
+            (unzip_pet, coreg, [('out_file', 'source')]),
+
+            (self.input_node, convert_mgh, [('orig_nu', 'in_file')]),
+            (convert_mgh, unzip_orig_nu, [('out_file', 'in_file')]),
+
+            (unzip_orig_nu, coreg, [('out_file', 'target')]),
+            (coreg, removenan, [('coregistered_source', 'volname')]),
+            (removenan, vol2vol, [('vol_wo_nan', 'source_file')]),
+
+            (self.input_node, tkregister, [('orig_nu', 'target_image')]),
+
+            (unzip_orig_nu, normalize12, [('out_file', 'image_to_align')]),
+            (unzip_mask, apply_inverse_deformation, [('out_file', 'img')]),
+            (normalize12, apply_inverse_deformation, [('deformation_field', 'deformation_field')]),
+            (unzip_orig_nu, apply_inverse_deformation, [('out_file', 'target')]),
+            (apply_inverse_deformation, vol2vol_mask, [('freesurfer_space_eroded_mask', 'source_file')]),
+
+            (gtmsegmentation, vol2vol_mask, [('gtmseg_file', 'target_file')]),
+            (gtmsegmentation, tkregister, [('gtmseg_file', 'moving_image')]),
+            (gtmsegmentation, convert_gtmseg, [('gtmseg_file', 'in_file')]),
+            (gtmsegmentation, vol2vol, [('gtmseg_file', 'target_file')]),
+
+            # SUVR and partial volume correction
+            (vol2vol, pons_normalization, [('transformed_file', 'pet_path')]),
+            (vol2vol_mask, pons_normalization, [('transformed_file', 'mask')]),
+
+            (convert_gtmseg, labelconversion, [('out_file', 'gtmsegfile')]),
+            (labelconversion, pvc, [('mask_4d', 'mask_file')]),
+            (pons_normalization, pvc, [('suvr', 'in_file')]),
+
+            # Projection on the cortical surface of each hemisphere
+            (reformat_surface_name, mris_exp, [('out', 'in_surface')]),
+            (mris_exp, extract_mid_surface, [('out_surface', 'in_surfaces')]),
+
+            (mris_exp, surf_conversion, [('out_surface', 'in_surface')]),
+            (tkregister, surf_conversion, [('reg_file', 'reg_file')]),
+            (gtmsegmentation, surf_conversion, [('gtmseg_file', 'gtmsegfile')]),
+
+            (pvc, vol_on_surf, [('out_file', 'volume')]),
+            (surf_conversion, vol_on_surf, [('tval', 'surface')]),
+            (gtmsegmentation, vol_on_surf, [('gtmseg_file', 'gtmsegfile')]),
+
+            (vol_on_surf, normal_average, [('output', 'in_surfaces')]),
+
+            (normal_average, project_on_fsaverage, [('out_surface', 'projection')]),
+
+            # Statistics on the surface atlases (both hemispheres)
+            (project_on_fsaverage, gather_fsaverage_projection, [('out_fsaverage', 'fsaverage_projection')]),
+            (normal_average, gather_pet_projection, [('out_surface', 'pet_projection_lh_rh')]),
+            (gather_fsaverage_projection, gather_pet_projection, [('fsaverage_projection',
+                                                                   'fsaverage_projection_lh_rh')]),
+            (gather_pet_projection, atlas_tsv, [('pet_projection_lh_rh', 'pet')]),
+            (surface_atlas, atlas_tsv, [('atlas_files', 'atlas_files')]),
+            (gather_pet_projection, clean_freesurfer_directory, [('pet_projection_lh_rh', 'pet_projections'),
+                                                                 ('fsaverage_projection_lh_rh',
+                                                                  'fsaverage_projections')]),
+
+            # Writing outputs into CAPS
+            (atlas_tsv, outputnode, [('destrieux_tsv', 'destrieux_tsv')]),
+            (atlas_tsv, outputnode, [('desikan_tsv', 'desikan_tsv')]),
+            (project_on_fsaverage, outputnode, [('out_fsaverage', 'projection_fsaverage_smoothed')]),
+            (extract_mid_surface, outputnode, [('mid_surface', 'mid_surf')]),
+            (normal_average, outputnode, [('out_surface', 'projection_native_subject')]),
+
+            (output_dir, datasink, [('output_dir', 'base_directory')]),
+            (outputnode, datasink, [('projection_fsaverage_smoothed', 'projection_fsaverage')]),
+            (outputnode, datasink, [('mid_surf', 'midsurface')]),
+            (outputnode, datasink, [('projection_native_subject', 'projection_native')]),
+            (outputnode, datasink, [('destrieux_tsv', 'destrieux_tsv')]),
+            (outputnode, datasink, [('desikan_tsv', 'desikan_tsv')])
         ])
@@ -104,7 +104,7 @@ def remove_nan(volname):
 
     # Load the volume and get the data
     nifti_in = nib.load(volname)
-    data = np.nan_to_num(nifti_in.get_data())
+    data = np.nan_to_num(np.asanyarray(nifti_in.dataobj))
 
     # Now create final image (using header of original image), and save it in current directory
     nifti_out = nib.Nifti1Image(data, nifti_in.affine, header=nifti_in.header)
@@ -119,13 +119,15 @@ def make_label_conversion(gtmsegfile, csv):
     """make_label_conversion is a method used on the segmentation from gtmsegmentation. The purpose is to reduce the
     number of label. The gathering of labels is specified in a separate file
 
+    The labels are converted with a single lookup table, and the mask of each converted label is written as a volume
+    of a 4D image (in ascending order of the converted labels), which is the mask file expected by PETPVC.
+
     Args:
         (string) gtmsegfile   : path to the Nifti volume containing the gtmseg segmentation
         (string) csv          : path to .csv file that contains 3 columns : REGION SOURCE DST. Separator is , (coma).
 
     Returns:
-        (list of strings) List of path to the converted volumes according to the .csv file. Each volume is a mask
-        representing an area
+        (string) Path to the 4D volume containing the mask of each area of the converted segmentation
     """
     import nibabel as nib
     import numpy
@@ -133,23 +135,9 @@ def make_label_conversion(gtmsegfile, csv):
     import pandas
     from clinica.utils.stream import cprint
 
-    def isclose(a, b, rel_tol=1e-9, abs_tol=0.0):
-        """ Small function designed to measure equality between to floating or double numbers, using 2 thresholds : a
-        relative tolerance, and an absolute tolerance
-        """
-        return abs(a - b) <= max(rel_tol * max(abs(a), abs(b)), abs_tol)
-
     # Read label from gtmsegfile, change data into integers in order to have no problems when testing equality of labels
     label = nib.load(gtmsegfile)
-    label.header.set_data_dtype('int8')
-    volume = label.get_data()
-
-    # Unique function gives a list where each label of the volume is listed once
-    old_labels = numpy.unique(volume)
-    old_labels = old_labels.astype('int16')
-
-    # allsum is a control volume (sum of a pixel across the 4 th dimension must be equal to 1)
-    allsum = numpy.zeros(volume.shape)
+    volume = numpy.rint(numpy.asanyarray(label.dataobj)).astype('int64')
 
     # Reading of csv file, raise exception if the pattern REGION, SOURCE, DST is not found
     if not os.path.isfile(csv):
@@ -159,58 +147,35 @@ def make_label_conversion(gtmsegfile, csv):
         raise Exception('CSV file ' + csv + ' is not in the correct format. Columns should be : REGION, SOURCE, DST')
 
     # Extract columns to a list form (values converted into integers)
-    src = list(convert_lut.SOURCE)
-    src_val = numpy.asanyarray(src)
-    src_val = src_val.astype('int')
-
-    dst = list(convert_lut.DST)
-    dst_val = numpy.asarray(dst)
-    dst_val = dst_val.astype('int')
-
-    reg = list(convert_lut.REGION)
+    src_val = numpy.asarray(list(convert_lut.SOURCE)).astype('int')
+    dst_val = numpy.asarray(list(convert_lut.DST)).astype('int')
 
     # Check that each label of original volume (old_label) has a matching transformation in the csv file
-    for i in range(old_labels.size):
-        index = numpy.argwhere(src_val == old_labels[i])
-        # Size 0 means no occurence found
-        if index.size == 0:
-            raise Exception('Could not find label '
-                            + str(old_labels[i])
-                            + ' on conversion table. Add it manually in csv file to correct error')
-        else:
-            cprint(str(old_labels[i]) + ' has been found on conversion table')
-
-    # Instanciation of final volume, with same dtype as original volume
-    new_volume = numpy.zeros(volume.shape, dtype=volume.dtype)
-    # Computing the transformation
-    for i in range(len(src)):
-        new_volume[volume == src_val[i]] = dst_val[i]
-        cprint('Region ' + reg[i] + ' transformed')
-    # Get unique list of new label
-    new_labels = numpy.unique(new_volume)
-    new_labels = new_labels.astype('int')
-    list_of_regions = list()
-
-    # For each label, create a volume file filled with 0s and 1s and save it in current directory under whatever name
-    for i in range(new_labels.size):
-        region_volume = numpy.zeros(volume.shape, dtype='uint8')
-        region_volume[new_volume == new_labels[i]] = 1
-        myNifti = nib.Nifti1Image(region_volume, label.affine, header=label.header)
-        current_path = './' + str(new_labels[i]) + '.nii.gz'
-        current_path = os.path.abspath(current_path)
-        nib.save(myNifti, current_path)
-        list_of_regions.append(current_path)
-        cprint('Label ' + str(new_labels[i]) + ' created in ' + current_path)
-        allsum = allsum + region_volume
-
-    # The sum of a voxel location across the fourth dimension should be 1
-    sum_voxel_mean = float(sum(sum(sum(allsum)))) / allsum.size
-    if not isclose(1.0, sum_voxel_mean):
-        raise Exception('Problem during parcellation : the mean sum of a voxel across 4th dimension is '
-                        + str(sum_voxel_mean)
-                        + ' instead of 1.0')
-    # The list of files is returned
-    return list_of_regions
+    old_labels = numpy.unique(volume)
+    missing_labels = numpy.setdiff1d(old_labels, src_val)
+    if missing_labels.size > 0:
+        raise Exception('Could not find label '
+                        + str(missing_labels[0])
+                        + ' on conversion table. Add it manually in csv file to correct error')
+
+    # Lookup table from the gtmseg labels to the index of the converted labels (the last row of the csv file wins
+    # when a label is listed several times)
+    in_volume = numpy.isin(src_val, old_labels)
+    new_labels = numpy.unique(dst_val[in_volume])
+    lut = numpy.zeros(old_labels.max() + 1, dtype='int64')
+    lut[src_val[in_volume]] = numpy.searchsorted(new_labels, dst_val[in_volume])
+    new_index = lut[volume]
+
+    # The sum of a voxel location across the fourth dimension is 1 by construction
+    masks = numpy.zeros(volume.shape + (new_labels.size,), dtype='uint8')
+    masks.reshape(-1, new_labels.size)[numpy.arange(volume.size), new_index.ravel()] = 1
+    cprint('Labels ' + ', '.join(str(lab) for lab in new_labels) + ' created')
+
+    mask_header = label.header.copy()
+    mask_header.set_data_dtype('uint8')
+    mask_4d = os.path.abspath('./converted_labels.nii.gz')
+    nib.save(nib.Nifti1Image(masks, label.affine, header=mask_header), mask_4d)
+    return mask_4d
 
 
 def runApplyInverseDeformationField_SPM_standalone(target,
@@ -305,16 +270,17 @@ def suvr_normalization(pet_path, mask):
         (string) Path to the suvr normalized volume in the current directory
     """
     import nibabel as nib
+    import numpy as np
     import os
 
     # Load mask
     eroded_mask_nifti = nib.load(mask)
-    eroded_mask = eroded_mask_nifti.get_data()
+    eroded_mask = np.asanyarray(eroded_mask_nifti.dataobj)
     eroded_mask = eroded_mask > 0
 
     # Load PET data (they must be in gtmsegspace, or same space as label file)
     pet = nib.load(pet_path)
-    pet_data = pet.get_data()
+    pet_data = np.asanyarray(pet.dataobj)
 
     # check that eroded mask is not null
     mask_size = sum(sum(sum(eroded_mask)))
@@ -489,14 +455,13 @@ def vol2surf(volume, surface, subject_id, session_id, caps_dir, gtmsegfile, is_l
                                       freesurfer_id,
                                       'surf'))
 
-    if not os.path.exists(os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                                       freesurfer_id,
-                                       'mri',
-                                       'gtmseg.mgz')):
-        shutil.copy(gtmsegfile, os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                                             freesurfer_id,
-                                             'mri',
-                                             'gtmseg.mgz'))
+    # the projections of both hemispheres may run at the same time: the segmentation is copied under a
+    # temporary name then renamed, and is removed by clean_freesurfer_directory once all of them are done
+    gtmseg_in_mri_folder = os.path.join(os.path.expandvars('$SUBJECTS_DIR'), freesurfer_id, 'mri', 'gtmseg.mgz')
+    if not os.path.exists(gtmseg_in_mri_folder):
+        gtmseg_copy = gtmseg_in_mri_folder + '.' + str(os.getpid())
+        shutil.copy(gtmsegfile, gtmseg_copy)
+        os.replace(gtmseg_copy, gtmseg_in_mri_folder)
 
     # execute vol2surf
     output = os.path.abspath('./' + hemi + '.projection_' + os.path.basename(surface) + '.mgh')
@@ -519,12 +484,6 @@ def vol2surf(volume, surface, subject_id, session_id, caps_dir, gtmsegfile, is_l
                            freesurfer_id,
                            'surf',
                            os.path.basename(surface)))
-    # TODO carreful here...
-    # Removing gtmseg.mgz may lead to problems as other vol2surf are using it
-    os.remove(os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                           freesurfer_id,
-                           'mri',
-                           'gtmseg.mgz'))
 
     # put back original subjects_dir env
     os.environ["SUBJECTS_DIR"] = subjects_dir_backup
@@ -550,18 +509,16 @@ def weighted_mean(in_surfaces):
     # coefficient for normal repartition
     coefficient = [0.1034, 0.1399, 0.1677, 0.1782, 0.1677, 0.1399, 0.1034]
 
-    # sample only to get dimension
-    sample = nib.load(in_surfaces[0])
-    data_normalized = np.zeros(sample.header.get_data_shape())
-
     if len(in_surfaces) != 7:
         raise Exception('There should be 7 surfaces at this point of the pipeline, but found '
                         + str(len(in_surfaces))
                         + ', something went wrong...')
 
-    for i in range(len(in_surfaces)):
-        current_surf = nib.load(in_surfaces[i])
-        data_normalized += current_surf.get_data() * coefficient[i]
+    # The 7 projections are stacked in memory and averaged in a single product
+    surfaces = [nib.load(surface) for surface in in_surfaces]
+    sample = surfaces[0]
+    data = np.stack([np.asanyarray(surface.dataobj) for surface in surfaces])
+    data_normalized = np.tensordot(coefficient, data, axes=1)
 
     # hemisphere name will always be in our case the first 2 letters of the filename
     hemi = os.path.basename(in_surfaces[0])[0:2]
@@ -600,19 +557,22 @@ def fsaverage_projection(projection, subject_id, caps_dir, session_id, fwhm, is_
 
     os.environ["SUBJECTS_DIR"] = root_env
 
-    # copy fsaverage folder next to : subject_id + '_' + session_id
-    # for the mris_preproc command to properly find src and target
-    fsaverage_has_been_copied = False
+    # link fsaverage folder next to : subject_id + '_' + session_id
+    # for the mris_preproc command to properly find src and target. The projections of all the FWHM
+    # run at the same time: the link is removed by clean_freesurfer_directory once all of them are done
     if not os.path.exists(os.path.join(os.path.expandvars('$SUBJECTS_DIR'), 'fsaverage')):
-        shutil.copytree(os.path.join(subjects_dir_backup, 'fsaverage'),
-                        os.path.join(os.path.expandvars('$SUBJECTS_DIR'), 'fsaverage'))
-        fsaverage_has_been_copied = True
+        try:
+            os.symlink(os.path.abspath(os.path.join(subjects_dir_backup, 'fsaverage')),
+                       os.path.join(os.path.expandvars('$SUBJECTS_DIR'), 'fsaverage'))
+        except FileExistsError:
+            pass
 
-    # also copy the mgh file in the surf folder (needed by MRISPreproc
+    # also copy the mgh file in the surf folder (needed by MRISPreproc), under a name specific to this FWHM
     projection_in_surf_folder = os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
                                              freesurfer_id,
                                              'surf',
-                                             os.path.basename(projection))
+                                             os.path.basename(projection)[:3] + 'fwhm-' + str(fwhm) + '_'
+                                             + os.path.basename(projection)[3:])
 
     if not os.path.exists(projection_in_surf_folder):
         shutil.copy(projection, projection_in_surf_folder)
@@ -626,17 +586,13 @@ def fsaverage_projection(projection, subject_id, caps_dir, session_id, fwhm, is_
     fsproj.inputs.subjects = [freesurfer_id]
     fsproj.inputs.fwhm = fwhm
     fsproj.inputs.hemi = hemi
-    fsproj.inputs.surf_measure = os.path.basename(projection)[3:]
+    fsproj.inputs.surf_measure = os.path.basename(projection_in_surf_folder)[3:]
     fsproj.inputs.out_file = out_fsaverage
     fsproj.run()
 
     # remove projection file from surf folder
     os.remove(projection_in_surf_folder)
 
-    # remove fsaverage if it has been copied
-    if fsaverage_has_been_copied:
-        shutil.rmtree(os.path.join(os.path.expandvars('$SUBJECTS_DIR'), 'fsaverage'))
-
     # put back original subjects_dir env
     os.environ["SUBJECTS_DIR"] = subjects_dir_backup
     return out_fsaverage
@@ -683,40 +639,28 @@ def produce_tsv(pet, atlas_files):
     from clinica.utils.stream import cprint
 
     # Extract data from projected PET data
-    lh_pet_mgh = np.squeeze(nib.load(pet[0]).get_data())
-    rh_pet_mgh = np.squeeze(nib.load(pet[1]).get_data())
+    pet_mgh = {'lh': np.squeeze(np.asanyarray(nib.load(pet[0]).dataobj)),
+               'rh': np.squeeze(np.asanyarray(nib.load(pet[1]).dataobj))}
 
     filename_tsv = []
     for atlas in atlas_files:
 
-        annot_atlas_left = nib.freesurfer.io.read_annot(atlas_files[atlas]['lh'], orig_ids=False)
-        annot_atlas_left[0][annot_atlas_left[0] == -1] = 0
-        annot_atlas_right = nib.freesurfer.io.read_annot(atlas_files[atlas]['rh'], orig_ids=False)
-        annot_atlas_right[0][annot_atlas_right[0] == -1] = 0
-
-        average_region = []
-        region_names = []
-        for r in range(len(annot_atlas_left[2])):
-            cprint(annot_atlas_left[2][r])
-            region_names.append(annot_atlas_left[2][r].astype(str) + '_lh')
-            region_names.append(annot_atlas_left[2][r].astype(str) + '_rh')
-
-            mask_left = annot_atlas_left[0] == r
-            mask_left = np.uint(mask_left)
-
-            masked_data_left = mask_left * lh_pet_mgh
-            if np.sum(mask_left) == 0:
-                average_region.append(np.nan)
-            else:
-                average_region.append(np.sum(masked_data_left) / np.sum(mask_left))
-
-            mask_right = annot_atlas_right[0] == r
-            mask_right = np.uint(mask_right)
-            masked_data_right = mask_right * rh_pet_mgh
-            if np.sum(mask_right) == 0:
-                average_region.append(np.nan)
-            else:
-                average_region.append(np.sum(masked_data_right) / np.sum(mask_right))
+        # The regions are the ones of the left hemisphere, the mean of each region is computed with a single bincount
+        region_names_left = nib.freesurfer.io.read_annot(atlas_files[atlas]['lh'], orig_ids=False)[2]
+        n_regions = len(region_names_left)
+        average_hemi = {}
+        for hemi in ['lh', 'rh']:
+            annot_atlas = nib.freesurfer.io.read_annot(atlas_files[atlas][hemi], orig_ids=False)[0]
+            annot_atlas[annot_atlas == -1] = 0
+            n_labels = max(n_regions, annot_atlas.max() + 1)
+            region_sum = np.bincount(annot_atlas, weights=pet_mgh[hemi], minlength=n_labels)[:n_regions]
+            region_size = np.bincount(annot_atlas, minlength=n_labels)[:n_regions]
+            average_hemi[hemi] = np.full(n_regions, np.nan)
+            np.divide(region_sum, region_size, out=average_hemi[hemi], where=region_size > 0)
+
+        region_names = [name.astype(str) + '_' + hemi for name in region_names_left for hemi in ['lh', 'rh']]
+        average_region = np.column_stack((average_hemi['lh'], average_hemi['rh'])).ravel()
+        cprint('Mean PET value computed in the ' + str(n_regions) + ' regions of ' + atlas + ' atlas')
 
         final_tsv = pds.DataFrame({'index': range(len(region_names)),
                                    'label_name': region_names,
@@ -729,70 +673,23 @@ def produce_tsv(pet, atlas_files):
     return os.path.abspath(filename_tsv[0]), os.path.abspath(filename_tsv[1])
 
 
-def get_wf(subject_id,
-           session_id,
-           pvc_psf_tsv,
-           caps_dir,
-           pet,
-           orig_nu,
-           white_surface_left,
-           white_surface_right,
-           working_directory_subjects,
-           acq_label,
-           csv_segmentation,
-           suvr_reference_region,
-           matscript_folder_inverse_deformation,
-           destrieux_left,
-           destrieux_right,
-           desikan_left,
-           desikan_right,
-           spm_standalone_is_available,
-           is_longitudinal):
-    """get_wf create a full workflow for only one subject, and then executes it
+def check_pet_volume(pet, subject_id, session_id):
+    """check_pet_volume checks that the PET image is a 3D volume before it is processed
 
     Args:
-        subject_id (string): The subject ID
-        session_id (string): The session ID
-        pvc_psf_tsv (string): Path the TSV file containing information on the point spread function (PSF)
-        caps_dir (string): Path to the CAPS directory
-        pet (string): Path to the PET image in the bids directory
-        orig_nu (string): Path to the orig_nu file (must be in the CAPS directory, in mri)
-        white_surface_left (string): Path to the left white surface in native space of subject
-        white_surface_right (string): Path to the right white surface in native space of subject
-        working_directory_subjects (string):
-        acq_label (string):
-        csv_segmentation (string): Path to the CSV for the segmentation (problems encountered while using __file__)
-        suvr_reference_region (string): Label of the SUVR reference region
-        matscript_folder_inverse_deformation (string): Path to the current folder containing the matlab script used to call the spm function for the inverse deformation
-        destrieux_left (string):
-        destrieux_right (string):
-        desikan_left (string):
-        desikan_right (string):
-        spm_standalone_is_available (string):
-        is_longitudinal (string):
+        (string) pet        : Path to the PET image in the BIDS directory
+        (string) subject_id : The subject_id (something like sub-ADNI002S4213)
+        (string) session_id : The session id ( something like : ses-M12)
 
     Returns:
-        Void
+        (string) Path to the PET image
     """
-    import os
     import datetime
     import nibabel as nib
     from colorama import Fore
-    import nipype.pipeline.engine as pe
-    import nipype.interfaces.utility as niu
-    import nipype.interfaces.io as nio
-    from nipype.interfaces.freesurfer import Tkregister2, ApplyVolTransform, MRIConvert
-    from nipype.interfaces.fsl import Merge
-    from nipype.interfaces.petpvc import PETPVC
-    from nipype.interfaces.spm import Coregister, Normalize12
-    import clinica.pipelines.pet_surface.pet_surface_utils as utils
-    from clinica.utils.filemanip import unzip_nii
-    from clinica.utils.pet import read_psf_information, get_suvr_mask
-    from clinica.utils.spm import get_tpm
     from clinica.utils.stream import cprint
     from clinica.utils.ux import print_begin_image
 
-    # Check that the PET file is a 3D volume
     img = nib.load(pet)
     if len(img.shape) == 4:
         now = datetime.datetime.now().strftime('%H:%M:%S')
@@ -802,353 +699,85 @@ def get_wf(subject_id,
         raise NotImplementedError(error_msg)
 
     print_begin_image(subject_id + '_' + session_id)
+    return pet
 
-    # Creation of workflow
-    # 1 Creation of node
-    unzip_pet = pe.Node(niu.Function(input_names=['in_file'],
-                                     output_names=['out_file'],
-                                     function=unzip_nii),
-                        name='unzip_pet')
-
-    unzip_orig_nu = unzip_pet.clone(name='unzip_orig_nu')
-
-    unzip_mask = unzip_pet.clone(name='unzip_mask')
-    unzip_mask.inputs.in_file = get_suvr_mask(suvr_reference_region)
 
-    coreg = pe.Node(Coregister(), name='coreg')
+def get_psf_fwhm(psf, axis):
+    """get_psf_fwhm gives the FWHM of the point spread function along one axis (connection function)
 
-    convert_mgh = pe.Node(MRIConvert(), name='convert_mgh')
-
-    removenan = pe.Node(niu.Function(input_names=['volname'],
-                                     output_names=['vol_wo_nan'],
-                                     function=utils.remove_nan),
-                        name='removenan')
-
-    gtmsegmentation = pe.Node(niu.Function(input_names=['caps_dir',
-                                                        'subject_id',
-                                                        'session_id',
-                                                        'is_longitudinal'],
-                                           output_names=['gtmseg_file'],
-                                           function=utils.perform_gtmseg),
-                              name='gtmseg')
-    gtmsegmentation.inputs.caps_dir = caps_dir
-    gtmsegmentation.inputs.subject_id = subject_id
-    gtmsegmentation.inputs.session_id = session_id
-    gtmsegmentation.inputs.is_longitudinal = is_longitudinal
-
-    tkregister = pe.Node(Tkregister2(reg_header=True), name='tkreg')
-
-    convert_gtmseg = convert_mgh.clone(name='convert_gtmseg')
+    Args:
+        (list of float) psf : FWHM of the PSF along x, y and z, see clinica.utils.pet.read_psf_information
+        (int) axis          : 0, 1 or 2
 
-    labelconversion = pe.Node(niu.Function(input_names=['gtmsegfile',
-                                                        'csv'],
-                                           output_names=['list_of_regions'],
-                                           function=utils.make_label_conversion),
-                              name='conversion_of_labels')
+    Returns:
+        (float) FWHM along the axis
+    """
+    return psf[axis]
 
-    labelconversion.inputs.csv = csv_segmentation
 
-    if not os.path.exists(labelconversion.inputs.csv):
-        raise Exception('CSV file : ' + labelconversion.inputs.csv + ' does not exist.')
+def get_surface_atlases(destrieux_left, destrieux_right, desikan_left, desikan_right):
+    """get_surface_atlases gathers the annotation files of a subject by atlas and hemisphere
 
-    merge_volume = pe.Node(Merge(output_type='NIFTI_GZ', dimension='t'),
-                           name='merge_volume')
+    Returns:
+        (dict) Path to the lh and rh annotation files of each atlas
+    """
+    return {'destrieux': {'lh': destrieux_left,
+                          'rh': destrieux_right},
+            'desikan': {'lh': desikan_left,
+                        'rh': desikan_right}}
 
-    vol2vol = pe.Node(ApplyVolTransform(reg_header=True, interp='trilin'),
-                      name='vol2vol')
 
-    vol2vol_mask = pe.Node(ApplyVolTransform(reg_header=True, interp='nearest'),
-                           name='vol2vol_mask')
+def get_output_dir(is_longitudinal, caps_dir, subject_id, session_id):
+    """get_output_dir gives the folder of the CAPS directory where the outputs of a subject are written
 
-    normalize12 = pe.Node(Normalize12(tpm=get_tpm(),
-                                      affine_regularization_type='mni',
-                                      jobtype='est',
-                                      bias_fwhm=60,
-                                      bias_regularization=0.0001,
-                                      warping_regularization=[0, 0.001, 0.5, 0.05, 0.2]),
-                          name='normalize_to_MNI')
+    Returns:
+        (string) Path to the pet/surface (or pet/long-*/surface_longitudinal) folder of the subject
+    """
+    import os
+    from clinica.utils.exceptions import ClinicaCAPSError
 
-    if spm_standalone_is_available:
-        fun_apply_inverse_deformation = utils.runApplyInverseDeformationField_SPM_standalone
-    else:
-        fun_apply_inverse_deformation = utils.runApplyInverseDeformationField
-    apply_inverse_deformation = pe.Node(niu.Function(input_names=['target',
-                                                                  'deformation_field',
-                                                                  'img',
-                                                                  'matscript_folder'],
-                                                     output_names=['freesurfer_space_eroded_mask'],
-                                                     function=fun_apply_inverse_deformation),
-                                        name='applyInverseDeformation')
-    apply_inverse_deformation.inputs.matscript_folder = matscript_folder_inverse_deformation
-
-    pons_normalization = pe.Node(niu.Function(input_names=['pet_path',
-                                                           'mask'],
-                                              output_names=['suvr'],
-                                              function=utils.suvr_normalization),
-                                 name='pons_normalization')
-    pons_normalization.inputs.pet_tracer = acq_label
-
-    # read_psf_information expects a list of subjects/sessions and returns a list of PSF
-    psf_info = read_psf_information(pvc_psf_tsv, [subject_id], [session_id], acq_label)[0]
-
-    pvc = pe.Node(PETPVC(pvc='IY'), name='petpvc')
-    pvc.inputs.fwhm_x = psf_info[0]
-    pvc.inputs.fwhm_y = psf_info[1]
-    pvc.inputs.fwhm_z = psf_info[2]
-
-    reformat_surface_name = pe.Node(niu.Function(input_names=['hemi',
-                                                              'left_surface',
-                                                              'right_surface'],
-                                                 output_names=['out'],
-                                                 function=utils.reformat_surfname),
-                                    name='reformat_surface_name')
-    reformat_surface_name.inputs.left_surface = white_surface_left
-    reformat_surface_name.inputs.right_surface = white_surface_right
-    reformat_surface_name.iterables = ('hemi', ['lh', 'rh'])
-
-    mris_exp = pe.Node(niu.Function(input_names=['in_surface'],
-                                    output_names=['out_surface'],
-                                    function=utils.mris_expand),
-                       name='mris_expand_white')
-
-    surf_conversion = pe.MapNode(niu.Function(input_names=['in_surface',
-                                                           'reg_file',
-                                                           'gtmsegfile',
-                                                           'subject_id',
-                                                           'session_id',
-                                                           'caps_dir',
-                                                           'is_longitudinal'],
-                                              output_names=['tval'],
-                                              function=utils.surf2surf),
-                                 name='surf_conversion',
-                                 iterfield=['in_surface'])
-    surf_conversion.inputs.subject_id = subject_id
-    surf_conversion.inputs.session_id = session_id
-    surf_conversion.inputs.caps_dir = caps_dir
-    surf_conversion.inputs.is_longitudinal = is_longitudinal
-
-    vol_on_surf = pe.MapNode(niu.Function(input_names=['volume',
-                                                       'surface',
-                                                       'subject_id',
-                                                       'session_id',
-                                                       'caps_dir',
-                                                       'gtmsegfile',
-                                                       'is_longitudinal'],
-                                          output_names=['output'],
-                                          function=utils.vol2surf),
-                             name='vol_on_surf',
-                             iterfield=['surface'])
-    vol_on_surf.inputs.subject_id = subject_id
-    vol_on_surf.inputs.session_id = session_id
-    vol_on_surf.inputs.caps_dir = caps_dir
-    vol_on_surf.inputs.is_longitudinal = is_longitudinal
-
-    normal_average = pe.Node(niu.Function(input_names=['in_surfaces'],
-                                          output_names=['out_surface'],
-                                          function=utils.weighted_mean),
-                             name='normal_average')
-
-    project_on_fsaverage = pe.Node(niu.Function(input_names=['projection',
-                                                             'subject_id',
-                                                             'caps_dir',
-                                                             'session_id',
-                                                             'fwhm',
-                                                             'is_longitudinal'],
-                                                output_names=['out_fsaverage'],
-                                                function=utils.fsaverage_projection),
-                                   name='project_on_fsaverage')
-    project_on_fsaverage.iterables = ('fwhm', [0, 5, 10, 15, 20, 25])
-    project_on_fsaverage.inputs.subject_id = subject_id
-    project_on_fsaverage.inputs.session_id = session_id
-    project_on_fsaverage.inputs.caps_dir = caps_dir
-    project_on_fsaverage.inputs.is_longitudinal = is_longitudinal
-
-    extract_mid_surface = pe.Node(niu.Function(input_names=['in_surfaces'],
-                                               output_names=['mid_surface'],
-                                               function=utils.get_mid_surface),
-                                  name='extract_mid_surface')
-
-
-    surface_atlas = {'destrieux': {'lh': destrieux_left,
-                                   'rh': destrieux_right},
-                     'desikan': {'lh': desikan_left,
-                                 'rh': desikan_right}}
-
-    gather_pet_projection = pe.JoinNode(niu.IdentityInterface(fields=['pet_projection_lh_rh']),
-                                        name='gather_pet_projection_hemisphere',
-                                        joinsource='reformat_surface_name',
-                                        joinfield=['pet_projection_lh_rh'])
-
-    atlas_tsv = pe.Node(
-            niu.Function(input_names=['pet', 'atlas_files'],
-                         output_names=['destrieux_tsv', 'desikan_tsv'],
-                         function=utils.produce_tsv),
-            name='atlas_tsv')
-    atlas_tsv.inputs.atlas_files = surface_atlas
-
-    # 2 creation of workflow : working dir, inputnode, outputnode and datasink
-    name_workflow = subject_id.replace('-', '_') + '_' + session_id.replace('-', '_')
     if is_longitudinal:
-        name_workflow += '_long'
-
-    wf = pe.Workflow(name=name_workflow)
-    wf.base_dir = working_directory_subjects
-
-    inputnode = pe.Node(niu.IdentityInterface(fields=['orig_nu',
-                                                      'pet',
-                                                      'psf',
-                                                      'white_surface_left',
-                                                      'white_surface_right']),
-                        name='inputnode',
-                        mandatory_inputs=True)
-
-    inputnode.inputs.orig_nu = orig_nu
-    inputnode.inputs.pet = pet
-    inputnode.inputs.psf = pvc_psf_tsv
-    inputnode.inputs.white_surface_right = white_surface_right
-    inputnode.inputs.white_surface_left = white_surface_left
-
-    outputnode = pe.Node(niu.IdentityInterface(fields=['mid_surf',
-                                                       'projection_native_subject',
-                                                       'projection_fsaverage_smoothed',
-                                                       'destrieux_tsv',
-                                                       'desikan_tsv']),
-                         name='outputnode',
-                         mandatory_inputs=True)
-
-    datasink = pe.Node(nio.DataSink(),
-                       name='sinker')
-
-    def get_output_dir(is_longitudinal, caps_dir, subject_id, session_id):
-        import os
-        from clinica.utils.exceptions import ClinicaCAPSError
-
-        if is_longitudinal:
-            root = os.path.join(caps_dir, 'subjects', subject_id, session_id, 't1')
-            long_folds = [f for f in os.listdir(root) if f.startswith('long-')]
-            if len(long_folds) > 1:
-                raise ClinicaCAPSError('[Error] Folder ' + root + ' contains ' + str(len(long_folds))
-                                       + ' folders labeled long-*. Only 1 can exist')
-            elif len(long_folds) == 0:
-                raise ClinicaCAPSError(
-                    '[Error] Folder ' + root + ' does not contains a folder labeled long-*. Have you run t1-freesurfer-longitudinal ?')
-            else:
-                output_dir = os.path.join(caps_dir, 'subjects', subject_id, session_id,
-                                          'pet', long_folds[0], 'surface_longitudinal')
+        root = os.path.join(caps_dir, 'subjects', subject_id, session_id, 't1')
+        long_folds = [f for f in os.listdir(root) if f.startswith('long-')]
+        if len(long_folds) > 1:
+            raise ClinicaCAPSError('[Error] Folder ' + root + ' contains ' + str(len(long_folds))
+                                   + ' folders labeled long-*. Only 1 can exist')
+        elif len(long_folds) == 0:
+            raise ClinicaCAPSError(
+                '[Error] Folder ' + root + ' does not contains a folder labeled long-*. Have you run t1-freesurfer-longitudinal ?')
         else:
             output_dir = os.path.join(caps_dir, 'subjects', subject_id, session_id,
-                                      'pet', 'surface')
-
-        return output_dir
-
-    datasink.inputs.base_directory = get_output_dir(is_longitudinal, caps_dir, subject_id, session_id)
-    datasink.inputs.parameterization = True
-    cross_sectional_regexp_substitutions = [
-        # Mid surface
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/midsurface\/.*_hemi_([a-z]+)(.*)$',
-         r'\1/\2_\3_hemi-\4_midcorticalsurface'),
-        # Projection in native space
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/projection_native\/.*_hemi_([a-z]+).*',
-         r'\1/\2_\3_task-rest_acq-' + acq_label + r'_pet_space-native_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\4_projection.mgh'),
-        # Projection in fsaverage
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/projection_fsaverage\/.*_hemi_([a-z]+).*_fwhm_([0-9]+).*',
-         r'\1/\2_\3_task-rest_acq-' + acq_label + r'_pet_space-fsaverage_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\4_fwhm-\5_projection.mgh'),
-        # TSV file for Destrieux atlas
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/destrieux_tsv\/destrieux.tsv',
-         r'\1/atlas_statistics/\2_\3_task-rest_acq-' + acq_label + '_pet_space-destrieux_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv'),
-        # TSV file for Desikan atlas
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/surface)\/desikan_tsv\/desikan.tsv',
-         r'\1/atlas_statistics/\2_\3_task-rest_acq-' + acq_label + '_pet_space-desikan_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv')
-    ]
-    longitudinal_regexp_substitutions = [
-        # Mid surface
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/midsurface\/.*_hemi_([a-z]+)(.*)$',
-         r'\1/\2_\3_\4_hemi-\5_midcorticalsurface'),
-        # Projection in native space
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/projection_native\/.*_hemi_([a-z]+).*',
-         r'\1/\2_\3_\4_task-rest_acq-' + acq_label + r'_pet_space-native_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\5_projection.mgh'),
-        # Projection in fsaverage
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/projection_fsaverage\/.*_hemi_([a-z]+).*_fwhm_([0-9]+).*',
-         r'\1/\2_\3_\4_task-rest_acq-' + acq_label + r'_pet_space-fsaverage_suvr-' + suvr_reference_region + r'_pvc-iy_hemi-\5_fwhm-\6_projection.mgh'),
-        # TSV file for Destrieux atlas
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/destrieux_tsv\/destrieux.tsv',
-         r'\1/atlas_statistics/\2_\3_\4_task-rest_acq-' + acq_label + '_pet_space-destrieux_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv'),
-        # TSV file for Desikan atlas
-        (r'(.*(sub-.*)\/(ses-.*)\/pet\/(long-.*)\/surface_longitudinal)\/desikan_tsv\/desikan.tsv',
-         r'\1/atlas_statistics/\2_\3_\4_task-rest_acq-' + acq_label + '_pet_space-desikan_pvc-iy_suvr-' + suvr_reference_region + '_statistics.tsv')
-    ]
-    if is_longitudinal:
-        datasink.inputs.regexp_substitutions = longitudinal_regexp_substitutions
+                                      'pet', long_folds[0], 'surface_longitudinal')
     else:
-        datasink.inputs.regexp_substitutions = cross_sectional_regexp_substitutions
-
-    # 3 Connecting the nodes
+        output_dir = os.path.join(caps_dir, 'subjects', subject_id, session_id,
+                                  'pet', 'surface')
 
-    # TODO(@arnaud.marcoux): Add titles for sections of connections.
-    #   Could be useful to add sections title to group similar connections
-    #   together.
+    return output_dir
 
-    wf.connect([(inputnode, unzip_pet, [('pet', 'in_file')]),
-                (unzip_pet, coreg, [('out_file', 'source')]),
 
-                (inputnode, convert_mgh, [('orig_nu', 'in_file')]),
-                (convert_mgh, unzip_orig_nu, [('out_file', 'in_file')]),
+def clean_freesurfer_directory(pet_projections, fsaverage_projections, caps_dir, subject_id, session_id,
+                               is_longitudinal):
+    """clean_freesurfer_directory removes the files added to the FreeSurfer folder of a subject by vol2surf
+    (gtmseg.mgz) and fsaverage_projection (link to fsaverage), once all the projections of the subject are done
 
-                (unzip_orig_nu, coreg, [('out_file', 'target')]),
-                (coreg, removenan, [('coregistered_source', 'volname')]),
-                (removenan, vol2vol, [('vol_wo_nan', 'source_file')]),
-
-                (inputnode, tkregister, [('orig_nu', 'target_image')]),
-
-                (unzip_orig_nu, normalize12, [('out_file', 'image_to_align')]),
-                (unzip_mask, apply_inverse_deformation, [('out_file', 'img')]),
-                (normalize12, apply_inverse_deformation, [('deformation_field', 'deformation_field')]),
-                (unzip_orig_nu, apply_inverse_deformation, [('out_file', 'target')]),
-                (apply_inverse_deformation, vol2vol_mask, [('freesurfer_space_eroded_mask', 'source_file')]),
-
-                (gtmsegmentation, vol2vol_mask, [('gtmseg_file', 'target_file')]),
-                (gtmsegmentation, tkregister, [('gtmseg_file', 'moving_image')]),
-                (gtmsegmentation, convert_gtmseg, [('gtmseg_file', 'in_file')]),
-                (gtmsegmentation, vol2vol, [('gtmseg_file', 'target_file')]),
-
-                (vol2vol, pons_normalization, [('transformed_file', 'pet_path')]),
-                (vol2vol_mask, pons_normalization, [('transformed_file', 'mask')]),
-
-                (convert_gtmseg, labelconversion, [('out_file', 'gtmsegfile')]),
-                (labelconversion, merge_volume, [('list_of_regions', 'in_files')]),
-
-                (merge_volume, pvc, [('merged_file', 'mask_file')]),
-                (pons_normalization, pvc, [('suvr', 'in_file')]),
-
-                (reformat_surface_name, mris_exp, [('out', 'in_surface')]),
-                (mris_exp, extract_mid_surface, [('out_surface', 'in_surfaces')]),
-
-                (mris_exp, surf_conversion, [('out_surface', 'in_surface')]),
-                (tkregister, surf_conversion, [('reg_file', 'reg_file')]),
-                (gtmsegmentation, surf_conversion, [('gtmseg_file', 'gtmsegfile')]),
-
-                (pvc, vol_on_surf, [('out_file', 'volume')]),
-                (surf_conversion, vol_on_surf, [('tval', 'surface')]),
-                (gtmsegmentation, vol_on_surf, [('gtmseg_file', 'gtmsegfile')]),
-
-                (vol_on_surf, normal_average, [('output', 'in_surfaces')]),
+    Args:
+        (list) pet_projections       : Projections in native space of both hemispheres (only used to wait for them)
+        (list) fsaverage_projections : Projections on fsaverage of both hemispheres (only used to wait for them)
+        (string) caps_dir            : Path to the CAPS directory
+        (string) subject_id          : The subject_id (something like sub-ADNI002S4213)
+        (string) session_id          : The session id ( something like : ses-M12)
+        (bool) is_longitudinal       : longitudinal pipeline or not
+    """
+    import os
+    import clinica.pipelines.pet_surface.pet_surface_utils as utils
 
-                (normal_average, project_on_fsaverage, [('out_surface', 'projection')]),
+    root_env, freesurfer_id = utils.get_new_subjects_dir(is_longitudinal, caps_dir, subject_id, session_id)
 
-                (normal_average, gather_pet_projection, [('out_surface', 'pet_projection_lh_rh')]),
-                (gather_pet_projection, atlas_tsv, [('pet_projection_lh_rh', 'pet')]),
-                (atlas_tsv, outputnode, [('destrieux_tsv', 'destrieux_tsv')]),
-                (atlas_tsv, outputnode, [('desikan_tsv', 'desikan_tsv')]),
-                (project_on_fsaverage, outputnode, [('out_fsaverage', 'projection_fsaverage_smoothed')]),
-                (extract_mid_surface, outputnode, [('mid_surface', 'mid_surf')]),
-                (normal_average, outputnode, [('out_surface', 'projection_native_subject')]),
+    gtmseg_in_mri_folder = os.path.join(root_env, freesurfer_id, 'mri', 'gtmseg.mgz')
+    if os.path.exists(gtmseg_in_mri_folder):
+        os.remove(gtmseg_in_mri_folder)
 
-                (outputnode, datasink, [('projection_fsaverage_smoothed', 'projection_fsaverage')]),
-                (outputnode, datasink, [('mid_surf', 'midsurface')]),
-                (outputnode, datasink, [('projection_native_subject', 'projection_native')]),
-                (outputnode, datasink, [('destrieux_tsv', 'destrieux_tsv')]),
-                (outputnode, datasink, [('desikan_tsv', 'desikan_tsv')])
-                ])
-    # wf.write_graph(graph2use='flat')
-    wf.run()
-    pass
+    # a fsaverage folder which is not a link was already there before the pipeline
+    fsaverage_link = os.path.join(root_env, 'fsaverage')
+    if os.path.islink(fsaverage_link):
+        os.remove(fsaverage_link)
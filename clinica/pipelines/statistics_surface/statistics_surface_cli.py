@@ -94,6 +94,22 @@ class StatisticsSurfaceCLI(ce.CmdParser):
                               type=float, default=0.001,
                               help='Threshold to define a cluster in the process of cluster-wise correction '
                                    '(default: --cluster_threshold %(default)s).')
+        advanced.add_argument("-glm", "--glm_backend",
+                              type=str, default='matlab', choices=['matlab', 'numpy'],
+                              help='Implementation of SurfStat fitting the GLM: the Matlab toolbox or its '
+                                   'Python port, which does not need Matlab (default: --glm_backend %(default)s).')
+        advanced.add_argument("-nperm", "--n_permutations",
+                              type=int, default=0,
+                              help='Number of permutations of the non-parametric test giving peak-level and '
+                                   'cluster-level FWE-corrected p-values, with --glm_backend numpy (disabled if 0) '
+                                   '(default: --n_permutations %(default)s).')
+        advanced.add_argument("-ps", "--permutation_seed",
+                              type=int, default=0,
+                              help='Seed of the random permutations (default: --permutation_seed %(default)s).')
+        advanced.add_argument("-pp", "--permutation_procs",
+                              type=int, default=1,
+                              help='Number of processes sharing the permutations. They are started in addition to '
+                                   'the processes of --n_procs (default: --permutation_procs %(default)s).')
 
     def run_command(self, args):
         """Run the pipeline with defined args."""
@@ -147,6 +163,10 @@ class StatisticsSurfaceCLI(ce.CmdParser):
             'measure_label': args.measure_label,
             # Advanced arguments (i.e. tricky parameters)
             'cluster_threshold': args.cluster_threshold,
+            'glm_backend': args.glm_backend,
+            'n_permutations': args.n_permutations,
+            'permutation_seed': args.permutation_seed,
+            'permutation_procs': args.permutation_procs,
         }
         pipeline = StatisticsSurface(
             caps_directory=self.absolute_path(args.caps_directory),
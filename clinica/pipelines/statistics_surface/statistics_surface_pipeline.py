@@ -60,6 +60,27 @@ class StatisticsSurface(cpe.Pipeline):
                 f"Cluster threshold should be between 0 and 1 "
                 f"(given value: {self.parameters['cluster_threshold']})."
             )
+        self.parameters.setdefault('glm_backend', 'matlab')
+        if self.parameters['glm_backend'] not in ['matlab', 'numpy']:
+            raise ClinicaException(
+                f"The glm_backend you specified is wrong: it should be matlab or "
+                f"numpy (given value: {self.parameters['glm_backend']})."
+            )
+        self.parameters.setdefault('n_permutations', 0)
+        self.parameters.setdefault('permutation_seed', 0)
+        self.parameters.setdefault('permutation_procs', 1)
+        if self.parameters['n_permutations'] < 0:
+            raise ClinicaException(
+                f"The number of permutations should be positive "
+                f"(given value: {self.parameters['n_permutations']})."
+            )
+        if self.parameters['permutation_procs'] < 1:
+            raise ClinicaException(
+                f"The number of permutation processes should be at least 1 "
+                f"(given value: {self.parameters['permutation_procs']})."
+            )
+        if self.parameters['n_permutations'] and self.parameters['glm_backend'] != 'numpy':
+            raise ClinicaException("Permutations are only available with the numpy GLM backend (--glm_backend numpy).")
 
     def check_custom_dependencies(self):
         """Check dependencies that can not be listed in the `info.json` file."""
@@ -152,7 +173,10 @@ class StatisticsSurface(cpe.Pipeline):
 
         # Give pipeline info
         # ==================
-        cprint('The pipeline will last a few minutes. Images generated by Matlab will popup during the pipeline.')
+        if self.parameters['glm_backend'] == 'matlab':
+            cprint('The pipeline will last a few minutes. Images generated by Matlab will popup during the pipeline.')
+        else:
+            cprint('The pipeline will last a few minutes. Images are saved in the output directory of the pipeline.')
 
     def build_output_node(self):
         """Build and connect an output node to the pipeline."""
@@ -192,7 +216,7 @@ class StatisticsSurface(cpe.Pipeline):
         init_input.inputs.base_dir = os.path.join(self.base_dir, self.name)
         init_input.inputs.subjects_visits_tsv = self.tsv_file
 
-        # Node to wrap the SurfStat matlab script
+        # Node to wrap the SurfStat matlab script (or its Python implementation)
         surfstat = npe.Node(name='1-RunSurfStat',
                             interface=nutil.Function(
                                 input_names=['caps_dir',
@@ -201,7 +225,8 @@ class StatisticsSurface(cpe.Pipeline):
                                              'pipeline_parameters',
                                              ],
                                 output_names=['output_dir'],
-                                function=utils.run_matlab))
+                                function=utils.run_numpy if self.parameters['glm_backend'] == 'numpy'
+                                else utils.run_matlab))
         surfstat.inputs.caps_dir = self.caps_directory
         surfstat.inputs.subjects_visits_tsv = self.tsv_file
         surfstat.inputs.pipeline_parameters = self.parameters
@@ -106,11 +106,12 @@ def get_string_format_from_tsv(tsv_file):
     def dtype_to_str_format(dtype):
         """Convert pandas dtypes (e.g. int64) to string format (e.g. %d)"""
         import numpy as np
+        from pandas.api.types import is_string_dtype
         if dtype == np.int64:
             str_format = "%d"
         elif dtype == np.float64:
             str_format = "%f"
-        elif dtype == np.object:
+        elif is_string_dtype(dtype):
             str_format = "%s"
         else:
             raise ValueError("Unknown dtype (given: %s)" % dtype)
@@ -220,6 +221,224 @@ def run_matlab(caps_dir,
     return output_dir
 
 
+def run_numpy(caps_dir,
+              output_dir,
+              subjects_visits_tsv,
+              pipeline_parameters):
+    """
+    Fit the GLM of clinicasurfstat.m with the Python implementation of SurfStat (no Matlab needed).
+
+    The surface-based features of all the subjects are read into a (n_subjects x n_vertices) memory-mapped array
+    and the GLM is fitted by blocks of vertices. The .mat files and figures have the same names as the ones of
+    clinicasurfstat.m. If pipeline_parameters['n_permutations'] > 0, the T statistics are also corrected with
+    permutations (see clinica.utils.permutation.PermutationEngine).
+
+    Args:
+        caps_dir (str): CAPS directory containing surface-based features
+        output_dir (str): Output directory that will contain the .mat files and figures
+        subjects_visits_tsv (str): TSV file containing the GLM information
+        pipeline_parameters (dict): parameters of StatisticsSurface pipeline
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np
+    import nibabel as nib
+    import pandas as pd
+    from scipy import stats
+    from scipy.io import savemat
+    import clinica.pipelines.statistics_surface.surfstat as surfstat
+    from clinica.pipelines.statistics_surface.statistics_surface_utils import covariates_to_design_matrix
+    from clinica.utils.check_dependency import check_environment_variable
+    from clinica.utils.exceptions import ClinicaException
+    from clinica.utils.permutation import PermutationEngine, restrict_edges, write_null_distributions
+    from clinica.utils.stream import cprint
+
+    threshold_uncorrected_p_value = 0.001
+    threshold_corrected_p_value = 0.05
+    cluster_threshold = pipeline_parameters['cluster_threshold']
+    contrast = pipeline_parameters['contrast']
+    fwhm = pipeline_parameters['full_width_at_half_maximum']
+    suffix = '_measure-' + pipeline_parameters['measure_label'] + '_fwhm-' + str(fwhm)
+
+    freesurfer_home = check_environment_variable('FREESURFER_HOME', 'FreeSurfer')
+    surf = surfstat.read_surface([os.path.join(freesurfer_home, 'subjects', 'fsaverage', 'surf', hemi + '.pial')
+                                  for hemi in ['lh', 'rh']])
+    edg, _ = surfstat.mesh_edges(surf['tri'])
+    n_vertices = sum(surf['n_vertices'])
+
+    tsv_data = pd.read_csv(subjects_visits_tsv, sep='\t')
+    if list(tsv_data.columns[:2]) != ['participant_id', 'session_id']:
+        raise ClinicaException('The first columns of the TSV file should be participant_id and session_id.')
+
+    # Surface-based features of all the subjects
+    data_file = os.path.abspath('surface_data.npy')
+    data = None
+    try:
+        data = np.lib.format.open_memmap(data_file, mode='w+', dtype=np.float32, shape=(len(tsv_data), n_vertices))
+
+        def read_subject(index):
+            surface_file = pipeline_parameters['custom_file'].replace(
+                '@subject', tsv_data['participant_id'][index]).replace(
+                '@session', tsv_data['session_id'][index]).replace(
+                '@fwhm', str(fwhm))
+            features = np.concatenate([
+                np.asanyarray(nib.load(os.path.join(caps_dir, 'subjects', surface_file.replace('@hemi', hemi))).dataobj).ravel()
+                for hemi in ['lh', 'rh']
+            ])
+            if features.size != n_vertices:
+                raise ClinicaException('Surface-based features of %s do not have the %d vertices of fsaverage.'
+                                       % (surface_file, n_vertices))
+            data[index] = features
+
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(read_subject, range(len(tsv_data))))
+        mask = data[0] > 0
+
+        def save_figure(values, title, filename, threshold=None):
+            surfstat.surface_view(surf, values, title, os.path.join(output_dir, filename + '.jpg'), threshold=threshold)
+
+        def save_p_values(p_values, thresh, title, filename):
+            # -log10 of the P-values under the threshold
+            log_p_values = -np.log10(np.maximum(p_values, np.finfo(float).tiny)) * (p_values < thresh) * mask
+            save_figure(log_p_values, title + ' (-log10 P-value)', filename, threshold=-np.log10(thresh))
+
+        def save_corrected_results(slm, title, prefix):
+            pval, _, clus, _ = surfstat.corrected_p_values(slm, mask, surf, cluster_threshold)
+            pval['thresh'] = threshold_corrected_p_value
+            save_p_values(np.minimum(pval['P'], pval.get('C', 1.)), threshold_corrected_p_value,
+                          title + ' (clusterthreshold = ' + str(cluster_threshold) + ')', prefix + '_correctedPValue')
+            savemat(os.path.join(output_dir, prefix + '_correctedPValue.mat'), {'correctedpvaluesstruct': pval})
+            cprint('After correction (Clusterwise Correction for Multiple Comparisons):')
+            if clus is not None:
+                cprint('#Clusters found: %d' % len(clus['P']))
+                cprint('#Significative clusters (after correction): %d' % np.sum(clus['P'] <= threshold_corrected_p_value))
+            else:
+                cprint('No cluster found!')
+
+            qval = surfstat.false_discovery_rate(slm, mask)
+            save_p_values(qval['Q'], threshold_corrected_p_value, 'False discovery rate ' + title, prefix + '_FDR')
+            savemat(os.path.join(output_dir, prefix + '_FDR.mat'), {'qvaluesstruct': qval})
+
+        def save_permutation_results(slm, title, prefix):
+            # Non-parametric peak-level (P) and cluster-level (C) FWE-corrected P-values
+            n_permutations = pipeline_parameters.get('n_permutations', 0)
+            if not n_permutations:
+                return
+            engine = PermutationEngine(slm['X'], slm['c'], n_permutations=n_permutations,
+                                       seed=pipeline_parameters.get('permutation_seed', 0),
+                                       cluster_threshold=stats.t.isf(cluster_threshold, slm['df']),
+                                       edges=restrict_edges(edg, mask),
+                                       n_procs=pipeline_parameters.get('permutation_procs', 1))
+            results = engine.run(data[:, mask])
+            pval = {'P': np.ones(n_vertices), 'C': np.ones(n_vertices), 'mask': mask,
+                    'thresh': threshold_corrected_p_value}
+            pval['P'][mask] = results['peak_p_values']
+            pval['C'][mask] = results['cluster_p_values']
+            save_p_values(np.minimum(pval['P'], pval['C']), threshold_corrected_p_value,
+                          title + ' (' + str(n_permutations) + ' permutations)', prefix + '_permutationPValue')
+            savemat(os.path.join(output_dir, prefix + '_permutationPValue.mat'), {'permutationpvaluesstruct': pval})
+            write_null_distributions(results, os.path.join(output_dir, prefix + '_nullDistribution.tsv'))
+
+        def save_results(slm, title, prefix):
+            t_values = slm['t'] * mask
+            save_figure(t_values, 'T-statistic for ' + title, prefix + '_TStatistics')
+            savemat(os.path.join(output_dir, prefix + '_TStatistics.mat'), {'tvaluewithmask': t_values})
+
+            uncorrected = {'P': stats.t.sf(slm['t'], slm['df']), 'mask': mask, 'thresh': threshold_uncorrected_p_value}
+            save_p_values(uncorrected['P'], threshold_uncorrected_p_value,
+                          'Uncorrected P-values (' + str(threshold_uncorrected_p_value) + ') ' + title,
+                          prefix + '_uncorrectedPValue')
+            savemat(os.path.join(output_dir, prefix + '_uncorrectedPValue.mat'), {'uncorrectedpvaluesstruct': uncorrected})
+
+            save_corrected_results(slm, title, prefix)
+            save_permutation_results(slm, title, prefix)
+
+        design_matrix = covariates_to_design_matrix(contrast, pipeline_parameters['covariates'])
+        cprint('The GLM linear model is: ' + design_matrix)
+        slm = surfstat.linear_model(data, surfstat.design_matrix(tsv_data, design_matrix), edg,
+                                    os.path.abspath('residuals.npy'))
+
+        if pipeline_parameters['glm_type'] == 'group_comparison' and '*' not in contrast:
+            indicators, levels = surfstat.term_matrix(tsv_data, contrast)
+            if len(levels) != 2:
+                raise ClinicaException('For group comparison, there should be just 2 different groups!')
+            for i, j in [(0, 1), (1, 0)]:
+                title = levels[i] + '-' + levels[j]
+                prefix = 'group-' + pipeline_parameters['group_label'] + '_' + levels[j] + '-lt-' + levels[i] + suffix
+                save_results(surfstat.t_statistic(slm, indicators[:, i] - indicators[:, j]), title, prefix)
+
+        elif pipeline_parameters['glm_type'] == 'group_comparison':
+            # Interaction between a continuous and a categorical variable
+            cprint('The contrast here is the interaction between one continue variable and one categorical variable: '
+                   + contrast)
+            terms = [surfstat.term_matrix(tsv_data, variable) for variable in contrast.split('*')]
+            (continuous, continuous_names), (categorical, _) = sorted(terms, key=lambda term: term[0].shape[1])
+            prefix = 'interaction-' + contrast + suffix
+            slm_t = surfstat.t_statistic(slm, continuous[:, 0] * (categorical[:, 0] - categorical[:, 1]))
+            t_values = slm_t['t'] * mask
+            save_figure(t_values, 'T-statistic for interaction ' + contrast, prefix + '_TStatistics')
+            savemat(os.path.join(output_dir, prefix + '_TStatistics.mat'), {'tvaluewithmask': t_values})
+            save_permutation_results(slm_t, 'for interaction ' + contrast, prefix)
+            _plot_highest_t_value_vertex(data[:, np.argmax(slm_t['t'])], continuous[:, 0], continuous_names[0],
+                                         categorical, output_dir)
+
+            # F statistic comparing the models with and without interaction
+            contrast_variables = set(variable.strip() for variable in contrast.split('*'))
+            reduced_design_matrix = ' + '.join(
+                term for term in design_matrix.split(' + ')
+                if set(variable.strip() for variable in term.split('*')) != contrast_variables
+            )
+            slm_reduced = surfstat.linear_model(data, surfstat.design_matrix(tsv_data, reduced_design_matrix), edg,
+                                                os.path.abspath('residuals_reduced.npy'))
+            slm_f = surfstat.f_statistic(slm_reduced, slm)
+            f_values = slm_f['t'] * mask
+            save_figure(f_values, 'F-statistic for interaction ' + contrast, prefix + '_FStatistics')
+            savemat(os.path.join(output_dir, prefix + '_FStatistics.mat'), {'fvaluewithmask': f_values})
+            save_corrected_results(slm_f, 'for interaction ' + contrast, prefix)
+
+        elif pipeline_parameters['glm_type'] == 'correlation':
+            variable = contrast.lstrip('-')
+            contrast_sign = 'negative' if contrast.startswith('-') else 'positive'
+            covariate = tsv_data[variable].to_numpy(dtype=float)
+            prefix = 'group-' + pipeline_parameters['group_label'] + '_correlation-' + variable + \
+                     '_contrast-' + contrast_sign + suffix
+            save_results(surfstat.t_statistic(slm, -covariate if contrast_sign == 'negative' else covariate),
+                         variable, prefix)
+
+        else:
+            raise NotImplementedError("The other GLM situations have not been implemented in this pipeline.")
+    finally:
+        # Memory-mapped data and residuals of the GLM, also removed if the fit fails
+        data = None
+        for memmap_file in ['surface_data.npy', 'residuals.npy', 'residuals_reduced.npy']:
+            if os.path.exists(os.path.abspath(memmap_file)):
+                os.remove(os.path.abspath(memmap_file))
+
+    return output_dir
+
+
+def _plot_highest_t_value_vertex(y_seed, continuous, continuous_name, categorical, output_dir):
+    """Plot the features of the vertex with the highest T value versus the continuous variable of an
+    interaction, with the regression line of each group (SurfStatPlot)."""
+    import os
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    figure, axes = plt.subplots()
+    for group in range(categorical.shape[1]):
+        in_group = categorical[:, group] > 0
+        axes.scatter(continuous[in_group], y_seed[in_group], s=10)
+        slope, intercept = np.polyfit(continuous[in_group], y_seed[in_group], 1)
+        x = np.array([continuous[in_group].min(), continuous[in_group].max()])
+        axes.plot(x, intercept + slope * x)
+    axes.set_xlabel(continuous_name)
+    axes.set_ylabel('Yseed')
+    figure.savefig(os.path.join(output_dir, 'Highest T value vertex Yseed versus ' + continuous_name + '.jpg'))
+    plt.close(figure)
+
+
 def create_glm_info_dictionary(tsv_file, pipeline_parameters):
     """Create dictionary containing the GLM information that will be stored in a JSON file."""
     out_dict = {
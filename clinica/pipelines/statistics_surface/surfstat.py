@@ -0,0 +1,607 @@
+# coding: utf8
+
+"""Python implementation of the SurfStat functions used by clinicasurfstat.m.
+
+Only univariate fixed-effects models are handled: linear model, T and F statistics, corrected P-values of
+vertices and clusters on a triangular mesh (random field theory) and false discovery rate. The names of the
+fields of the structures (P, C, Q, mask, thresh...) are the ones of SurfStat.
+
+Reference: Worsley, K.J., Taylor, J.E., Carbonell, F., Chung, M.K., Duerden, E., Bernhardt, B., Lyttelton, O.,
+Boucher, M., Evans, A.C. (2009). SurfStat: A Matlab toolbox for the statistical analysis of univariate and
+multivariate surface and volumetric data using linear mixed effects models and random field theory.
+NeuroImage, 47:S102.
+"""
+
+
+def read_surface(surface_files):
+    """Read and concatenate FreeSurfer surfaces (SurfStatReadSurf), e.g. lh.pial and rh.pial of fsaverage.
+
+    Returns:
+        surf: dict with the coordinates of the vertices 'coord' (n_vertices x 3), the 0-based vertex indices
+            of the triangles 'tri' (n_triangles x 3) and the number of vertices of each surface 'n_vertices'.
+    """
+    import numpy as np
+    from nibabel.freesurfer import read_geometry
+
+    coords, triangles, n_vertices = [], [], []
+    for surface_file in surface_files:
+        coord, tri = read_geometry(surface_file)
+        triangles.append(tri.astype(np.int64) + sum(n_vertices))
+        coords.append(coord)
+        n_vertices.append(coord.shape[0])
+
+    return {'coord': np.concatenate(coords), 'tri': np.concatenate(triangles), 'n_vertices': n_vertices}
+
+
+def mesh_edges(tri):
+    """Edges of a triangular mesh (SurfStatEdg).
+
+    Args:
+        tri: (n_triangles x 3) array of vertex indices of the triangles.
+
+    Returns:
+        edg: (n_edges x 2) array of the vertex indices of the edges, first index lower than the second one.
+        tri_edg: (n_triangles x 3) array of the indices in edg of the edges [1 2], [1 3] and [2 3] of each
+            triangle, its vertices being sorted.
+    """
+    import numpy as np
+
+    tri = np.sort(tri, axis=1).astype(np.int64)
+    n = tri.max() + 1
+    codes = np.concatenate([tri[:, 0] * n + tri[:, 1], tri[:, 0] * n + tri[:, 2], tri[:, 1] * n + tri[:, 2]])
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    edg = np.stack([unique_codes // n, unique_codes % n], axis=1)
+
+    return edg, inverse.reshape(3, -1).T
+
+
+def term_matrix(tsv_data, term):
+    """Columns of a term of a model (SurfStat term): a numerical variable is one column, a categorical
+    variable one indicator column per level (sorted) and a product of variables (e.g. age*group) the products
+    of their columns. A leading minus sign (e.g. -age) is ignored.
+
+    Returns:
+        matrix: (n_observations x n_columns) array.
+        names: list of the names of the columns.
+    """
+    import numpy as np
+    from pandas.api.types import is_numeric_dtype
+
+    n = len(tsv_data)
+    matrix, names = np.ones((n, 1)), ['1']
+    for variable in term.split('*'):
+        variable = variable.strip().lstrip('-')
+        if variable == '1':
+            continue
+        column = tsv_data[variable]
+        if not is_numeric_dtype(column):
+            levels = sorted(column.unique())
+            columns = np.stack([(column == level).to_numpy(dtype=float) for level in levels], axis=1)
+        else:
+            levels = [variable]
+            columns = column.to_numpy(dtype=float)[:, np.newaxis]
+        matrix = (matrix[:, :, np.newaxis] * columns[:, np.newaxis, :]).reshape(n, -1)
+        names = [level if name == '1' else name + '*' + level for name in names for level in levels]
+
+    return matrix, names
+
+
+def design_matrix(tsv_data, model):
+    """Design matrix of a model such as "1 + group + age" (see covariates_to_design_matrix).
+
+    As in SurfStat, the null columns are removed and the columns equal up to a positive factor are kept once.
+    """
+    import numpy as np
+
+    columns = np.concatenate([term_matrix(tsv_data, term)[0] for term in model.split('+')], axis=1)
+    columns = columns[:, np.any(columns != 0, axis=0)]
+    normalized = columns / np.abs(columns).sum(axis=0)
+    _, index = np.unique(normalized.round(12), axis=1, return_index=True)
+
+    return columns[:, np.sort(index)]
+
+
+def linear_model(data, design, edg, residuals_file, block_size=None):
+    """Fit a univariate linear model at each vertex (SurfStatLinMod).
+
+    The vertices are fitted by blocks. The normalized residuals are stored in a memory-mapped file to
+    compute the sum over the observations of their squared differences along the edges of the mesh, used
+    by resels.
+
+    Args:
+        data: (n_observations x n_vertices) array, e.g. a numpy.memmap.
+        design: (n_observations x n_regressors) design matrix.
+        edg: (n_edges x 2) edges of the mesh (see mesh_edges).
+        residuals_file: path to the .npy file of the normalized residuals (n_vertices x n_observations).
+        block_size: number of vertices (and edges) in a block.
+
+    Returns:
+        slm: dict with the design matrix 'X', the degrees of freedom 'df', the coefficients 'coef'
+            (n_regressors x n_vertices), the sum of squared errors 'SSE' and the sum over observations of the
+            squares of differences of normalized residuals along each edge 'resl'.
+    """
+    import numpy as np
+
+    n, v = data.shape
+    if block_size is None:
+        block_size = max(1, 2 ** 24 // n)
+    pinv_x = np.linalg.pinv(design)
+    coef = np.empty((design.shape[1], v))
+    sse = np.empty(v)
+    residuals = np.lib.format.open_memmap(residuals_file, mode='w+', dtype=np.float32, shape=(v, n))
+    for start in range(0, v, block_size):
+        y = np.array(data[:, start:start + block_size], dtype=np.float64)
+        block_coef = pinv_x @ y
+        y -= design @ block_coef
+        block_sse = np.einsum('ij,ij->j', y, y)
+        norm = np.sqrt(block_sse)
+        coef[:, start:start + block_size] = block_coef
+        sse[start:start + block_size] = block_sse
+        residuals[start:start + block_size] = (y / np.where(norm > 0, norm, 1)).T
+
+    resl = np.empty(len(edg))
+    for start in range(0, len(edg), block_size):
+        block_edg = edg[start:start + block_size]
+        difference = residuals[block_edg[:, 0]].astype(np.float64) - residuals[block_edg[:, 1]]
+        resl[start:start + block_size] = np.einsum('ij,ij->i', difference, difference)
+    del residuals
+
+    return {'X': design, 'df': int(n - np.linalg.matrix_rank(design)), 'coef': coef, 'SSE': sse, 'resl': resl}
+
+
+def t_statistic(slm, contrast):
+    """T statistic of a contrast of a linear model (SurfStatT).
+
+    Args:
+        slm: linear model (see linear_model).
+        contrast: vector of the values of the contrast for each observation, e.g. the difference of the
+            indicators of 2 groups or a covariate.
+
+    Returns:
+        slm with the contrast of the coefficients 'c', the effect 'ef', its standard deviation 'sd' and the
+        T statistic 't'.
+    """
+    import numpy as np
+    from clinica.utils.exceptions import ClinicaException
+
+    contrast = np.asarray(contrast, dtype=float)
+    pinv_x = np.linalg.pinv(slm['X'])
+    c = pinv_x @ contrast
+    r = contrast - slm['X'] @ c
+    if np.sum(r ** 2) / np.sum(contrast ** 2) > np.finfo(float).eps:
+        raise ClinicaException('Contrast is not in the model.')
+
+    vc = np.sum((c @ pinv_x) ** 2)
+    ef = c @ slm['coef']
+    sd = np.sqrt(vc * slm['SSE'] / slm['df'])
+    t = np.where(sd > 0, ef / np.where(sd > 0, sd, 1), 0)
+
+    return dict(slm, c=c, ef=ef, sd=sd, t=t, k=1)
+
+
+def f_statistic(slm1, slm2):
+    """F statistic comparing 2 nested linear models (SurfStatF).
+
+    Returns:
+        The model with the lower degrees of freedom, with 'df' = [df1 - df2, df2] and the F statistic 't'.
+    """
+    import numpy as np
+    from clinica.utils.exceptions import ClinicaException
+
+    if slm1['df'] < slm2['df']:
+        slm1, slm2 = slm2, slm1
+    x1, x2 = slm1['X'], slm2['X']
+    r = x1 - x2 @ np.linalg.pinv(x2) @ x1
+    if np.sum(r ** 2) / np.sum(x1 ** 2) > np.finfo(float).eps:
+        raise ClinicaException('Models are not nested.')
+
+    df1, df2 = slm1['df'], slm2['df']
+    sse = slm2['SSE']
+    t = np.where(sse > 0, (slm1['SSE'] - sse) / np.where(sse > 0, sse, 1), 0) * (df2 / (df1 - df2))
+
+    return dict(slm2, df=[df1 - df2, df2], t=t, k=1)
+
+
+def resels(slm, mask, tri, edg, tri_edg):
+    """Resels of the search region of a surface (SurfStatResels).
+
+    Args:
+        slm: linear model (see linear_model).
+        mask: boolean vector of the vertices of the search region.
+        tri: triangles of the mesh.
+        edg, tri_edg: edges of the mesh and of its triangles (see mesh_edges).
+
+    Returns:
+        resels: vector of the resels of the search region (intrinsic volumes divided by
+            sqrt(4 log(2)) ** dimension).
+        reselspvert: resels per vertex.
+    """
+    import numpy as np
+    from scipy.linalg import toeplitz
+
+    resl = slm['resl']
+    lkc = np.zeros((3, 3))
+    lkc[0, 0] = mask.sum()
+    mask_edg = mask[edg].all(axis=1)
+    lkc[0, 1] = mask_edg.sum()
+    lkc[1, 1] = np.sqrt(resl[mask_edg]).sum()
+
+    mask_tri = mask[tri].all(axis=1)
+    lkc[0, 2] = mask_tri.sum()
+    l12, l13, l23 = resl[tri_edg[mask_tri]].T
+    r2 = np.sqrt(np.maximum(4 * l12 * l13 - (l12 + l13 - l23) ** 2, 0)) / 4
+    lkc[1, 2] = np.sum(np.sqrt(l12) + np.sqrt(l13) + np.sqrt(l23)) / 2
+    lkc[2, 2] = r2.sum()
+
+    reselspvert = np.zeros(len(mask))
+    for j in range(3):
+        reselspvert += np.bincount(tri[mask_tri, j], weights=r2, minlength=len(mask))
+    reselspvert /= 3 * 4 * np.log(2)
+
+    signs = (-1.) ** np.arange(3)
+    lkcs = np.sum(toeplitz(signs, signs) * lkc, axis=1)
+    lkcs = lkcs[:np.flatnonzero(lkcs)[-1] + 1]
+
+    return lkcs / np.sqrt(4 * np.log(2)) ** np.arange(len(lkcs)), reselspvert
+
+
+def peak_clusters(slm, mask, thresh, reselspvert, edg):
+    """Peaks and clusters of the excursion set of a statistic above a threshold (SurfStatPeakClus).
+
+    Returns:
+        peak: dict of the statistic 't', the vertex 'vertid' (0-based) and the cluster 'clusid' of the local
+            maxima of the excursion set, sorted by decreasing statistic.
+        clus: dict of the cluster id 'clusid', number of vertices 'nverts' and resels 'resels' of the
+            clusters, the cluster ids being sorted by decreasing resels and starting at 1.
+        clusid: cluster id of each vertex (0 outside the clusters).
+        None, None, None if the excursion set is empty.
+    """
+    import numpy as np
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    t = np.array(slm['t'], dtype=float)
+    t[~mask] = t.min()
+    t1, t2 = t[edg[:, 0]], t[edg[:, 1]]
+    is_local_maximum = np.ones(len(t), dtype=bool)
+    is_local_maximum[edg[t1 < t2, 0]] = False
+    is_local_maximum[edg[t2 < t1, 1]] = False
+
+    excursion_set = t >= thresh
+    vox = np.flatnonzero(excursion_set)
+    if len(vox) == 0:
+        return None, None, None
+
+    voxid = np.cumsum(excursion_set) - 1
+    excursion_edg = voxid[edg[excursion_set[edg].all(axis=1)]]
+    graph = coo_matrix((np.ones(len(excursion_edg)), (excursion_edg[:, 0], excursion_edg[:, 1])),
+                       shape=(len(vox), len(vox)))
+    nclus, labels = connected_components(graph, directed=False)
+    ucvol = np.bincount(labels, minlength=nclus)
+    ucrsl = np.bincount(labels, weights=reselspvert[vox], minlength=nclus)
+
+    # Clusters numbered by decreasing resels
+    rankrsl = np.empty(nclus, dtype=np.int64)
+    rankrsl[np.argsort(ucrsl, kind='stable')] = np.arange(nclus, 0, -1)
+    clusid = np.zeros(len(t), dtype=np.int64)
+    clusid[vox] = rankrsl[labels]
+
+    lmid = np.flatnonzero(is_local_maximum & excursion_set)
+    order = np.argsort(-t[lmid], kind='stable')
+    peak = {'t': t[lmid[order]], 'vertid': lmid[order], 'clusid': clusid[lmid[order]]}
+    order = np.argsort(rankrsl)
+    clus = {'clusid': rankrsl[order], 'nverts': ucvol[order], 'resels': ucrsl[order]}
+
+    return peak, clus, clusid
+
+
+def corrected_p_values(slm, mask, surf, clusthresh=0.001):
+    """Corrected P-values of vertices and clusters (SurfStatP).
+
+    Args:
+        slm: linear model with a T or F statistic 't' (see t_statistic and f_statistic).
+        mask: boolean vector of the vertices of the search region.
+        surf: surface (see read_surface).
+        clusthresh: P-value threshold (or statistic threshold if >= 1) defining the clusters.
+
+    Returns:
+        pval: dict of the corrected P-values of the vertices 'P', of their clusters 'C' (if the statistic is
+            above the threshold) and of the 'mask'.
+        peak, clus, clusid: see peak_clusters, with the corrected P-values of the peaks and clusters 'P'.
+    """
+    import numpy as np
+
+    t = slm['t']
+    df = slm['df']
+    v = len(t)
+    edg, tri_edg = mesh_edges(surf['tri'])
+    if clusthresh < 1:
+        statistic, p_values = _p_value_table(df, [1])
+        thresh = _minterp1(p_values, statistic, clusthresh)
+    else:
+        thresh = clusthresh
+    search_resels, reselspvert = resels(slm, mask, np.sort(surf['tri'], axis=1), edg, tri_edg)
+    statistic, p_values = _p_value_table(df, search_resels, v)
+
+    pval = {}
+    if np.max(t[mask]) < thresh:
+        peak, clus, clusid = None, None, None
+    else:
+        peak, clus, clusid = peak_clusters(slm, mask, thresh, reselspvert, edg)
+        peak['P'] = _interpolate_p_values(statistic, p_values, peak['t'], df)
+        clus['P'] = _cluster_p_values(clus['resels'], search_resels, df, thresh)
+        pval['C'] = np.concatenate([[1.], clus['P']])[clusid]
+    tlim = _minterp1(p_values, statistic, 1.)
+    p = _interpolate_p_values(statistic, p_values, t, df)
+    pval['P'] = np.where(t > tlim, p, 1.)
+    pval['mask'] = mask
+
+    return pval, peak, clus, clusid
+
+
+def false_discovery_rate(slm, mask):
+    """Q-values of the false discovery rate of the vertices (SurfStatQ).
+
+    Returns:
+        qval: dict of the Q-values 'Q' (1 outside the mask) and the 'mask'.
+    """
+    import numpy as np
+
+    statistic, p_values = _p_value_table(slm['df'], [1])
+    p = _interpolate_p_values(statistic, p_values, slm['t'][mask], slm['df'])
+    index = np.argsort(p, kind='stable')
+    p_sorted = p[index] / np.arange(1, len(p) + 1) * len(p)
+    q = np.empty(len(p))
+    q[index] = np.minimum(np.minimum.accumulate(p_sorted[::-1])[::-1], 1)
+    q_values = np.ones(len(mask))
+    q_values[mask] = q
+
+    return {'Q': q_values, 'mask': mask}
+
+
+def _degrees_of_freedom(df):
+    """Degrees of freedom of the statistic field as in stat_threshold: (is_tstat, df1, df2, dfw)."""
+    import numpy as np
+
+    df = np.atleast_1d(np.asarray(df, dtype=float))
+    if len(df) == 1:
+        is_tstat, df1, df2 = True, 1., df[0]
+    else:
+        is_tstat, df1, df2 = False, df[0], df[1]
+    # Degrees of freedom of the estimation of the smoothness
+    dfw = df[-1]
+    df2 = np.inf if df2 >= 1000 else df2
+    dfw = np.inf if dfw >= 1000 else dfw
+
+    return is_tstat, df1, df2, dfw
+
+
+def _gammalni(x):
+    import numpy as np
+    from scipy.special import gammaln
+
+    x = np.asarray(x, dtype=float)
+    return np.where(x >= 0, gammaln(np.abs(x)), np.inf)
+
+
+def _ec_densities(df, dimension):
+    """Euler characteristic densities of a T or F field (stat_threshold of one variate).
+
+    Returns:
+        statistic: decreasing vector of values of the statistic.
+        rho: (len(statistic) x dimension + 1) array of the EC densities, rho[:, 0] being the probability
+            that the statistic is above the value.
+    """
+    import numpy as np
+    from scipy.special import betaln, gammaln
+
+    is_tstat, df1, df2, _ = _degrees_of_freedom(df)
+    df0 = df1 + df2
+    t = (np.arange(1000, 0, -1) / 100.) ** 4
+    if np.isinf(df2):
+        u = df1 * t
+        b = np.exp(-u / 2 - np.log(2 * np.pi) / 2 + np.log(u) / 4) * df1 ** 0.25 * 4 / 100
+    else:
+        u = df1 * t / df2
+        b = np.exp(-df0 / 2 * np.log1p(u) + np.log(u) / 4 - betaln(0.5, (df0 - 1) / 2)) * (df1 / df2) ** 0.25 * 4 / 100
+    t = np.append(t, 0.)
+    b = np.append(b, 0.)
+    n = len(t)
+    sb = np.cumsum(b)
+    sb1 = np.cumsum(b * (-1.) ** np.arange(1, n + 1))
+    pt1 = sb + sb1 / 3 - b / 3
+    pt2 = sb - sb1 / 3 - b / 3
+
+    # Second dimension of the densities for the number of variates of the F statistic
+    nvar = int(round(df1))
+    dd = (dimension, nvar - 1)
+    tau = np.zeros((n, max(dd) + 1, max(dd) + 1))
+    tau[0::2, 0, 0] = pt1[0::2]
+    tau[1::2, 0, 0] = pt2[1::2]
+    tau[-1, 0, 0] = 1
+    tau[:, 0, 0] = np.minimum(tau[:, 0, 0], 1)
+    u = df1 * t
+    with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+        for d in range(1, max(dd) + 1):
+            for e in range(min(min(dd), d) + 1):
+                s1 = 0.
+                cons = -((d + e) / 2 + 1) * np.log(np.pi) + gammaln(d) + gammaln(e + 1)
+                for k in range(int(np.floor((d - 1 + e) / 2)) + 1):
+                    i, j = np.meshgrid(np.arange(k + 1), np.arange(k + 1), indexing='ij')
+                    if np.isinf(df2):
+                        q1 = np.log(np.pi) / 2 - ((d + e - 1) / 2 + i + j) * np.log(2)
+                    else:
+                        q1 = ((df0 - 1 - d - e) * np.log(2) + gammaln((df0 - d) / 2 + i) + gammaln((df0 - e) / 2 + j)
+                              - _gammalni(df0 - d - e + i + j + k) - ((d + e - 1) / 2 - k) * np.log(df2))
+                    q2 = (cons - _gammalni(i + 1) - _gammalni(j + 1) - _gammalni(k - i - j + 1)
+                          - _gammalni(d - k - i + j) - _gammalni(e - k - j + i + 1))
+                    s2 = np.sum(np.exp(q1 + q2))
+                    if s2 > 0:
+                        s1 = s1 + (-1) ** k * u ** ((d + e - 1) / 2 - k) * s2
+                if np.isinf(df2):
+                    s1 = s1 * np.exp(-u / 2)
+                else:
+                    s1 = s1 * np.exp(-(df0 - 2) / 2 * np.log1p(u / df2))
+                if dd[0] >= dd[1]:
+                    tau[:, d, e] = s1
+                    if d <= min(dd):
+                        tau[:, e, d] = s1
+                else:
+                    tau[:, e, d] = s1
+                    if d <= min(dd):
+                        tau[:, d, e] = s1
+
+    j = np.arange(nvar - 1, -1, -2)
+    a = np.zeros(nvar)
+    a[j] = np.exp(j * np.log(2) + j / 2 * np.log(np.pi) + gammaln((nvar + 1) / 2)
+                  - gammaln((nvar + 1 - j) / 2) - gammaln(j + 1))
+    rho = sum(a[k] * tau[:, :dimension + 1, k] for k in range(nvar))
+
+    if is_tstat:
+        t = np.concatenate([np.sqrt(t[:-1]), -np.sqrt(t)[::-1]])
+        lower = rho[::-1] / 2 * -(-1.) ** np.arange(dimension + 1)
+        lower[:, 0] += 1
+        rho = np.concatenate([rho[:-1] / 2, lower])
+
+    return t, rho
+
+
+def _p_value_table(df, search_resels, n_vertices=1):
+    """P-values of the maximum of a field over a search region, for a table of values of the statistic.
+
+    Returns:
+        statistic: decreasing vector of values of the statistic.
+        p_values: minimum of the random field theory and Bonferroni P-values (only the latter when the
+            search region has no resels, i.e. the P-value of a single vertex).
+    """
+    import numpy as np
+
+    search_resels = np.asarray(search_resels, dtype=float)
+    dimension = len(search_resels) - 1
+    statistic, rho = _ec_densities(df, dimension)
+    p_bonferroni = n_vertices * rho[:, 0]
+    if dimension == 0:
+        return statistic, p_bonferroni
+    invol = search_resels * (4 * np.log(2)) ** (np.arange(dimension + 1) / 2)
+
+    return statistic, np.minimum(rho @ invol, p_bonferroni)
+
+
+def _interpolate_p_values(statistic, p_values, values, df):
+    """P-values of values of the statistic: 0 above and 1 (T statistic) or 0 (F statistic) below the table."""
+    import numpy as np
+
+    is_tstat = _degrees_of_freedom(df)[0]
+    return np.interp(values, statistic[::-1], p_values[::-1], left=float(is_tstat), right=0.)
+
+
+def _minterp1(x, y, ix):
+    """Linear interpolation on the increasing subsequence of x (running maxima), NaN out of its range."""
+    import numpy as np
+
+    keep = x > np.maximum.accumulate(np.concatenate([[-np.inf], x[:-1]]))
+    return np.interp(ix, x[keep], y[keep], left=np.nan, right=np.nan)
+
+
+def _cluster_p_values(cluster_resels, search_resels, df, thresh):
+    """Corrected P-values of the extent (in resels) of clusters above a threshold (stat_threshold).
+
+    Cluster sizes outside the range of the numerical distribution of the extent get the P-value of its
+    closest bound instead of NaN.
+    """
+    import numpy as np
+    from scipy.special import gamma, gammaln
+
+    cluster_resels = np.asarray(cluster_resels, dtype=float)
+    search_resels = np.asarray(search_resels, dtype=float)
+    d = len(search_resels) - 1
+    if d == 0:
+        return np.full(len(cluster_resels), np.nan)
+    _, df1, df2, dfw = _degrees_of_freedom(df)
+    statistic, rho = _ec_densities(df, d)
+    rho_d = np.interp(thresh, statistic[::-1], rho[::-1, d])
+    p = np.interp(thresh, statistic[::-1], rho[::-1, 0])
+    invol = search_resels * (4 * np.log(2)) ** (np.arange(d + 1) / 2)
+    expected_clusters = invol[d] * rho_d
+
+    if np.isinf(df2) and np.isinf(dfw):
+        cons = gamma(d / 2 + 1) * (4 * np.log(2)) ** (d / 2) * rho_d / p
+        p_s = np.exp(-(cluster_resels * cons) ** (2 / d))
+        return 1 - np.exp(-p_s * expected_clusters)
+
+    # Distribution of the extent of a cluster: product of independent random variables whose densities
+    # of the logarithms are convolved with the FFT
+    ny = 2 ** 12
+    a = d / 2
+    b2 = a * 10 * max(np.sqrt(2 / min(df1 + df2, dfw)), 1)
+    b1 = a * np.log((1 - (1 - 0.000001) ** (2 / (df2 - d))) * df2 / 2)
+    dy = (b2 - b1) / ny
+    b1 = np.round(b1 / dy) * dy
+    y = np.arange(ny) * dy + b1
+
+    nuv = [df1 + df2 - d] + [df2 + 2 - k for k in range(1, d + 1)]
+    aav = [d / 2] + [-0.5] * d
+    if dfw > 4:
+        nuv += [dfw - 1 - k for k in range(d)]
+    else:
+        nuv += [dfw - 1] * d
+    aav += [0.5] * d
+    nuv.append(dfw)
+    aav.append(-d / 2)
+
+    f = np.zeros((ny, len(nuv) + 1))
+    mu = np.zeros(len(nuv) + 1)
+    with np.errstate(over='ignore', under='ignore', invalid='ignore'):
+        yy = np.exp(y / a) / df2 * 2
+        yy = yy * (yy < 1)
+        f[:, 0] = (1 - yy) ** ((df2 - d) / 2 - 1) * ((df2 - d) / 2) * yy / a
+        mu[0] = np.exp(gammaln(a + 1) + gammaln((df2 - d + 2) / 2) - gammaln((df2 + 2) / 2) + a * np.log(df2 / 2))
+        for i, (nu, aa) in enumerate(zip(nuv, aav), start=1):
+            yy = y / aa + np.log(nu)
+            f[:, i] = np.exp(nu / 2 * yy - np.exp(yy) / 2 - (nu / 2) * np.log(2) - gammaln(nu / 2)) / abs(aa)
+            mu[i] = np.exp(gammaln(nu / 2 + aa) - gammaln(nu / 2) - aa * np.log(nu / 2))
+    f = np.nan_to_num(f)
+    omega = 2 * np.pi * np.arange(ny) / ny / dy
+    shift = np.exp(-1j * b1 * omega) * dy
+    ff = np.real(np.fft.ifft(np.prod(np.fft.fft(f, axis=0), axis=1) * shift ** len(nuv)))
+
+    alpha = p / rho_d / np.prod(mu) / (4 * np.log(2)) ** (d / 2)
+    p_s = np.cumsum(ff[::-1])[::-1] * dy
+    p_s_max = 1 - np.exp(-p_s * expected_clusters)
+    log_p_values = np.log(cluster_resels / alpha + (cluster_resels <= 0)) + dy / 2
+
+    return np.where(cluster_resels > 0, np.interp(log_p_values, y, p_s_max), 1.)
+
+
+def surface_view(surf, values, title, filename, threshold=None, cmap='cold_hot'):
+    """Plot values of the vertices on the lateral and medial views of the hemispheres (SurfStatView).
+
+    Args:
+        surf: surface of the left and right hemispheres (see read_surface).
+        values: vector of the values of the vertices.
+        title: title of the figure.
+        filename: path to the figure.
+        threshold: absolute value under which the vertices are not colored.
+        cmap: colormap.
+    """
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from nilearn import plotting
+
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    vmax = max(np.abs(values).max(), np.finfo(float).eps)
+    figure, axes = plt.subplots(1, 4, figsize=(16, 4.5), subplot_kw={'projection': '3d'})
+    start = 0
+    for i, (hemi, n_vertices) in enumerate(zip(['left', 'right'], surf['n_vertices'])):
+        end = start + n_vertices
+        tri = surf['tri'][(surf['tri'] >= start).all(axis=1) & (surf['tri'] < end).all(axis=1)] - start
+        for j, view in enumerate(['lateral', 'medial']):
+            plotting.plot_surf_stat_map((surf['coord'][start:end], tri), values[start:end], hemi=hemi, view=view,
+                                        threshold=threshold, vmax=vmax, cmap=cmap, colorbar=(i == 1 and j == 1),
+                                        axes=axes[2 * i + j], figure=figure)
+        start = end
+    figure.suptitle(title)
+    figure.savefig(filename, dpi=100)
+    plt.close(figure)
@@ -93,6 +93,23 @@ class StatisticsVolumeCLI(ce.CmdParser):
                               type=float, default=0.001,
                               help='Threshold to define a cluster in the process of cluster-wise correction '
                                    '(default: --cluster_threshold %(default)s).')
+        advanced.add_argument("-glm", "--glm_backend",
+                              type=str, default='spm', choices=['spm', 'numpy'],
+                              help='Software used to estimate the GLM: SPM (requires Matlab) or NumPy '
+                                   '(in-process estimation, Matlab is not needed) '
+                                   '(default: --glm_backend %(default)s).')
+        advanced.add_argument("-nperm", "--n_permutations",
+                              type=int, default=0,
+                              help='Number of permutations of the non-parametric test giving peak-level and '
+                                   'cluster-level FWE-corrected p-values (disabled if 0) '
+                                   '(default: --n_permutations %(default)s).')
+        advanced.add_argument("-ps", "--permutation_seed",
+                              type=int, default=0,
+                              help='Seed of the random permutations (default: --permutation_seed %(default)s).')
+        advanced.add_argument("-pp", "--permutation_procs",
+                              type=int, default=1,
+                              help='Number of processes sharing the permutations. They are started in addition to '
+                                   'the processes of --n_procs (default: --permutation_procs %(default)s).')
 
     def run_command(self, args):
         from networkx import Graph
@@ -136,6 +153,10 @@ class StatisticsVolumeCLI(ce.CmdParser):
             'custom_file': args.custom_file,
             # Advanced arguments
             'cluster_threshold': args.cluster_threshold,
+            'glm_backend': args.glm_backend,
+            'n_permutations': args.n_permutations,
+            'permutation_seed': args.permutation_seed,
+            'permutation_procs': args.permutation_procs,
         }
 
         pipeline = StatisticsVolume(
@@ -4,7 +4,7 @@ import clinica.pipelines.engine as cpe
 
 
 class StatisticsVolume(cpe.Pipeline):
-    """StatisticsVolume - Volume-based mass-univariate analysis with SPM.
+    """StatisticsVolume - Volume-based mass-univariate analysis with SPM (or NumPy, see glm_backend).
 
     Returns:
         A clinica pipeline object containing the StatisticsVolume pipeline.
@@ -39,11 +39,34 @@ class StatisticsVolume(cpe.Pipeline):
 
         # Advanced parameters
         self.parameters.setdefault('cluster_threshold', 0.001)
+        self.parameters.setdefault('glm_backend', 'spm')
+        self.parameters.setdefault('n_permutations', 0)
+        self.parameters.setdefault('permutation_seed', 0)
+        self.parameters.setdefault('permutation_procs', 1)
 
         if self.parameters['cluster_threshold'] < 0 or self.parameters['cluster_threshold'] > 1:
             raise ClinicaException("Cluster threshold should be between 0 and 1 "
                                    "(given value: %s)." % self.parameters['cluster_threshold'])
 
+        if self.parameters['glm_backend'] not in ['spm', 'numpy']:
+            raise ClinicaException("GLM backend should be 'spm' or 'numpy' "
+                                   "(given value: %s)." % self.parameters['glm_backend'])
+
+        if self.parameters['n_permutations'] < 0:
+            raise ClinicaException("Number of permutations should be positive "
+                                   "(given value: %s)." % self.parameters['n_permutations'])
+
+        if self.parameters['permutation_procs'] < 1:
+            raise ClinicaException("Number of permutation processes should be at least 1 "
+                                   "(given value: %s)." % self.parameters['permutation_procs'])
+
+    def check_dependencies(self):
+        """Check dependencies of the `info.json` file, SPM being not needed when the GLM is estimated with NumPy."""
+        if self.parameters.get('glm_backend', 'spm') == 'numpy':
+            self.check_custom_dependencies()
+            return self
+        return super().check_dependencies()
+
     def check_custom_dependencies(self):
         """Check dependencies that can not be listed in the `info.json` file."""
         pass
@@ -71,7 +94,10 @@ class StatisticsVolume(cpe.Pipeline):
                 'resels_per_voxels',
                 'mask',
                 'regression_coeff',
-                'contrast']
+                'contrasts',
+                'p_values',
+                'permutation_p_values',
+                'null_distributions']
 
     def build_input_node(self):
         """Build and connect an input node to the pipeline."""
@@ -148,7 +174,8 @@ class StatisticsVolume(cpe.Pipeline):
 
         if len(self.subjects):
             print_images_to_process(self.subjects, self.sessions)
-            cprint('The pipeline will last a few minutes. Images generated by SPM will popup during the pipeline.')
+            if self.parameters['glm_backend'] == 'spm':
+                cprint('The pipeline will last a few minutes. Images generated by SPM will popup during the pipeline.')
             print_begin_image(f"group-{self.parameters['group_label']}")
 
         self.connect([
@@ -180,6 +207,16 @@ class StatisticsVolume(cpe.Pipeline):
                 (join(self.caps_directory, relative_path) + r'/contrasts/(.*)',
                  join(self.caps_directory, relative_path) + r'/\1'),
 
+                # p-value maps
+                (join(self.caps_directory, relative_path) + r'/p_values/(.*)',
+                 join(self.caps_directory, relative_path) + r'/\1'),
+
+                # FWE p-value maps and null distributions of the permutation test
+                (join(self.caps_directory, relative_path) + r'/permutation_p_values/(.*)',
+                 join(self.caps_directory, relative_path) + r'/\1'),
+                (join(self.caps_directory, relative_path) + r'/null_distributions/(.*)',
+                 join(self.caps_directory, relative_path) + r'/\1'),
+
                 # resels per voxels
                 (join(self.caps_directory, relative_path) + '/resels_per_voxels/resels_per_voxel.nii',
                  join(self.caps_directory, relative_path) + '/group-' + self.parameters['group_label'] + '_RPV.nii'),
@@ -218,7 +255,10 @@ class StatisticsVolume(cpe.Pipeline):
             (self.output_node, datasink, [('resels_per_voxels', 'resels_per_voxels')]),
             (self.output_node, datasink, [('mask', 'mask')]),
             (self.output_node, datasink, [('regression_coeff', 'regression_coeff')]),
-            (self.output_node, datasink, [('contrasts', 'contrasts')])
+            (self.output_node, datasink, [('contrasts', 'contrasts')]),
+            (self.output_node, datasink, [('p_values', 'p_values')]),
+            (self.output_node, datasink, [('permutation_p_values', 'permutation_p_values')]),
+            (self.output_node, datasink, [('null_distributions', 'null_distributions')]),
         ])
 
     def build_core_nodes(self):
@@ -322,6 +362,44 @@ class StatisticsVolume(cpe.Pipeline):
         # ==========
         self.connect([
             (self.input_node, unzip_node, [('input_files', 'in_file')]),
+        ])
+
+        if self.parameters['glm_backend'] == 'numpy':
+            # The model is estimated in process, on all the voxels at once, instead of the 4 SPM steps
+            estimate_glm_node = npe.Node(nutil.Function(
+                input_names=['file_list', 'tsv', 'contrast', 'idx_group1', 'idx_group2', 'class_names',
+                             'group_label', 'fwhm', 'measure', 'cluster_threshold'],
+                output_names=['spmT_0001', 'spmT_0002', 'spm_figures', 'variance_of_error',
+                              'resels_per_voxels', 'mask', 'regression_coeff', 'contrasts', 'p_values'],
+                function=utils.estimate_glm),
+                name='estimate_glm_node',
+                overwrite=True)
+            estimate_glm_node.inputs.tsv = self.tsv_file
+            estimate_glm_node.inputs.contrast = self.parameters['contrast']
+            estimate_glm_node.inputs.group_label = self.parameters['group_label']
+            estimate_glm_node.inputs.fwhm = self.parameters['full_width_at_half_maximum']
+            estimate_glm_node.inputs.measure = self.parameters['measure_label']
+            estimate_glm_node.inputs.cluster_threshold = self.parameters['cluster_threshold']
+
+            self.connect([
+                (unzip_node, estimate_glm_node, [('output_files', 'file_list')]),
+                (get_groups, estimate_glm_node, [('idx_group1', 'idx_group1')]),
+                (get_groups, estimate_glm_node, [('idx_group2', 'idx_group2')]),
+                (get_groups, estimate_glm_node, [('class_names', 'class_names')]),
+                (estimate_glm_node, self.output_node, [('spmT_0001', 'spmT_0001')]),
+                (estimate_glm_node, self.output_node, [('spmT_0002', 'spmT_0002')]),
+                (estimate_glm_node, self.output_node, [('spm_figures', 'spm_figures')]),
+                (estimate_glm_node, self.output_node, [('variance_of_error', 'variance_of_error')]),
+                (estimate_glm_node, self.output_node, [('resels_per_voxels', 'resels_per_voxels')]),
+                (estimate_glm_node, self.output_node, [('mask', 'mask')]),
+                (estimate_glm_node, self.output_node, [('regression_coeff', 'regression_coeff')]),
+                (estimate_glm_node, self.output_node, [('contrasts', 'contrasts')]),
+                (estimate_glm_node, self.output_node, [('p_values', 'p_values')]),
+            ])
+            self._connect_permutation_test(unzip_node, get_groups, estimate_glm_node)
+            return
+
+        self.connect([
             (unzip_node, model_creation, [('output_files', 'file_list')]),
             (get_groups, model_creation, [('idx_group1', 'idx_group1')]),
             (get_groups, model_creation, [('idx_group2', 'idx_group2')]),
@@ -354,3 +432,39 @@ class StatisticsVolume(cpe.Pipeline):
             (read_output_node, self.output_node, [('regression_coeff', 'regression_coeff')]),
             (read_output_node, self.output_node, [('contrasts', 'contrasts')]),
         ])
+        self._connect_permutation_test(unzip_node, get_groups, read_output_node)
+
+    def _connect_permutation_test(self, unzip_node, get_groups, glm_node):
+        """Connect the permutation test (if n_permutations > 0) to the images and to the mask of the GLM."""
+        import clinica.pipelines.statistics_volume.statistics_volume_utils as utils
+        import nipype.interfaces.utility as nutil
+        import nipype.pipeline.engine as npe
+
+        if not self.parameters['n_permutations']:
+            return
+
+        permutation_node = npe.Node(nutil.Function(
+            input_names=['file_list', 'tsv', 'contrast', 'idx_group1', 'idx_group2', 'class_names', 'group_label',
+                         'fwhm', 'measure', 'mask', 'cluster_threshold', 'n_permutations', 'seed', 'n_procs'],
+            output_names=['permutation_p_values', 'null_distributions'],
+            function=utils.permutation_test),
+            name='permutation_node')
+        permutation_node.inputs.tsv = self.tsv_file
+        permutation_node.inputs.contrast = self.parameters['contrast']
+        permutation_node.inputs.group_label = self.parameters['group_label']
+        permutation_node.inputs.fwhm = self.parameters['full_width_at_half_maximum']
+        permutation_node.inputs.measure = self.parameters['measure_label']
+        permutation_node.inputs.cluster_threshold = self.parameters['cluster_threshold']
+        permutation_node.inputs.n_permutations = self.parameters['n_permutations']
+        permutation_node.inputs.seed = self.parameters['permutation_seed']
+        permutation_node.inputs.n_procs = self.parameters['permutation_procs']
+
+        self.connect([
+            (unzip_node, permutation_node, [('output_files', 'file_list')]),
+            (get_groups, permutation_node, [('idx_group1', 'idx_group1')]),
+            (get_groups, permutation_node, [('idx_group2', 'idx_group2')]),
+            (get_groups, permutation_node, [('class_names', 'class_names')]),
+            (glm_node, permutation_node, [('mask', 'mask')]),
+            (permutation_node, self.output_node, [('permutation_p_values', 'permutation_p_values')]),
+            (permutation_node, self.output_node, [('null_distributions', 'null_distributions')]),
+        ])
@@ -57,11 +57,7 @@ def model_creation(tsv, contrast, idx_group1, idx_group2, file_list, template_fi
     """
     from os.path import join, dirname, isfile, abspath, isdir
     from shutil import rmtree
-    from clinica.utils.exceptions import ClinicaException
-    from numbers import Number
     from os import remove, mkdir
-    import numpy as np
-    import pandas as pds
     import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
 
     # Get template for model creation
@@ -95,14 +91,46 @@ def model_creation(tsv, contrast, idx_group1, idx_group2, file_list, template_fi
         file.write(filedata)
 
     # Add our covariates
-    tsv = pds.read_csv(tsv, sep='\t')
-    columns_stripped = [elem.strip(' ') for elem in list(tsv.columns)]
-    if columns_stripped != list(tsv.columns):
+    covariates, covariates_data = utls.get_covariates(tsv, contrast)
+    for covar_number, (covar, current_covar_data) in enumerate(zip(covariates, covariates_data), start=1):
+        current_covar_data_group1 = [elem for i, elem in enumerate(current_covar_data) if i in idx_group1]
+        current_covar_data_group2 = [elem for i, elem in enumerate(current_covar_data) if i in idx_group2]
+        covar_data_concatenated = current_covar_data_group1 + current_covar_data_group2
+        utls.write_covariate_lines(current_model, covar_number, covar, covar_data_concatenated)
+
+    # Tell matlab to run the script at the end
+    with open(current_model, 'a') as file:
+        file.write('spm_jobman(\'run\', matlabbatch)')
+    return current_model, covariates
+
+
+def get_covariates(tsv, contrast):
+    """
+        Read the covariates of the TSV file (all the columns except participant_id, session_id and the contrast)
+    Args:
+        tsv: (str) path to the tsv file containing information on subjects/sessions with all covariates
+        contrast: (str) name of a column of the tsv
+
+    Returns:
+        covariates: list of str with the names of covariates
+        covariates_data: list (one element per covariate) of list of float with the values of the covariate, in the
+            order of the tsv file. Categorical variables (like Male; Female) are coded with the index of their value.
+    """
+    from numbers import Number
+    import numpy as np
+    import pandas as pds
+    from clinica.utils.exceptions import ClinicaException
+    import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
+
+    tsv_data = pds.read_csv(tsv, sep='\t')
+    columns_stripped = [elem.strip(' ') for elem in list(tsv_data.columns)]
+    if columns_stripped != list(tsv_data.columns):
         raise ClinicaException('[Error] Check the column of your tsv file ' + tsv
                                + 'Whitespace in the column names can cause errors')
     covariates = [elem for elem in columns_stripped if elem not in ['participant_id', 'session_id', contrast]]
-    for covar_number, covar in enumerate(covariates, start=1):
-        current_covar_data = list(tsv[covar])
+    covariates_data = []
+    for covar in covariates:
+        current_covar_data = list(tsv_data[covar])
         if isinstance(current_covar_data[0], str):
             # Transform data
             temp_data = [elem.replace(',', '.') for elem in current_covar_data]
@@ -116,16 +144,8 @@ def model_creation(tsv, contrast, idx_group1, idx_group2, file_list, template_fi
         elif isinstance(current_covar_data[0], Number):
             # Do nothing
             pass
-
-        current_covar_data_group1 = [elem for i, elem in enumerate(current_covar_data) if i in idx_group1]
-        current_covar_data_group2 = [elem for i, elem in enumerate(current_covar_data) if i in idx_group2]
-        covar_data_concatenated = current_covar_data_group1 + current_covar_data_group2
-        utls.write_covariate_lines(current_model, covar_number, covar, covar_data_concatenated)
-
-    # Tell matlab to run the script at the end
-    with open(current_model, 'a') as file:
-        file.write('spm_jobman(\'run\', matlabbatch)')
-    return current_model, covariates
+        covariates_data.append(current_covar_data)
+    return covariates, covariates_data
 
 
 def is_number(s: str):
@@ -386,6 +406,7 @@ def read_output(spm_mat, class_names, covariates, group_label, fwhm, measure):
     from os.path import join, dirname, isdir, isfile, abspath
     from os import listdir
     from shutil import copyfile
+    import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
 
     if not isfile(spm_mat):
         if not isdir(dirname(spm_mat)):
@@ -409,22 +430,18 @@ def read_output(spm_mat, class_names, covariates, group_label, fwhm, measure):
     spm_T = sorted(spm_T)
     if len(spm_T) != 2:
         raise RuntimeError('[Error] ' + str(len(spm_T)) + ' SPM t-map(s) were found')
-    if fwhm:
-        spmT_0001 = abspath('group-' + group_label + '_' + class_names[0] + '-lt-' + class_names[1] + '_measure-' + measure + '_fwhm-' + str(int(fwhm)) + '_TStatistics.nii')
-        spmT_0002 = abspath('group-' + group_label + '_' + class_names[1] + '-lt-' + class_names[0] + '_measure-' + measure + '_fwhm-' + str(int(fwhm)) + '_TStatistics.nii')
-    else:
-        spmT_0001 = abspath('group-' + group_label + '_' + class_names[0] + '-lt-' + class_names[1] + '_measure-' + measure + '_TStatistics.nii')
-        spmT_0002 = abspath('group-' + group_label + '_' + class_names[1] + '-lt-' + class_names[0] + '_measure-' + measure + '_TStatistics.nii')
+    filenames = utls.get_output_filenames(class_names, covariates, group_label, fwhm, measure)
+    spmT_0001, spmT_0002 = filenames['t_maps']
     copyfile(join(dirname(spm_mat), 'spmT_0001.nii'), spmT_0001)
     copyfile(join(dirname(spm_mat), 'spmT_0002.nii'), spmT_0002)
 
-    variance_of_error = abspath('./group-' + group_label + '_VarianceError.nii')
+    variance_of_error = filenames['variance_of_error']
     copyfile(abspath(join(dirname(spm_mat), 'ResMS.nii')), variance_of_error)
 
-    resels_per_voxels = abspath('./resels_per_voxel.nii')
+    resels_per_voxels = filenames['resels_per_voxels']
     copyfile(abspath(join(dirname(spm_mat), 'RPV.nii')), resels_per_voxels)
 
-    mask = abspath('./included_voxel_mask.nii')
+    mask = filenames['mask']
     copyfile(abspath(join(dirname(spm_mat), 'mask.nii')), mask)
 
     # Handle beta files
@@ -432,10 +449,7 @@ def read_output(spm_mat, class_names, covariates, group_label, fwhm, measure):
     betas = sorted(betas)
     if len(betas) != 2 + len(covariates):
         raise RuntimeError('[Error] Not enough betas files found in output directory')
-    regression_coeff_covar = [abspath('./' + covar + '.nii') for covar in covariates]
-    regression_coeff = [abspath('./' + class_names[0] + '.nii'),
-                        abspath('./' + class_names[1] + '.nii')]
-    regression_coeff.extend(regression_coeff_covar)
+    regression_coeff = filenames['regression_coeff']
     # Order is respected:
     for beta, reg_coeff in zip(betas, regression_coeff):
         copyfile(beta, reg_coeff)
@@ -444,9 +458,379 @@ def read_output(spm_mat, class_names, covariates, group_label, fwhm, measure):
     con_files = [abspath(join(dirname(spm_mat), f)) for f in list_files if f.startswith('con_')]
     if len(con_files) != 2:
         raise RuntimeError('There must exists only 2 contrast files !')
-    contrasts = [abspath('group-' + group_label + '_' + class_names[0] + '-lt-' + class_names[1] + '_measure-' + measure + '_contrast.nii'),
-                 abspath('group-' + group_label + '_' + class_names[1] + '-lt-' + class_names[0] + '_measure-' + measure + '_contrast.nii')]
+    contrasts = filenames['contrasts']
     for con, contrast in zip(con_files, contrasts):
         copyfile(con, contrast)
 
     return spmT_0001, spmT_0002, spm_figures, variance_of_error, resels_per_voxels, mask, regression_coeff, contrasts
+
+
+def glm_design_matrix(tsv, contrast, idx_group1, idx_group2):
+    """
+        Build the design matrix of the 2-sample t-test, as done by SPM for the model created by model_creation: one
+        column per group, then one column per covariate (centered on its mean)
+    Args:
+        tsv: (str) path to the tsv file containing information on subjects/sessions with all covariates
+        contrast: (str) name of a column of the tsv
+        idx_group1: (list of int) list of indexes of first group
+        idx_group2: (list of int) list of indexes of second group
+
+    Returns:
+        design_matrix: (np.ndarray) of shape (number of subjects/sessions, 2 + number of covariates), in the order of
+            the tsv file
+        covariates: list of str with the names of covariates
+    """
+    import numpy as np
+    import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
+
+    covariates, covariates_data = utls.get_covariates(tsv, contrast)
+    n_scans = len(idx_group1) + len(idx_group2)
+
+    design_matrix = np.zeros((n_scans, 2 + len(covariates)))
+    design_matrix[idx_group1, 0] = 1
+    design_matrix[idx_group2, 1] = 1
+    for covar_number, current_covar_data in enumerate(covariates_data, start=2):
+        design_matrix[:, covar_number] = np.asarray(current_covar_data, dtype=float)
+        design_matrix[:, covar_number] -= design_matrix[:, covar_number].mean()
+
+    return design_matrix, covariates
+
+
+def get_output_filenames(class_names, covariates, group_label, fwhm, measure):
+    """
+        Names of the outputs of the group comparison in the current directory, as they are written in the CAPS
+    Args:
+        class_names: (list) of str of length 2 that correspond to the 2 classes for the group comparison
+        covariates: (list) of str: list of covariates
+        group_label: name of the group label
+        fwhm: fwhm in mm used
+        measure: measure used
+
+    Returns:
+        (dict) path to the t maps ('t_maps'), p-value maps ('p_values'), contrasts ('contrasts'), variance of error
+        ('variance_of_error'), resels per voxel ('resels_per_voxels'), mask ('mask') and regression coefficients
+        ('regression_coeff') of the analysis, and of the outputs of permutation_test: peak-level and cluster-level
+        FWE p-value maps ('peak_fwe_p_values', 'cluster_fwe_p_values') and null distributions ('null_distributions')
+    """
+    from os.path import abspath
+
+    comparisons = ['group-' + group_label + '_' + class_names[0] + '-lt-' + class_names[1] + '_measure-' + measure,
+                   'group-' + group_label + '_' + class_names[1] + '-lt-' + class_names[0] + '_measure-' + measure]
+    if fwhm:
+        statistics = [comparison + '_fwhm-' + str(int(fwhm)) for comparison in comparisons]
+    else:
+        statistics = comparisons
+
+    return {
+        't_maps': [abspath(statistic + '_TStatistics.nii') for statistic in statistics],
+        'p_values': [abspath(statistic + '_PValue.nii') for statistic in statistics],
+        'contrasts': [abspath(comparison + '_contrast.nii') for comparison in comparisons],
+        'variance_of_error': abspath('./group-' + group_label + '_VarianceError.nii'),
+        'resels_per_voxels': abspath('./resels_per_voxel.nii'),
+        'mask': abspath('./included_voxel_mask.nii'),
+        'regression_coeff': [abspath('./' + name + '.nii') for name in list(class_names) + list(covariates)],
+        'peak_fwe_p_values': [abspath(statistic + '_peakFWEPValue.nii') for statistic in statistics],
+        'cluster_fwe_p_values': [abspath(statistic + '_clusterFWEPValue.nii') for statistic in statistics],
+        'null_distributions': [abspath(statistic + '_nullDistribution.tsv') for statistic in statistics],
+    }
+
+
+def estimate_glm(file_list, tsv, contrast, idx_group1, idx_group2, class_names, group_label, fwhm, measure,
+                 cluster_threshold):
+    """
+        Estimate the 2-sample t-test of the model of model_creation without SPM: the GLM is fitted on all the voxels
+        at once, by slabs of slices read from the (uncompressed) input images
+
+    As in SPM, the voxels included are the ones that are finite and not null in all the images, the variances of
+    the 2 groups may differ (the residuals of each group are weighted by a variance estimated on all the voxels,
+    instead of SPM ReML estimation) and the t maps are computed for the 2 contrasts group2 > group1 and
+    group1 > group2. The resels per voxel are estimated from the derivatives of the normalized residuals.
+
+    Args:
+        file_list: List of files used in the statistical test. Their order is the same as it appears on the tsv file
+        tsv: (str) path to the tsv file containing information on subjects/sessions with all covariates
+        contrast: (str) name of a column of the tsv
+        idx_group1: (list of int) list of indexes of first group
+        idx_group2: (list of int) list of indexes of second group
+        class_names: (list) of str of length 2 that correspond to the 2 classes for the group comparison
+        group_label: name of the group label
+        fwhm: fwhm in mm used
+        measure: measure used
+        cluster_threshold: (float) uncorrected p-value used to threshold the figures
+
+    Returns:
+        Same outputs as read_output, and p_values: (str list) path to (uncorrected) p-value maps of the 2 contrasts
+    """
+    import numpy as np
+    import nibabel as nib
+    from scipy import stats
+    from clinica.utils.exceptions import ClinicaException
+    from clinica.utils.stream import cprint
+    import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
+
+    design_matrix, covariates = utls.glm_design_matrix(tsv, contrast, idx_group1, idx_group2)
+    n_scans, n_regressors = design_matrix.shape
+    if len(file_list) != n_scans:
+        raise ClinicaException('Number of images (%s) and of rows in ' % len(file_list) + tsv
+                               + ' (%s) mismatch' % n_scans)
+
+    images = [nib.load(f) for f in file_list]
+    shape = images[0].shape[:3]
+    for f, img in zip(file_list, images):
+        if img.shape[:3] != shape:
+            raise ClinicaException('Image ' + f + ' does not have the dimensions of ' + file_list[0])
+
+    # Contrasts of the SPM model (see template_model_contrast.m): group2 > group1, then group1 > group2
+    contrast_weights = np.zeros((2, n_regressors))
+    contrast_weights[0, :2] = [-1, 1]
+    contrast_weights[1, :2] = [1, -1]
+    in_group2 = design_matrix[:, 1] == 1
+
+    # Slabs of slices such that the data of a slab take about 256 MB
+    slab_size = max(1, 2 ** 26 // (n_scans * shape[0] * shape[1]))
+    slabs = [(z, min(z + slab_size, shape[2])) for z in range(0, shape[2], slab_size)]
+
+    def read_slab(z_start, z_end):
+        return np.stack([np.asarray(img.dataobj[:, :, z_start:z_end], dtype=np.float32).reshape(
+            shape[:2] + (z_end - z_start,)) for img in images])
+
+    # First pass: mask and variance of each group (relative to the variance of the voxel) with an OLS fit
+    mask = np.zeros(shape, dtype=bool)
+    pinv_ols = np.linalg.pinv(design_matrix)
+    df_ols = n_scans - np.linalg.matrix_rank(design_matrix)
+    group_variance = np.zeros(2)
+    n_voxels = 0
+    for z_start, z_end in slabs:
+        data = read_slab(z_start, z_end)
+        mask[:, :, z_start:z_end] = np.all(np.isfinite(data) & (data != 0), axis=0)
+        y = data[:, mask[:, :, z_start:z_end]].astype(np.float64)
+        residuals = y - design_matrix.dot(pinv_ols.dot(y))
+        residual_ms = (residuals ** 2).sum(axis=0) / df_ols
+        residuals = residuals[:, residual_ms > 0] ** 2 / residual_ms[residual_ms > 0]
+        group_variance += [residuals[~in_group2].sum(), residuals[in_group2].sum()]
+        n_voxels += residuals.shape[1]
+    if n_voxels == 0:
+        raise ClinicaException('No voxel is included in the analysis (all voxels are null or constant)')
+    group_variance /= n_voxels * np.array([np.sum(~in_group2), np.sum(in_group2)])
+    scan_weights = 1 / np.sqrt(np.where(in_group2, group_variance[1], group_variance[0]) / group_variance.mean())
+    cprint('Relative variance of the residuals of %s and %s groups: %.3f, %.3f'
+           % (class_names[0], class_names[1], group_variance[0] / group_variance.mean(),
+              group_variance[1] / group_variance.mean()))
+
+    # Second pass: weighted least squares on all the voxels of a slab at once
+    design_weighted = design_matrix * scan_weights[:, np.newaxis]
+    pinv_weighted = np.linalg.pinv(design_weighted)
+    df = n_scans - np.linalg.matrix_rank(design_weighted)
+    contrast_variance = np.einsum('ij,jk,ik->i', contrast_weights,
+                                  np.linalg.pinv(design_weighted.T.dot(design_weighted)), contrast_weights)
+
+    beta = np.full((n_regressors,) + shape, np.nan, dtype=np.float32)
+    con = np.full((2,) + shape, np.nan, dtype=np.float32)
+    residual_ms = np.full(shape, np.nan, dtype=np.float32)
+    resels_per_voxel = np.full(shape, np.nan, dtype=np.float32)
+    for z_start, z_end in slabs:
+        # One more slice on both sides of the slab for the derivatives of the residuals along z
+        z_read_start, z_read_end = max(z_start - 1, 0), min(z_end + 1, shape[2])
+        slab_mask = mask[:, :, z_read_start:z_read_end]
+        y = read_slab(z_read_start, z_read_end)[:, slab_mask].astype(np.float64) * scan_weights[:, np.newaxis]
+        slab_beta = pinv_weighted.dot(y)
+        residuals = y - design_weighted.dot(slab_beta)
+        slab_residual_ss = (residuals ** 2).sum(axis=0)
+
+        in_slab = np.zeros(slab_mask.shape, dtype=bool)
+        in_slab[:, :, z_start - z_read_start:z_end - z_read_start] = True
+        written = in_slab[slab_mask]
+        out_mask = mask[:, :, z_start:z_end]
+        beta[:, :, :, z_start:z_end][:, out_mask] = slab_beta[:, written]
+        con[:, :, :, z_start:z_end][:, out_mask] = contrast_weights.dot(slab_beta[:, written])
+        residual_ms[:, :, z_start:z_end][out_mask] = slab_residual_ss[written] / df
+
+        # Normalized residuals (u), their derivatives and the roughness matrix of the residual fields
+        norm = np.sqrt(slab_residual_ss)
+        norm[norm == 0] = np.inf
+        u = np.zeros(slab_mask.shape, dtype=np.float32)
+        roughness = np.zeros((6, ) + slab_mask.shape)
+        for scan in range(n_scans):
+            u[slab_mask] = residuals[scan] / norm
+            derivatives = [utls._masked_derivative(u, slab_mask, axis) for axis in range(3)]
+            for component, (i, j) in enumerate([(0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2)]):
+                roughness[component] += derivatives[i] * derivatives[j]
+        roughness *= (df - 2.) / (df - 1.)
+        lxx, lyy, lzz, lxy, lxz, lyz = roughness
+        determinant = lxx * (lyy * lzz - lyz ** 2) - lxy * (lxy * lzz - lyz * lxz) + lxz * (lxy * lyz - lyy * lxz)
+        slab_rpv = np.sqrt(np.maximum(determinant, 0)) / (4 * np.log(2)) ** 1.5
+        resels_per_voxel[:, :, z_start:z_end][out_mask] = slab_rpv[in_slab & slab_mask]
+
+    t_maps = con / np.sqrt(residual_ms * contrast_variance[:, np.newaxis, np.newaxis, np.newaxis])
+    p_values = stats.t.sf(t_maps, df).astype(np.float32)
+
+    # Write the outputs with the names of read_output
+    filenames = utls.get_output_filenames(class_names, covariates, group_label, fwhm, measure)
+    header = images[0].header.copy()
+    header.set_data_shape(shape)
+    header.set_data_dtype(np.float32)
+    affine = images[0].affine
+
+    def save(data, filename):
+        nib.Nifti1Image(data, affine, header).to_filename(filename)
+        return filename
+
+    for t_map, filename in zip(t_maps, filenames['t_maps']):
+        save(t_map, filename)
+    for p_value, filename in zip(p_values, filenames['p_values']):
+        save(p_value, filename)
+    for contrast_map, filename in zip(con, filenames['contrasts']):
+        save(contrast_map, filename)
+    for beta_map, filename in zip(beta, filenames['regression_coeff']):
+        save(beta_map, filename)
+    save(residual_ms, filenames['variance_of_error'])
+    save(resels_per_voxel, filenames['resels_per_voxels'])
+    mask_header = header.copy()
+    mask_header.set_data_dtype(np.uint8)
+    nib.Nifti1Image(mask.astype(np.uint8), affine, mask_header).to_filename(filenames['mask'])
+
+    # Figures: glass brain of the t maps thresholded at the uncorrected p-value cluster_threshold
+    spm_figures = utls.plot_t_maps(filenames['t_maps'], class_names, group_label,
+                                   stats.t.isf(cluster_threshold, df), cluster_threshold)
+
+    return (filenames['t_maps'][0], filenames['t_maps'][1], spm_figures, filenames['variance_of_error'],
+            filenames['resels_per_voxels'], filenames['mask'], filenames['regression_coeff'], filenames['contrasts'],
+            filenames['p_values'])
+
+
+def permutation_test(file_list, tsv, contrast, idx_group1, idx_group2, class_names, group_label, fwhm, measure,
+                     mask, cluster_threshold, n_permutations, seed, n_procs):
+    """
+        Compute peak-level and cluster-level FWE-corrected p-values of the 2 contrasts of the group comparison with
+        permutations (see clinica.utils.permutation.PermutationEngine)
+
+    The design matrix is the one of estimate_glm (ordinary least squares, the group variances being assumed equal
+    under exchangeability). Clusters are formed with 6-connectivity at the t value of the uncorrected p-value
+    cluster_threshold, and their size is their number of voxels.
+
+    Args:
+        file_list: List of files used in the statistical test. Their order is the same as it appears on the tsv file
+        tsv: (str) path to the tsv file containing information on subjects/sessions with all covariates
+        contrast: (str) name of a column of the tsv
+        idx_group1: (list of int) list of indexes of first group
+        idx_group2: (list of int) list of indexes of second group
+        class_names: (list) of str of length 2 that correspond to the 2 classes for the group comparison
+        group_label: name of the group label
+        fwhm: fwhm in mm used
+        measure: measure used
+        mask: (str) path to the mask of the voxels included in the analysis
+        cluster_threshold: (float) uncorrected p-value used as cluster-forming threshold
+        n_permutations: (int) number of permutations
+        seed: (int) seed of the random permutations
+        n_procs: (int) number of processes running the permutations
+
+    Returns:
+        permutation_p_values: (str list) path to peak-level then cluster-level FWE p-value maps of the 2 contrasts
+        null_distributions: (str list) path to the TSV files of the null distributions of the 2 contrasts
+    """
+    import os
+    import numpy as np
+    import nibabel as nib
+    from scipy import stats
+    from clinica.utils.exceptions import ClinicaException
+    from clinica.utils.permutation import PermutationEngine, grid_edges, write_null_distributions
+    import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
+
+    design_matrix, covariates = utls.glm_design_matrix(tsv, contrast, idx_group1, idx_group2)
+    n_scans = design_matrix.shape[0]
+    if len(file_list) != n_scans:
+        raise ClinicaException('Number of images (%s) and of rows in ' % len(file_list) + tsv
+                               + ' (%s) mismatch' % n_scans)
+    mask_image = nib.load(mask)
+    mask_data = np.asanyarray(mask_image.dataobj) > 0
+
+    # Voxels of the mask of all the images, one image in memory at a time
+    data_file = os.path.abspath('permutation_data.npy')
+    data = None
+    try:
+        data = np.lib.format.open_memmap(data_file, mode='w+', dtype=np.float32,
+                                         shape=(n_scans, np.count_nonzero(mask_data)))
+        for scan, f in enumerate(file_list):
+            image = nib.load(f)
+            if image.shape[:3] != mask_data.shape:
+                raise ClinicaException('Image ' + f + ' does not have the dimensions of the mask ' + mask)
+            data[scan] = np.asarray(image.dataobj, dtype=np.float32).reshape(mask_data.shape)[mask_data]
+
+        df = n_scans - np.linalg.matrix_rank(design_matrix)
+        t_threshold = stats.t.isf(cluster_threshold, df)
+        filenames = utls.get_output_filenames(class_names, covariates, group_label, fwhm, measure)
+        contrast_weights = np.zeros((2, design_matrix.shape[1]))
+        contrast_weights[0, :2] = [-1, 1]
+        contrast_weights[1, :2] = [1, -1]
+
+        edges = grid_edges(mask_data)
+        header = mask_image.header.copy()
+        header.set_data_dtype(np.float32)
+        for i, weights in enumerate(contrast_weights):
+            engine = PermutationEngine(design_matrix, weights, n_permutations=n_permutations, seed=seed,
+                                       cluster_threshold=t_threshold, edges=edges, n_procs=n_procs)
+            results = engine.run(data)
+            for key, filename in [('peak_p_values', filenames['peak_fwe_p_values'][i]),
+                                  ('cluster_p_values', filenames['cluster_fwe_p_values'][i])]:
+                p_value_map = np.full(mask_data.shape, np.nan, dtype=np.float32)
+                p_value_map[mask_data] = results[key]
+                nib.Nifti1Image(p_value_map, mask_image.affine, header).to_filename(filename)
+            write_null_distributions(results, filenames['null_distributions'][i])
+    finally:
+        # Memory-mapped voxels of the images, also removed if the permutations fail
+        data = None
+        if os.path.exists(data_file):
+            os.remove(data_file)
+
+    return filenames['peak_fwe_p_values'] + filenames['cluster_fwe_p_values'], filenames['null_distributions']
+
+
+def _masked_derivative(u, mask, axis):
+    """Finite difference of u along axis, forward where the next voxel is in the mask, backward otherwise."""
+    import numpy as np
+
+    forward = np.zeros(u.shape, dtype=u.dtype)
+    backward = np.zeros(u.shape, dtype=u.dtype)
+    forward_mask = np.zeros(mask.shape, dtype=bool)
+    backward_mask = np.zeros(mask.shape, dtype=bool)
+
+    head = [slice(None)] * 3
+    tail = [slice(None)] * 3
+    head[axis] = slice(None, -1)
+    tail[axis] = slice(1, None)
+    head, tail = tuple(head), tuple(tail)
+
+    difference = u[tail] - u[head]
+    both = mask[tail] & mask[head]
+    forward[head] = difference
+    forward_mask[head] = both
+    backward[tail] = difference
+    backward_mask[tail] = both
+    return np.where(forward_mask, forward, np.where(backward_mask, backward, 0))
+
+
+def plot_t_maps(t_maps, class_names, group_label, t_threshold, p_threshold):
+    """
+        Plot the glass brain of the t maps of estimate_glm (replacing the reports of SPM results)
+    Args:
+        t_maps: (list) of 2 str: path to the t maps of the 2 contrasts
+        class_names: (list) of str of length 2 that correspond to the 2 classes for the group comparison
+        group_label: name of the group label
+        t_threshold: (float) t value under which voxels are not displayed
+        p_threshold: (float) uncorrected p-value corresponding to t_threshold (used in figure titles)
+
+    Returns:
+        spm_figures: (list) path to figure files
+    """
+    from os.path import abspath
+    from nilearn import plotting
+
+    titles = [class_names[1] + ' > ' + class_names[0], class_names[0] + ' > ' + class_names[1]]
+    spm_figures = []
+    for i, (t_map, title) in enumerate(zip(t_maps, titles), start=1):
+        figure = abspath('./group-' + group_label + '_report-' + str(i) + '.png')
+        plotting.plot_glass_brain(t_map, threshold=t_threshold, colorbar=True,
+                                  title='Hypothesis: ' + title + ' (p < ' + str(p_threshold) + ' uncorrected)',
+                                  output_file=figure)
+        spm_figures.append(figure)
+    return spm_figures
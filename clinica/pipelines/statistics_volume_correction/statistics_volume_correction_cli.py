@@ -39,6 +39,11 @@ class StatisticsVolumeCorrectionCLI(ce.CmdParser):
         optional = self._args.add_argument_group(PIPELINE_CATEGORIES['OPTIONAL'])
         optional.add_argument("-nc", "--n_cuts", default=8, type=int,
                               help='Number of cuts along each direction')
+        optional.add_argument("-cc", "--cluster_connectivity", default=6, type=int, choices=[6, 18, 26],
+                              help='Connectivity of the voxels of a cluster: 6 (faces), 18 (faces and edges) or '
+                                   '26 (faces, edges and corners) (default: --cluster_connectivity %(default)s).')
+        optional.add_argument("-ts", "--two_sided", action='store_true', default=False,
+                              help='Also keep the clusters of t values less than -height_threshold.')
 
         # Clinica standard arguments (e.g. --n_procs)
         self.add_clinica_standard_arguments()
@@ -53,9 +58,11 @@ class StatisticsVolumeCorrectionCLI(ce.CmdParser):
             'height_threshold': args.height_threshold,
             'FWEp': args.FWEp,
             'FDRp': args.FDRp,
-            'FWEc': args.FWEp,
-            'FDRc': args.FDRp,
-            'n_cuts': args.n_cuts
+            'FWEc': args.FWEc,
+            'FDRc': args.FDRc,
+            'n_cuts': args.n_cuts,
+            'cluster_connectivity': args.cluster_connectivity,
+            'two_sided': args.two_sided,
         }
 
         pipeline = StatisticsVolumeCorrection(
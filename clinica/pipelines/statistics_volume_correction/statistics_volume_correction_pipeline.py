@@ -10,6 +10,18 @@ class StatisticsVolumeCorrection(cpe.Pipeline):
         A clinica pipeline object containing the StatisticsVolumeCorrection pipeline.
     """
 
+    def check_pipeline_parameters(self):
+        """Check pipeline parameters."""
+        from clinica.utils.exceptions import ClinicaException
+
+        self.parameters.setdefault('cluster_connectivity', 6)
+        if self.parameters['cluster_connectivity'] not in [6, 18, 26]:
+            raise ClinicaException(
+                f"The cluster connectivity should be 6, 18 or 26 "
+                f"(given value: {self.parameters['cluster_connectivity']})."
+            )
+        self.parameters.setdefault('two_sided', False)
+
     def check_custom_dependencies(self):
         """Check dependencies that can not be listed in the `info.json` file.
         """
@@ -76,11 +88,14 @@ class StatisticsVolumeCorrection(cpe.Pipeline):
 
         cluster_correction_FWE = npe.Node(name='cluster_correction_FWE',
                                           interface=nutil.Function(
-                                              input_names=['t_map', 't_thresh', 'c_thresh'],
-                                              output_names=['output'],
+                                              input_names=['t_map', 't_thresh', 'c_thresh',
+                                                           'connectivity', 'two_sided'],
+                                              output_names=['output', 'cluster_table'],
                                               function=utils.cluster_correction))
         cluster_correction_FWE.inputs.t_thresh = self.parameters['height_threshold']
         cluster_correction_FWE.inputs.c_thresh = self.parameters['FWEc']
+        cluster_correction_FWE.inputs.connectivity = self.parameters['cluster_connectivity']
+        cluster_correction_FWE.inputs.two_sided = self.parameters['two_sided']
 
         cluster_correction_FDR = cluster_correction_FWE.clone(name='cluster_correction_FDR')
         cluster_correction_FDR.inputs.t_thresh = self.parameters['height_threshold']
@@ -138,10 +153,14 @@ class StatisticsVolumeCorrection(cpe.Pipeline):
         save_fig_peak_correction_FDR = save_fig_peak_correction_FWE.clone(name='save_fig_peak_correction_FDR')
         save_fig_peak_correction_FDR.inputs.name = 'FDRp'
 
-        save_fig_cluster_correction_FWE = save_fig_peak_correction_FWE.clone(name='save_fig_cluster_correction_FWE')
+        save_fig_cluster_correction_FWE = npe.Node(name='save_fig_cluster_correction_FWE',
+                                                   interface=nutil.Function(
+                                                       input_names=['t_map', 'figs', 'name', 'cluster_table'],
+                                                       output_names=[],
+                                                       function=utils.generate_output))
         save_fig_cluster_correction_FWE.inputs.name = 'FWEc'
 
-        save_fig_cluster_correction_FDR = save_fig_peak_correction_FWE.clone(name='save_fig_cluster_correction_FDR')
+        save_fig_cluster_correction_FDR = save_fig_cluster_correction_FWE.clone(name='save_fig_cluster_correction_FDR')
         save_fig_cluster_correction_FDR.inputs.name = 'FDRc'
 
         # Connection
@@ -161,6 +180,8 @@ class StatisticsVolumeCorrection(cpe.Pipeline):
             (produce_fig_FDR_peak_correction, save_fig_peak_correction_FDR, [('figs', 'figs')]),
             (produce_fig_FWE_cluster_correction, save_fig_cluster_correction_FWE, [('figs', 'figs')]),
             (produce_fig_FDR_cluster_correction, save_fig_cluster_correction_FDR, [('figs', 'figs')]),
+            (cluster_correction_FWE, save_fig_cluster_correction_FWE, [('cluster_table', 'cluster_table')]),
+            (cluster_correction_FDR, save_fig_cluster_correction_FDR, [('cluster_table', 'cluster_table')]),
 
             (self.input_node, save_fig_peak_correction_FWE, [('t_map', 't_map')]),
             (self.input_node, save_fig_peak_correction_FDR, [('t_map', 't_map')]),
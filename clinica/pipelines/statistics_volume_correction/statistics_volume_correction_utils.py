@@ -22,7 +22,7 @@ def peak_correction(t_map, t_threshold, output_name=None):
     from os.path import join, basename, abspath
 
     original_nifti = nib.load(t_map)
-    data = original_nifti.get_data()
+    data = original_nifti.get_fdata()
     data[data < t_threshold] = 0
     new_data = nib.Nifti1Image(data, affine=original_nifti.affine, header=original_nifti.header)
     if output_name:
@@ -33,39 +33,103 @@ def peak_correction(t_map, t_threshold, output_name=None):
     return abspath(filename)
 
 
-def cluster_correction(t_map, t_thresh, c_thresh, output_name=None):
+def cluster_correction(t_map, t_thresh, c_thresh, output_name=None, connectivity=6, two_sided=False):
     """
     Performs cluster correction. First t_map is thresholded with t_thresh (like in peak_correction()). Then, clusters
-    that have a size less than c_thresh are removed
+    that have a size less than c_thresh are removed.
+
+    The clusters are labelled once and their sizes counted in a single pass over the voxels. A TSV file next to the
+    output image describes the remaining clusters (size, peak t value, peak and centre of mass coordinates in the
+    space of the t_map, e.g. MNI), sorted by decreasing size.
+
     Args:
         t_map: (str) path to t-statistics nifti map
         t_thresh: (float) threshold on t value
         c_thresh: (int) minimal size of clusters after thresholding
         output_name: (str) optional output name
+        connectivity: (int) 6 (faces), 18 (faces and edges) or 26 (faces, edges and corners) connectivity of the
+            voxels of a cluster
+        two_sided: (bool) if True, voxels with t values less than -t_thresh are also kept, positive and negative
+            clusters being labelled separately
 
     Returns:
-        path to the generated file.
+        path to the generated file and path to the TSV file describing its clusters.
     """
     import nibabel as nib
     from os.path import join, basename, abspath
     import numpy as np
-    from scipy.ndimage.measurements import label
+    import pandas as pd
+    from scipy.ndimage import label, generate_binary_structure
+    from clinica.utils.stream import cprint
+
+    connectivity_to_rank = {6: 1, 18: 2, 26: 3}
+    if connectivity not in connectivity_to_rank:
+        raise ValueError('Connectivity must be 6, 18 or 26 (given: %s)' % connectivity)
+    structure = generate_binary_structure(3, connectivity_to_rank[connectivity])
 
     original_nifti = nib.load(t_map)
-    data = original_nifti.get_data()
-    data[data < t_thresh] = 0
-    labeled_mask, num_features = label(data)
-    for i in range(1, num_features + 1):
-        if np.sum(labeled_mask == i) < c_thresh:
-            print('Label number ' + str(i) + ' cluster size is: ' + str(np.sum(labeled_mask == i)) + ' so it is removed')
-            data[labeled_mask == i] = 0
+    data = original_nifti.get_fdata()
+    labeled_mask, num_features = label(data >= t_thresh, structure=structure)
+    if two_sided:
+        negative_labeled_mask, num_negative_features = label(data <= -t_thresh, structure=structure)
+        negative_voxels = negative_labeled_mask > 0
+        labeled_mask[negative_voxels] = negative_labeled_mask[negative_voxels] + num_features
+        num_features += num_negative_features
+
+    # Single pass: size of each cluster, then lookup table of the clusters to keep (label 0 is the background)
+    flat_labels = labeled_mask.ravel()
+    cluster_sizes = np.bincount(flat_labels, minlength=num_features + 1)
+    keep = cluster_sizes >= c_thresh
+    keep[0] = False
+    cprint('%d out of %d clusters have at least %s voxels' % (np.count_nonzero(keep), num_features, c_thresh))
+    data[~keep[labeled_mask]] = 0
+
+    # Clusters description
+    kept_labels = np.flatnonzero(keep)
+    kept_voxels = np.flatnonzero(keep[flat_labels])
+    voxel_labels = flat_labels[kept_voxels]
+    voxel_t = data.ravel()[kept_voxels]
+    voxel_coordinates = np.column_stack(np.unravel_index(kept_voxels, data.shape))
+    sizes = cluster_sizes[kept_labels]
+
+    # Peak of each cluster: voxel of highest |t|, found after sorting the voxels by label then |t|
+    order = np.lexsort((np.abs(voxel_t), voxel_labels))
+    last_of_label = order[np.searchsorted(voxel_labels[order], kept_labels, side='right') - 1]
+    peak_t = voxel_t[last_of_label]
+    peak_coordinates = nib.affines.apply_affine(original_nifti.affine, voxel_coordinates[last_of_label])
+
+    label_index = np.zeros(num_features + 1, dtype=int)
+    label_index[kept_labels] = np.arange(len(kept_labels))
+    centers = np.column_stack([
+        np.bincount(label_index[voxel_labels], weights=voxel_coordinates[:, axis], minlength=len(kept_labels)) / sizes
+        for axis in range(3)
+    ])
+    center_coordinates = nib.affines.apply_affine(original_nifti.affine, centers)
+
+    voxel_volume = abs(np.linalg.det(original_nifti.affine[:3, :3]))
+    clusters = pd.DataFrame({
+        'size': sizes,
+        'volume_mm3': sizes * voxel_volume,
+        'peak_t': peak_t,
+        'peak_x': peak_coordinates[:, 0],
+        'peak_y': peak_coordinates[:, 1],
+        'peak_z': peak_coordinates[:, 2],
+        'center_of_mass_x': center_coordinates[:, 0],
+        'center_of_mass_y': center_coordinates[:, 1],
+        'center_of_mass_z': center_coordinates[:, 2],
+    })
+    clusters = clusters.sort_values('size', ascending=False, kind='stable').reset_index(drop=True)
+    clusters.insert(0, 'cluster_id', np.arange(1, len(clusters) + 1))
+
     new_data = nib.Nifti1Image(data, affine=original_nifti.affine, header=original_nifti.header)
     if output_name:
         filename = output_name
     else:
         filename = join('./cluster_corrected_t-' + str(t_thresh) + '_c-' + str(c_thresh) + basename(t_map))
     nib.save(new_data, filename)
-    return abspath(filename)
+    tsv_filename = filename.replace('.nii.gz', '').replace('.nii', '') + '_clusters.tsv'
+    clusters.to_csv(tsv_filename, sep='\t', index=False, float_format='%.4f')
+    return abspath(filename), abspath(tsv_filename)
 
 
 def produce_figures(nii_file, template, type_of_correction, t_thresh, c_thresh, n_cuts):
@@ -130,13 +194,14 @@ def produce_figures(nii_file, template, type_of_correction, t_thresh, c_thresh,
             abspath('./statmap_z.png')]
 
 
-def generate_output(t_map, figs, name):
+def generate_output(t_map, figs, name, cluster_table=None):
     """
         Produce output
     Args:
         t_map: (str) path to t-map on which whole pipeline was based
         figs: (list of str) paths to figs to save
         name: (str) name of the correction (ex: cluster_correction_FWE)
+        cluster_table: (str) optional path to the TSV file describing the clusters to save
 
     Returns:
         Nothing
@@ -154,3 +219,5 @@ def generate_output(t_map, figs, name):
     copyfile(figs[1], join(out_folder, t_map_basename.replace('TStatistics', 'desc-' + name + '_axis-x_TStatistics.png')))
     copyfile(figs[2], join(out_folder, t_map_basename.replace('TStatistics', 'desc-' + name + '_axis-y_TStatistics.png')))
     copyfile(figs[3], join(out_folder, t_map_basename.replace('TStatistics', 'desc-' + name + '_axis-z_TStatistics.png')))
+    if cluster_table:
+        copyfile(cluster_table, join(out_folder, t_map_basename.replace('TStatistics', 'desc-' + name + '_clusters.tsv')))
@@ -0,0 +1,564 @@
+# coding: utf8
+
+"""
+This module contains an index of BIDS and CAPS directories.
+
+The index lists each directory of the dataset once and is shared by all the calls
+to clinica_file_reader, clinica_group_reader and the subject/session listing
+functions made in the same process. Every directory keeps its modification time:
+a directory is listed again only when an entry has been added, removed or renamed
+in it since the previous query.
+
+If the CLINICA_INDEX_DIR environment variable is set, the index is also stored in a
+manifest (<CLINICA_INDEX_DIR>/<hash of the directory path>/manifest.sqlite) recording
+every entry with its BIDS entities, size and mtime, so that a new Clinica process only
+has to check the mtime of the directories instead of listing them. The indexed
+directory itself is never written.
+"""
+
+import os
+import re
+import threading
+import time
+from fnmatch import translate
+
+# Directories modified less than this number of seconds before being listed are
+# listed again at the next query (the mtime resolution of some file systems is 1s)
+_RACY_MTIME_DELAY = 2
+
+MANIFEST_ENV = "CLINICA_INDEX_DIR"
+MANIFEST_FILENAME = "manifest.sqlite"
+_MANIFEST_VERSION = "1"
+_MANIFEST_TIMEOUT = 10
+
+_INDEX_CACHE = {}
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+class _DirectoryNode:
+    """Listing of a directory, lazily built and refreshed when its mtime changes."""
+
+    __slots__ = (
+        "index",
+        "path",
+        "relpath",
+        "parent",
+        "mtime",
+        "files",
+        "directories",
+        "_lower_names",
+        "_checked",
+        "_paths",
+    )
+
+    def __init__(self, index, path, relpath="", parent=None):
+        self.index = index
+        self.path = path
+        self.relpath = relpath
+        self.parent = parent
+        self.mtime = None
+        # Name -> (size, mtime) of the files of the directory
+        self.files = {}
+        self.directories = {}
+        self._lower_names = {}
+        self._checked = None
+        self._paths = None
+
+    def refresh(self, generation):
+        """List the directory again if it changed since the last query.
+
+        A directory is checked at most once per generation (i.e. per query).
+        """
+        if self._checked == generation:
+            return
+        self._checked = generation
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == self.mtime:
+            return
+        self._scan(mtime)
+
+    def _scan(self, mtime):
+        files = {}
+        directories = {}
+        if mtime is not None:
+            try:
+                with os.scandir(self.path) as entries:
+                    for entry in entries:
+                        if _is_dir(entry):
+                            directories[entry.name] = self.directories.get(
+                                entry.name
+                            ) or self.child(entry.name)
+                        else:
+                            files[entry.name] = _entry_stat(entry)
+            except OSError:
+                mtime, files, directories = None, {}, {}
+            if mtime is not None and time.time() - mtime / 1e9 < _RACY_MTIME_DELAY:
+                mtime = None
+
+        for name in self.directories.keys() - directories.keys():
+            self.index._removed.add(self.directories[name].relpath)
+        self.mtime = mtime
+        self.set_listing(files, directories)
+        self.index._dirty.add(self)
+
+    def child(self, name):
+        return _DirectoryNode(
+            self.index,
+            os.path.join(self.path, name),
+            os.path.join(self.relpath, name),
+            self,
+        )
+
+    def set_listing(self, files, directories):
+        self.files = {name: files[name] for name in sorted(files)}
+        self.directories = {name: directories[name] for name in sorted(directories)}
+        self._lower_names = {}
+        for name in self.directories:
+            self._lower_names.setdefault(name.lower(), []).append(name)
+
+        # The cached path tables of this directory and of its parents are now outdated
+        node = self
+        while node is not None:
+            node._paths = None
+            node = node.parent
+
+    def children(self, name, generation):
+        """Sub-directories whose name is `name` (case insensitive)."""
+        self.refresh(generation)
+        return [self.directories[n] for n in self._lower_names.get(name.lower(), [])]
+
+    def refresh_tree(self, generation):
+        """Refresh the directory and all its sub-directories."""
+        self.refresh(generation)
+        for child in self.directories.values():
+            child.refresh_tree(generation)
+
+    def paths(self):
+        """Table of the entries below the directory, as tuples of names (cached)."""
+        if self._paths is None:
+            paths = [(name,) for name in self.files]
+            for name, child in self.directories.items():
+                paths.append((name,))
+                paths.extend((name,) + path for path in child.paths())
+            self._paths = paths
+        return self._paths
+
+    def iter_paths(self, prefix=()):
+        """Iterate over the entries below the directory, without caching them."""
+        for name in self.files:
+            yield prefix + (name,)
+        for name, child in self.directories.items():
+            yield prefix + (name,)
+            yield from child.iter_paths(prefix + (name,))
+
+
+def manifest_path(directory):
+    """Path of the manifest of `directory`, or None if the manifests are disabled."""
+    import hashlib
+
+    manifest_directory = os.environ.get(MANIFEST_ENV)
+    if not manifest_directory:
+        return None
+    directory_hash = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(
+        os.path.expanduser(manifest_directory), directory_hash, MANIFEST_FILENAME
+    )
+
+
+def _is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _entry_stat(entry):
+    try:
+        stat = entry.stat()
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None, None
+
+
+def _is_attached(node):
+    """Check that the node has not been removed from the tree by a refresh of a parent."""
+    while node.parent is not None:
+        if node.parent.directories.get(os.path.basename(node.relpath)) is not node:
+            return False
+        node = node.parent
+    return True
+
+
+def _is_hidden(name):
+    return name[0] == "."
+
+
+def parse_entities(directory, name):
+    """Extract the BIDS entities of an entry from its location in the dataset.
+
+    Args:
+        directory: directory of the entry, relative to the BIDS or CAPS directory
+        name: name of the entry
+
+    Returns:
+        dict with the keys 'sub', 'ses', 'acq', 'modality' and 'suffix' (None when
+        the entity is not present)
+
+    Example:
+        >>> from clinica.utils.dataset_index import parse_entities
+        >>> parse_entities('sub-01/ses-M00/pet', 'sub-01_ses-M00_task-rest_acq-fdg_pet.nii.gz')
+        {'sub': 'sub-01', 'ses': 'ses-M00', 'acq': 'fdg', 'modality': 'pet', 'suffix': 'pet'}
+    """
+    parts = directory.split(os.sep) if directory else []
+    # CAPS hierarchy
+    if parts and parts[0] == "subjects":
+        parts = parts[1:]
+    subject = parts[0] if len(parts) > 0 and parts[0].startswith("sub-") else None
+    session = (
+        parts[1]
+        if subject and len(parts) > 1 and parts[1].startswith("ses-")
+        else None
+    )
+
+    tokens = name.split(".")[0].split("_")
+    labels = dict(token.split("-", 1) for token in tokens if "-" in token)
+    return {
+        "sub": subject,
+        "ses": session,
+        "acq": labels.get("acq"),
+        "modality": parts[2] if session and len(parts) > 2 else None,
+        "suffix": tokens[-1] if len(tokens) > 1 and "-" not in tokens[-1] else None,
+    }
+
+
+class _PatternMatcher:
+    """Case insensitive matcher equivalent to insensitive_glob('<origin>/**/<pattern>')."""
+
+    def __init__(self, pattern):
+        parts = [part for part in pattern.split(os.sep) if part]
+        self.regexes = [re.compile(translate(part), re.IGNORECASE) for part in parts]
+        self.hidden_allowed = [_is_hidden(part) for part in parts]
+        self.n_parts = len(parts)
+
+    def match(self, path):
+        if len(path) < self.n_parts:
+            return False
+        # '**' does not go through hidden directories
+        if any(_is_hidden(name) for name in path[: len(path) - self.n_parts]):
+            return False
+        for name, regex, hidden_allowed in zip(
+            reversed(path), reversed(self.regexes), reversed(self.hidden_allowed)
+        ):
+            if (_is_hidden(name) and not hidden_allowed) or not regex.match(name):
+                return False
+        return True
+
+
+def is_indexable_pattern(pattern):
+    """Check if the matches of `pattern` can be resolved with a DatasetIndex.
+
+    Patterns with recursive wildcards, relative components, character classes or
+    which only target directories are left to glob.
+    """
+    if not pattern or pattern.endswith(os.sep) or "[" in pattern:
+        return False
+    parts = [part for part in pattern.split(os.sep) if part]
+    return len(parts) > 0 and not any(part in ("**", ".", "..") for part in parts)
+
+
+class DatasetIndex:
+    """Index of the entries of a BIDS or CAPS directory.
+
+    All paths returned by the index are relative to the indexed directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.manifest = manifest_path(self.directory)
+        self._root = _DirectoryNode(self, self.directory)
+        self._generation = 0
+        self._dataset_type = None
+        self._lock = threading.RLock()
+        # Directories listed since the last save of the manifest, and removed ones
+        self._dirty = set()
+        self._removed = set()
+        self._persistent = self.manifest is not None
+        self._load_manifest()
+
+    def _new_generation(self):
+        self._generation += 1
+        return self._generation
+
+    def _load_manifest(self):
+        """Rebuild the listings of the directories recorded in the manifest."""
+        import sqlite3
+        from contextlib import closing
+
+        if self.manifest is None or not os.path.isfile(self.manifest):
+            return
+        try:
+            with closing(
+                sqlite3.connect(self.manifest, timeout=_MANIFEST_TIMEOUT)
+            ) as connection:
+                version = connection.execute(
+                    "SELECT value FROM metadata WHERE key = 'version'"
+                ).fetchone()
+                if version != (_MANIFEST_VERSION,):
+                    return
+                directories = connection.execute(
+                    "SELECT path, mtime FROM directories ORDER BY path"
+                ).fetchall()
+                entries = connection.execute(
+                    "SELECT directory, name, is_dir, size, mtime FROM entries"
+                ).fetchall()
+        except sqlite3.Error:
+            return
+
+        listings = {}
+        for directory, name, is_dir, size, mtime in entries:
+            files, subdirectories = listings.setdefault(directory, ({}, []))
+            if is_dir:
+                subdirectories.append(name)
+            else:
+                files[name] = (size, mtime)
+
+        nodes = {"": self._root}
+
+        def get_node(relpath):
+            if relpath not in nodes:
+                parent = get_node(os.path.dirname(relpath))
+                name = os.path.basename(relpath)
+                nodes[relpath] = parent.directories.get(name) or parent.child(name)
+            return nodes[relpath]
+
+        for relpath, mtime in directories:
+            node = get_node(relpath)
+            files, subdirectories = listings.get(relpath, ({}, []))
+            node.set_listing(
+                files,
+                {name: get_node(os.path.join(relpath, name)) for name in subdirectories},
+            )
+            node.mtime = mtime
+
+    def _save_manifest(self):
+        """Write the directories listed since the last save to the manifest.
+
+        The manifest is silently disabled if it cannot be written (e.g. read-only
+        CLINICA_INDEX_DIR).
+        """
+        import sqlite3
+        from contextlib import closing
+
+        if not self._persistent or not (self._dirty or self._removed):
+            return
+        try:
+            os.makedirs(os.path.dirname(self.manifest), exist_ok=True)
+            with closing(
+                sqlite3.connect(self.manifest, timeout=_MANIFEST_TIMEOUT)
+            ) as connection, connection:
+                connection.executescript(
+                    "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT);"
+                    "CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, mtime INTEGER);"
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "directory TEXT, name TEXT, is_dir INTEGER, size INTEGER, mtime INTEGER, "
+                    "sub TEXT, ses TEXT, acq TEXT, modality TEXT, suffix TEXT, "
+                    "PRIMARY KEY (directory, name));"
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO metadata VALUES ('version', ?)",
+                    (_MANIFEST_VERSION,),
+                )
+                for relpath in self._removed:
+                    subtree = relpath.replace("\\", "\\\\").replace("%", "\\%")
+                    subtree = subtree.replace("_", "\\_") + os.sep + "%"
+                    for table, column in (("directories", "path"), ("entries", "directory")):
+                        connection.execute(
+                            f"DELETE FROM {table} WHERE {column} = ? OR {column} LIKE ? ESCAPE '\\'",
+                            (relpath, subtree),
+                        )
+                for node in self._dirty:
+                    if not _is_attached(node):
+                        continue
+                    connection.execute(
+                        "DELETE FROM entries WHERE directory = ?", (node.relpath,)
+                    )
+                    connection.execute(
+                        "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                        (node.relpath, node.mtime),
+                    )
+                    rows = [
+                        (name, 0, size, mtime)
+                        for name, (size, mtime) in node.files.items()
+                    ] + [
+                        (name, 1, None, child.mtime)
+                        for name, child in node.directories.items()
+                    ]
+                    connection.executemany(
+                        "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (node.relpath, name, is_dir, size, mtime)
+                            + tuple(parse_entities(node.relpath, name).values())
+                            for name, is_dir, size, mtime in rows
+                        ],
+                    )
+        except (OSError, sqlite3.Error):
+            self._persistent = False
+        self._dirty.clear()
+        self._removed.clear()
+
+    def is_bids(self):
+        """Determine if the directory is a BIDS (True) or a CAPS (False) and check it.
+
+        The result of determine_caps_or_bids and check_bids_folder/check_caps_folder
+        is kept as long as the root and 'subjects' folders are not modified.
+        """
+        from clinica.utils.inputs import (
+            check_bids_folder,
+            check_caps_folder,
+            determine_caps_or_bids,
+        )
+
+        with self._lock:
+            generation = self._new_generation()
+            self._root.refresh(generation)
+            subjects_node = self._root.directories.get("subjects")
+            if subjects_node is not None:
+                subjects_node.refresh(generation)
+            key = (self._root.mtime, subjects_node.mtime if subjects_node else None)
+
+            if self._dataset_type is not None and self._dataset_type[0] == key:
+                return self._dataset_type[1]
+
+            is_bids = determine_caps_or_bids(self.directory)
+            if is_bids:
+                check_bids_folder(self.directory)
+            else:
+                check_caps_folder(self.directory)
+            if None not in key[: 2 if subjects_node else 1]:
+                self._dataset_type = (key, is_bids)
+            return is_bids
+
+    def find_session_files(self, subjects, sessions, pattern, is_bids):
+        """Find the entries matching `pattern` for each subject/session pair.
+
+        Args:
+            subjects: list of subjects
+            sessions: list of sessions (must be same size as subjects)
+            pattern: glob pattern (see clinica_file_reader)
+            is_bids: True if the directory is a BIDS, False if it is a CAPS
+
+        Returns:
+            list (one element per subject/session) of lists of relative paths
+        """
+        matcher = _PatternMatcher(pattern)
+        with self._lock:
+            generation = self._new_generation()
+            if is_bids:
+                parents = [self._root]
+            else:
+                parents = self._root.children("subjects", generation)
+
+            results = []
+            for subject, session in zip(subjects, sessions):
+                found = []
+                for parent in parents:
+                    for subject_node in parent.children(subject, generation):
+                        for session_node in subject_node.children(session, generation):
+                            session_node.refresh_tree(generation)
+                            found.extend(
+                                os.path.join(session_node.relpath, *path)
+                                for path in session_node.paths()
+                                if matcher.match(path)
+                            )
+                results.append(found)
+            self._save_manifest()
+            return results
+
+    def find_files(self, pattern):
+        """Find the entries matching `pattern` in the whole directory.
+
+        Returns:
+            list of relative paths
+        """
+        matcher = _PatternMatcher(pattern)
+        with self._lock:
+            generation = self._new_generation()
+            self._root.refresh_tree(generation)
+            found = [
+                os.path.join(*path)
+                for path in self._root.iter_paths()
+                if matcher.match(path)
+            ]
+            self._save_manifest()
+            return found
+
+    def glob(self, pattern):
+        """Equivalent of glob.glob (case sensitive, non recursive) for a relative pattern.
+
+        Returns:
+            sorted list of relative paths (ending with a separator if `pattern` does)
+        """
+        from fnmatch import filter
+        from glob import has_magic
+
+        parts = pattern.split(os.sep)
+        directories_only = parts[-1] == ""
+        parts = [part for part in parts if part]
+        with self._lock:
+            generation = self._new_generation()
+            candidates = [((), self._root)]
+            for position, part in enumerate(parts):
+                last = position == len(parts) - 1
+                matches = []
+                for path, node in candidates:
+                    node.refresh(generation)
+                    names = list(node.directories)
+                    if last and not directories_only:
+                        names = sorted(names + list(node.files))
+                    if has_magic(part):
+                        if not _is_hidden(part):
+                            names = [name for name in names if not _is_hidden(name)]
+                        names = filter(names, part)
+                    else:
+                        names = [part] if part in names else []
+                    matches.extend(
+                        (path + (name,), node.directories.get(name)) for name in names
+                    )
+                candidates = [
+                    (path, node) for path, node in matches if node is not None or last
+                ]
+            self._save_manifest()
+            return [
+                os.path.join(*path, "") if directories_only else os.path.join(*path)
+                for path, _ in candidates
+            ]
+
+
+def get_dataset_index(directory):
+    """Return the DatasetIndex of `directory` shared by the whole process."""
+    key = os.path.abspath(directory)
+    with _INDEX_CACHE_LOCK:
+        if key not in _INDEX_CACHE:
+            _INDEX_CACHE[key] = DatasetIndex(key)
+        return _INDEX_CACHE[key]
+
+
+def index_glob(directory, pattern):
+    """glob.glob for a non recursive pattern located in a BIDS or CAPS directory.
+
+    Args:
+        directory: BIDS or CAPS directory
+        pattern: glob pattern starting with `directory`
+
+    Returns:
+        list of paths found, resolved with the DatasetIndex of `directory`
+    """
+    from glob import glob
+
+    prefix = os.path.join(directory, "")
+    if not pattern.startswith(prefix) or "**" in pattern:
+        return glob(pattern)
+    return [prefix + path for path in get_dataset_index(directory).glob(pattern[len(prefix):])]
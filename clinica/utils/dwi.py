@@ -353,3 +353,145 @@ def check_dwi_volume(in_dwi, in_bvec, in_bval):
         raise IOError('Number of DWIs, b-vals and b-vecs mismatch '
                       '(# DWI = %s, # B-vec = %s, #B-val = %s) ' %
                       (num_dwis, num_b_vecs, num_b_vals))
+
+
+def split_volumes(in_file):
+    """
+    Split a 4D volume into 3D volumes (same as fslsplit, without calling FSL).
+
+    Args:
+        in_file (str): 4D volume (a 3D volume is written as the only volume).
+
+    Returns:
+        out_files (list of str): The 3D volumes (vol0000.nii.gz, vol0001.nii.gz, ...).
+    """
+    import os.path as op
+    import nibabel as nib
+    import numpy as np
+
+    img = nib.load(in_file)
+    hdr = img.header.copy()
+    hdr.set_data_shape(img.shape[:3])
+    is_3d = len(img.shape) == 3
+
+    out_files = []
+    for t in range(1 if is_3d else img.shape[3]):
+        out_file = op.abspath('vol%04d.nii.gz' % t)
+        data = img.dataobj if is_3d else img.dataobj[..., t]
+        nib.Nifti1Image(np.asanyarray(data), img.affine, hdr).to_filename(out_file)
+        out_files.append(out_file)
+    return out_files
+
+
+def merge_volumes_remove_negative(in_files, in_multipliers=None):
+    """
+    Merge 3D volumes into a 4D volume in which negative values are set to 0.
+
+    This replaces the fslmaths (-mul, -thr 0) and fslmerge calls on each volume by a single
+    pass over the volumes in memory.
+
+    Args:
+        in_files (list of str): 3D volumes.
+        in_multipliers (Optional[list]): Value (float) or map (path to a 3D volume, e.g. the
+            determinant of the Jacobian) multiplying each volume before the thresholding.
+
+    Returns:
+        out_file (str): The 4D volume.
+    """
+    import os.path as op
+    import nibabel as nib
+    import numpy as np
+
+    if in_multipliers is not None and len(in_multipliers) != len(in_files):
+        raise ValueError('Number of volumes and multipliers mismatch (%s volumes, %s multipliers)'
+                         % (len(in_files), len(in_multipliers)))
+
+    img = nib.load(in_files[0])
+    data = np.zeros(img.shape[:3] + (len(in_files),), dtype=np.float32)
+    for t, in_file in enumerate(in_files):
+        data[..., t] = np.asanyarray(nib.load(in_file).dataobj)
+        if in_multipliers is not None:
+            multiplier = in_multipliers[t]
+            if isinstance(multiplier, str):
+                multiplier = np.asanyarray(nib.load(multiplier).dataobj)
+            data[..., t] *= multiplier
+    np.maximum(data, 0, out=data)
+
+    hdr = img.header.copy()
+    hdr.set_data_shape(data.shape)
+    hdr.set_data_dtype(np.float32)
+    out_file = op.abspath('merged_dwis.nii.gz')
+    nib.Nifti1Image(data, img.affine, hdr).to_filename(out_file)
+    return out_file
+
+
+def remove_bias_field(in_file, in_bias):
+    """
+    Divide each volume of a 4D volume by a bias field and set negative values to 0.
+
+    As with fslmaths -div, voxels where the bias field is 0 are set to 0.
+
+    Args:
+        in_file (str): 4D volume.
+        in_bias (str): 3D bias field (e.g. estimated by N4 on the b0 volume).
+
+    Returns:
+        out_file (str): The 4D volume without bias.
+    """
+    import os.path as op
+    import nibabel as nib
+    import numpy as np
+
+    img = nib.load(in_file)
+    bias = np.asanyarray(nib.load(in_bias).dataobj).astype(np.float32)
+    data = np.asanyarray(img.dataobj).astype(np.float32)
+
+    nonzero = bias != 0
+    np.divide(data, bias[..., np.newaxis], out=data, where=nonzero[..., np.newaxis])
+    data[~nonzero] = 0
+    np.maximum(data, 0, out=data)
+
+    hdr = img.header.copy()
+    hdr.set_data_dtype(np.float32)
+    out_file = op.abspath(op.basename(in_file).split('.')[0] + '_bias_corrected.nii.gz')
+    nib.Nifti1Image(data, img.affine, hdr).to_filename(out_file)
+    return out_file
+
+
+def recompose_modulated_dwi(in_dwi, in_bval, in_corrected, in_factors):
+    """
+    Replace the DWI volumes (b-value != 0) of a dataset by the corrected volumes multiplied by
+    a factor (e.g. the determinant of the Jacobian of their affine registration), with negative
+    values set to 0.
+
+    Args:
+        in_dwi (str): DWI dataset.
+        in_bval (str): b-values of the DWI dataset.
+        in_corrected (str): 4D volume of the corrected DWI volumes.
+        in_factors (list of float): Factor of each corrected volume.
+
+    Returns:
+        out_file (str): The DWI dataset with the corrected volumes.
+    """
+    import os.path as op
+    import nibabel as nib
+    import numpy as np
+
+    img = nib.load(in_dwi)
+    data = np.asanyarray(img.dataobj).astype(np.float32)
+    dwis = np.where(np.loadtxt(in_bval) != 0)[0]
+    corrected = nib.load(in_corrected)
+
+    if not (len(dwis) == corrected.shape[3] == len(in_factors)):
+        raise ValueError('Number of DWIs, corrected volumes and factors mismatch '
+                         '(# DWI = %s, # corrected = %s, # factors = %s)'
+                         % (len(dwis), corrected.shape[3], len(in_factors)))
+
+    for t, (dwi, factor) in enumerate(zip(dwis, in_factors)):
+        data[..., dwi] = np.maximum(np.asanyarray(corrected.dataobj[..., t]) * factor, 0)
+
+    hdr = img.header.copy()
+    hdr.set_data_dtype(np.float32)
+    out_file = op.abspath(op.basename(in_dwi).split('.')[0] + '_eccorrect.nii.gz')
+    nib.Nifti1Image(data, img.affine, hdr).to_filename(out_file)
+    return out_file
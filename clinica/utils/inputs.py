@@ -254,13 +254,12 @@ def clinica_file_reader(
         for elem in information.keys()
     ), "'information' can only contain the keys 'pattern', 'description' and 'needed_pipeline'"
 
-    pattern = information["pattern"]
-    is_bids = determine_caps_or_bids(input_directory)
+    from clinica.utils.dataset_index import get_dataset_index, is_indexable_pattern
 
-    if is_bids:
-        check_bids_folder(input_directory)
-    else:
-        check_caps_folder(input_directory)
+    pattern = information["pattern"]
+    dataset_index = get_dataset_index(input_directory)
+    # Equivalent to determine_caps_or_bids followed by check_bids_folder/check_caps_folder
+    is_bids = dataset_index.is_bids()
 
     # Some check on the formatting on the data
     assert pattern[0] != "/", (
@@ -274,19 +273,32 @@ def clinica_file_reader(
     if len(subjects) == 0:
         return []
 
+    # Files found for each subject/session
+    if is_indexable_pattern(pattern):
+        found_per_session = [
+            [join(input_directory, found_file) for found_file in found_files]
+            for found_files in dataset_index.find_session_files(
+                subjects, sessions, pattern, is_bids
+            )
+        ]
+    else:
+        found_per_session = []
+        for sub, ses in zip(subjects, sessions):
+            if is_bids:
+                origin_pattern = join(input_directory, sub, ses)
+            else:
+                origin_pattern = join(input_directory, "subjects", sub, ses)
+
+            current_pattern = join(origin_pattern, "**/", pattern)
+            found_per_session.append(
+                insensitive_glob(current_pattern, recursive=True)
+            )
+
     # results is the list containing the results
     results = []
     # error is the list of the errors that happen during the whole process
     error_encountered = []
-    for sub, ses in zip(subjects, sessions):
-        if is_bids:
-            origin_pattern = join(input_directory, sub, ses)
-        else:
-            origin_pattern = join(input_directory, "subjects", sub, ses)
-
-        current_pattern = join(origin_pattern, "**/", pattern)
-        current_glob_found = insensitive_glob(current_pattern, recursive=True)
-
+    for sub, ses, current_glob_found in zip(subjects, sessions, found_per_session):
         # Error handling if more than 1 file are found, or when no file is found
         if len(current_glob_found) > 1:
             error_str = f"\t* {Fore.BLUE}  ({sub} | {ses}) {Fore.RESET}: More than 1 file found:\n"
@@ -344,6 +356,7 @@ def clinica_group_reader(caps_directory, information, raise_exception=True):
     """
     from os.path import join
     from colorama import Fore
+    from clinica.utils.dataset_index import get_dataset_index, is_indexable_pattern
     from clinica.utils.exceptions import ClinicaCAPSError
 
     assert isinstance(
@@ -364,8 +377,14 @@ def clinica_group_reader(caps_directory, information, raise_exception=True):
 
     check_caps_folder(caps_directory)
 
-    current_pattern = join(caps_directory, "**/", pattern)
-    current_glob_found = insensitive_glob(current_pattern, recursive=True)
+    if is_indexable_pattern(pattern):
+        current_glob_found = [
+            join(caps_directory, found_file)
+            for found_file in get_dataset_index(caps_directory).find_files(pattern)
+        ]
+    else:
+        current_pattern = join(caps_directory, "**/", pattern)
+        current_glob_found = insensitive_glob(current_pattern, recursive=True)
 
     if len(current_glob_found) != 1 and raise_exception is True:
         error_string = f"{Fore.RED}\n[Error] Clinica encountered a problem while getting {information['description']}. "
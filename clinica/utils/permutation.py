@@ -0,0 +1,339 @@
+# coding: utf8
+
+"""
+This module contains a permutation engine for the group statistics.
+
+The engine computes family-wise error (FWE) corrected p-values of a GLM contrast on images
+(statistics-volume) or surfaces (statistics-surface) from the null distributions of the
+maximum t-statistic and of the maximum cluster size. The nuisance regressors are handled with
+the Freedman-Lane procedure [Winkler et al., 2014, NeuroImage 92:381-397]: the residuals of
+the model without the regressors of interest are permuted and added back to its fitted values.
+"""
+
+
+def grid_edges(mask, connectivity=6):
+    """
+    Get the pairs of neighbouring voxels of a mask.
+
+    Args:
+        mask (np.ndarray): 3D boolean mask.
+        connectivity (int): 6 (faces), 18 (faces and edges) or 26 (faces, edges and corners).
+
+    Returns:
+        Array of shape (n_edges, 2) of indices in the voxels of the mask (order of mask[mask]).
+    """
+    import numpy as np
+    from scipy.ndimage import generate_binary_structure
+
+    connectivity_to_rank = {6: 1, 18: 2, 26: 3}
+    if connectivity not in connectivity_to_rank:
+        raise ValueError('Connectivity must be 6, 18 or 26 (given: %s)' % connectivity)
+    structure = generate_binary_structure(3, connectivity_to_rank[connectivity])
+
+    index = np.full(mask.shape, -1, dtype=np.int64)
+    index[mask] = np.arange(np.count_nonzero(mask))
+    edges = []
+    # Half of the neighbours (the other half gives the same edges reversed)
+    for offset in np.argwhere(structure) - 1:
+        if tuple(offset) <= (0, 0, 0):
+            continue
+        source = tuple(slice(None, -1) if o > 0 else slice(1, None) if o < 0 else slice(None) for o in offset)
+        target = tuple(slice(1, None) if o > 0 else slice(None, -1) if o < 0 else slice(None) for o in offset)
+        source_index, target_index = index[source].ravel(), index[target].ravel()
+        in_mask = (source_index >= 0) & (target_index >= 0)
+        edges.append(np.column_stack([source_index[in_mask], target_index[in_mask]]))
+    return np.concatenate(edges)
+
+
+def restrict_edges(edges, mask):
+    """
+    Get the edges of a graph (e.g. a mesh) between the vertices of a mask.
+
+    Args:
+        edges (np.ndarray): Array of shape (n_edges, 2) of indices of vertices.
+        mask (np.ndarray): Boolean vector of the vertices to keep.
+
+    Returns:
+        Array of shape (n_kept_edges, 2) of indices in the vertices of the mask (order of mask[mask]).
+    """
+    import numpy as np
+
+    index = np.full(len(mask), -1, dtype=np.int64)
+    index[mask] = np.arange(np.count_nonzero(mask))
+    edges = index[edges]
+    return edges[(edges >= 0).all(axis=1)]
+
+
+def random_permutations(n_observations, n_permutations, seed=0):
+    """
+    Draw permutations of the observations, the first one being the identity.
+
+    Args:
+        n_observations (int): Number of observations (subjects/sessions).
+        n_permutations (int): Number of permutations, including the identity.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Array of shape (n_permutations, n_observations).
+    """
+    import numpy as np
+
+    generator = np.random.default_rng(seed)
+    permutations = np.empty((n_permutations, n_observations), dtype=np.int64)
+    permutations[0] = np.arange(n_observations)
+    for i in range(1, n_permutations):
+        permutations[i] = generator.permutation(n_observations)
+    return permutations
+
+
+def cluster_labels(supra_threshold, edges):
+    """
+    Label the connected components of the supra-threshold features of a graph.
+
+    Args:
+        supra_threshold (np.ndarray): Boolean vector of the features above the cluster-forming threshold.
+        edges (np.ndarray): Array of shape (n_edges, 2) of neighbouring features.
+
+    Returns:
+        Vector of the labels of the features (0 below the threshold, clusters numbered from 1) and vector of the sizes
+        of the clusters (first element being 0).
+    """
+    import numpy as np
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    labels = np.zeros(len(supra_threshold), dtype=np.int64)
+    nodes = np.flatnonzero(supra_threshold)
+    if len(nodes) == 0:
+        return labels, np.zeros(1, dtype=np.int64)
+    local_index = np.full(len(supra_threshold), -1, dtype=np.int64)
+    local_index[nodes] = np.arange(len(nodes))
+    supra_edges = local_index[edges[supra_threshold[edges[:, 0]] & supra_threshold[edges[:, 1]]]]
+    graph = coo_matrix((np.ones(len(supra_edges), dtype=np.int8), (supra_edges[:, 0], supra_edges[:, 1])),
+                       shape=(len(nodes), len(nodes)))
+    _, components = connected_components(graph, directed=False)
+    labels[nodes] = components + 1
+    sizes = np.bincount(labels)
+    sizes[0] = 0
+    return labels, sizes
+
+
+class PermutationEngine:
+    """
+    Permutation inference of a contrast of a GLM fitted on a set of images or surfaces.
+
+    The engine works on a (n_observations x n_features) matrix, e.g. the voxels of a mask or the
+    vertices of a surface. It writes the residuals of the reduced model (without the effect of
+    interest) to a memory-mapped file read by worker processes. Each worker processes its
+    permutations by batches: all the GLMs of a batch are solved with two matrix products per block
+    of features, since the fitted values of the reduced model do not change the contrast nor the
+    residuals of the full model.
+
+    Example:
+        >>> from clinica.utils.permutation import PermutationEngine, grid_edges
+        >>> engine = PermutationEngine(design_matrix, [-1, 1, 0], n_permutations=5000,
+        ...                            cluster_threshold=3.1, edges=grid_edges(mask), n_procs=4)
+        >>> results = engine.run(data, working_directory='.')
+    """
+
+    def __init__(self, design_matrix, contrast, n_permutations=5000, seed=0, cluster_threshold=None, edges=None,
+                 n_procs=1, batch_size=64, block_size=None):
+        """
+        Args:
+            design_matrix (np.ndarray): Design matrix of shape (n_observations, n_regressors).
+            contrast (list[float]): Contrast on the regressors (t-test of contrast.dot(beta) > 0).
+            n_permutations (int): Number of permutations, including the identity.
+            seed (int): Seed of the random permutations.
+            cluster_threshold (Optional[float]): Cluster-forming threshold on the t values. If None, only the null
+                distribution of the maximum t value is computed.
+            edges (Optional[np.ndarray]): Pairs of neighbouring features (see grid_edges and restrict_edges),
+                needed by the cluster-wise inference.
+            n_procs (int): Number of worker processes.
+            batch_size (int): Maximal number of permutations processed at once by a worker.
+            block_size (Optional[int]): Number of features of the blocks of the residuals.
+        """
+        import numpy as np
+        from scipy.linalg import null_space, orth
+        from clinica.utils.exceptions import ClinicaException
+
+        design_matrix = np.asarray(design_matrix, dtype=np.float64)
+        contrast = np.asarray(contrast, dtype=np.float64).ravel()
+        if contrast.shape != (design_matrix.shape[1],):
+            raise ClinicaException('The contrast must have one weight per column of the design matrix '
+                                   '(given: %d weights for %d columns).' % (contrast.size, design_matrix.shape[1]))
+        pinv_design = np.linalg.pinv(design_matrix)
+        if not np.allclose(contrast.dot(pinv_design).dot(design_matrix), contrast):
+            raise ClinicaException('The contrast is not estimable with this design matrix.')
+        if cluster_threshold is not None and edges is None:
+            raise ClinicaException('The edges between features are needed by the cluster-wise inference.')
+        if n_permutations < 1:
+            raise ClinicaException('The number of permutations must be positive (given: %s).' % n_permutations)
+
+        self.n_observations = design_matrix.shape[0]
+        # Reduced model: part of the design orthogonal to the contrast
+        self.nuisance = orth(design_matrix.dot(null_space(contrast[np.newaxis, :])))
+        # Contrast of the estimates as weights of the observations, and basis of the full model
+        self.contrast_weights = pinv_design.T.dot(contrast)
+        self.model_basis = orth(design_matrix)
+        self.df = self.n_observations - self.model_basis.shape[1]
+        if self.df < 1:
+            raise ClinicaException('The design matrix leaves no degree of freedom for the residuals.')
+
+        self.n_permutations = n_permutations
+        self.seed = seed
+        self.cluster_threshold = cluster_threshold
+        self.edges = None if edges is None else np.asarray(edges, dtype=np.int64)
+        self.n_procs = n_procs
+        self.batch_size = batch_size
+        self.block_size = block_size
+
+    def run(self, data, working_directory='.'):
+        """
+        Compute the FWE-corrected p-values of the contrast.
+
+        Args:
+            data (np.ndarray): (n_observations, n_features) matrix, possibly memory-mapped.
+            working_directory (str): Directory of the memory-mapped residuals.
+
+        Returns:
+            Dictionary of arrays: t values ('t'), peak-level FWE p-values ('peak_p_values'), null distribution of
+            the maximum t value ('max_t'), and if a cluster-forming threshold is given, clusters of the t map
+            ('cluster_labels', 0 below the threshold), cluster-level FWE p-values of its features
+            ('cluster_p_values'), cluster sizes ('cluster_sizes') and null distribution of the maximum cluster
+            size ('max_cluster_size').
+        """
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        import numpy as np
+        from clinica.utils.exceptions import ClinicaException
+        from clinica.utils.stream import cprint
+
+        n_observations, n_features = data.shape
+        if n_observations != self.n_observations:
+            raise ClinicaException('Number of observations of the data (%d) and of the design matrix (%d) mismatch.'
+                                   % (n_observations, self.n_observations))
+        block_size = self.block_size or max(1, 2 ** 22 // n_observations)
+
+        # Memory-mapped residuals of the reduced model and edges read by the workers
+        residuals_file = os.path.abspath(os.path.join(working_directory, 'permutation_residuals.npy'))
+        edges_file = None
+        if self.cluster_threshold is not None:
+            edges_file = os.path.abspath(os.path.join(working_directory, 'permutation_edges.npy'))
+        try:
+            residuals = np.lib.format.open_memmap(residuals_file, mode='w+', dtype=np.float32,
+                                                  shape=(n_observations, n_features))
+            for start in range(0, n_features, block_size):
+                y = np.array(data[:, start:start + block_size], dtype=np.float64)
+                residuals[:, start:start + block_size] = y - self.nuisance.dot(self.nuisance.T.dot(y))
+            residuals.flush()
+            del residuals
+
+            permutations = random_permutations(n_observations, self.n_permutations, self.seed)
+            batch_size = max(1, min(self.batch_size, 2 ** 25 // n_features))
+            batches = [permutations[i:i + batch_size] for i in range(0, self.n_permutations, batch_size)]
+            if edges_file is not None:
+                np.save(edges_file, self.edges)
+            arguments = (residuals_file, self.contrast_weights, self.model_basis, self.df, self.cluster_threshold,
+                         edges_file, block_size)
+
+            cprint('Running %d permutations (%d batches) with %d process(es)'
+                   % (self.n_permutations, len(batches), self.n_procs))
+            observed_t = _t_statistics(np.load(residuals_file, mmap_mode='r'), permutations[:1], self.contrast_weights,
+                                       self.model_basis, self.df, block_size)[0]
+            if self.n_procs > 1:
+                with ProcessPoolExecutor(max_workers=self.n_procs) as executor:
+                    null_batches = list(executor.map(_permutation_batch, batches, *[[a] * len(batches) for a in arguments]))
+            else:
+                null_batches = [_permutation_batch(batch, *arguments) for batch in batches]
+            max_t = np.concatenate([null_batch[0] for null_batch in null_batches])
+
+            # The identity belongs to the null distribution, hence p-values >= 1 / n_permutations
+            sorted_max_t = np.sort(max_t)
+            results = {
+                't': observed_t,
+                'peak_p_values': (self.n_permutations - np.searchsorted(sorted_max_t, observed_t, side='left'))
+                / self.n_permutations,
+                'max_t': max_t,
+            }
+
+            if self.cluster_threshold is not None:
+                max_cluster_size = np.concatenate([null_batch[1] for null_batch in null_batches])
+                labels, sizes = cluster_labels(observed_t >= self.cluster_threshold, self.edges)
+                sorted_max_cluster_size = np.sort(max_cluster_size)
+                cluster_p_values = (self.n_permutations
+                                    - np.searchsorted(sorted_max_cluster_size, sizes, side='left')) / self.n_permutations
+                cluster_p_values[0] = 1
+                results.update({
+                    'cluster_labels': labels,
+                    'cluster_sizes': sizes[1:],
+                    'cluster_p_values': cluster_p_values[labels],
+                    'max_cluster_size': max_cluster_size,
+                })
+        finally:
+            for filename in [residuals_file, edges_file]:
+                if filename is not None and os.path.exists(filename):
+                    os.remove(filename)
+
+        return results
+
+
+def write_null_distributions(results, filename):
+    """
+    Write the null distributions of a PermutationEngine to a TSV file (one row per permutation, the first one being
+    the identity).
+
+    Args:
+        results (dict): Output of PermutationEngine.run.
+        filename (str): Path to the TSV file.
+    """
+    import pandas
+
+    columns = {'permutation': range(len(results['max_t'])), 'max_t': results['max_t']}
+    if 'max_cluster_size' in results:
+        columns['max_cluster_size'] = results['max_cluster_size']
+    pandas.DataFrame(columns).to_csv(filename, sep='\t', index=False)
+
+
+def _t_statistics(residuals, permutations, contrast_weights, model_basis, df, block_size):
+    """t values of a batch of permutations of the residuals of the reduced model (n_permutations x n_features)."""
+    import numpy as np
+
+    n_permutations = len(permutations)
+    n_basis = model_basis.shape[1]
+    # Permuting the data is permuting the weights of the observations: (w' P) = (P' w)'
+    weights = np.empty((n_permutations, len(contrast_weights)))
+    bases = np.empty((n_permutations, len(contrast_weights), n_basis))
+    for i, permutation in enumerate(permutations):
+        weights[i, permutation] = contrast_weights
+        bases[i, permutation] = model_basis
+    bases = bases.transpose(0, 2, 1).reshape(n_permutations * n_basis, -1)
+    contrast_variance = contrast_weights.dot(contrast_weights)
+
+    n_features = residuals.shape[1]
+    t = np.empty((n_permutations, n_features), dtype=np.float32)
+    for start in range(0, n_features, block_size):
+        y = np.array(residuals[:, start:start + block_size], dtype=np.float64)
+        effects = weights.dot(y)
+        projections = bases.dot(y).reshape(n_permutations, n_basis, -1)
+        residual_ss = (y ** 2).sum(axis=0) - (projections ** 2).sum(axis=1)
+        standard_error = np.sqrt(np.maximum(residual_ss, 0) / df * contrast_variance)
+        t[:, start:start + block_size] = np.divide(effects, standard_error, out=np.zeros_like(effects),
+                                                   where=standard_error > 1e-12 * np.sqrt(contrast_variance))
+    return t
+
+
+def _permutation_batch(permutations, residuals_file, contrast_weights, model_basis, df, cluster_threshold,
+                       edges_file, block_size):
+    """Maximum t value and maximum cluster size of each permutation of a batch (run by the worker processes)."""
+    import numpy as np
+
+    residuals = np.load(residuals_file, mmap_mode='r')
+    t = _t_statistics(residuals, permutations, contrast_weights, model_basis, df, block_size)
+    max_t = t.max(axis=1)
+    if cluster_threshold is None:
+        return max_t, None
+
+    edges = np.load(edges_file, mmap_mode='r')
+    max_cluster_size = np.array([cluster_labels(permuted_t >= cluster_threshold, edges)[1].max()
+                                 for permuted_t in t])
+    return max_t, max_cluster_size
@@ -3,10 +3,154 @@
 """
 This module contains utilities for statistics.
 
-Currently, it contains one function to generate TSV file containing mean map based on a parcellation.
+Currently, it contains functions to generate TSV files containing mean maps based on a parcellation.
 """
 
-def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None):
+from collections import namedtuple
+
+# Voxels of the ROIs of an atlas, sorted by ROI:
+# - label_names / label_values: content of the TSV file of the atlas (one element per row)
+# - row_to_roi: position of the ROI of each row in the ROI arrays (LUT may contain duplicates)
+# - shape: shape of the label image
+# - roi_voxels: flat indices of the voxels belonging to a ROI, sorted by ROI
+# - roi_ids: ROI of each element of roi_voxels
+# - counts: number of voxels of each ROI
+# - starts: position of the first voxel of each ROI in roi_voxels
+AtlasLabelIndex = namedtuple(
+    "AtlasLabelIndex",
+    [
+        "label_names",
+        "label_values",
+        "row_to_roi",
+        "shape",
+        "roi_voxels",
+        "roi_ids",
+        "counts",
+        "starts",
+    ],
+)
+
+_ATLAS_LABEL_INDEX_CACHE = {}
+
+
+def get_atlas_label_index(in_atlas):
+    """
+    Get the label index of an atlas.
+
+    The label image and the TSV file of the atlas are read once per process:
+    the index is cached as long as these files are not modified.
+
+    Args:
+        in_atlas (:obj: AbstractClass): An atlas with a set of ROI.
+
+    Returns:
+        An AtlasLabelIndex.
+    """
+    import os
+    import nibabel as nib
+    import numpy as np
+    import pandas
+
+    atlas_labels = in_atlas.get_atlas_labels()
+    tsv_roi = in_atlas.get_tsv_roi()
+    key = (
+        atlas_labels,
+        os.stat(atlas_labels).st_mtime_ns,
+        tsv_roi,
+        os.stat(tsv_roi).st_mtime_ns,
+    )
+    if key in _ATLAS_LABEL_INDEX_CACHE:
+        return _ATLAS_LABEL_INDEX_CACHE[key]
+
+    atlas_correspondence = pandas.io.parsers.read_csv(tsv_roi, sep='\t')
+    label_names = list(atlas_correspondence.roi_name)
+    label_values = np.array(atlas_correspondence.roi_value)  # TODO create roi_value column in lut_*.txt and remove irrelevant RGB information
+    roi_values, row_to_roi = np.unique(label_values, return_inverse=True)
+    n_rois = len(roi_values)
+
+    atlas_labels_img = nib.load(atlas_labels)
+    atlas_labels_data = atlas_labels_img.get_fdata().ravel()
+
+    # ROI of each voxel (n_rois for voxels outside the ROIs of the TSV file)
+    voxel_rois = np.searchsorted(roi_values, atlas_labels_data)
+    voxel_rois[voxel_rois == n_rois] = 0
+    voxel_rois[roi_values[voxel_rois] != atlas_labels_data] = n_rois
+
+    counts = np.bincount(voxel_rois, minlength=n_rois + 1)[:n_rois]
+    roi_voxels = np.argsort(voxel_rois, kind='stable')[:counts.sum()]
+    roi_ids = np.repeat(np.arange(n_rois, dtype=np.int32), counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    label_index = AtlasLabelIndex(
+        label_names=label_names,
+        label_values=label_values,
+        row_to_roi=row_to_roi,
+        shape=atlas_labels_img.shape[:3],
+        roi_voxels=roi_voxels,
+        roi_ids=roi_ids,
+        counts=counts,
+        starts=starts,
+    )
+    _ATLAS_LABEL_INDEX_CACHE[key] = label_index
+    return label_index
+
+
+def roi_statistics(img_data, label_index, median=False):
+    """
+    Compute the statistics of an image on each ROI of an atlas in a single sweep.
+
+    Args:
+        img_data (np.ndarray): Image registered on the atlas.
+        label_index (AtlasLabelIndex): Label index of the atlas (see get_atlas_label_index).
+        median (bool): If True, the median of each ROI is also computed.
+
+    Returns:
+        Dictionary of arrays (one element per row of the TSV file of the atlas) with keys
+        'mean', 'std', 'n_voxels', 'min', 'max' (and 'median'). Statistics of
+        ROIs without voxels are NaN.
+    """
+    import numpy as np
+
+    if img_data.shape[:3] != label_index.shape:
+        raise ValueError(
+            "Image of shape %s is not registered on the atlas (shape %s)"
+            % (img_data.shape, label_index.shape)
+        )
+
+    counts = label_index.counts
+    non_empty = counts > 0
+    values = np.asarray(img_data, dtype=np.float64).ravel()[label_index.roi_voxels]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.bincount(label_index.roi_ids, weights=values, minlength=len(counts)) / counts
+        deviation = values - mean[label_index.roi_ids]
+        std = np.sqrt(
+            np.bincount(label_index.roi_ids, weights=deviation * deviation, minlength=len(counts)) / counts
+        )
+
+    minimum = np.full(len(counts), np.nan)
+    maximum = np.full(len(counts), np.nan)
+    if values.size > 0:
+        minimum[non_empty] = np.minimum.reduceat(values, label_index.starts[non_empty])
+        maximum[non_empty] = np.maximum.reduceat(values, label_index.starts[non_empty])
+
+    statistics = {
+        'mean': mean,
+        'std': std,
+        'n_voxels': counts,
+        'min': minimum,
+        'max': maximum,
+    }
+    if median:
+        statistics['median'] = np.array([
+            np.median(values[start:start + count]) if count > 0 else np.nan
+            for start, count in zip(label_index.starts, counts)
+        ])
+
+    return {name: statistic[label_index.row_to_roi] for name, statistic in statistics.items()}
+
+
+def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None, extra_statistics=False, median=False):
     """
     Compute statistics of a map on an atlas.
 
@@ -19,53 +163,172 @@ def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None):
         in_atlas (:obj: AbstractClass): An atlas with a set of ROI. These ROI
             are used to compute statistics.
         out_file (Optional[str]): Name of the output file.
+        extra_statistics (Optional[bool]): If True, the standard deviation, the number of voxels,
+            the minimum and the maximum of each ROI are also saved.
+        median (Optional[bool]): If True, the median of each ROI is also saved.
 
     Returns:
         out_file (str): TSV file containing the statistics (content of the
-            columns: label, mean scalar, std of the scalar', number of voxels).
+            columns: label, mean scalar[, std of the scalar, number of voxels, min, max, median]).
     """
-    from clinica.utils.atlas import AtlasAbstract
-    import nibabel as nib
-    import numpy as np
-    import pandas
-    import os.path as op
-    from clinica.utils.stream import cprint
+    return statistics_on_atlases(
+        in_normalized_map, [in_atlas], None if out_file is None else [out_file],
+        extra_statistics=extra_statistics, median=median
+    )[0]
+
 
-    if not isinstance(in_atlas, AtlasAbstract):
-        raise Exception("Atlas element must be an AtlasAbstract type")
+def statistics_on_atlases(in_normalized_map, in_atlas_list, out_file_list=None, extra_statistics=False, median=False):
+    """
+    Compute statistics of a map on several atlases.
+
+    The map is loaded once and the label index of each atlas is cached (see
+    get_atlas_label_index).
+
+    Args:
+        in_normalized_map (str): File containing a scalar image registered
+            on the atlases.
+        in_atlas_list (list[:obj: AbstractClass]): Atlases with a set of ROI.
+        out_file_list (Optional[list[str]]): Names of the output files (one per atlas).
+        extra_statistics (Optional[bool]): See statistics_on_atlas.
+        median (Optional[bool]): See statistics_on_atlas.
 
-    if out_file is None:
+    Returns:
+        out_file_list (list[str]): TSV files containing the statistics.
+    """
+    import os.path as op
+
+    if out_file_list is None:
         fname, ext = op.splitext(op.basename(in_normalized_map))
         if ext == ".gz":
             fname, ext2 = op.splitext(fname)
             ext = ext2 + ext
-        out_file = op.abspath("%s_statistics_%s.tsv"
-                              % (fname, in_atlas.get_name_atlas()))
-
-    atlas_labels = nib.load(in_atlas.get_atlas_labels())
-    atlas_labels_data = atlas_labels.get_data()
-
-    img = nib.load(in_normalized_map)
-    img_data = img.get_data()
-
-    atlas_correspondence = pandas.io.parsers.read_csv(in_atlas.get_tsv_roi(), sep='\t')
-    label_name = list(atlas_correspondence.roi_name)
-    label_value = list(atlas_correspondence.roi_value)  # TODO create roi_value column in lut_*.txt and remove irrelevant RGB information
-
-    mean_signal_value = []
-    for label in label_value:
-        current_mask_label = atlas_labels_data == label
-        masked_data = np.array(img_data, copy=True)
-        masked_data[np.invert(current_mask_label)] = 0
-        mean_signal_value.append(np.sum(masked_data) / np.sum(current_mask_label))
-
-    try:
-        data = pandas.DataFrame({'label_name': label_name,
-                                 'mean_scalar': mean_signal_value
-                                 })
-        data.to_csv(out_file, sep='\t', index=True, encoding='utf-8')
-    except Exception as e:
-        cprint("Impossible to save %s with pandas" % out_file)
-        raise e
-
-    return out_file
+        out_file_list = [op.abspath("%s_statistics_%s.tsv" % (fname, in_atlas.get_name_atlas()))
+                         for in_atlas in in_atlas_list]
+
+    engine = AtlasStatisticsEngine(in_atlas_list, extra_statistics=extra_statistics, median=median)
+    engine.run([in_normalized_map], out_file_lists=[out_file_list])
+
+    return out_file_list
+
+
+class AtlasStatisticsEngine:
+    """
+    Compute the statistics of a set of images on a set of atlases.
+
+    Each atlas is loaded once: the flat indices of the voxels of its ROIs are
+    computed when the engine is created (see get_atlas_label_index), then the
+    images are streamed through all the atlases, each image being loaded once.
+
+    Example:
+        >>> from clinica.utils.atlas import AAL2, Hammers
+        >>> from clinica.utils.statistics import AtlasStatisticsEngine
+        >>> engine = AtlasStatisticsEngine([AAL2(), Hammers()])
+        >>> engine.run(image_list, long_format_files=['aal2.tsv', 'hammers.tsv'])
+    """
+
+    def __init__(self, in_atlas_list, extra_statistics=False, median=False):
+        """
+        Args:
+            in_atlas_list (list[:obj: AbstractClass]): Atlases with a set of ROI.
+            extra_statistics (Optional[bool]): See statistics_on_atlas.
+            median (Optional[bool]): See statistics_on_atlas.
+        """
+        from clinica.utils.atlas import AtlasAbstract
+
+        if not all(isinstance(in_atlas, AtlasAbstract) for in_atlas in in_atlas_list):
+            raise Exception("Atlas element must be an AtlasAbstract type")
+
+        self.atlas_list = list(in_atlas_list)
+        self.label_indexes = [get_atlas_label_index(in_atlas) for in_atlas in self.atlas_list]
+        self.extra_statistics = extra_statistics
+        self.median = median
+
+    def _columns(self, statistics):
+        columns = {'mean_scalar': statistics['mean']}
+        if self.extra_statistics:
+            columns.update({'std_scalar': statistics['std'],
+                            'n_voxels': statistics['n_voxels'],
+                            'min_scalar': statistics['min'],
+                            'max_scalar': statistics['max']})
+        if self.median:
+            columns['median_scalar'] = statistics['median']
+        return columns
+
+    def image_statistics(self, img_data):
+        """
+        Compute the statistics of an image on each atlas.
+
+        Args:
+            img_data (np.ndarray): Image registered on the atlases.
+
+        Returns:
+            List (one element per atlas) of dictionaries of arrays (see roi_statistics).
+        """
+        return [roi_statistics(img_data, label_index, median=self.median)
+                for label_index in self.label_indexes]
+
+    def run(self, in_images, out_file_lists=None, long_format_files=None, image_ids=None, n_threads=1):
+        """
+        Compute the statistics of images on the atlases.
+
+        Args:
+            in_images (list[str]): Files containing scalar images registered on the atlases.
+            out_file_lists (Optional[list[list[str]]]): For each image, names of the TSV
+                files (one per atlas) with the format of statistics_on_atlas.
+            long_format_files (Optional[list[str]]): Names of the TSV files (one per atlas)
+                gathering the statistics of all the images (one row per image and ROI).
+            image_ids (Optional[list[str]]): Identifiers of the images in the long format
+                tables (default: file names without extension).
+            n_threads (Optional[int]): Number of images loaded in parallel.
+
+        Returns:
+            List (one element per atlas) of pandas.DataFrame in long format.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        import os.path as op
+        import nibabel as nib
+        import numpy as np
+        import pandas
+        from clinica.utils.stream import cprint
+
+        if image_ids is None:
+            image_ids = [op.basename(in_image).split('.')[0] for in_image in in_images]
+
+        def load_image(in_image):
+            return nib.load(in_image).get_fdata()
+
+        # Long format columns for each atlas, as lists of per-image arrays
+        long_format_columns = [{} for _ in self.atlas_list]
+        with ThreadPoolExecutor(max_workers=max(n_threads, 1)) as executor:
+            for chunk_start in range(0, len(in_images), max(n_threads, 1)):
+                chunk = range(chunk_start, min(chunk_start + max(n_threads, 1), len(in_images)))
+                for position, img_data in zip(chunk, executor.map(load_image, [in_images[i] for i in chunk])):
+                    for atlas_position, statistics in enumerate(self.image_statistics(img_data)):
+                        label_index = self.label_indexes[atlas_position]
+                        columns = self._columns(statistics)
+                        if out_file_lists is not None:
+                            out_file = out_file_lists[position][atlas_position]
+                            try:
+                                data = pandas.DataFrame(dict({'label_name': label_index.label_names}, **columns))
+                                data.to_csv(out_file, sep='\t', index=True, encoding='utf-8')
+                            except Exception as e:
+                                cprint("Impossible to save %s with pandas" % out_file)
+                                raise e
+                        atlas_columns = long_format_columns[atlas_position]
+                        for name, values in dict(
+                            {'image_id': np.repeat(image_ids[position], len(label_index.label_names)),
+                             'label_name': label_index.label_names,
+                             'label_value': label_index.label_values},
+                            **columns
+                        ).items():
+                            atlas_columns.setdefault(name, []).append(np.asarray(values))
+
+        long_format_data = [
+            pandas.DataFrame({name: np.concatenate(values) for name, values in atlas_columns.items()})
+            for atlas_columns in long_format_columns
+        ]
+        if long_format_files is not None:
+            for data, long_format_file in zip(long_format_data, long_format_files):
+                data.to_csv(long_format_file, sep='\t', index=False, encoding='utf-8')
+
+        return long_format_data
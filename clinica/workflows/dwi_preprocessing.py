@@ -142,7 +142,7 @@ def b0_flirt_pipeline(num_b0s, name='b0_coregistration'):
     from nipype.interfaces import fsl
     import nipype.interfaces.utility as niu
 
-    from clinica.utils.dwi import merge_volumes_tdim
+    from clinica.utils.dwi import merge_volumes_tdim, split_volumes, merge_volumes_remove_negative
 
     inputnode = pe.Node(niu.IdentityInterface(fields=['in_file']),
                         name='inputnode')
@@ -150,7 +150,10 @@ def b0_flirt_pipeline(num_b0s, name='b0_coregistration'):
     tsize = num_b0s - 1
     fslroi_moving = pe.Node(fsl.ExtractROI(args='1 '+str(tsize)),
                             name='b0_moving')
-    split_moving = pe.Node(fsl.Split(dimension='t'), name='split_b0_moving')
+    split_moving = pe.Node(niu.Function(input_names=['in_file'],
+                                        output_names=['out_files'],
+                                        function=split_volumes),
+                           name='split_b0_moving')
 
     bet_ref = pe.Node(fsl.BET(frac=0.3, mask=True, robust=True),
                       name='bet_ref')
@@ -168,9 +171,10 @@ def b0_flirt_pipeline(num_b0s, name='b0_coregistration'):
         fine_search=1, coarse_search=10),
         name='b0_co_registration', iterfield=['in_file'])
 
-    merge = pe.Node(fsl.Merge(dimension='t'), name='merge_registered_b0s')
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='remove_negative')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['out_file'],
+                                 function=merge_volumes_remove_negative),
+                    name='merge_registered_b0s')
     insert_ref = pe.Node(niu.Function(input_names=['in_file1', 'in_file2'],
                                       output_names=['out_file'],
                                       function=merge_volumes_tdim),
@@ -191,9 +195,8 @@ def b0_flirt_pipeline(num_b0s, name='b0_coregistration'):
                          ('out_file', 'in_weight')]),
         (fslroi_ref, flirt, [('roi_file', 'reference')]),
         (split_moving, flirt, [('out_files', 'in_file')]),
-        (flirt, thres, [('out_file', 'in_file')]),
-        (thres, merge, [('out_file', 'in_files')]),
-        (merge, insert_ref, [('merged_file', 'in_file2')]),
+        (flirt, merge, [('out_file', 'in_files')]),
+        (merge, insert_ref, [('out_file', 'in_file2')]),
         (fslroi_ref, insert_ref, [('roi_file', 'in_file1')]),
         (insert_ref, outputnode, [('out_file', 'out_file')]),
         (flirt, outputnode, [('out_matrix_file', 'out_xfms')])
@@ -228,6 +231,8 @@ def dwi_flirt(name='DWICoregistration', excl_nodiff=False, flirt_param={}):
 
     from nipype.workflows.dmri.fsl.utils import enhance
 
+    from clinica.utils.dwi import split_volumes, merge_volumes_remove_negative
+
     inputnode = pe.Node(
             niu.IdentityInterface(
                 fields=['reference',
@@ -251,13 +256,17 @@ def dwi_flirt(name='DWICoregistration', excl_nodiff=False, flirt_param={}):
                 nan2zeros=True,
                 args='-kernel sphere 5 -dilM'),
             name='MskDilate')
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
+    split = pe.Node(niu.Function(input_names=['in_file'],
+                                 output_names=['out_files'],
+                                 function=split_volumes),
+                    name='SplitDWIs')
     n4 = pe.Node(ants.N4BiasFieldCorrection(dimension=3), name='Bias')
     flirt = pe.MapNode(fsl.FLIRT(**flirt_param), name='CoRegistration',
                        iterfield=['in_file', 'in_matrix_file'])
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['out_file'],
+                                 function=merge_volumes_remove_negative),
+                    name='MergeDWIs')
     outputnode = pe.Node(
             niu.IdentityInterface(
                 fields=['out_file',
@@ -290,9 +299,8 @@ def dwi_flirt(name='DWICoregistration', excl_nodiff=False, flirt_param={}):
                          ('out_file', 'in_weight')]),
         (enhdw, flirt, [('out_file', 'in_file')]),
         (initmat, flirt, [('init_xfms', 'in_matrix_file')]),
-        (flirt,      thres,      [('out_file', 'in_file')]),
-        (thres,      merge,      [('out_file', 'in_files')]),
-        (merge,     outputnode, [('merged_file', 'out_file')]),
+        (flirt,      merge,      [('out_file', 'in_files')]),
+        (merge,     outputnode, [('out_file', 'out_file')]),
         (enhb0, outputnode, [('out_file', 'out_ref')]),
         (flirt,     outputnode, [('out_matrix_file', 'out_xfms')])
     ])
@@ -476,11 +484,10 @@ head-motion correction)
     from nipype.workflows.data import get_flirt_schedule
     from nipype.workflows.dmri.fsl.utils import extract_bval
     from nipype.workflows.dmri.fsl.utils import recompose_xfm
-    from nipype.workflows.dmri.fsl.utils import recompose_dwi
     from nipype.workflows.dmri.fsl.artifacts import _xfm_jacobian
 
     from clinica.workflows.dwi_preprocessing import dwi_flirt
-    from clinica.utils.dwi import merge_volumes_tdim
+    from clinica.utils.dwi import merge_volumes_tdim, recompose_modulated_dwi
 
     params = dict(dof=12, no_search=True, interp='spline', bgvalue=0,
                   schedule=get_flirt_schedule('ecc'))
@@ -497,18 +504,15 @@ head-motion correction)
 
     flirt = dwi_flirt(flirt_param=params, excl_nodiff=True)
 
-    mult = pe.MapNode(fsl.BinaryMaths(operation='mul'), name='ModulateDWIs',
-                      iterfield=['in_file', 'operand_value'])
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
     get_mat = pe.Node(niu.Function(
         input_names=['in_bval', 'in_xfms'], output_names=['out_files'],
         function=recompose_xfm), name='GatherMatrices')
+    # The DWIs are modulated by the determinant of the Jacobian of their
+    # registration, and their negative values removed, when they are merged
     merge = pe.Node(niu.Function(
-        input_names=['in_dwi', 'in_bval', 'in_corrected'],
-        output_names=['out_file'], function=recompose_dwi), name='MergeDWIs')
+        input_names=['in_dwi', 'in_bval', 'in_corrected', 'in_factors'],
+        output_names=['out_file'], function=recompose_modulated_dwi),
+        name='MergeDWIs')
 
     merged_volumes = pe.Node(niu.Function(
         input_names=['in_file1', 'in_file2'],
@@ -535,12 +539,9 @@ head-motion correction)
         (getb0,      flirt,        [('roi_file', 'inputnode.reference')]),
         (pick_dws,   flirt,        [('out_file', 'inputnode.in_file')]),
         (flirt,      get_mat,      [('outputnode.out_xfms', 'in_xfms')]),
-        (flirt,      mult,         [(('outputnode.out_xfms', _xfm_jacobian),
-                                     'operand_value')]),
-        (flirt,      split,        [('outputnode.out_file', 'in_file')]),
-        (split,      mult,         [('out_files', 'in_file')]),
-        (mult,       thres,        [('out_file', 'in_file')]),
-        (thres,      merge,        [('out_file', 'in_corrected')]),
+        (flirt,      merge,        [(('outputnode.out_xfms', _xfm_jacobian),
+                                     'in_factors')]),
+        (flirt,      merge,        [('outputnode.out_file', 'in_corrected')]),
         (get_mat,    outputnode,   [('out_files', 'out_xfms')]),
         (merge,      outputnode,   [('out_file', 'out_file')])
     ])
@@ -571,6 +572,8 @@ def remove_bias(name='bias_correct'):
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.ants as ants
 
+    from clinica.utils.dwi import remove_bias_field
+
     inputnode = pe.Node(niu.IdentityInterface(
         fields=['in_file']), name='inputnode')
 
@@ -585,12 +588,10 @@ def remove_bias(name='bias_correct'):
     n4 = pe.Node(ants.N4BiasFieldCorrection(
         dimension=3, save_bias=True, bspline_fitting_distance=600),
         name='Bias_b0')
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
-    mult = pe.MapNode(fsl.MultiImageMaths(op_string='-div %s'),
-                      iterfield=['in_file'], name='RemoveBiasOfDWIs')
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-    merge = pe.Node(fsl.utils.Merge(dimension='t'), name='MergeDWIs')
+    remove_bias_dwis = pe.Node(niu.Function(
+        input_names=['in_file', 'in_bias'],
+        output_names=['out_file'], function=remove_bias_field),
+        name='RemoveBiasOfDWIs')
 
     wf = pe.Workflow(name=name)
     wf.connect([
@@ -598,12 +599,9 @@ def remove_bias(name='bias_correct'):
         (get_b0,   n4, [('roi_file', 'input_image')]),
         (get_b0, mask_b0, [('roi_file', 'in_file')]),
         (mask_b0, n4, [('mask_file', 'mask_image')]),
-        (inputnode, split, [('in_file', 'in_file')]),
-        (n4,    mult, [('bias_image', 'operand_files')]),
-        (split, mult, [('out_files', 'in_file')]),
-        (mult, thres, [('out_file', 'in_file')]),
-        (thres, merge, [('out_file', 'in_files')]),
-        (merge,   outputnode, [('merged_file', 'out_file')]),
+        (inputnode, remove_bias_dwis, [('in_file', 'in_file')]),
+        (n4, remove_bias_dwis, [('bias_image', 'in_bias')]),
+        (remove_bias_dwis, outputnode, [('out_file', 'out_file')]),
         (mask_b0, outputnode, [('mask_file', 'b0_mask')])
     ])
     return wf
@@ -705,9 +703,14 @@ def epi_pipeline(name='susceptibility_distortion_correction_using_t1'):
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.c3 as c3
 
+    from clinica.utils.dwi import split_volumes, merge_volumes_remove_negative
+
     inputnode = pe.Node(niu.IdentityInterface(fields=['T1', 'DWI', 'bvec']), name='inputnode')
 
-    split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
+    split = pe.Node(niu.Function(input_names=['in_file'],
+                                 output_names=['out_files'],
+                                 function=split_volumes),
+                    name='SplitDWIs')
     pick_ref = pe.Node(niu.Select(), name='Pick_b0')
     pick_ref.inputs.index = [0]
 
@@ -771,14 +774,12 @@ def epi_pipeline(name='susceptibility_distortion_correction_using_t1'):
     jacobian.inputs.imageDimension = 3
     jacobian.inputs.outputImage = 'Jacobian_image.nii.gz'
 
-    jacmult = pe.MapNode(fsl.MultiImageMaths(op_string='-mul %s'),
-                         iterfield=['in_file', 'operand_files'],
-                         name='ModulateDWIs')
-
-    thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
-                       name='RemoveNegative')
-
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    # The warped DWIs are modulated by the determinant of the Jacobian, and
+    # their negative values removed, when they are merged
+    merge = pe.Node(niu.Function(input_names=['in_files', 'in_multipliers'],
+                                 output_names=['out_file'],
+                                 function=merge_volumes_remove_negative),
+                    name='MergeDWIs')
 
     outputnode = pe.Node(niu.IdentityInterface(fields=['DWI_2_T1_Coregistration_matrix',
                                                        'epi_correction_deformation_field',
@@ -815,12 +816,10 @@ def epi_pipeline(name='susceptibility_distortion_correction_using_t1'):
 
     wf.connect([(merge_transform, apply_transform, [('out', 'ants_warp_affine')])])
     wf.connect([(apply_transform, jacobian, [('out_warp_field', 'deformationField')])])
-    wf.connect([(apply_transform, jacmult, [('out_warped', 'operand_files')])])
-    wf.connect([(jacobian, jacmult, [('outputImage', 'in_file')])])
-    wf.connect([(jacmult, thres, [('out_file', 'in_file')])])
-    wf.connect([(thres, merge, [('out_file', 'in_files')])])
+    wf.connect([(apply_transform, merge, [('out_warped', 'in_files')])])
+    wf.connect([(jacobian, merge, [('outputImage', 'in_multipliers')])])
 
-    wf.connect([(merge, outputnode, [('merged_file', 'DWIs_epicorrected')])])
+    wf.connect([(merge, outputnode, [('out_file', 'DWIs_epicorrected')])])
     wf.connect([(flirt_b0_2_T1, outputnode, [('out_matrix_file', 'DWI_2_T1_Coregistration_matrix')])])
     wf.connect([(antsRegistrationSyNQuick, outputnode, [('warp', 'epi_correction_deformation_field'),
                                                         ('affine_matrix', 'epi_correction_affine_transform'),
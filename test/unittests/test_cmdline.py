@@ -0,0 +1,105 @@
+# coding: utf8
+
+"""
+    Unit tests of the `clinica` command line: the sub-commands are declared from the
+    registry (clinica.engine.registry) and only the requested one is imported.
+"""
+
+import warnings
+
+warnings.filterwarnings("ignore")
+
+# Code run in a new interpreter: run `clinica <arguments>` and print the imported modules
+CLINICA_SCRIPT = """
+import sys
+sys.argv = ['clinica'] + sys.argv[1:]
+from clinica.cmdline import execute
+try:
+    execute()
+except SystemExit:
+    pass
+sys.stderr.write('IMPORTED MODULES\\n' + '\\n'.join(sys.modules))
+"""
+
+
+def run_clinica(arguments):
+    import subprocess
+    import sys
+    from os.path import abspath, dirname, join, pardir
+
+    root = abspath(join(dirname(abspath(__file__)), pardir, pardir))
+    process = subprocess.run([sys.executable, '-c', CLINICA_SCRIPT] + arguments, cwd=root,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True, check=True)
+    # Warnings may be printed before the list of modules
+    modules = process.stderr.split('IMPORTED MODULES\n')[-1].splitlines()
+    return process.stdout, modules
+
+
+def test_help_imports():
+    output, modules = run_clinica(['--help'])
+
+    assert 'run' in output and 'convert' in output and 'iotools' in output
+    assert [m for m in modules if m.startswith('clinica.pipelines.')] == []
+    assert [m for m in modules if m.startswith('clinica.iotools.')] == []
+    for heavy_module in ['nipype', 'numpy', 'pandas', 'nibabel']:
+        assert heavy_module not in modules
+    assert len([m for m in modules if m.startswith('clinica')]) < 15
+
+
+def test_only_requested_command_is_imported():
+    output, modules = run_clinica(['run', 't1-linear', '--help'])
+
+    assert 'bids_directory' in output
+    cli_modules = [m for m in modules if m.startswith('clinica.') and m.endswith('_cli')]
+    assert cli_modules == ['clinica.pipelines.t1_linear.t1_linear_cli']
+
+
+def test_custom_pipelines_are_not_imported(tmp_path, monkeypatch):
+    from clinica.cmdline import ClinicaClassLoader
+    from clinica.engine import CmdParser
+
+    pipeline_dir = tmp_path / 'pipelines' / 'custom_pipeline'
+    pipeline_dir.mkdir(parents=True)
+    (pipeline_dir / 'custom_pipeline_cli.py').write_text(
+        'raise ImportError("custom_pipeline_cli must not be imported")\n'
+        'import clinica.engine as ce\n\n\n'
+        'class CustomPipelineCLI(ce.CmdParser):\n'
+        '    def define_name(self):\n'
+        '        self._name = "custom-pipeline"\n\n'
+        '    def define_description(self):\n'
+        '        self._description = ("Custom pipeline:\\n"\n'
+        '                             "http://clinica.run")\n'
+    )
+
+    monkeypatch.setenv('CLINICAPATH', str(tmp_path))
+    specs = ClinicaClassLoader(baseclass=CmdParser, extra_dir='pipelines').load_specs()
+
+    assert [(spec.name, spec.class_name, spec.help) for spec in specs] == [
+        ('custom-pipeline', 'CustomPipelineCLI', 'Custom pipeline:\nhttp://clinica.run')
+    ]
+    output, modules = run_clinica(['run'])
+    assert 'custom-pipeline' in output
+    assert 'custom_pipeline_cli' not in modules
+
+
+def test_requested_command():
+    from clinica.engine.registry import requested_command
+
+    assert requested_command(['run', 't1-linear', 'bids', 'caps']) == ('run', 't1-linear')
+    assert requested_command(['-v', 'iotools', 'merge-tsv', '-h']) == ('iotools', 'merge-tsv')
+    assert requested_command(['-l', 'run.log', 'convert']) == ('convert', None)
+    assert requested_command(['--help']) == (None, None)
+
+
+def test_registry_matches_cmdparsers():
+    from clinica.engine import CmdParser
+    from clinica.engine.registry import COMMANDS, load_command
+
+    for specs in COMMANDS.values():
+        names = [spec.name for spec in specs]
+        assert len(names) == len(set(names))
+        for spec in specs:
+            cmdparser = load_command(spec)
+            assert isinstance(cmdparser, CmdParser)
+            assert cmdparser.name == spec.name
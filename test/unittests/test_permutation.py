@@ -0,0 +1,80 @@
+# coding: utf8
+
+"""
+    Unit tests of the permutation engine of the group statistics (clinica.utils.permutation)
+    on synthetic volumes with a planted effect.
+"""
+
+import warnings
+
+import numpy as np
+
+warnings.filterwarnings("ignore")
+
+SHAPE = (12, 12, 12)
+BLOB = (slice(4, 8), slice(4, 8), slice(4, 8))
+
+
+def synthetic_study(n_subjects=24, effect=2.5, seed=0):
+    """Design matrix (intercept, group, age), contrast on the group and noise volumes with a blob in the 2nd group."""
+    generator = np.random.default_rng(seed)
+    group = np.repeat([0., 1.], n_subjects // 2)
+    age = generator.normal(70, 5, n_subjects)
+    design_matrix = np.column_stack([np.ones(n_subjects), group, age])
+
+    volumes = generator.normal(size=(n_subjects,) + SHAPE)
+    volumes += 0.05 * (age - 70)[:, np.newaxis, np.newaxis, np.newaxis]
+    volumes[(group == 1,) + BLOB] += effect
+    mask = np.ones(SHAPE, dtype=bool)
+    return design_matrix, [0, 1, 0], volumes[:, mask], mask
+
+
+def test_observed_t_map_matches_ols(tmp_path):
+    from clinica.utils.permutation import PermutationEngine
+
+    design_matrix, contrast, data, _ = synthetic_study()
+    results = PermutationEngine(design_matrix, contrast, n_permutations=10).run(data, str(tmp_path))
+
+    beta, _, _, _ = np.linalg.lstsq(design_matrix, data, rcond=None)
+    residuals = data - design_matrix.dot(beta)
+    df = design_matrix.shape[0] - np.linalg.matrix_rank(design_matrix)
+    sigma2 = (residuals ** 2).sum(axis=0) / df
+    c = np.asarray(contrast, dtype=float)
+    t = c.dot(beta) / np.sqrt(sigma2 * c.dot(np.linalg.inv(design_matrix.T.dot(design_matrix))).dot(c))
+
+    np.testing.assert_allclose(results['t'], t, rtol=1e-4, atol=1e-4)
+
+
+def test_only_planted_blob_survives(tmp_path):
+    from scipy import stats
+    from clinica.utils.permutation import PermutationEngine, grid_edges
+
+    design_matrix, contrast, data, mask = synthetic_study()
+    blob = np.zeros(SHAPE, dtype=bool)
+    blob[BLOB] = True
+    blob = blob[mask]
+    engine = PermutationEngine(design_matrix, contrast, n_permutations=200, seed=1,
+                               cluster_threshold=stats.t.isf(0.001, design_matrix.shape[0] - 3),
+                               edges=grid_edges(mask))
+    results = engine.run(data, str(tmp_path))
+
+    for p_values in [results['peak_p_values'], results['cluster_p_values']]:
+        significant = p_values < 0.05
+        assert significant[blob].any()
+        assert not significant[~blob].any()
+
+
+def test_null_distribution_does_not_depend_on_n_procs(tmp_path):
+    from clinica.utils.permutation import PermutationEngine, grid_edges
+
+    design_matrix, contrast, data, mask = synthetic_study()
+    results = []
+    for n_procs in [1, 2]:
+        working_directory = tmp_path / str(n_procs)
+        working_directory.mkdir()
+        engine = PermutationEngine(design_matrix, contrast, n_permutations=50, seed=3, cluster_threshold=3.,
+                                   edges=grid_edges(mask), n_procs=n_procs, batch_size=8)
+        results.append(engine.run(data, str(working_directory)))
+
+    np.testing.assert_array_equal(results[0]['max_t'], results[1]['max_t'])
+    np.testing.assert_array_equal(results[0]['max_cluster_size'], results[1]['max_cluster_size'])